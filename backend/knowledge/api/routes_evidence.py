@@ -33,6 +33,7 @@ def build_evidence_for_asset(
         processed_asset_count=stats.processed_asset_count,
         built_evidence_count=stats.built_evidence_count,
         skipped_asset_count=stats.skipped_asset_count,
+        unchanged_asset_count=stats.unchanged_asset_count,
         failed_asset_ids=stats.failed_asset_ids,
     )
 
@@ -56,6 +57,7 @@ def build_evidence_for_source(
         processed_asset_count=stats.processed_asset_count,
         built_evidence_count=stats.built_evidence_count,
         skipped_asset_count=stats.skipped_asset_count,
+        unchanged_asset_count=stats.unchanged_asset_count,
         failed_asset_ids=stats.failed_asset_ids,
     )
 
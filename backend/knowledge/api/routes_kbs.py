@@ -9,10 +9,12 @@ from knowledge.core.settings import get_settings
 from knowledge.db.session import get_db
 from knowledge.models import (
     EmbeddingRecord,
+    EvidencePosting,
     ImportedChunk,
     ImportedDocument,
     ImportTask,
     ImportTaskItem,
+    KBVectorCodebook,
     KnowledgeBase,
     LongTermMemory,
     MemoryIngestionEvent,
@@ -23,6 +25,7 @@ from knowledge.schemas.kb import KBCreateRequest, KBResponse, KBStatsResponse, K
 from knowledge.services.bindings import BindingService
 from knowledge.services.evidence_pipeline import EvidencePipelineService
 from knowledge.services.ingestion import IngestionService
+from knowledge.services.service_access_cache import service_access_cache
 from knowledge.services.source_sync import SourceSyncService
 
 
@@ -124,7 +127,7 @@ def _delete_kb_resources(db: Session, wallet_address: str, kb_id: int) -> None:
             .where(EmbeddingRecord.owner_wallet_address == wallet_address)
         ).all()
     )
-    ingestion_service.vector_store.delete_vectors([vector_id for vector_id in vector_ids if vector_id])
+    ingestion_service.vector_store.delete_vectors([vector_id for vector_id in vector_ids if vector_id], kb_id=kb_id)
 
     task_ids = select(ImportTask.id).where(ImportTask.kb_id == kb_id).where(ImportTask.owner_wallet_address == wallet_address)
     db.execute(delete(ImportTaskItem).where(ImportTaskItem.task_id.in_(task_ids)))
@@ -132,6 +135,8 @@ def _delete_kb_resources(db: Session, wallet_address: str, kb_id: int) -> None:
     db.execute(delete(MemoryIngestionEvent).where(MemoryIngestionEvent.kb_id == kb_id).where(MemoryIngestionEvent.owner_wallet_address == wallet_address))
     db.execute(delete(LongTermMemory).where(LongTermMemory.kb_id == kb_id).where(LongTermMemory.owner_wallet_address == wallet_address))
     db.execute(delete(EmbeddingRecord).where(EmbeddingRecord.kb_id == kb_id).where(EmbeddingRecord.owner_wallet_address == wallet_address))
+    db.execute(delete(KBVectorCodebook).where(KBVectorCodebook.kb_id == kb_id).where(KBVectorCodebook.owner_wallet_address == wallet_address))
+    db.execute(delete(EvidencePosting).where(EvidencePosting.kb_id == kb_id))
     db.execute(delete(ImportedChunk).where(ImportedChunk.kb_id == kb_id).where(ImportedChunk.owner_wallet_address == wallet_address))
     db.execute(delete(ImportedDocument).where(ImportedDocument.kb_id == kb_id).where(ImportedDocument.owner_wallet_address == wallet_address))
     db.execute(delete(SourceBinding).where(SourceBinding.kb_id == kb_id))
@@ -208,6 +213,7 @@ def delete_kb(kb_id: int, wallet_address: str = Depends(get_current_wallet), db:
     _delete_kb_resources(db, wallet_address, kb.id)
     db.delete(kb)
     db.commit()
+    service_access_cache.invalidate()
     return {"ok": True}
 
 
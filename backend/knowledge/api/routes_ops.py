@@ -22,6 +22,11 @@ from knowledge.models import (
     WorkerStatus,
 )
 from knowledge.core.settings import get_settings
+from knowledge.services.embedding import query_embedding_cache
+from knowledge.services.embedding_cache import EmbeddingCache
+from knowledge.services.retrieval_log_writer import retrieval_log_writer
+from knowledge.services.search_result_cache import search_result_cache
+from knowledge.services.service_access_cache import service_access_cache
 from knowledge.services.vector_store import build_vector_store
 from knowledge.services.task_queue import TaskQueueService
 from knowledge.utils.time import utc_now
@@ -29,6 +34,7 @@ from knowledge.utils.time import utc_now
 
 router = APIRouter(prefix="/ops", tags=["ops"], dependencies=[Depends(get_current_wallet)])
 task_queue_service = TaskQueueService()
+embedding_cache = EmbeddingCache()
 
 
 @router.get("/overview")
@@ -88,6 +94,11 @@ def overview(db: Session = Depends(get_db)) -> dict:
             db.scalar(select(func.count(SourceAsset.id)).where(SourceAsset.availability_status == "changed")) or 0
         ),
         "uploads": int(db.scalar(select(func.count(UploadRecord.id))) or 0),
+        "embedding_cache": embedding_cache.overview(db),
+        "query_embedding_cache": query_embedding_cache.stats(),
+        "retrieval_log_writer": retrieval_log_writer.stats(),
+        "service_access_cache": service_access_cache.stats(),
+        "search_result_cache": search_result_cache.stats(),
     }
 
 
@@ -4,7 +4,12 @@ from fastapi import APIRouter, Depends, Header, HTTPException
 from sqlalchemy.orm import Session
 
 from knowledge.db.session import get_db
-from knowledge.schemas.service_search import ServiceSearchRequest, ServiceSearchResponse
+from knowledge.schemas.service_search import (
+    ServiceSearchBatchRequest,
+    ServiceSearchBatchResponse,
+    ServiceSearchRequest,
+    ServiceSearchResponse,
+)
 from knowledge.services.service_search import ServiceSearchService
 
 
@@ -12,6 +17,12 @@ router = APIRouter(tags=["service_search"])
 service_search_service = ServiceSearchService()
 
 
+def _http_error(exc: LookupError | ValueError) -> HTTPException:
+    if isinstance(exc, LookupError):
+        return HTTPException(status_code=404, detail=str(exc))
+    return HTTPException(status_code=400 if "must be one of" in str(exc) or "cannot" in str(exc) else 403, detail=str(exc))
+
+
 def _search(mode: str, payload: ServiceSearchRequest, service_api_key: str, db: Session) -> ServiceSearchResponse:
     try:
         return service_search_service.search(
@@ -23,11 +34,10 @@ def _search(mode: str, payload: ServiceSearchRequest, service_api_key: str, db:
             result_view=payload.result_view,
             availability_mode=payload.availability_mode,
             top_k=payload.top_k,
+            retrieval=payload.retrieval,
         )
-    except LookupError as exc:
-        raise HTTPException(status_code=404, detail=str(exc)) from exc
-    except ValueError as exc:
-        raise HTTPException(status_code=400 if "must be one of" in str(exc) or "cannot" in str(exc) else 403, detail=str(exc)) from exc
+    except (LookupError, ValueError) as exc:
+        raise _http_error(exc) from exc
 
 
 @router.post("/service/search", response_model=ServiceSearchResponse)
@@ -55,3 +65,25 @@ def service_search_evidence(
     db: Session = Depends(get_db),
 ):
     return _search("evidence_only", payload, x_service_api_key, db)
+
+
+@router.post("/service/search/batch", response_model=ServiceSearchBatchResponse)
+def service_search_batch(
+    payload: ServiceSearchBatchRequest,
+    x_service_api_key: str = Header(alias="X-Service-Api-Key"),
+    db: Session = Depends(get_db),
+):
+    try:
+        return service_search_service.search_batch(
+            db,
+            service_api_key=x_service_api_key,
+            kb_id=payload.kb_id,
+            queries=payload.queries,
+            mode=payload.mode,
+            result_view=payload.result_view,
+            availability_mode=payload.availability_mode,
+            top_k=payload.top_k,
+            retrieval=payload.retrieval,
+        )
+    except (LookupError, ValueError) as exc:
+        raise _http_error(exc) from exc
@@ -378,6 +378,9 @@ def task_items(task_id: int, wallet_address: str = Depends(get_current_wallet),
             "stage": item.stage,
             "duration_ms": item.duration_ms,
             "error_type": item.error_type,
+            "chunks_added": item.chunks_added,
+            "chunks_kept": item.chunks_kept,
+            "chunks_removed": item.chunks_removed,
             "created_at": item.created_at,
         }
         for item in items
@@ -41,6 +41,12 @@ class Settings(BaseSettings):
     token_encryption_secret: str = ""
 
     vector_store_mode: str = "db"
+    vector_matrix_cache_max_kbs: int = 16
+    vector_store_local_root: str = str(Path(__file__).resolve().parents[3] / ".vector_segments")
+    vector_store_local_max_segments: int = 16
+    vector_ann_min_vectors: int = 2048
+    vector_quantization_rerank_factor: int = 4
+    vector_quantization_fit_sample_size: int = 4096
     weaviate_url: str = "http://127.0.0.1:8080"
     weaviate_index_name: str = "KnowledgeChunk"
     weaviate_scheme: str = "http"
@@ -54,6 +60,41 @@ class Settings(BaseSettings):
     model_gateway_api_key: str = ""
     embedding_model: str = "text-embedding-3-small"
     embedding_dimensions: int = 32
+    embedding_vector_dtype: str = "float32"
+    embedding_batch_max_tokens: int = 8000
+    embedding_batch_max_texts: int = 256
+    embedding_concurrency: int = 4
+    embedding_max_retries: int = 3
+    embedding_retry_backoff_seconds: float = 0.5
+    ingestion_embedding_window_files: int = 16
+    ingestion_chunk_group_size: int = 256
+    ingestion_read_workers: int = 4
+    ingestion_read_prefetch: int = 8
+    ingestion_parse_workers: int = 2
+    ingestion_parse_queue: int = 4
+    ingestion_parse_backend: str = "thread"
+    ingestion_parse_timeout_seconds: float = 300.0
+    ingestion_parse_memory_limit_mb: int = 0
+    ingestion_write_batch_size: int = 500
+    ingestion_chunk_diff: bool = True
+    embedding_cache_enabled: bool = True
+    embedding_cache_max_entries: int = 200000
+    embedding_cache_ttl_seconds: int = 60 * 60 * 24 * 30
+    query_embedding_cache_max_entries: int = 4096
+    query_embedding_cache_ttl_seconds: int = 600
+    lexical_tokenizer: str = "cjk_ngram"
+    hybrid_lexical_candidates: int = 50
+    hybrid_vector_candidates: int = 50
+    hybrid_rrf_k: int = 60
+    hybrid_search_workers: int = 4
+    retrieval_log_async_enabled: bool = True
+    retrieval_log_batch_size: int = 200
+    retrieval_log_flush_interval_ms: int = 250
+    retrieval_log_max_queue_size: int = 10000
+    service_access_cache_ttl_seconds: float = 5.0
+    service_search_batch_max_queries: int = 32
+    search_result_cache_max_entries: int = 2048
+    search_result_cache_ttl_seconds: int = 300
 
     chunk_size: int = 800
     chunk_overlap: int = 120
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from sqlalchemy import Engine, inspect, text
+from sqlalchemy import JSON, Engine, Integer, LargeBinary, bindparam, column, inspect, select, table, text, update
+
+from knowledge.core.settings import get_settings
+from knowledge.utils.vectors import encode_vector
 
 
 TASK_COLUMNS: dict[str, str] = {
@@ -15,15 +18,56 @@ TASK_ITEM_COLUMNS: dict[str, str] = {
     "stage": "VARCHAR(64)",
     "duration_ms": "INTEGER",
     "error_type": "VARCHAR(128)",
+    "chunks_added": "INTEGER",
+    "chunks_kept": "INTEGER",
+    "chunks_removed": "INTEGER",
 }
 
 SOURCE_BINDING_COLUMNS: dict[str, str] = {
     "credential_id": "INTEGER",
 }
 
+EMBEDDING_COLUMNS: dict[str, str] = {
+    "vector_blob": "BLOB",
+    "vector_codes": "BLOB",
+}
+
+KNOWLEDGE_BASE_COLUMNS: dict[str, str] = {
+    "evidence_generation": "INTEGER NOT NULL DEFAULT 0",
+}
+
+DOCUMENT_COLUMNS: dict[str, str] = {
+    "content_sha256": "VARCHAR(64) NOT NULL DEFAULT ''",
+    "chunk_config_hash": "VARCHAR(64) NOT NULL DEFAULT ''",
+}
+
+CHUNK_COLUMNS: dict[str, str] = {
+    "content_sha256": "VARCHAR(64) NOT NULL DEFAULT ''",
+}
+
+SOURCE_ASSET_COLUMNS: dict[str, str] = {
+    "content_sha256": "VARCHAR(64) NOT NULL DEFAULT ''",
+    "chunk_config_hash": "VARCHAR(64) NOT NULL DEFAULT ''",
+}
+
+EVIDENCE_COLUMNS: dict[str, str] = {
+    "lexical_length": "INTEGER",
+    "lexical_tokenizer": "VARCHAR(32)",
+}
+
+EMBEDDING_BLOB_MIGRATION_BATCH_SIZE = 500
+
+_embeddings = table(
+    "embeddings",
+    column("id", Integer),
+    column("vector_json", JSON),
+    column("vector_blob", LargeBinary),
+)
+
 RUNTIME_INDEXES: tuple[tuple[str, str, str], ...] = (
     ("import_tasks", "ix_import_tasks_status_created_at", "status, created_at"),
     ("import_tasks", "ix_import_tasks_owner_status_created_at", "owner_wallet_address, status, created_at"),
+    ("embeddings", "ix_embeddings_kb_owner_id", "kb_id, owner_wallet_address, id"),
 )
 
 
@@ -33,8 +77,49 @@ def ensure_runtime_schema(engine: Engine) -> None:
         _ensure_columns(connection, inspector, "import_tasks", TASK_COLUMNS)
         _ensure_columns(connection, inspector, "import_task_items", TASK_ITEM_COLUMNS)
         _ensure_columns(connection, inspector, "source_bindings", SOURCE_BINDING_COLUMNS)
+        _ensure_columns(connection, inspector, "embeddings", _dialect_columns(connection, EMBEDDING_COLUMNS))
+        _ensure_columns(connection, inspector, "knowledge_bases", KNOWLEDGE_BASE_COLUMNS)
+        _ensure_columns(connection, inspector, "evidence_units", EVIDENCE_COLUMNS)
+        _ensure_columns(connection, inspector, "documents", DOCUMENT_COLUMNS)
+        _ensure_columns(connection, inspector, "chunks", CHUNK_COLUMNS)
+        _ensure_columns(connection, inspector, "source_assets", SOURCE_ASSET_COLUMNS)
         inspector = inspect(connection)
         _ensure_indexes(connection, inspector)
+    _migrate_embedding_vectors(engine)
+
+
+def _dialect_columns(connection, columns: dict[str, str]) -> dict[str, str]:
+    if connection.dialect.name != "postgresql":
+        return columns
+    return {name: "BYTEA" if column_type == "BLOB" else column_type for name, column_type in columns.items()}
+
+
+def _migrate_embedding_vectors(engine: Engine, batch_size: int = EMBEDDING_BLOB_MIGRATION_BATCH_SIZE) -> int:
+    if not inspect(engine).has_table("embeddings"):
+        return 0
+    dtype = get_settings().embedding_vector_dtype
+    converted = 0
+    last_id = 0
+    while True:
+        # One transaction per batch keeps locks short on large tables; the id cursor makes reruns resumable.
+        with engine.begin() as connection:
+            rows = connection.execute(
+                select(_embeddings.c.id, _embeddings.c.vector_json)
+                .where(_embeddings.c.vector_blob.is_(None))
+                .where(_embeddings.c.id > last_id)
+                .order_by(_embeddings.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return converted
+            connection.execute(
+                update(_embeddings)
+                .where(_embeddings.c.id == bindparam("row_id"))
+                .values(vector_blob=bindparam("blob"), vector_json=bindparam("empty")),
+                [{"row_id": row_id, "blob": encode_vector(vector, dtype), "empty": []} for row_id, vector in rows],
+            )
+        converted += len(rows)
+        last_id = rows[-1][0]
 
 
 def _ensure_columns(connection, inspector, table_name: str, columns: dict[str, str]) -> None:
@@ -56,7 +141,7 @@ def _ensure_indexes(connection, inspector) -> None:
 
 
 def _iter_indexes(inspector):
-    for table_name in ("import_tasks", "import_task_items"):
+    for table_name in ("import_tasks", "import_task_items", "embeddings"):
         if not inspector.has_table(table_name):
             continue
         for index in inspector.get_indexes(table_name):
@@ -39,6 +39,22 @@ if is_sqlite:
         cursor.close()
 
 
+@event.listens_for(SessionLocal, "after_flush")
+def _mark_flushed(session: Session, _flush_context) -> None:
+    session.info["flushed_writes"] = True
+
+
+@event.listens_for(SessionLocal, "after_transaction_end")
+def _clear_flushed(session: Session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop("flushed_writes", None)
+
+
+def has_pending_writes(db: Session) -> bool:
+    """Whether the session's transaction holds ORM changes, flushed or not, that a commit would persist."""
+    return bool(db.new or db.dirty or db.deleted or db.info.get("flushed_writes"))
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -26,6 +26,8 @@ from knowledge.core.settings import get_settings
 from knowledge.db.base import Base
 from knowledge.db.schema import ensure_runtime_schema
 from knowledge.db.session import engine
+from knowledge.services.retrieval_log_writer import retrieval_log_writer
+from knowledge.services.service_search import close_hybrid_search_executor
 from knowledge.services.vector_store import close_vector_store
 
 
@@ -36,7 +38,10 @@ settings = get_settings()
 async def lifespan(_: FastAPI):
     Base.metadata.create_all(bind=engine)
     ensure_runtime_schema(engine)
+    retrieval_log_writer.start()
     yield
+    retrieval_log_writer.stop()
+    close_hybrid_search_executor()
     close_vector_store()
 
 
@@ -1,6 +1,8 @@
 from knowledge.models.entities import (
     AuthChallenge,
+    EvidencePosting,
     EvidenceUnit,
+    EmbeddingCacheEntry,
     EmbeddingRecord,
     ImportedChunk,
     ImportedDocument,
@@ -8,6 +10,8 @@ from knowledge.models.entities import (
     ImportTaskItem,
     KBRelease,
     KBReleaseItem,
+    KBReleaseSearchIndex,
+    KBVectorCodebook,
     KnowledgeBase,
     KnowledgeItem,
     KnowledgeItemCandidate,
@@ -30,7 +34,9 @@ from knowledge.models.entities import (
 
 __all__ = [
     "AuthChallenge",
+    "EvidencePosting",
     "EvidenceUnit",
+    "EmbeddingCacheEntry",
     "EmbeddingRecord",
     "ImportedChunk",
     "ImportedDocument",
@@ -38,6 +44,8 @@ __all__ = [
     "ImportTaskItem",
     "KBRelease",
     "KBReleaseItem",
+    "KBReleaseSearchIndex",
+    "KBVectorCodebook",
     "KnowledgeBase",
     "KnowledgeItem",
     "KnowledgeItemCandidate",
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Boolean, DateTime, Float, ForeignKey, Index, Integer, JSON, String, Text, UniqueConstraint
+from sqlalchemy import Boolean, DateTime, Float, ForeignKey, Index, Integer, JSON, LargeBinary, String, Text, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from knowledge.db.base import Base
@@ -18,6 +18,7 @@ SOURCE_SYNC_STATUSES = ("pending_sync", "syncing", "synced", "failed", "source_m
 SOURCE_MISSING_POLICIES = ("mark_missing", "retain_index_until_confirmed")
 SOURCE_ASSET_AVAILABILITY_STATUSES = ("discovered", "available", "changed", "missing", "missing_unconfirmed", "ignored")
 EVIDENCE_VECTOR_STATUSES = ("pending", "indexed", "failed")
+VECTOR_QUANTIZATION_METHODS = ("none", "int8")
 KNOWLEDGE_ITEM_ORIGIN_TYPES = ("extracted", "manual", "manual_from_extracted", "merged")
 KNOWLEDGE_ITEM_CANDIDATE_REVIEW_STATUSES = ("pending_review", "accepted", "rejected", "merged")
 KNOWLEDGE_ITEM_LIFECYCLE_STATUSES = ("candidate", "confirmed", "rejected", "archived")
@@ -63,6 +64,7 @@ class KnowledgeBase(Base):
     description: Mapped[str] = mapped_column(Text, default="", nullable=False)
     status: Mapped[str] = mapped_column(String(32), default="active", nullable=False)
     retrieval_config: Mapped[dict] = mapped_column(JSON, default=dict, nullable=False)
+    evidence_generation: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow, onupdate=utcnow, nullable=False)
 
@@ -77,6 +79,9 @@ class KnowledgeBase(Base):
     releases: Mapped[list["KBRelease"]] = relationship(back_populates="knowledge_base", cascade="all, delete-orphan")
     service_grants: Mapped[list["ServiceGrant"]] = relationship(back_populates="knowledge_base", cascade="all, delete-orphan")
     retrieval_logs: Mapped[list["RetrievalLog"]] = relationship(back_populates="knowledge_base", cascade="all, delete-orphan")
+    vector_codebook: Mapped[Optional["KBVectorCodebook"]] = relationship(
+        back_populates="knowledge_base", cascade="all, delete-orphan", uselist=False
+    )
 
 
 class SourceBinding(Base):
@@ -107,6 +112,8 @@ class ImportedDocument(Base):
     source_file_name: Mapped[str] = mapped_column(String(255), nullable=False)
     source_kind: Mapped[str] = mapped_column(String(16), nullable=False)
     source_etag_or_mtime: Mapped[str] = mapped_column(String(128), default="", nullable=False)
+    content_sha256: Mapped[str] = mapped_column(String(64), default="", nullable=False)
+    chunk_config_hash: Mapped[str] = mapped_column(String(64), default="", nullable=False)
     parse_status: Mapped[str] = mapped_column(String(32), default="pending", nullable=False)
     chunk_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     last_indexed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
@@ -126,6 +133,7 @@ class ImportedChunk(Base):
     owner_wallet_address: Mapped[str] = mapped_column(String(64), index=True, nullable=False)
     chunk_index: Mapped[int] = mapped_column(Integer, nullable=False)
     text: Mapped[str] = mapped_column(Text, nullable=False)
+    content_sha256: Mapped[str] = mapped_column(String(64), default="", nullable=False)
     metadata_json: Mapped[dict] = mapped_column(JSON, default=dict, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow, nullable=False)
 
@@ -135,6 +143,7 @@ class ImportedChunk(Base):
 
 class EmbeddingRecord(Base):
     __tablename__ = "embeddings"
+    __table_args__ = (Index("ix_embeddings_kb_owner_id", "kb_id", "owner_wallet_address", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     chunk_id: Mapped[int] = mapped_column(ForeignKey("chunks.id"), index=True, nullable=False, unique=True)
@@ -143,12 +152,47 @@ class EmbeddingRecord(Base):
     vector_id: Mapped[str] = mapped_column(String(128), default="", nullable=False)
     embedding_model: Mapped[str] = mapped_column(String(128), nullable=False)
     index_status: Mapped[str] = mapped_column(String(32), default="indexed", nullable=False)
-    vector_json: Mapped[list[float]] = mapped_column(JSON, nullable=False)
+    vector_json: Mapped[list[float]] = mapped_column(JSON, default=list, nullable=False)
+    vector_blob: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)
+    vector_codes: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow, nullable=False)
 
     chunk: Mapped["ImportedChunk"] = relationship(back_populates="embedding")
 
 
+class KBVectorCodebook(Base):
+    __tablename__ = "kb_vector_codebooks"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    kb_id: Mapped[int] = mapped_column(ForeignKey("knowledge_bases.id"), index=True, nullable=False, unique=True)
+    owner_wallet_address: Mapped[str] = mapped_column(String(64), index=True, nullable=False)
+    method: Mapped[str] = mapped_column(String(32), default=VECTOR_QUANTIZATION_METHODS[1], nullable=False)
+    dimensions: Mapped[int] = mapped_column(Integer, nullable=False)
+    params_blob: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    sample_size: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow, onupdate=utcnow, nullable=False)
+
+    knowledge_base: Mapped["KnowledgeBase"] = relationship(back_populates="vector_codebook")
+
+
+class EmbeddingCacheEntry(Base):
+    __tablename__ = "embedding_cache_entries"
+    __table_args__ = (
+        UniqueConstraint("model", "dimensions", "content_hash", name="uq_embedding_cache_entries_key"),
+        Index("ix_embedding_cache_entries_last_used_at", "last_used_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    model: Mapped[str] = mapped_column(String(255), nullable=False)
+    dimensions: Mapped[int] = mapped_column(Integer, nullable=False)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    vector_blob: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    hit_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow, nullable=False)
+    last_used_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow, nullable=False)
+
+
 class ImportTask(Base):
     __tablename__ = "import_tasks"
     __table_args__ = (
@@ -188,6 +232,9 @@ class ImportTaskItem(Base):
     stage: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
     duration_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     error_type: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    chunks_added: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    chunks_kept: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    chunks_removed: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow, onupdate=utcnow, nullable=False)
 
@@ -322,6 +369,8 @@ class SourceAsset(Base):
     asset_name: Mapped[str] = mapped_column(String(255), nullable=False)
     asset_type: Mapped[str] = mapped_column(String(64), default="file", nullable=False)
     source_version: Mapped[str] = mapped_column(String(128), default="", nullable=False)
+    content_sha256: Mapped[str] = mapped_column(String(64), default="", nullable=False)
+    chunk_config_hash: Mapped[str] = mapped_column(String(64), default="", nullable=False)
     availability_status: Mapped[str] = mapped_column(String(32), default=SOURCE_ASSET_AVAILABILITY_STATUSES[0], nullable=False)
     last_ingested_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow, nullable=False)
@@ -347,6 +396,8 @@ class EvidenceUnit(Base):
     metadata_json: Mapped[dict] = mapped_column(JSON, default=dict, nullable=False)
     source_locator: Mapped[dict] = mapped_column(JSON, default=dict, nullable=False)
     vector_status: Mapped[str] = mapped_column(String(32), default=EVIDENCE_VECTOR_STATUSES[0], nullable=False)
+    lexical_length: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    lexical_tokenizer: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow, nullable=False)
 
     knowledge_base: Mapped["KnowledgeBase"] = relationship(back_populates="evidence_units")
@@ -354,6 +405,17 @@ class EvidenceUnit(Base):
     knowledge_item_links: Mapped[list["KnowledgeItemEvidenceLink"]] = relationship(back_populates="evidence_unit", cascade="all, delete-orphan")
 
 
+class EvidencePosting(Base):
+    __tablename__ = "evidence_postings"
+    __table_args__ = (Index("ix_evidence_postings_kb_term_evidence", "kb_id", "term", "evidence_id"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    kb_id: Mapped[int] = mapped_column(ForeignKey("knowledge_bases.id"), nullable=False)
+    evidence_id: Mapped[int] = mapped_column(ForeignKey("evidence_units.id", ondelete="CASCADE"), index=True, nullable=False)
+    term: Mapped[str] = mapped_column(String(64), nullable=False)
+    term_frequency: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
+
+
 class KnowledgeItemCandidate(Base):
     __tablename__ = "knowledge_item_candidates"
     __table_args__ = (
@@ -471,6 +533,7 @@ class KBRelease(Base):
     knowledge_base: Mapped["KnowledgeBase"] = relationship(back_populates="releases")
     supersedes_release: Mapped[Optional["KBRelease"]] = relationship(remote_side="KBRelease.id")
     release_items: Mapped[list["KBReleaseItem"]] = relationship(back_populates="release", cascade="all, delete-orphan")
+    search_index: Mapped[Optional["KBReleaseSearchIndex"]] = relationship(back_populates="release", cascade="all, delete-orphan", uselist=False)
     pinned_grants: Mapped[list["ServiceGrant"]] = relationship(back_populates="pinned_release")
     retrieval_logs: Mapped[list["RetrievalLog"]] = relationship(back_populates="release")
 
@@ -494,6 +557,19 @@ class KBReleaseItem(Base):
     knowledge_item_revision: Mapped["KnowledgeItemRevision"] = relationship(back_populates="release_items")
 
 
+class KBReleaseSearchIndex(Base):
+    __tablename__ = "kb_release_search_indexes"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    release_id: Mapped[int] = mapped_column(ForeignKey("kb_releases.id", ondelete="CASCADE"), unique=True, nullable=False)
+    tokenizer: Mapped[str] = mapped_column(String(32), nullable=False)
+    item_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    entries_json: Mapped[list] = mapped_column(JSON, default=list, nullable=False)
+    built_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow, nullable=False)
+
+    release: Mapped["KBRelease"] = relationship(back_populates="search_index")
+
+
 class ServicePrincipal(Base):
     __tablename__ = "service_principals"
     __table_args__ = (
@@ -12,6 +12,7 @@ class EvidenceBuildResponse(BaseModel):
     processed_asset_count: int = 0
     built_evidence_count: int = 0
     skipped_asset_count: int = 0
+    unchanged_asset_count: int = 0
     failed_asset_ids: list[int] = Field(default_factory=list)
 
 
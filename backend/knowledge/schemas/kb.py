@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -14,6 +14,9 @@ class KBConfig(BaseModel):
     retrieval_top_k: int = 6
     memory_top_k: int = 4
     embedding_model: str = "text-embedding-3-small"
+    vector_index: Literal["flat", "ivf"] = "flat"
+    ivf_nprobe: int = Field(default=16, ge=1, le=4096)
+    vector_quantization: Literal["none", "int8"] = "none"
 
 
 class KBCreateRequest(BaseModel):
@@ -7,6 +7,7 @@ from knowledge.schemas.grants import ServiceGrantResolvedRead
 
 
 RESULT_VIEWS = ("compact", "referenced", "audit")
+RETRIEVAL_STRATEGIES = ("lexical", "hybrid")
 
 
 class ServiceSearchRequest(BaseModel):
@@ -15,6 +16,17 @@ class ServiceSearchRequest(BaseModel):
     top_k: int = 5
     result_view: str | None = None
     availability_mode: str = "allow_all"
+    retrieval: str = "lexical"
+
+
+class ServiceSearchBatchRequest(BaseModel):
+    kb_id: int
+    queries: list[str]
+    mode: str = "formal_first"
+    top_k: int = 5
+    result_view: str | None = None
+    availability_mode: str = "allow_all"
+    retrieval: str = "lexical"
 
 
 class ServiceSearchSourceHealthDetail(BaseModel):
@@ -60,6 +72,23 @@ class ServiceSearchResponse(BaseModel):
     mode: str
     result_view: str
     availability_mode: str
+    retrieval: str = "lexical"
     release: KBReleaseRead | None = None
     grant: ServiceGrantResolvedRead | None = None
     hits: list[ServiceSearchHit] = Field(default_factory=list)
+
+
+class ServiceSearchBatchResult(BaseModel):
+    query: str
+    hits: list[ServiceSearchHit] = Field(default_factory=list)
+
+
+class ServiceSearchBatchResponse(BaseModel):
+    kb_id: int
+    mode: str
+    result_view: str
+    availability_mode: str
+    retrieval: str = "lexical"
+    release: KBReleaseRead | None = None
+    grant: ServiceGrantResolvedRead | None = None
+    results: list[ServiceSearchBatchResult] = Field(default_factory=list)
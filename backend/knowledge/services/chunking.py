@@ -5,10 +5,12 @@ import io
 import json
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Iterable, Iterator
 
 from langchain_text_splitters import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
 
 from knowledge.services.filetypes import infer_file_type
+from knowledge.services.parser import ParsedSection
 
 
 @dataclass
@@ -32,6 +34,12 @@ class DocumentChunker:
             return self._chunk_yaml(parsed_text, config)
         return self._chunk_text(parsed_text, config, file_type=file_type)
 
+    def iter_chunks(self, file_name: str, sections: Iterable[ParsedSection], config: dict) -> Iterator[ChunkResult]:
+        if infer_file_type(file_name) == "pdf":
+            yield from self._iter_pdf_chunks(sections, config)
+            return
+        yield from self.chunk(file_name, "\n".join(section.text for section in sections), config)
+
     def _text_splitter(self, chunk_size: int, chunk_overlap: int, separators: list[str]) -> RecursiveCharacterTextSplitter:
         return RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
@@ -55,13 +63,23 @@ class DocumentChunker:
             if part.strip()
         ]
 
-    def _chunk_pdf(self, text: str, config: dict) -> list[ChunkResult]:
-        splitter = self._text_splitter(
-            chunk_size=max(500, int(config.get("chunk_size", 800)) - 120),
-            chunk_overlap=max(60, int(config.get("chunk_overlap", 120)) - 40),
+    @staticmethod
+    def _pdf_chunk_size(config: dict) -> int:
+        return max(500, int(config.get("chunk_size", 800)) - 120)
+
+    @staticmethod
+    def _pdf_chunk_overlap(config: dict) -> int:
+        return max(60, int(config.get("chunk_overlap", 120)) - 40)
+
+    def _pdf_splitter(self, config: dict) -> RecursiveCharacterTextSplitter:
+        return self._text_splitter(
+            chunk_size=self._pdf_chunk_size(config),
+            chunk_overlap=self._pdf_chunk_overlap(config),
             separators=["\n\n", "\n", "。", "！", "？", ".", " ", ""],
         )
-        parts = splitter.split_text(text)
+
+    def _chunk_pdf(self, text: str, config: dict) -> list[ChunkResult]:
+        parts = self._pdf_splitter(config).split_text(text)
         return [
             ChunkResult(
                 text=part,
@@ -71,6 +89,55 @@ class DocumentChunker:
             if part.strip()
         ]
 
+    def _iter_pdf_chunks(self, pages: Iterable[ParsedSection], config: dict) -> Iterator[ChunkResult]:
+        # Split page by page; a short remainder is carried into the next page rather than becoming a tiny
+        # chunk at every page break, and a full-length last part still carries its overlap tail across the
+        # break. Only one page of text plus the carry is held at a time.
+        splitter = self._pdf_splitter(config)
+        carry_limit = self._pdf_chunk_size(config) // 2
+        overlap = self._pdf_chunk_overlap(config)
+        carry, carry_start, page_end = "", None, None
+        tail = ""
+        for page in pages:
+            if not page.text.strip():
+                continue
+            page_end = page.page_number
+            page_start = carry_start if carry else page_end
+            lead = carry or tail
+            text = f"{lead} {page.text}" if lead else page.text
+            parts = [part for part in splitter.split_text(text) if part.strip()]
+            carry, carry_start, tail = "", None, ""
+            if parts and len(parts[-1]) < carry_limit:
+                carry = parts.pop()
+                carry_start = page_end if parts else page_start
+            elif parts:
+                tail = self._overlap_tail(parts[-1], overlap)
+            for index, part in enumerate(parts):
+                yield self._pdf_chunk(part, page_start if index == 0 else page_end, page_end)
+        if carry:
+            yield self._pdf_chunk(carry, carry_start, page_end)
+
+    @staticmethod
+    def _overlap_tail(text: str, overlap: int) -> str:
+        if len(text) <= overlap:
+            return text
+        tail = text[-overlap:]
+        # Start on a word boundary so the next page's first chunk does not open mid-word.
+        space = tail.find(" ")
+        return tail[space + 1 :] if 0 <= space < len(tail) - 1 else tail
+
+    @staticmethod
+    def _pdf_chunk(text: str, page_start: int | None, page_end: int | None) -> ChunkResult:
+        return ChunkResult(
+            text=text,
+            metadata={
+                "chunk_strategy": "pdf_recursive_dense",
+                "char_count": len(text),
+                "page_start": page_start,
+                "page_end": page_end,
+            },
+        )
+
     def _chunk_markdown(self, text: str, config: dict) -> list[ChunkResult]:
         header_splitter = MarkdownHeaderTextSplitter(
             headers_to_split_on=[("#", "h1"), ("##", "h2"), ("###", "h3")],
@@ -2,20 +2,162 @@ from __future__ import annotations
 
 import hashlib
 import math
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from time import perf_counter
+from typing import Callable
 
 from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
+from sqlalchemy.exc import SQLAlchemyError
 
 from knowledge.core.settings import get_settings
+from knowledge.services.embedding_cache import EmbeddingCache, build_embedding_cache, content_hash
+
+
+class QueryEmbeddingCache:
+    """Process-wide LRU of query vectors with a TTL.
+
+    Concurrent misses for the same key are single-flighted: the first caller embeds, the others wait on its
+    future and share the result (or its exception).
+    """
+
+    def __init__(
+        self,
+        max_entries: int | None = None,
+        ttl_seconds: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        settings = get_settings()
+        self.max_entries = max(0, int(settings.query_embedding_cache_max_entries if max_entries is None else max_entries))
+        self.ttl_seconds = max(0.0, float(settings.query_embedding_cache_ttl_seconds if ttl_seconds is None else ttl_seconds))
+        self._clock = clock
+        self._entries: OrderedDict[tuple, tuple[float, list[float]]] = OrderedDict()
+        self._inflight: dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.coalesced = 0
+            self.evictions = 0
+            self.errors = 0
+            self.upstream_calls = 0
+            self.upstream_ms_total = 0.0
+            self.upstream_ms_max = 0.0
+
+    def get_or_compute(self, key: tuple, compute: Callable[[], list[float]]) -> list[float]:
+        if self.max_entries == 0:
+            return compute()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (not self.ttl_seconds or self._clock() - entry[0] < self.ttl_seconds):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(entry[1])
+            if entry is not None:
+                del self._entries[key]
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return list(future.result())
+
+        started = perf_counter()
+        try:
+            vector = list(compute())
+        except BaseException as exc:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self.errors += 1
+            future.set_exception(exc)
+            raise
+        elapsed_ms = (perf_counter() - started) * 1000
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._entries[key] = (self._clock(), vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self.upstream_calls += 1
+            self.upstream_ms_total += elapsed_ms
+            self.upstream_ms_max = max(self.upstream_ms_max, elapsed_ms)
+        future.set_result(vector)
+        return list(vector)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "errors": self.errors,
+                "avg_upstream_ms": round(self.upstream_ms_total / self.upstream_calls, 3) if self.upstream_calls else 0.0,
+                "max_upstream_ms": round(self.upstream_ms_max, 3),
+            }
+
+
+query_embedding_cache = QueryEmbeddingCache()
 
 
 class EmbeddingProvider:
     provider_name = "unknown"
+    cache: EmbeddingCache | None = None
+    query_cache: QueryEmbeddingCache | None = None
+    cache_model = ""
+    cache_dimensions = 0
 
     def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        if self.cache is None:
+            return self._embed_uncached(texts)
+        hashes = [content_hash(text) for text in texts]
+        unique_hashes = list(dict.fromkeys(hashes))
+        try:
+            vectors = self.cache.get_many(self.cache_model, self.cache_dimensions, unique_hashes)
+        except SQLAlchemyError:
+            self.cache.stats.record(errors=1)
+            vectors = {}
+        missing = [hash_value for hash_value in unique_hashes if hash_value not in vectors]
+        if missing:
+            text_by_hash = dict(zip(hashes, texts))
+            embedded = self._embed_uncached([text_by_hash[hash_value] for hash_value in missing])
+            if len(embedded) != len(missing):
+                raise ValueError(f"embedding provider returned {len(embedded)} vectors for {len(missing)} texts")
+            fresh = dict(zip(missing, embedded))
+            try:
+                self.cache.put_many(self.cache_model, self.cache_dimensions, fresh)
+            except SQLAlchemyError:
+                self.cache.stats.record(errors=1)
+            vectors.update(fresh)
+        return [vectors[hash_value] for hash_value in hashes]
+
+    def _embed_uncached(self, texts: list[str]) -> list[list[float]]:
         raise NotImplementedError
 
     def embed_query(self, text: str) -> list[float]:
+        if self.query_cache is None:
+            return self._embed_query_uncached(text)
+        key = (self.provider_name, self.cache_model, self.cache_dimensions, text)
+        return self.query_cache.get_or_compute(key, lambda: self._embed_query_uncached(text))
+
+    def _embed_query_uncached(self, text: str) -> list[float]:
         return self.embed_texts([text])[0]
 
     def diagnostics(self) -> dict:
@@ -25,10 +167,19 @@ class EmbeddingProvider:
 class MockEmbeddingProvider(EmbeddingProvider):
     provider_name = "mock"
 
-    def __init__(self, dimensions: int, configured_mode: str = "mock", fallback_reason: str = "") -> None:
+    def __init__(
+        self,
+        dimensions: int,
+        configured_mode: str = "mock",
+        fallback_reason: str = "",
+        query_cache: QueryEmbeddingCache | None = None,
+    ) -> None:
         self.dimensions = dimensions
         self.configured_mode = configured_mode
         self.fallback_reason = fallback_reason
+        self.query_cache = query_cache
+        self.cache_model = self.provider_name
+        self.cache_dimensions = int(dimensions)
 
     def embed_texts(self, texts: list[str]) -> list[list[float]]:
         vectors: list[list[float]] = []
@@ -54,15 +205,27 @@ class MockEmbeddingProvider(EmbeddingProvider):
 class OpenAICompatibleEmbeddingProvider(EmbeddingProvider):
     provider_name = "openai_compatible"
 
-    def __init__(self, base_url: str, api_key: str, model: str) -> None:
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        model: str,
+        dimensions: int = 0,
+        cache: EmbeddingCache | None = None,
+        query_cache: QueryEmbeddingCache | None = None,
+    ) -> None:
         self.base_url = base_url
         self.model = model
         self.client = OpenAIEmbeddings(base_url=base_url, api_key=api_key or "dummy", model=model)
+        self.cache = cache
+        self.query_cache = query_cache
+        self.cache_model = model
+        self.cache_dimensions = int(dimensions)
 
-    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+    def _embed_uncached(self, texts: list[str]) -> list[list[float]]:
         return self.client.embed_documents(texts)
 
-    def embed_query(self, text: str) -> list[float]:
+    def _embed_query_uncached(self, text: str) -> list[float]:
         return self.client.embed_query(text)
 
     def diagnostics(self) -> dict:
@@ -71,6 +234,7 @@ class OpenAICompatibleEmbeddingProvider(EmbeddingProvider):
             "configured_mode": self.provider_name,
             "base_url": self.base_url,
             "model": self.model,
+            "embedding_cache": self.cache is not None,
             "fallback_reason": "",
         }
 
@@ -93,6 +257,9 @@ def build_embedding_provider() -> EmbeddingProvider:
             base_url=settings.model_gateway_base_url,
             api_key=settings.model_gateway_api_key,
             model=settings.embedding_model,
+            dimensions=settings.embedding_dimensions,
+            cache=build_embedding_cache(),
+            query_cache=query_embedding_cache,
         )
     fallback_reason = ""
     if settings.model_provider_mode == "openai_compatible" and not settings.model_gateway_base_url:
@@ -101,6 +268,7 @@ def build_embedding_provider() -> EmbeddingProvider:
         dimensions=settings.embedding_dimensions,
         configured_mode=settings.model_provider_mode,
         fallback_reason=fallback_reason,
+        query_cache=query_embedding_cache,
     )
 
 
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Callable, Iterator
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from knowledge.core.settings import get_settings
+from knowledge.db.session import SessionLocal
+from knowledge.models import EmbeddingCacheEntry
+from knowledge.utils.time import utc_now
+from knowledge.utils.vectors import decode_vector, encode_vector
+
+
+LOOKUP_BATCH_SIZE = 500
+
+_caller_session: ContextVar[Session | None] = ContextVar("embedding_cache_session", default=None)
+
+
+@contextmanager
+def embedding_cache_session(db: Session) -> Iterator[Session]:
+    """Route cache reads and writes through ``db`` instead of a fresh session.
+
+    Callers that embed while holding an uncommitted SQLite write must use this: a second connection
+    would wait out the busy timeout on the caller's own lock. Cache rows then commit (or roll back)
+    with the caller's transaction.
+    """
+    token = _caller_session.set(db)
+    try:
+        yield db
+    finally:
+        _caller_session.reset(token)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCacheStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.writes = 0
+            self.evictions = 0
+            self.errors = 0
+
+    def record(self, **counts: int) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + int(value))
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "errors": self.errors,
+            }
+
+
+embedding_cache_stats = EmbeddingCacheStats()
+
+
+class EmbeddingCache:
+    """Content-addressed store of document embeddings keyed by (model, dimensions, sha256(text)).
+
+    Entries unused for ``ttl_seconds`` are treated as misses and purged; past ``max_entries`` the least
+    recently used rows are evicted. Eviction runs every ``evict_interval`` writes rather than per call.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_entries: int | None = None,
+        ttl_seconds: int | None = None,
+        evict_interval: int = 1000,
+        stats: EmbeddingCacheStats | None = None,
+    ) -> None:
+        settings = get_settings()
+        self.session_factory = session_factory
+        self.max_entries = max(1, int(max_entries or settings.embedding_cache_max_entries))
+        self.ttl_seconds = max(0, int(settings.embedding_cache_ttl_seconds if ttl_seconds is None else ttl_seconds))
+        self.evict_interval = max(1, int(evict_interval))
+        self.stats = stats or embedding_cache_stats
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+
+    def get_many(self, model: str, dimensions: int, hashes: list[str]) -> dict[str, list[float]]:
+        found: dict[str, list[float]] = {}
+        if not hashes:
+            return found
+        cutoff = self._expired_before()
+        with self._session() as (db, shared):
+            hit_ids: list[int] = []
+            for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+                rows = db.execute(
+                    select(EmbeddingCacheEntry.id, EmbeddingCacheEntry.content_hash, EmbeddingCacheEntry.vector_blob, EmbeddingCacheEntry.last_used_at)
+                    .where(EmbeddingCacheEntry.model == model)
+                    .where(EmbeddingCacheEntry.dimensions == int(dimensions))
+                    .where(EmbeddingCacheEntry.content_hash.in_(hashes[start : start + LOOKUP_BATCH_SIZE]))
+                ).all()
+                for entry_id, hash_value, blob, last_used_at in rows:
+                    if cutoff is not None and last_used_at < cutoff:
+                        continue
+                    found[hash_value] = decode_vector(blob).tolist()
+                    hit_ids.append(entry_id)
+            for start in range(0, len(hit_ids), LOOKUP_BATCH_SIZE):
+                db.execute(
+                    update(EmbeddingCacheEntry)
+                    .where(EmbeddingCacheEntry.id.in_(hit_ids[start : start + LOOKUP_BATCH_SIZE]))
+                    .values(last_used_at=utc_now(), hit_count=EmbeddingCacheEntry.hit_count + 1)
+                )
+            if not shared:
+                db.commit()
+        self.stats.record(hits=len(found), misses=len(hashes) - len(found))
+        return found
+
+    def put_many(self, model: str, dimensions: int, vectors: dict[str, list[float]]) -> None:
+        if not vectors:
+            return
+        now = utc_now()
+        with self._session() as (db, shared):
+            try:
+                # Savepoint so a lost insert race never poisons a shared caller transaction.
+                with db.begin_nested():
+                    self._write_entries(db, model, dimensions, vectors, now)
+            except IntegrityError:
+                # Another worker cached the same texts first; their vectors are as good as ours.
+                if not shared:
+                    db.rollback()
+                return
+            if not shared:
+                db.commit()
+        self.stats.record(writes=len(vectors))
+        with self._lock:
+            self._writes_since_evict += len(vectors)
+            # Eviction deletes across the whole table; leave it to the next unshared write.
+            due = not shared and self._writes_since_evict >= self.evict_interval
+            if due:
+                self._writes_since_evict = 0
+        if due:
+            self.evict()
+
+    def _write_entries(self, db: Session, model: str, dimensions: int, vectors: dict[str, list[float]], now: datetime) -> None:
+        existing: dict[str, int] = {}
+        hashes = list(vectors)
+        for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+            existing.update(
+                db.execute(
+                    select(EmbeddingCacheEntry.content_hash, EmbeddingCacheEntry.id)
+                    .where(EmbeddingCacheEntry.model == model)
+                    .where(EmbeddingCacheEntry.dimensions == int(dimensions))
+                    .where(EmbeddingCacheEntry.content_hash.in_(hashes[start : start + LOOKUP_BATCH_SIZE]))
+                ).all()
+            )
+        new_rows = []
+        for hash_value, vector in vectors.items():
+            if hash_value in existing:
+                # Expired entry re-embedded: refresh in place instead of violating the unique key.
+                db.execute(
+                    update(EmbeddingCacheEntry)
+                    .where(EmbeddingCacheEntry.id == existing[hash_value])
+                    .values(vector_blob=encode_vector(vector), created_at=now, last_used_at=now)
+                )
+            else:
+                new_rows.append(
+                    {
+                        "model": model,
+                        "dimensions": int(dimensions),
+                        "content_hash": hash_value,
+                        "vector_blob": encode_vector(vector),
+                        "created_at": now,
+                        "last_used_at": now,
+                    }
+                )
+        if new_rows:
+            db.execute(insert(EmbeddingCacheEntry), new_rows)
+
+    @contextmanager
+    def _session(self) -> Iterator[tuple[Session, bool]]:
+        shared = _caller_session.get()
+        if shared is not None:
+            yield shared, True
+            return
+        db = self.session_factory()
+        try:
+            yield db, False
+        finally:
+            db.close()
+
+    def evict(self) -> int:
+        removed = 0
+        db = self.session_factory()
+        try:
+            cutoff = self._expired_before()
+            if cutoff is not None:
+                removed += db.execute(delete(EmbeddingCacheEntry).where(EmbeddingCacheEntry.last_used_at < cutoff)).rowcount or 0
+            overflow = int(db.scalar(select(func.count(EmbeddingCacheEntry.id))) or 0) - self.max_entries
+            if overflow > 0:
+                oldest = (
+                    select(EmbeddingCacheEntry.id)
+                    .order_by(EmbeddingCacheEntry.last_used_at.asc(), EmbeddingCacheEntry.id.asc())
+                    .limit(overflow)
+                    .scalar_subquery()
+                )
+                removed += db.execute(delete(EmbeddingCacheEntry).where(EmbeddingCacheEntry.id.in_(oldest))).rowcount or 0
+            db.commit()
+        finally:
+            db.close()
+        self.stats.record(evictions=removed)
+        return removed
+
+    def overview(self, db: Session) -> dict:
+        return {
+            "entries": int(db.scalar(select(func.count(EmbeddingCacheEntry.id))) or 0),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            **self.stats.as_dict(),
+        }
+
+    def _expired_before(self) -> datetime | None:
+        if not self.ttl_seconds:
+            return None
+        return utc_now() - timedelta(seconds=self.ttl_seconds)
+
+
+def build_embedding_cache() -> EmbeddingCache | None:
+    if not get_settings().embedding_cache_enabled:
+        return None
+    return EmbeddingCache()
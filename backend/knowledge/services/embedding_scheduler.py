@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Callable
+
+import httpx
+import openai
+
+from knowledge.core.settings import get_settings
+from knowledge.services.embedding import EmbeddingProvider
+
+
+TRANSIENT_STATUS_CODES = frozenset({408, 429})
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    # Timeouts, dropped connections, rate limits and server errors may pass on retry; a rejected input never will.
+    if isinstance(exc, (TimeoutError, ConnectionError, httpx.TransportError, openai.APIConnectionError)):
+        return True
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return isinstance(status, int) and (status in TRANSIENT_STATUS_CODES or status >= 500)
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four UTF-8 bytes per token; errs on the high side for CJK text, which is what budgets need.
+    return max(1, math.ceil(len(text.encode("utf-8")) / 4))
+
+
+@dataclass
+class EmbeddingBatch:
+    texts: list[str] = field(default_factory=list)
+    slots: list[tuple[int, int]] = field(default_factory=list)
+    tokens: int = 0
+
+
+@dataclass
+class EmbeddingScheduleStats:
+    groups: int = 0
+    texts: int = 0
+    batches: int = 0
+    retries: int = 0
+    failed_batches: int = 0
+    estimated_tokens: int = 0
+    duration_ms: int = 0
+
+    def merge(self, other: "EmbeddingScheduleStats") -> None:
+        self.groups += other.groups
+        self.texts += other.texts
+        self.batches += other.batches
+        self.retries += other.retries
+        self.failed_batches += other.failed_batches
+        self.estimated_tokens += other.estimated_tokens
+        self.duration_ms += other.duration_ms
+
+    def as_dict(self) -> dict:
+        return {
+            "groups": self.groups,
+            "texts": self.texts,
+            "batches": self.batches,
+            "retries": self.retries,
+            "failed_batches": self.failed_batches,
+            "estimated_tokens": self.estimated_tokens,
+            "duration_ms": self.duration_ms,
+        }
+
+
+class EmbeddingScheduler:
+    """Packs texts from many files into token-budgeted batches and embeds them concurrently.
+
+    Each group (usually one file's chunks) gets back either its vectors in order or the exception of the
+    first batch that failed, so one bad batch only fails the files it carried. Only transient errors are retried.
+    """
+
+    def __init__(
+        self,
+        provider: EmbeddingProvider,
+        max_batch_tokens: int | None = None,
+        max_batch_texts: int | None = None,
+        concurrency: int | None = None,
+        max_retries: int | None = None,
+        backoff_seconds: float | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        settings = get_settings()
+        self.provider = provider
+        self.max_batch_tokens = max(1, int(max_batch_tokens or settings.embedding_batch_max_tokens))
+        self.max_batch_texts = max(1, int(max_batch_texts or settings.embedding_batch_max_texts))
+        self.concurrency = max(1, int(concurrency or settings.embedding_concurrency))
+        self.max_retries = max(0, int(settings.embedding_max_retries if max_retries is None else max_retries))
+        self.backoff_seconds = max(0.0, float(settings.embedding_retry_backoff_seconds if backoff_seconds is None else backoff_seconds))
+        self._sleep = sleep
+
+    def embed_groups(self, groups: list[list[str]]) -> tuple[list[list[list[float]] | Exception], EmbeddingScheduleStats]:
+        started = perf_counter()
+        batches = self.pack(groups)
+        stats = EmbeddingScheduleStats(
+            groups=len(groups),
+            texts=sum(len(batch.texts) for batch in batches),
+            batches=len(batches),
+            estimated_tokens=sum(batch.tokens for batch in batches),
+        )
+        results: list[list[list[float]] | Exception] = [[[] for _ in group] for group in groups]
+        if len(batches) <= 1 or self.concurrency == 1:
+            outcomes = [self._embed_batch(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches)), thread_name_prefix="embedding") as executor:
+                outcomes = list(executor.map(self._embed_batch, batches))
+        for batch, (vectors, retries) in zip(batches, outcomes):
+            stats.retries += retries
+            if isinstance(vectors, Exception):
+                stats.failed_batches += 1
+            for position, (group_index, item_index) in enumerate(batch.slots):
+                if isinstance(results[group_index], Exception):
+                    continue
+                if isinstance(vectors, Exception):
+                    results[group_index] = vectors
+                else:
+                    results[group_index][item_index] = vectors[position]
+        stats.duration_ms = int((perf_counter() - started) * 1000)
+        return results, stats
+
+    def pack(self, groups: list[list[str]]) -> list[EmbeddingBatch]:
+        batches: list[EmbeddingBatch] = []
+        current = EmbeddingBatch()
+        for group_index, texts in enumerate(groups):
+            for item_index, text in enumerate(texts):
+                tokens = estimate_tokens(text)
+                if current.texts and (
+                    current.tokens + tokens > self.max_batch_tokens or len(current.texts) >= self.max_batch_texts
+                ):
+                    batches.append(current)
+                    current = EmbeddingBatch()
+                current.texts.append(text)
+                current.slots.append((group_index, item_index))
+                current.tokens += tokens
+        if current.texts:
+            batches.append(current)
+        return batches
+
+    def _embed_batch(self, batch: EmbeddingBatch) -> tuple[list[list[float]] | Exception, int]:
+        attempt = 0
+        while True:
+            try:
+                vectors = self.provider.embed_texts(batch.texts)
+                if len(vectors) != len(batch.texts):
+                    raise ValueError(f"embedding provider returned {len(vectors)} vectors for {len(batch.texts)} texts")
+                return vectors, attempt
+            except Exception as exc:  # noqa: BLE001
+                if attempt >= self.max_retries or not is_transient_error(exc):
+                    return exc, attempt
+                self._sleep(self.backoff_seconds * (2**attempt) * (1 + random.random() * 0.25))
+                attempt += 1
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from itertools import chain
 
 from sqlalchemy import select
 from sqlalchemy.orm import Session
@@ -8,16 +9,22 @@ from sqlalchemy.orm import Session
 from knowledge.core.settings import get_settings
 from knowledge.models import EvidenceUnit, KnowledgeBase, Source, SourceAsset
 from knowledge.services.chunking import DocumentChunker
+from knowledge.services.embedding_cache import embedding_cache_session
 from knowledge.services.filetypes import infer_file_type
+from knowledge.services.lexical_index import EvidenceLexicalIndex
 from knowledge.services.parser import DocumentParser
+from knowledge.services.search_result_cache import bump_evidence_generation
 from knowledge.services.source_registry import SourceRegistryService
 from knowledge.services.warehouse import WarehouseGateway, build_warehouse_gateway
 from knowledge.services.warehouse_access import WarehouseAccessService
 from knowledge.services.vector_store import build_vector_store
+from knowledge.utils.hashing import config_hash, sha256_bytes
 from knowledge.utils.time import utc_now
 
 
 ELIGIBLE_ASSET_STATUSES = {"discovered", "available", "changed"}
+EVIDENCE_INDEX_BATCH_SIZE = 256
+EVIDENCE_CONFIG_KEYS = ("chunk_size", "chunk_overlap")
 
 
 @dataclass
@@ -25,6 +32,7 @@ class EvidenceBuildStats:
     processed_asset_count: int = 0
     built_evidence_count: int = 0
     skipped_asset_count: int = 0
+    unchanged_asset_count: int = 0
     failed_asset_ids: list[int] | None = None
 
     def __post_init__(self) -> None:
@@ -46,6 +54,7 @@ class EvidencePipelineService:
         self.parser = parser or DocumentParser()
         self.chunker = chunker or DocumentChunker()
         self.vector_store = build_vector_store()
+        self.lexical_index = EvidenceLexicalIndex()
         self.source_registry_service = SourceRegistryService()
 
     def build_for_asset(self, db: Session, wallet_address: str, kb_id: int, asset_id: int) -> EvidenceBuildStats:
@@ -123,11 +132,15 @@ class EvidencePipelineService:
                 stats.failed_asset_ids.append(asset.id)
                 raise
             stats.processed_asset_count += 1
+            if built_count is None:
+                stats.unchanged_asset_count += 1
+                continue
             stats.built_evidence_count += built_count
+        bump_evidence_generation(db, kb.id)
         db.commit()
         return stats
 
-    def _build_for_single_asset(self, db: Session, wallet_address: str, kb: KnowledgeBase, asset: SourceAsset) -> int:
+    def _build_for_single_asset(self, db: Session, wallet_address: str, kb: KnowledgeBase, asset: SourceAsset) -> int | None:
         resolved = self.warehouse_access_service.resolve_path_read_access(
             db,
             wallet_address,
@@ -142,18 +155,32 @@ class EvidencePipelineService:
             if self.warehouse_access_service.is_auth_error(exc):
                 self.warehouse_access_service.mark_access_invalid(resolved)
             raise
-        parsed_text = self.parser.parse(asset.asset_name, raw_content)
-        if not parsed_text.strip():
+        content_sha256 = sha256_bytes(raw_content)
+        chunk_config = self._build_chunk_config(kb)
+        chunk_config_hash = config_hash(chunk_config, EVIDENCE_CONFIG_KEYS)
+        if asset.last_ingested_at is not None and asset.content_sha256 == content_sha256 and asset.chunk_config_hash == chunk_config_hash:
+            # A touched or restored file with identical bytes keeps its evidence units, ids and vectors.
+            for evidence in db.scalars(select(EvidenceUnit).where(EvidenceUnit.asset_id == asset.id)).all():
+                if (evidence.source_locator or {}).get("source_version") != asset.source_version:
+                    evidence.source_locator = {**(evidence.source_locator or {}), "source_version": asset.source_version}
+            asset.last_ingested_at = utc_now()
+            asset.availability_status = "available"
+            return None
+        asset.content_sha256 = content_sha256
+        asset.chunk_config_hash = chunk_config_hash
+        sections = self.parser.iter_sections(asset.asset_name, raw_content)
+        first_section = next(sections, None)
+        if first_section is None:
             self._delete_existing_evidence(db, asset)
             asset.last_ingested_at = utc_now()
             asset.availability_status = "available"
             return 0
 
-        chunks = self.chunker.chunk(asset.asset_name, parsed_text, self._build_chunk_config(kb))
         self._delete_existing_evidence(db, asset)
-
-        evidence_units: list[EvidenceUnit] = []
         file_type = infer_file_type(asset.asset_name)
+        chunks = self.chunker.iter_chunks(asset.asset_name, chain([first_section], sections), chunk_config)
+        built_count = 0
+        evidence_units: list[EvidenceUnit] = []
         for chunk_index, chunk in enumerate(chunks):
             evidence = EvidenceUnit(
                 kb_id=kb.id,
@@ -171,12 +198,20 @@ class EvidencePipelineService:
             )
             db.add(evidence)
             evidence_units.append(evidence)
+            if len(evidence_units) >= EVIDENCE_INDEX_BATCH_SIZE:
+                db.flush()
+                self.lexical_index.index_evidence(db, kb.id, evidence_units)
+                self._index_evidence_units(db, wallet_address, kb.id, asset, file_type, evidence_units, first_chunk_index=built_count)
+                built_count += len(evidence_units)
+                evidence_units = []
         db.flush()
-        self._index_evidence_units(wallet_address, kb.id, asset, file_type, evidence_units)
+        self.lexical_index.index_evidence(db, kb.id, evidence_units)
+        self._index_evidence_units(db, wallet_address, kb.id, asset, file_type, evidence_units, first_chunk_index=built_count)
+        built_count += len(evidence_units)
         asset.last_ingested_at = utc_now()
         asset.availability_status = "available"
         db.flush()
-        return len(evidence_units)
+        return built_count
 
     def _delete_existing_evidence(self, db: Session, asset: SourceAsset) -> None:
         existing = list(
@@ -187,23 +222,25 @@ class EvidencePipelineService:
             ).all()
         )
         vector_ids = [self._vector_id_for_evidence(evidence.id) for evidence in existing]
-        self.vector_store.delete_vectors(vector_ids)
+        self.vector_store.delete_vectors(vector_ids, kb_id=asset.kb_id)
         for evidence in existing:
             db.delete(evidence)
         db.flush()
 
     def _index_evidence_units(
         self,
+        db: Session,
         wallet_address: str,
         kb_id: int,
         asset: SourceAsset,
         file_type: str,
         evidence_units: list[EvidenceUnit],
+        first_chunk_index: int = 0,
     ) -> None:
         if not evidence_units:
             return
         payloads = []
-        for index, evidence in enumerate(evidence_units):
+        for index, evidence in enumerate(evidence_units, start=first_chunk_index):
             payloads.append(
                 {
                     "vector_id": self._vector_id_for_evidence(evidence.id),
@@ -224,7 +261,9 @@ class EvidencePipelineService:
                 }
             )
         try:
-            self.vector_store.index_chunks(payloads)
+            # Evidence rows are flushed but uncommitted; cache writes must share this transaction.
+            with embedding_cache_session(db):
+                self.vector_store.index_chunks(payloads)
         except Exception:
             for evidence in evidence_units:
                 evidence.vector_status = "failed"
@@ -273,6 +312,9 @@ class EvidencePipelineService:
         }
         if metadata.get("section"):
             locator["section_path"] = metadata["section"]
+        if metadata.get("page_start") is not None:
+            locator["page_start"] = metadata["page_start"]
+            locator["page_end"] = metadata.get("page_end", metadata["page_start"])
         return locator
 
     def _get_kb_or_404(self, db: Session, wallet_address: str, kb_id: int) -> KnowledgeBase:
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from knowledge.models import (
+    EvidenceUnit,
+    KBReleaseItem,
+    KBReleaseSearchIndex,
+    KnowledgeItem,
+    KnowledgeItemEvidenceLink,
+    KnowledgeItemRevision,
+)
+from knowledge.services.tokenizers import Tokenizer, build_tokenizer
+from knowledge.utils.time import utc_now
+
+
+@dataclass(frozen=True)
+class FormalIndexEntry:
+    release_item_id: int
+    knowledge_item_id: int
+    revision_id: int
+    is_hotfix: bool
+    text: str
+    tokens: frozenset[str]
+    evidence_ids: tuple[int, ...]
+    asset_ids: tuple[int, ...]
+
+    def as_json(self) -> dict:
+        return {
+            "release_item_id": self.release_item_id,
+            "knowledge_item_id": self.knowledge_item_id,
+            "revision_id": self.revision_id,
+            "is_hotfix": self.is_hotfix,
+            "text": self.text,
+            "tokens": sorted(self.tokens),
+            "evidence_ids": list(self.evidence_ids),
+            "asset_ids": list(self.asset_ids),
+        }
+
+    @classmethod
+    def from_json(cls, payload: dict) -> "FormalIndexEntry":
+        return cls(
+            release_item_id=int(payload["release_item_id"]),
+            knowledge_item_id=int(payload["knowledge_item_id"]),
+            revision_id=int(payload["revision_id"]),
+            is_hotfix=bool(payload.get("is_hotfix")),
+            text=str(payload.get("text") or ""),
+            tokens=frozenset(payload.get("tokens") or ()),
+            evidence_ids=tuple(int(value) for value in payload.get("evidence_ids") or ()),
+            asset_ids=tuple(int(value) for value in payload.get("asset_ids") or ()),
+        )
+
+
+class ReleaseFormalIndex:
+    """Read-optimized snapshot of a release for formal search.
+
+    Releases never change once published, so the tokenized title/statement and the linked evidence and
+    asset ids of every release item are compiled once at publish time and stored in a single row.
+    """
+
+    def __init__(self, tokenizer: Tokenizer | None = None) -> None:
+        self.tokenizer = tokenizer or build_tokenizer()
+
+    def build(self, db: Session, release_id: int) -> list[FormalIndexEntry]:
+        entries = self.compile(db, release_id)
+        db.execute(delete(KBReleaseSearchIndex).where(KBReleaseSearchIndex.release_id == release_id))
+        db.add(
+            KBReleaseSearchIndex(
+                release_id=release_id,
+                tokenizer=self.tokenizer.name,
+                item_count=len(entries),
+                entries_json=[entry.as_json() for entry in entries],
+                built_at=utc_now(),
+            )
+        )
+        db.flush()
+        return entries
+
+    def load(self, db: Session, release_id: int) -> list[FormalIndexEntry]:
+        index = db.scalar(select(KBReleaseSearchIndex).where(KBReleaseSearchIndex.release_id == release_id))
+        if index is not None and index.tokenizer == self.tokenizer.name:
+            return [FormalIndexEntry.from_json(payload) for payload in index.entries_json or []]
+        # Releases published before the index existed, or indexed with another tokenizer, are compiled on first use.
+        try:
+            with db.begin_nested():
+                return self.build(db, release_id)
+        except IntegrityError:
+            return self.compile(db, release_id)
+
+    def compile(self, db: Session, release_id: int) -> list[FormalIndexEntry]:
+        rows = db.execute(
+            select(KBReleaseItem.id, KnowledgeItem.id, KnowledgeItem.is_hotfix, KnowledgeItemRevision.id, KnowledgeItemRevision.title, KnowledgeItemRevision.statement)
+            .join(KnowledgeItem, KnowledgeItem.id == KBReleaseItem.knowledge_item_id)
+            .join(KnowledgeItemRevision, KnowledgeItemRevision.id == KBReleaseItem.knowledge_item_revision_id)
+            .where(KBReleaseItem.release_id == release_id)
+            .order_by(KBReleaseItem.knowledge_item_id.asc(), KBReleaseItem.id.asc())
+        ).all()
+        links: dict[int, list[tuple[int, int]]] = {}
+        for revision_id, evidence_id, asset_id in db.execute(
+            select(KnowledgeItemEvidenceLink.knowledge_item_revision_id, EvidenceUnit.id, EvidenceUnit.asset_id)
+            .join(EvidenceUnit, EvidenceUnit.id == KnowledgeItemEvidenceLink.evidence_unit_id)
+            .join(KBReleaseItem, KBReleaseItem.knowledge_item_revision_id == KnowledgeItemEvidenceLink.knowledge_item_revision_id)
+            .where(KBReleaseItem.release_id == release_id)
+            .order_by(KnowledgeItemEvidenceLink.rank.asc(), KnowledgeItemEvidenceLink.id.asc())
+        ):
+            links.setdefault(revision_id, []).append((evidence_id, asset_id))
+        entries = []
+        for release_item_id, item_id, is_hotfix, revision_id, title, statement in rows:
+            text = f"{title} {statement}"
+            evidence = links.get(revision_id, [])
+            entries.append(
+                FormalIndexEntry(
+                    release_item_id=release_item_id,
+                    knowledge_item_id=item_id,
+                    revision_id=revision_id,
+                    is_hotfix=bool(is_hotfix),
+                    text=text.strip().lower(),
+                    tokens=frozenset(self.tokenizer.tokenize(text)),
+                    evidence_ids=tuple(evidence_id for evidence_id, _ in evidence),
+                    asset_ids=tuple(sorted({asset_id for _, asset_id in evidence})),
+                )
+            )
+        return entries
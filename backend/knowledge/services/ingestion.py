@@ -1,30 +1,122 @@
 from __future__ import annotations
 
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from time import perf_counter
+from typing import Any, Iterator
 
-from sqlalchemy import delete, select
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.orm import Session
 
 from knowledge.core.settings import get_settings
 from knowledge.models import EmbeddingRecord, ImportedChunk, ImportedDocument, ImportTask, ImportTaskItem, KnowledgeBase, SourceBinding
-from knowledge.services.chunking import DocumentChunker
+from knowledge.services.chunking import ChunkResult
 from knowledge.services.embedding import EmbeddingProvider, build_embedding_provider
+from knowledge.services.embedding_cache import embedding_cache_session
+from knowledge.services.embedding_scheduler import EmbeddingScheduler, EmbeddingScheduleStats
 from knowledge.services.filetypes import infer_file_type
-from knowledge.services.parser import DocumentParser
+from knowledge.services.ingestion_pipeline import ParseExecutor, ParseJob, PipelineStats, timed
+from knowledge.services.vector_quantization import ensure_kb_quantizer
 from knowledge.services.vector_store import build_vector_store
 from knowledge.services.warehouse import WarehouseGateway, WarehouseFileEntry, build_warehouse_gateway
 from knowledge.services.warehouse_access import WarehouseAccessService
 from knowledge.services.warehouse_scope import warehouse_app_root
+from knowledge.utils.hashing import config_hash, sha256_bytes, sha256_text
 from knowledge.utils.time import utc_now
+from knowledge.utils.vectors import encode_vector, stored_vector
 import uuid
 
 
+INGESTION_CONFIG_KEYS = ("chunk_size", "chunk_overlap", "embedding_model", "vector_quantization")
+CHUNK_DELETE_BATCH_SIZE = 500
+
+
 class TaskCanceledError(Exception):
     def __init__(self, rollback_summary: dict | None = None) -> None:
         super().__init__("task canceled by user")
         self.rollback_summary = rollback_summary or {}
 
 
+@dataclass
+class IngestionCounts:
+    processed_files: int = 0
+    processed_chunks: int = 0
+    failed_files: int = 0
+    skipped_files: int = 0
+    deleted_files: int = 0
+    unversioned_files: int = 0
+    reused_embeddings: int = 0
+
+
+@dataclass
+class KeptChunk:
+    chunk_id: int
+    chunk_index: int
+    content_sha256: str
+    metadata_json: dict
+    vector_id: str | None
+
+
+@dataclass
+class PreparedFile:
+    file_entry: WarehouseFileEntry
+    wallet_address: str
+    started: float
+    kb: KnowledgeBase
+    document: ImportedDocument | None
+    source_kind: str
+    current_version: str
+    has_version_hint: bool
+    resolved: Any
+    config: dict
+    file_type: str
+    needs_vectors: bool
+    chunk_config_hash: str = ""
+    content_sha256: str = ""
+    # Stream and write state carried across the file's chunk groups.
+    parsed_chunks: int = 0
+    written_chunks: int = 0
+    reused_count: int = 0
+    chunks_added: int = 0
+    chunks_kept: int = 0
+    chunks_removed: int = 0
+    old_chunks: dict[str, deque[KeptChunk]] = field(default_factory=dict)
+    old_vector_ids: set[str] = field(default_factory=set)
+    # Highest id among old rows left in place; rows inserted by this import get larger ids.
+    old_max_chunk_id: int = 0
+    writing: bool = False
+    committed: bool = False
+    failed: bool = False
+
+
+@dataclass
+class ChunkGroup:
+    """A bounded slice of one file's chunk stream. The file's last group carries no chunks and finalizes it."""
+
+    prepared: PreparedFile
+    start: int
+    chunks: list[ChunkResult]
+    chunk_hashes: list[str] = field(default_factory=list)
+    reused_vectors: dict[str, list[float]] = field(default_factory=dict)
+    last: bool = False
+
+    @property
+    def texts(self) -> list[str]:
+        # Only chunks whose stored embedding could not be reused need the provider.
+        return [chunk.text for chunk, chunk_hash in zip(self.chunks, self.chunk_hashes) if chunk_hash not in self.reused_vectors]
+
+    @property
+    def reused_count(self) -> int:
+        return sum(1 for chunk_hash in self.chunk_hashes if chunk_hash in self.reused_vectors)
+
+    def merge_vectors(self, embedded: list[list[float]]) -> list[list[float]]:
+        if not self.reused_vectors:
+            return embedded
+        pending = iter(embedded)
+        return [self.reused_vectors[chunk_hash] if chunk_hash in self.reused_vectors else next(pending) for chunk_hash in self.chunk_hashes]
+
+
 class IngestionService:
     def __init__(
         self,
@@ -34,8 +126,7 @@ class IngestionService:
         self.settings = get_settings()
         self.warehouse_gateway = warehouse_gateway or build_warehouse_gateway()
         self.embedding_provider = embedding_provider or build_embedding_provider()
-        self.parser = DocumentParser()
-        self.chunker = DocumentChunker()
+        self.embedding_scheduler = EmbeddingScheduler(self.embedding_provider)
         self.vector_store = build_vector_store()
         self.warehouse_access_service = WarehouseAccessService(warehouse_gateway=self.warehouse_gateway)
 
@@ -75,12 +166,9 @@ class IngestionService:
         task.last_stage = "started"
         db.commit()
 
-        processed_files = 0
-        processed_chunks = 0
-        failed_files = 0
-        skipped_files = 0
-        deleted_files = 0
-        unversioned_files = 0
+        counts = IngestionCounts()
+        embedding_stats = EmbeddingScheduleStats()
+        pipeline_stats = PipelineStats()
         rollback_plan: dict[str, dict] = {}
         try:
             self._raise_if_cancel_requested(db, task, rollback_plan)
@@ -88,7 +176,7 @@ class IngestionService:
                 task.last_stage = "deleting"
                 task.heartbeat_at = utc_now()
                 db.commit()
-                deleted_files = self._handle_delete(db, task, rollback_plan)
+                counts.deleted_files = self._handle_delete(db, task, rollback_plan)
             else:
                 for source_path in task.source_paths:
                     self._raise_if_cancel_requested(db, task, rollback_plan)
@@ -98,7 +186,7 @@ class IngestionService:
                     try:
                         entries = self._iter_files(db, task, source_path)
                     except Exception as exc:  # noqa: BLE001
-                        failed_files += 1
+                        counts.failed_files += 1
                         self._record_task_item(
                             db,
                             task_id=task.id,
@@ -114,69 +202,18 @@ class IngestionService:
                         task.error_message = f"{task.error_message}\n{source_path}: {exc}".strip()
                         db.commit()
                         continue
-                    for file_entry in entries:
-                        self._raise_if_cancel_requested(db, task, rollback_plan)
-                        processed_files += 1
-                        file_started = perf_counter()
-                        task.last_stage = f"processing:{file_entry.path}"
-                        task.heartbeat_at = utc_now()
-                        db.commit()
-                        try:
-                            with db.begin_nested():
-                                chunks_created, item_status, used_version_hint = self._index_file(db, task, file_entry, rollback_plan)
-                            processed_chunks += chunks_created
-                            if item_status == "skipped":
-                                skipped_files += 1
-                            if not used_version_hint:
-                                unversioned_files += 1
-                            db.commit()
-                        except Exception as exc:  # noqa: BLE001
-                            db.rollback()
-                            failed_files += 1
-                            self._record_task_item(
-                                db,
-                                task_id=task.id,
-                                source_path=file_entry.path,
-                                file_name=file_entry.name,
-                                status="failed",
-                                message=str(exc),
-                                processed_chunks=0,
-                                source_version=file_entry.modified_at.isoformat() if file_entry.modified_at else "",
-                                stage="failed",
-                                duration_ms=self._duration_ms(file_started),
-                                error_type=type(exc).__name__,
-                            )
-                            task.error_message = f"{task.error_message}\n{file_entry.path}: {exc}".strip()
-                            task.last_stage = f"failed:{file_entry.path}"
-                            task.heartbeat_at = utc_now()
-                            db.commit()
+                    self._index_entries(db, task, entries, rollback_plan, counts, embedding_stats, pipeline_stats)
 
             self._raise_if_cancel_requested(db, task, rollback_plan)
-            task.status = "partial_success" if failed_files else "succeeded"
+            task.status = "partial_success" if counts.failed_files else "succeeded"
             task.last_stage = "completed"
-            task.stats_json = self._build_task_stats(
-                task=task,
-                processed_files=processed_files,
-                processed_chunks=processed_chunks,
-                failed_files=failed_files,
-                skipped_files=skipped_files,
-                deleted_files=deleted_files,
-                unversioned_files=unversioned_files,
-            )
+            task.stats_json = self._build_task_stats(task, counts, embedding_stats, pipeline_stats)
         except TaskCanceledError as exc:
             task.status = "canceled"
             task.error_message = "canceled by user"
             task.last_stage = "canceled"
             task.stats_json = {
-                **self._build_task_stats(
-                    task=task,
-                    processed_files=processed_files,
-                    processed_chunks=processed_chunks,
-                    failed_files=failed_files,
-                    skipped_files=skipped_files,
-                    deleted_files=deleted_files,
-                    unversioned_files=unversioned_files,
-                ),
+                **self._build_task_stats(task, counts, embedding_stats, pipeline_stats),
                 "canceled": True,
                 "rollback": exc.rollback_summary,
             }
@@ -184,15 +221,7 @@ class IngestionService:
             task.status = "failed"
             task.error_message = str(exc)
             task.last_stage = "failed"
-            task.stats_json = self._build_task_stats(
-                task=task,
-                processed_files=processed_files,
-                processed_chunks=processed_chunks,
-                failed_files=failed_files,
-                skipped_files=skipped_files,
-                deleted_files=deleted_files,
-                unversioned_files=unversioned_files,
-            )
+            task.stats_json = self._build_task_stats(task, counts, embedding_stats, pipeline_stats)
         task.finished_at = utc_now()
         task.claimed_by = None
         task.claimed_at = None
@@ -201,6 +230,219 @@ class IngestionService:
         db.refresh(task)
         return task
 
+    def _index_entries(
+        self,
+        db: Session,
+        task: ImportTask,
+        entries: list[WarehouseFileEntry],
+        rollback_plan: dict[str, dict],
+        counts: IngestionCounts,
+        embedding_stats: EmbeddingScheduleStats,
+        pipeline_stats: PipelineStats,
+    ) -> None:
+        # Bounded stages: warehouse reads are prefetched on a thread pool, parse+chunk runs on its own pool and streams
+        # each file back in chunk groups, and a window of groups is embedded in the background while the previous
+        # window is written. A window closes at INGESTION_EMBEDDING_WINDOW_FILES files or INGESTION_CHUNK_GROUP_SIZE
+        # chunks, so a large file never sits in memory whole. This thread is the only one touching the session.
+        window_size = max(1, int(self.settings.ingestion_embedding_window_files))
+        group_size = max(1, int(self.settings.ingestion_chunk_group_size))
+        read_depth = max(1, int(self.settings.ingestion_read_prefetch))
+        parse_depth = max(1, int(self.settings.ingestion_parse_queue))
+        pending = deque(entries)
+        reads: deque[tuple[PreparedFile, Future]] = deque()
+        parses: deque[tuple[PreparedFile, ParseJob]] = deque()
+        streaming: tuple[PreparedFile, ParseJob, Iterator[list[ChunkResult]]] | None = None
+        window: list[ChunkGroup] = []
+        window_chunks = 0
+        embedding: tuple[list[ChunkGroup], Future] | None = None
+        started = perf_counter()
+        read_pool = ThreadPoolExecutor(max_workers=max(1, int(self.settings.ingestion_read_workers)), thread_name_prefix="ingest-read")
+        parse_executor = self._build_parse_executor()
+        embed_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-embed")
+        try:
+            while pending or reads or parses or streaming is not None or window or embedding is not None:
+                if streaming is not None and streaming[0].failed:
+                    # A write of one of its earlier groups failed; stop parsing the rest of the file.
+                    streaming[2].close()
+                    streaming = None
+
+                if pending and len(reads) < read_depth:
+                    file_entry = pending.popleft()
+                    self._raise_if_cancel_requested(db, task, rollback_plan)
+                    counts.processed_files += 1
+                    file_started = perf_counter()
+                    task.last_stage = f"processing:{file_entry.path}"
+                    task.heartbeat_at = utc_now()
+                    db.commit()
+                    try:
+                        with db.begin_nested():
+                            opened = self._open_file(db, task, file_entry, rollback_plan, file_started=file_started)
+                        db.commit()
+                    except Exception as exc:  # noqa: BLE001
+                        counts.failed_files += 1
+                        self._record_file_failure(db, task, file_entry, exc, file_started)
+                        continue
+                    if isinstance(opened, PreparedFile):
+                        reads.append((opened, read_pool.submit(timed, self._read_content, opened)))
+                        pipeline_stats.read.enqueue(len(reads))
+                    else:
+                        counts.skipped_files += 1
+                        if not opened[2]:
+                            counts.unversioned_files += 1
+                    continue
+
+                if reads and len(parses) < parse_depth:
+                    prepared, future = reads.popleft()
+                    try:
+                        content = self._collect_read(db, prepared, future, pipeline_stats)
+                    except Exception as exc:  # noqa: BLE001
+                        counts.failed_files += 1
+                        self._record_file_failure(db, task, prepared.file_entry, exc, prepared.started)
+                        continue
+                    if self._content_unchanged(prepared):
+                        self._skip_unchanged_content(db, task, prepared)
+                        counts.skipped_files += 1
+                        if not prepared.has_version_hint:
+                            counts.unversioned_files += 1
+                        continue
+                    parses.append((prepared, parse_executor.submit(prepared.file_entry.name, content, prepared.config)))
+                    pipeline_stats.parse.enqueue(len(parses))
+                    continue
+
+                if streaming is None and parses:
+                    prepared, job = parses.popleft()
+                    streaming = (prepared, job, parse_executor.groups(job))
+
+                if streaming is not None:
+                    prepared, job, groups = streaming
+                    try:
+                        chunks = next(groups, None)
+                        if chunks is None:
+                            streaming = None
+                            pipeline_stats.parse.record(job.elapsed)
+                            group = ChunkGroup(prepared, start=prepared.parsed_chunks, chunks=[], last=True)
+                        else:
+                            group = self._chunk_group(db, prepared, chunks)
+                        self._raise_if_cancel_requested(db, task, rollback_plan)
+                    except TaskCanceledError:
+                        raise
+                    except Exception as exc:  # noqa: BLE001
+                        streaming = None
+                        self._fail_file(db, task, prepared, exc, rollback_plan, counts)
+                        continue
+                    window.append(group)
+                    window_chunks += len(group.chunks)
+                    window_files = sum(1 for item in window if item.last)
+                    if window_files < window_size and window_chunks < group_size and (pending or reads or parses or streaming is not None):
+                        continue
+
+                if window:
+                    embedded_groups = [group for group in window if group.prepared.needs_vectors]
+                    if embedded_groups:
+                        self._raise_if_cancel_requested(db, task, rollback_plan)
+                        task.last_stage = f"embedding:{self._file_count(embedded_groups)} files"
+                        task.heartbeat_at = utc_now()
+                        db.commit()
+                    pipeline_stats.embed.enqueue(self._file_count(window))
+                    # Submit before writing the previous window so this window embeds while that one is written.
+                    previous = embedding
+                    embedding = (window, embed_pool.submit(self.embedding_scheduler.embed_groups, [group.texts for group in embedded_groups]))
+                    window, window_chunks = [], 0
+                    if previous is not None:
+                        self._write_window(db, task, *previous, rollback_plan, counts, embedding_stats, pipeline_stats)
+                    continue
+
+                if embedding is not None:
+                    self._write_window(db, task, *embedding, rollback_plan, counts, embedding_stats, pipeline_stats)
+                    embedding = None
+        finally:
+            if streaming is not None:
+                streaming[2].close()
+            for pool in (read_pool, parse_executor, embed_pool):
+                pool.shutdown(wait=True, cancel_futures=True)
+            pipeline_stats.parse_backend = parse_executor.backend
+            pipeline_stats.parse_restarts += parse_executor.restarts
+            pipeline_stats.wall_seconds += perf_counter() - started
+
+    def _build_parse_executor(self) -> ParseExecutor:
+        return ParseExecutor(
+            backend=self.settings.ingestion_parse_backend,
+            workers=self.settings.ingestion_parse_workers,
+            timeout_seconds=self.settings.ingestion_parse_timeout_seconds,
+            memory_limit_mb=self.settings.ingestion_parse_memory_limit_mb,
+            group_size=self.settings.ingestion_chunk_group_size,
+        )
+
+    def _write_window(
+        self,
+        db: Session,
+        task: ImportTask,
+        window: list[ChunkGroup],
+        future: Future,
+        rollback_plan: dict[str, dict],
+        counts: IngestionCounts,
+        embedding_stats: EmbeddingScheduleStats,
+        pipeline_stats: PipelineStats,
+    ) -> None:
+        results, stats = future.result()
+        embedding_stats.merge(stats)
+        pipeline_stats.embed.record(stats.duration_ms / 1000, items=stats.texts)
+        embedded_groups = [group for group in window if group.prepared.needs_vectors]
+        vectors_by_group = {id(group): vectors for group, vectors in zip(embedded_groups, results)}
+        pipeline_stats.write.enqueue(self._file_count(window))
+        for group in window:
+            prepared = group.prepared
+            if prepared.failed:
+                continue
+            self._raise_if_cancel_requested(db, task, rollback_plan)
+            task.last_stage = f"processing:{prepared.file_entry.path}"
+            task.heartbeat_at = utc_now()
+            db.commit()
+            write_started = perf_counter()
+            try:
+                vectors = vectors_by_group.get(id(group), [])
+                if isinstance(vectors, Exception):
+                    raise vectors
+                with db.begin_nested():
+                    written = self._write_group(db, task, group, vectors, rollback_plan)
+                db.commit()
+                prepared.committed = True
+                pipeline_stats.write.record(perf_counter() - write_started, items=written)
+            except TaskCanceledError:
+                raise
+            except Exception as exc:  # noqa: BLE001
+                self._fail_file(db, task, prepared, exc, rollback_plan, counts)
+                continue
+            if group.last:
+                counts.processed_chunks += prepared.written_chunks
+                counts.reused_embeddings += prepared.reused_count
+                if not prepared.has_version_hint:
+                    counts.unversioned_files += 1
+
+    @staticmethod
+    def _file_count(groups: list[ChunkGroup]) -> int:
+        return len({id(group.prepared) for group in groups})
+
+    def _fail_file(
+        self,
+        db: Session,
+        task: ImportTask,
+        prepared: PreparedFile,
+        exc: Exception,
+        rollback_plan: dict[str, dict],
+        counts: IngestionCounts,
+    ) -> None:
+        if prepared.failed:
+            return
+        prepared.failed = True
+        counts.failed_files += 1
+        if prepared.committed:
+            # Earlier groups of this file are already committed; put the document back as the task found it.
+            db.rollback()
+            self._restore_document(db, task, prepared.file_entry.path, rollback_plan[prepared.file_entry.path])
+            db.commit()
+        self._record_file_failure(db, task, prepared.file_entry, exc, prepared.started)
+
     def delete_document_index(self, db: Session, document: ImportedDocument) -> None:
         self._delete_document_state(db, document)
         db.delete(document)
@@ -263,14 +505,15 @@ class IngestionService:
                 break
         return matched_documents
 
-    def _index_file(
+    def _open_file(
         self,
         db: Session,
         task: ImportTask,
         file_entry: WarehouseFileEntry,
         rollback_plan: dict[str, dict],
-    ) -> tuple[int, str, bool]:
-        file_started = perf_counter()
+        file_started: float | None = None,
+    ) -> "PreparedFile | tuple[int, str, bool]":
+        file_started = perf_counter() if file_started is None else file_started
         kb = db.get(KnowledgeBase, task.kb_id)
         if kb is None:
             raise ValueError("knowledge base not found")
@@ -305,106 +548,286 @@ class IngestionService:
             return 0, "skipped", has_version_hint
 
         resolved = self._resolve_read_access_for_task_path(db, task, file_entry.path)
+        config = {**self._default_config(), **(kb.retrieval_config or {})}
+        return PreparedFile(
+            file_entry=file_entry,
+            wallet_address=task.owner_wallet_address,
+            started=file_started,
+            kb=kb,
+            document=document,
+            source_kind=source_kind,
+            current_version=current_version,
+            has_version_hint=has_version_hint,
+            resolved=resolved,
+            config=config,
+            file_type=infer_file_type(file_entry.name),
+            needs_vectors=self.settings.vector_store_mode != "weaviate",
+            chunk_config_hash=config_hash(config, INGESTION_CONFIG_KEYS),
+        )
+
+    @staticmethod
+    def _content_unchanged(prepared: PreparedFile) -> bool:
+        document = prepared.document
+        return (
+            document is not None
+            and document.parse_status == "parsed"
+            and bool(document.content_sha256)
+            and document.content_sha256 == prepared.content_sha256
+            and document.chunk_config_hash == prepared.chunk_config_hash
+        )
+
+    def _skip_unchanged_content(self, db: Session, task: ImportTask, prepared: PreparedFile) -> None:
+        # Same bytes under the same chunking config: only the version hint moves, so the next mtime check skips early.
+        prepared.document.source_etag_or_mtime = prepared.current_version
+        self._record_task_item(
+            db,
+            task_id=task.id,
+            source_path=prepared.file_entry.path,
+            file_name=prepared.file_entry.name,
+            status="skipped",
+            message="content unchanged",
+            processed_chunks=0,
+            source_version=prepared.current_version,
+            stage="skipped",
+            duration_ms=self._duration_ms(prepared.started),
+        )
+        db.commit()
+
+    def _chunk_group(self, db: Session, prepared: PreparedFile, chunks: list[ChunkResult]) -> ChunkGroup:
+        group = ChunkGroup(prepared, start=prepared.parsed_chunks, chunks=chunks, chunk_hashes=[sha256_text(chunk.text) for chunk in chunks])
+        prepared.parsed_chunks += len(chunks)
+        if prepared.document is None or not prepared.needs_vectors:
+            return group
+        rows = db.execute(
+            select(ImportedChunk.content_sha256, EmbeddingRecord.vector_blob, EmbeddingRecord.vector_json)
+            .join(EmbeddingRecord, EmbeddingRecord.chunk_id == ImportedChunk.id)
+            .where(ImportedChunk.document_id == prepared.document.id)
+            .where(ImportedChunk.content_sha256.in_(set(group.chunk_hashes)))
+            .where(EmbeddingRecord.embedding_model == str(prepared.config["embedding_model"]))
+        ).all()
+        for chunk_hash, vector_blob, vector_json in rows:
+            if chunk_hash not in group.reused_vectors:
+                vector = stored_vector(vector_blob, vector_json)
+                if vector.size:
+                    group.reused_vectors[chunk_hash] = vector.tolist()
+        return group
+
+    def _read_content(self, prepared: PreparedFile) -> bytes:
+        content = self.warehouse_gateway.read_file(prepared.wallet_address, prepared.file_entry.path, auth=prepared.resolved.auth)
+        # Hashed here so the pipeline's read threads, not the writer thread, pay for it.
+        prepared.content_sha256 = sha256_bytes(content)
+        return content
+
+    def _collect_read(self, db: Session, prepared: PreparedFile, future: Future, pipeline_stats: PipelineStats) -> bytes:
         try:
-            content = self.warehouse_gateway.read_file(task.owner_wallet_address, file_entry.path, auth=resolved.auth)
-            self.warehouse_access_service.mark_access_success(resolved)
+            content, elapsed = future.result()
         except Exception as exc:  # noqa: BLE001
             if self.warehouse_access_service.is_auth_error(exc):
-                self.warehouse_access_service.mark_access_invalid(resolved)
+                self.warehouse_access_service.mark_access_invalid(prepared.resolved)
                 db.commit()
             raise
-        parsed_text = self.parser.parse(file_entry.name, content)
-        if not parsed_text.strip():
-            raise ValueError("parsed text is empty")
-        self._raise_if_cancel_requested(db, task, rollback_plan)
+        self.warehouse_access_service.mark_access_success(prepared.resolved)
+        pipeline_stats.read.record(elapsed)
+        pipeline_stats.read_bytes += len(content)
+        return content
 
-        config = {**self._default_config(), **(kb.retrieval_config or {})}
-        file_type = infer_file_type(file_entry.name)
-        chunks = self.chunker.chunk(file_entry.name, parsed_text, config)
-        if not chunks:
-            raise ValueError("no chunks created")
-        self._raise_if_cancel_requested(db, task, rollback_plan)
-        if document is None:
-            document = ImportedDocument(
-                kb_id=kb.id,
-                owner_wallet_address=task.owner_wallet_address,
-                source_path=file_entry.path,
-                source_file_name=file_entry.name,
-                source_kind=source_kind,
-                source_etag_or_mtime=current_version,
-                parse_status="parsed",
-            )
-            db.add(document)
-            db.flush()
-        else:
-            old_vector_ids = [row[0] for row in db.execute(select(EmbeddingRecord.vector_id).where(EmbeddingRecord.chunk_id.in_(select(ImportedChunk.id).where(ImportedChunk.document_id == document.id)))).all()]
-            self.vector_store.delete_vectors([vector_id for vector_id in old_vector_ids if vector_id])
-            db.execute(delete(EmbeddingRecord).where(EmbeddingRecord.chunk_id.in_(select(ImportedChunk.id).where(ImportedChunk.document_id == document.id))))
-            db.execute(delete(ImportedChunk).where(ImportedChunk.document_id == document.id))
-            document.source_etag_or_mtime = current_version
-            document.parse_status = "parsed"
-
-        use_db_vectors = self.settings.vector_store_mode != "weaviate"
-        embeddings = self.embedding_provider.embed_texts([chunk.text for chunk in chunks]) if use_db_vectors else []
-        self._raise_if_cancel_requested(db, task, rollback_plan)
-        vector_payloads: list[dict] = []
-        created = 0
-        for index, chunk_data in enumerate(chunks):
-            self._raise_if_cancel_requested(db, task, rollback_plan, rollback_current_transaction=True)
-            chunk = ImportedChunk(
-                document_id=document.id,
-                kb_id=kb.id,
-                owner_wallet_address=task.owner_wallet_address,
-                chunk_index=index,
-                text=chunk_data.text,
-                metadata_json={
+    def _write_group(
+        self,
+        db: Session,
+        task: ImportTask,
+        group: ChunkGroup,
+        embeddings: list[list[float]],
+        rollback_plan: dict[str, dict],
+    ) -> int:
+        prepared = group.prepared
+        file_entry = prepared.file_entry
+        kb = prepared.kb
+        source_kind = prepared.source_kind
+        current_version = prepared.current_version
+        config = prepared.config
+        file_type = prepared.file_type
+        chunks = group.chunks
+        if not prepared.writing:
+            self._begin_file(db, task, prepared)
+        document = prepared.document
+        if group.last:
+            self._finish_file(db, task, prepared)
+            return 0
+        embeddings = group.merge_vectors(embeddings)
+
+        def chunk_metadata(chunk_data: ChunkResult) -> dict:
+            return {
+                "source_path": file_entry.path,
+                "source_kind": source_kind,
+                "file_name": file_entry.name,
+                "file_type": file_type,
+                **chunk_data.metadata,
+            }
+
+        def vector_payload(offset: int, chunk_id: int, vector_id: str) -> dict:
+            return {
+                "vector_id": vector_id,
+                "text": chunks[offset].text,
+                "vector": embeddings[offset] if use_db_vectors else None,
+                "metadata": {
+                    "wallet_address": task.owner_wallet_address,
+                    "kb_id": kb.id,
+                    "document_id": document.id,
+                    "chunk_id": chunk_id,
                     "source_path": file_entry.path,
                     "source_kind": source_kind,
                     "file_name": file_entry.name,
                     "file_type": file_type,
-                    **chunk_data.metadata,
+                    "chunk_index": group.start + offset,
+                    "source_version": current_version,
+                    "chunk_strategy": chunks[offset].metadata.get("chunk_strategy"),
                 },
+            }
+
+        # Greedy alignment by content hash: each new chunk takes the earliest unclaimed old chunk with the same text,
+        # so repeated boilerplate chunks pair up in document order. Old chunks nobody claims are removed by _finish_file.
+        kept: dict[int, KeptChunk] = {}
+        for offset, chunk_hash in enumerate(group.chunk_hashes):
+            bucket = prepared.old_chunks.get(chunk_hash)
+            if bucket:
+                kept[offset] = bucket.popleft()
+
+        use_db_vectors = prepared.needs_vectors
+        vector_payloads: list[dict] = []
+        # Kept chunks keep their row, embedding and vector id; only a moved index or changed metadata is written back.
+        # The external store's copy also carries the document version and kind, so it is re-sent with the reused
+        # vector whenever either side changed.
+        document_changed = document.source_etag_or_mtime != current_version or document.source_kind != source_kind
+        kept_updates = []
+        for offset, row in kept.items():
+            index = group.start + offset
+            metadata = chunk_metadata(chunks[offset])
+            changed = row.chunk_index != index or row.metadata_json != metadata
+            if changed:
+                kept_updates.append({"id": row.chunk_id, "chunk_index": index, "metadata_json": metadata})
+            if row.vector_id and (changed or document_changed):
+                vector_payloads.append(vector_payload(offset, row.chunk_id, row.vector_id))
+        if kept_updates:
+            db.execute(update(ImportedChunk), kept_updates)
+
+        added_offsets = [offset for offset in range(len(chunks)) if offset not in kept]
+        quantizer = None
+        # Only the db backend reads vector_codes; the local backend encodes its segments at search time.
+        if embeddings and added_offsets and config.get("vector_quantization") == "int8" and self.settings.vector_store_mode == "db":
+            quantizer = ensure_kb_quantizer(db, kb, embeddings, self.settings.vector_quantization_fit_sample_size)
+        batch_size = max(1, int(self.settings.ingestion_write_batch_size))
+        for batch_start in range(0, len(added_offsets), batch_size):
+            self._raise_if_cancel_requested(db, task, rollback_plan, rollback_current_transaction=True)
+            batch = added_offsets[batch_start : batch_start + batch_size]
+            batch_indexes = [group.start + offset for offset in batch]
+            # One executemany per batch, then one SELECT for the new ids by chunk index (SQLite would fall back to a
+            # statement per row for an ordered INSERT ... RETURNING). Old rows still waiting to be claimed or removed
+            # can share an index, so only ids above the file's old rows are new.
+            db.execute(
+                insert(ImportedChunk),
+                [
+                    {
+                        "document_id": document.id,
+                        "kb_id": kb.id,
+                        "owner_wallet_address": task.owner_wallet_address,
+                        "chunk_index": group.start + offset,
+                        "text": chunks[offset].text,
+                        "content_sha256": group.chunk_hashes[offset],
+                        "metadata_json": chunk_metadata(chunks[offset]),
+                    }
+                    for offset in batch
+                ],
             )
-            db.add(chunk)
-            db.flush()
-            vector_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"knowledge:{kb.id}:{file_entry.path}:{index}"))
-            embedding = EmbeddingRecord(
-                chunk_id=chunk.id,
-                kb_id=kb.id,
-                owner_wallet_address=task.owner_wallet_address,
-                vector_id=vector_id,
-                embedding_model=str(config["embedding_model"]),
-                vector_json=embeddings[index] if use_db_vectors else [],
+            chunk_ids = dict(
+                db.execute(
+                    select(ImportedChunk.chunk_index, ImportedChunk.id)
+                    .where(ImportedChunk.document_id == document.id)
+                    .where(ImportedChunk.chunk_index.in_(batch_indexes))
+                    .where(ImportedChunk.id > prepared.old_max_chunk_id)
+                ).all()
             )
-            db.add(embedding)
-            vector_payloads.append(
-                {
-                    "vector_id": vector_id,
-                    "text": chunk_data.text,
-                    "metadata": {
-                        "wallet_address": task.owner_wallet_address,
+            embedding_rows: list[dict] = []
+            for offset, index in zip(batch, batch_indexes):
+                vector_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"knowledge:{kb.id}:{file_entry.path}:{index}"))
+                if vector_id in prepared.old_vector_ids:
+                    # An old chunk still owns this position's id (kept and moved, or not yet removed); salt with the
+                    # content hash to stay unique.
+                    vector_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"knowledge:{kb.id}:{file_entry.path}:{index}:{group.chunk_hashes[offset]}"))
+                embedding_rows.append(
+                    {
+                        "chunk_id": chunk_ids[index],
                         "kb_id": kb.id,
-                        "document_id": document.id,
-                        "chunk_id": chunk.id,
-                        "source_path": file_entry.path,
-                        "source_kind": source_kind,
-                        "file_name": file_entry.name,
-                        "file_type": file_type,
-                        "chunk_index": index,
-                        "source_version": current_version,
-                        "chunk_strategy": chunk_data.metadata.get("chunk_strategy"),
-                    },
-                }
-            )
-            created += 1
+                        "owner_wallet_address": task.owner_wallet_address,
+                        "vector_id": vector_id,
+                        "embedding_model": str(config["embedding_model"]),
+                        "vector_blob": encode_vector(embeddings[offset] if use_db_vectors else None, self.settings.embedding_vector_dtype),
+                        "vector_codes": encode_vector(quantizer.encode(embeddings[offset]), "int8") if quantizer is not None else None,
+                    }
+                )
+                vector_payloads.append(vector_payload(offset, chunk_ids[index], vector_id))
+            db.execute(insert(EmbeddingRecord), embedding_rows)
 
-        if self.settings.vector_store_mode == "weaviate":
+        if self.settings.vector_store_mode != "db":
             self._raise_if_cancel_requested(db, task, rollback_plan, rollback_current_transaction=True)
-            self.vector_store.index_chunks(vector_payloads)
+            with embedding_cache_session(db):
+                self.vector_store.index_chunks(vector_payloads)
 
-        document.chunk_count = created
+        prepared.written_chunks += len(chunks)
+        prepared.reused_count += group.reused_count
+        prepared.chunks_added += len(added_offsets)
+        prepared.chunks_kept += len(kept)
+        return len(chunks)
+
+    def _begin_file(self, db: Session, task: ImportTask, prepared: PreparedFile) -> None:
+        # Runs with the file's first group. The document stays "indexing" until _finish_file, so an interrupted
+        # stream is never mistaken for unchanged content on the next import.
+        kb = prepared.kb
+        document = prepared.document
+        prepared.writing = True
+        if document is None:
+            document = ImportedDocument(
+                kb_id=kb.id,
+                owner_wallet_address=task.owner_wallet_address,
+                source_path=prepared.file_entry.path,
+                source_file_name=prepared.file_entry.name,
+                source_kind=prepared.source_kind,
+                source_etag_or_mtime="",
+                content_sha256="",
+                chunk_config_hash=prepared.chunk_config_hash,
+                parse_status="indexing",
+            )
+            db.add(document)
+            db.flush()
+            prepared.document = document
+            return
+        old_rows = self._load_old_chunks(db, document)
+        removed_rows: list[KeptChunk] = []
+        if self.settings.ingestion_chunk_diff and document.chunk_config_hash == prepared.chunk_config_hash:
+            for row in old_rows:
+                if row.content_sha256 and row.vector_id is not None:
+                    prepared.old_chunks.setdefault(row.content_sha256, deque()).append(row)
+                    prepared.old_max_chunk_id = max(prepared.old_max_chunk_id, row.chunk_id)
+                    if row.vector_id:
+                        prepared.old_vector_ids.add(row.vector_id)
+                else:
+                    removed_rows.append(row)
+        else:
+            removed_rows = old_rows
+        self._remove_chunks(db, prepared, removed_rows)
+        document.chunk_config_hash = prepared.chunk_config_hash
+        document.parse_status = "indexing"
+
+    def _finish_file(self, db: Session, task: ImportTask, prepared: PreparedFile) -> None:
+        file_entry = prepared.file_entry
+        document = prepared.document
+        self._remove_chunks(db, prepared, [row for bucket in prepared.old_chunks.values() for row in bucket])
+        prepared.old_chunks.clear()
+        document.source_etag_or_mtime = prepared.current_version
+        document.content_sha256 = prepared.content_sha256
+        document.parse_status = "parsed"
+        document.chunk_count = prepared.written_chunks
         document.last_indexed_at = utc_now()
-        binding = resolved.binding or self._find_related_binding(db, kb.id, file_entry.path)
+        binding = prepared.resolved.binding or self._find_related_binding(db, prepared.kb.id, file_entry.path)
         if binding is not None:
             binding.last_imported_at = utc_now()
         self._record_task_item(
@@ -414,12 +837,43 @@ class IngestionService:
             file_name=file_entry.name,
             status="indexed",
             message="indexed successfully",
-            processed_chunks=created,
-            source_version=current_version,
+            processed_chunks=prepared.written_chunks,
+            source_version=prepared.current_version,
             stage="indexed",
-            duration_ms=self._duration_ms(file_started),
+            duration_ms=self._duration_ms(prepared.started),
+            chunks_added=prepared.chunks_added,
+            chunks_kept=prepared.chunks_kept,
+            chunks_removed=prepared.chunks_removed,
         )
-        return created, "indexed", has_version_hint
+
+    def _remove_chunks(self, db: Session, prepared: PreparedFile, rows: list[KeptChunk]) -> None:
+        if not rows:
+            return
+        self.vector_store.delete_vectors([row.vector_id for row in rows if row.vector_id], kb_id=prepared.kb.id)
+        removed_ids = [row.chunk_id for row in rows]
+        for offset in range(0, len(removed_ids), CHUNK_DELETE_BATCH_SIZE):
+            batch_ids = removed_ids[offset : offset + CHUNK_DELETE_BATCH_SIZE]
+            db.execute(delete(EmbeddingRecord).where(EmbeddingRecord.chunk_id.in_(batch_ids)))
+            db.execute(delete(ImportedChunk).where(ImportedChunk.id.in_(batch_ids)))
+        prepared.chunks_removed += len(rows)
+
+    @staticmethod
+    def _load_old_chunks(db: Session, document: ImportedDocument) -> list["KeptChunk"]:
+        return [
+            KeptChunk(*row)
+            for row in db.execute(
+                select(
+                    ImportedChunk.id,
+                    ImportedChunk.chunk_index,
+                    ImportedChunk.content_sha256,
+                    ImportedChunk.metadata_json,
+                    EmbeddingRecord.vector_id,
+                )
+                .outerjoin(EmbeddingRecord, EmbeddingRecord.chunk_id == ImportedChunk.id)
+                .where(ImportedChunk.document_id == document.id)
+                .order_by(ImportedChunk.chunk_index.asc(), ImportedChunk.id.asc())
+            ).all()
+        ]
 
     def _handle_delete(self, db: Session, task: ImportTask, rollback_plan: dict[str, dict]) -> int:
         documents = self._list_documents_for_delete(db, task)
@@ -485,12 +939,9 @@ class IngestionService:
     def _build_task_stats(
         self,
         task: ImportTask,
-        processed_files: int,
-        processed_chunks: int,
-        failed_files: int,
-        skipped_files: int,
-        deleted_files: int,
-        unversioned_files: int,
+        counts: IngestionCounts,
+        embedding_stats: EmbeddingScheduleStats | None = None,
+        pipeline_stats: PipelineStats | None = None,
     ) -> dict:
         wait_duration_ms = None
         if task.started_at is not None:
@@ -501,16 +952,46 @@ class IngestionService:
             run_duration_ms = max(0, int((finished_at - task.started_at).total_seconds() * 1000))
         return {
             **(task.stats_json or {}),
-            "processed_files": processed_files,
-            "processed_chunks": processed_chunks,
-            "failed_files": failed_files,
-            "skipped_files": skipped_files,
-            "deleted_files": deleted_files,
-            "unversioned_files": unversioned_files,
+            "processed_files": counts.processed_files,
+            "processed_chunks": counts.processed_chunks,
+            "failed_files": counts.failed_files,
+            "skipped_files": counts.skipped_files,
+            "deleted_files": counts.deleted_files,
+            "unversioned_files": counts.unversioned_files,
+            "reused_embeddings": counts.reused_embeddings,
             "wait_duration_ms": wait_duration_ms,
             "run_duration_ms": run_duration_ms,
+            **({"embedding": embedding_stats.as_dict()} if embedding_stats is not None and embedding_stats.texts else {}),
+            **({"pipeline": pipeline_stats.as_dict()} if pipeline_stats is not None and pipeline_stats.active else {}),
         }
 
+    def _record_file_failure(
+        self,
+        db: Session,
+        task: ImportTask,
+        file_entry: WarehouseFileEntry,
+        exc: Exception,
+        file_started: float,
+    ) -> None:
+        db.rollback()
+        self._record_task_item(
+            db,
+            task_id=task.id,
+            source_path=file_entry.path,
+            file_name=file_entry.name,
+            status="failed",
+            message=str(exc),
+            processed_chunks=0,
+            source_version=file_entry.modified_at.isoformat() if file_entry.modified_at else "",
+            stage="failed",
+            duration_ms=self._duration_ms(file_started),
+            error_type=type(exc).__name__,
+        )
+        task.error_message = f"{task.error_message}\n{file_entry.path}: {exc}".strip()
+        task.last_stage = f"failed:{file_entry.path}"
+        task.heartbeat_at = utc_now()
+        db.commit()
+
     def _record_task_item(
         self,
         db: Session,
@@ -524,6 +1005,9 @@ class IngestionService:
         stage: str | None = None,
         duration_ms: int | None = None,
         error_type: str | None = None,
+        chunks_added: int | None = None,
+        chunks_kept: int | None = None,
+        chunks_removed: int | None = None,
     ) -> None:
         item = ImportTaskItem(
             task_id=task_id,
@@ -536,6 +1020,9 @@ class IngestionService:
             stage=stage,
             duration_ms=duration_ms,
             error_type=error_type,
+            chunks_added=chunks_added,
+            chunks_kept=chunks_kept,
+            chunks_removed=chunks_removed,
         )
         db.add(item)
 
@@ -591,6 +1078,8 @@ class IngestionService:
                 "source_file_name": document.source_file_name,
                 "source_kind": document.source_kind,
                 "source_etag_or_mtime": document.source_etag_or_mtime,
+                "content_sha256": document.content_sha256,
+                "chunk_config_hash": document.chunk_config_hash,
                 "parse_status": document.parse_status,
                 "chunk_count": document.chunk_count,
                 "last_indexed_at": document.last_indexed_at,
@@ -606,6 +1095,7 @@ class IngestionService:
                         "owner_wallet_address": chunk.owner_wallet_address,
                         "chunk_index": chunk.chunk_index,
                         "text": chunk.text,
+                        "content_sha256": chunk.content_sha256,
                         "metadata_json": dict(chunk.metadata_json or {}),
                         "created_at": chunk.created_at,
                     },
@@ -619,6 +1109,8 @@ class IngestionService:
                             "embedding_model": embeddings[chunk.id].embedding_model,
                             "index_status": embeddings[chunk.id].index_status,
                             "vector_json": list(embeddings[chunk.id].vector_json or []),
+                            "vector_blob": embeddings[chunk.id].vector_blob,
+                            "vector_codes": embeddings[chunk.id].vector_codes,
                             "created_at": embeddings[chunk.id].created_at,
                         }
                         if chunk.id in embeddings
@@ -638,7 +1130,7 @@ class IngestionService:
                 )
             ).all()
         ]
-        self.vector_store.delete_vectors([vector_id for vector_id in old_vector_ids if vector_id])
+        self.vector_store.delete_vectors([vector_id for vector_id in old_vector_ids if vector_id], kb_id=document.kb_id)
         db.execute(delete(EmbeddingRecord).where(EmbeddingRecord.chunk_id.in_(select(ImportedChunk.id).where(ImportedChunk.document_id == document.id))))
         db.execute(delete(ImportedChunk).where(ImportedChunk.document_id == document.id))
 
@@ -665,67 +1157,75 @@ class IngestionService:
             db.refresh(task)
         raise TaskCanceledError(self._rollback_task(db, task, rollback_plan))
 
+    def _restore_document(self, db: Session, task: ImportTask, source_path: str, snapshot: dict) -> tuple[bool, bool, int]:
+        current_document = db.scalar(
+            select(ImportedDocument)
+            .where(ImportedDocument.kb_id == task.kb_id)
+            .where(ImportedDocument.owner_wallet_address == task.owner_wallet_address)
+            .where(ImportedDocument.source_path == source_path)
+        )
+        if current_document is not None:
+            self._delete_document_state(db, current_document)
+            db.delete(current_document)
+            db.flush()
+
+        binding = db.scalar(
+            select(SourceBinding)
+            .where(SourceBinding.kb_id == task.kb_id)
+            .where(SourceBinding.source_path == source_path)
+        )
+        if binding is not None:
+            binding.last_imported_at = snapshot.get("binding_last_imported_at")
+
+        if not snapshot.get("exists"):
+            return current_document is not None, False, 0
+
+        document_row = snapshot["document"]
+        db.execute(ImportedDocument.__table__.insert().values(**document_row))
+        vector_payloads: list[dict] = []
+        for entry in snapshot["chunks"]:
+            chunk_row = entry["chunk"]
+            embedding_row = entry["embedding"]
+            db.execute(ImportedChunk.__table__.insert().values(**chunk_row))
+            if embedding_row is not None:
+                db.execute(EmbeddingRecord.__table__.insert().values(**embedding_row))
+                vector_payloads.append(
+                    {
+                        "vector_id": embedding_row["vector_id"],
+                        "text": chunk_row["text"],
+                        "vector": stored_vector(embedding_row.get("vector_blob"), embedding_row["vector_json"]).tolist() or None,
+                        "metadata": {
+                            "wallet_address": task.owner_wallet_address,
+                            "kb_id": document_row["kb_id"],
+                            "document_id": document_row["id"],
+                            "chunk_id": chunk_row["id"],
+                            "source_path": document_row["source_path"],
+                            "source_kind": document_row["source_kind"],
+                            "file_name": document_row["source_file_name"],
+                            "file_type": chunk_row["metadata_json"].get("file_type"),
+                            "chunk_index": chunk_row["chunk_index"],
+                            "source_version": document_row["source_etag_or_mtime"],
+                            "chunk_strategy": chunk_row["metadata_json"].get("chunk_strategy"),
+                        },
+                    }
+                )
+        reindexed = 0
+        if self.settings.vector_store_mode != "db" and vector_payloads:
+            with embedding_cache_session(db):
+                self.vector_store.index_chunks(vector_payloads)
+            reindexed = len(vector_payloads)
+        return current_document is not None, True, reindexed
+
     def _rollback_task(self, db: Session, task: ImportTask, rollback_plan: dict[str, dict]) -> dict:
         restored = 0
         removed = 0
         reindexed_vectors = 0
         restored_paths: list[str] = []
         for source_path, snapshot in reversed(list(rollback_plan.items())):
-            current_document = db.scalar(
-                select(ImportedDocument)
-                .where(ImportedDocument.kb_id == task.kb_id)
-                .where(ImportedDocument.owner_wallet_address == task.owner_wallet_address)
-                .where(ImportedDocument.source_path == source_path)
-            )
-            if current_document is not None:
-                self._delete_document_state(db, current_document)
-                db.delete(current_document)
-                removed += 1
-
-            binding = db.scalar(
-                select(SourceBinding)
-                .where(SourceBinding.kb_id == task.kb_id)
-                .where(SourceBinding.source_path == source_path)
-            )
-            if binding is not None:
-                binding.last_imported_at = snapshot.get("binding_last_imported_at")
-
-            if not snapshot.get("exists"):
-                restored_paths.append(source_path)
-                continue
-
-            document_row = snapshot["document"]
-            db.execute(ImportedDocument.__table__.insert().values(**document_row))
-            vector_payloads: list[dict] = []
-            for entry in snapshot["chunks"]:
-                chunk_row = entry["chunk"]
-                embedding_row = entry["embedding"]
-                db.execute(ImportedChunk.__table__.insert().values(**chunk_row))
-                if embedding_row is not None:
-                    db.execute(EmbeddingRecord.__table__.insert().values(**embedding_row))
-                    vector_payloads.append(
-                        {
-                            "vector_id": embedding_row["vector_id"],
-                            "text": chunk_row["text"],
-                            "metadata": {
-                                "wallet_address": task.owner_wallet_address,
-                                "kb_id": document_row["kb_id"],
-                                "document_id": document_row["id"],
-                                "chunk_id": chunk_row["id"],
-                                "source_path": document_row["source_path"],
-                                "source_kind": document_row["source_kind"],
-                                "file_name": document_row["source_file_name"],
-                                "file_type": chunk_row["metadata_json"].get("file_type"),
-                                "chunk_index": chunk_row["chunk_index"],
-                                "source_version": document_row["source_etag_or_mtime"],
-                                "chunk_strategy": chunk_row["metadata_json"].get("chunk_strategy"),
-                            },
-                        }
-                    )
-            if self.settings.vector_store_mode == "weaviate" and vector_payloads:
-                self.vector_store.index_chunks(vector_payloads)
-                reindexed_vectors += len(vector_payloads)
-            restored += 1
+            had_document, restored_document, reindexed = self._restore_document(db, task, source_path, snapshot)
+            removed += int(had_document)
+            restored += int(restored_document)
+            reindexed_vectors += reindexed
             restored_paths.append(source_path)
 
         self._record_task_item(
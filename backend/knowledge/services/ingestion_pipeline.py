@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import BrokenExecutor, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import chain
+from time import perf_counter
+from typing import Any, Callable, Iterator
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+from knowledge.services.chunking import ChunkResult, DocumentChunker
+from knowledge.services.parser import DocumentParser
+
+
+STREAM_POLL_SECONDS = 0.05
+
+
+def iter_file_chunks(file_name: str, content: bytes, config: dict) -> Iterator[ChunkResult]:
+    # Module-level and free of service state so it can run in any executor.
+    sections = DocumentParser().iter_sections(file_name, content)
+    first_section = next(sections, None)
+    if first_section is None:
+        raise ValueError("parsed text is empty")
+    empty = True
+    for chunk in DocumentChunker().iter_chunks(file_name, chain([first_section], sections), config):
+        empty = False
+        yield chunk
+    if empty:
+        raise ValueError("no chunks created")
+
+
+def parse_file(file_name: str, content: bytes, config: dict) -> list[ChunkResult]:
+    return list(iter_file_chunks(file_name, content, config))
+
+
+def stream_chunk_groups(file_name: str, content: bytes, config: dict, group_size: int, sink: Any, stop: Any) -> None:
+    # Producer side of a ParseJob: chunks go out in groups through a bounded queue, so a slow consumer pauses
+    # the parser instead of letting a large file's chunks pile up. None marks the end of the file.
+    group: list[ChunkResult] = []
+    for chunk in iter_file_chunks(file_name, content, config):
+        group.append(chunk)
+        if len(group) >= group_size:
+            if not _put(sink, group, stop):
+                return
+            group = []
+    if group and not _put(sink, group, stop):
+        return
+    _put(sink, None, stop)
+
+
+def _put(sink: Any, item: Any, stop: Any) -> bool:
+    while not stop.is_set():
+        try:
+            sink.put(item, timeout=STREAM_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def timed(callback: Callable[..., Any], *args: Any) -> tuple[Any, float]:
+    started = perf_counter()
+    result = callback(*args)
+    return result, perf_counter() - started
+
+
+PARSE_BACKENDS = ("thread", "process")
+
+
+class ParseTimeoutError(TimeoutError):
+    pass
+
+
+def _limit_worker_memory(memory_limit_mb: int) -> None:
+    if resource is None or memory_limit_mb <= 0:
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+@dataclass
+class ParseJob:
+    args: tuple
+    future: Future
+    sink: Any
+    stop: Any
+    elapsed: float = 0.0
+
+
+class ParseExecutor:
+    """Runs the parse -> chunk stream on a thread pool or, for CPU-bound formats such as PDF, on a process pool.
+
+    Each job hands its chunks back in groups of group_size through a queue holding at most stream_depth groups,
+    so a file is never materialized whole. timeout_seconds bounds the wait for the next group. The process
+    backend caps each worker's address space at memory_limit_mb (where the platform supports it) and replaces
+    the whole pool on a timeout or a dead worker, resubmitting the other unfinished jobs in order. Threads cannot
+    be stopped, so on the thread backend a timeout only abandons the stream.
+    """
+
+    def __init__(
+        self,
+        backend: str = "thread",
+        workers: int = 2,
+        timeout_seconds: float = 0,
+        memory_limit_mb: int = 0,
+        group_size: int = 256,
+        stream_depth: int = 2,
+    ) -> None:
+        if backend not in PARSE_BACKENDS:
+            raise ValueError(f"parse backend must be one of {', '.join(PARSE_BACKENDS)}")
+        self.backend = backend
+        self.workers = max(1, int(workers))
+        self.timeout_seconds = max(0.0, float(timeout_seconds))
+        self.memory_limit_mb = max(0, int(memory_limit_mb))
+        self.group_size = max(1, int(group_size))
+        self.stream_depth = max(1, int(stream_depth))
+        self.restarts = 0
+        self._jobs: list[ParseJob] = []
+        self._manager = None
+        self._pool = self._build_pool()
+
+    def _build_pool(self) -> Executor:
+        if self.backend == "thread":
+            return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest-parse")
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_limit_worker_memory,
+            initargs=(self.memory_limit_mb,),
+        )
+
+    def submit(self, file_name: str, content: bytes, config: dict) -> ParseJob:
+        job = ParseJob(args=(file_name, content, config), future=Future(), sink=None, stop=None)
+        self._start(job)
+        self._jobs.append(job)
+        return job
+
+    def groups(self, job: ParseJob) -> Iterator[list[ChunkResult]]:
+        try:
+            waited_since = perf_counter()
+            while True:
+                try:
+                    item = job.sink.get(timeout=STREAM_POLL_SECONDS)
+                except queue.Empty:
+                    if job.future.done() and not self._finished(job.future):
+                        self._raise_failure(job)
+                    if self.timeout_seconds and perf_counter() - waited_since > self.timeout_seconds:
+                        self._abandon(job)
+                        raise ParseTimeoutError(f"parsing took longer than {self.timeout_seconds:g} seconds") from None
+                    continue
+                if item is None:
+                    _, job.elapsed = job.future.result()
+                    return
+                yield item
+                waited_since = perf_counter()
+        finally:
+            self.discard(job)
+
+    def result(self, job: ParseJob) -> tuple[list[ChunkResult], float]:
+        chunks = [chunk for group in self.groups(job) for chunk in group]
+        return chunks, job.elapsed
+
+    def discard(self, job: ParseJob) -> None:
+        job.stop.set()
+        if job in self._jobs:
+            self._jobs.remove(job)
+
+    def _start(self, job: ParseJob) -> None:
+        if self.backend == "thread":
+            job.sink, job.stop = queue.Queue(maxsize=self.stream_depth), threading.Event()
+        else:
+            if self._manager is None:
+                self._manager = multiprocessing.get_context("spawn").Manager()
+            job.sink, job.stop = self._manager.Queue(maxsize=self.stream_depth), self._manager.Event()
+        job.future = self._pool.submit(timed, stream_chunk_groups, *job.args, self.group_size, job.sink, job.stop)
+
+    @staticmethod
+    def _finished(future: Future) -> bool:
+        return future.done() and not future.cancelled() and future.exception() is None
+
+    def _raise_failure(self, job: ParseJob) -> None:
+        exc = job.future.exception() if not job.future.cancelled() else BrokenExecutor("parse job was cancelled")
+        if isinstance(exc, BrokenExecutor):
+            # A worker died (for example killed at the memory limit); fail this file and carry on with a fresh pool.
+            self.discard(job)
+            self._restart()
+        raise exc
+
+    def _abandon(self, job: ParseJob) -> None:
+        self.discard(job)
+        job.future.cancel()
+        if self.backend == "process":
+            self._restart()
+
+    def _restart(self) -> None:
+        # Executors cannot cancel a running call, so the stuck worker is terminated with its pool; jobs that had
+        # not finished are resubmitted in their original order so the next one consumed runs first.
+        pool = self._pool
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = self._build_pool()
+        self.restarts += 1
+        for job in self._jobs:
+            if not self._finished(job.future):
+                job.stop.set()
+                self._start(job)
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = True) -> None:
+        for job in list(self._jobs):
+            self.discard(job)
+        self._pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+
+@dataclass
+class StageStats:
+    unit: str
+    items: int = 0
+    busy_seconds: float = 0.0
+    max_queue_depth: int = 0
+    queue_depth_total: int = 0
+    queue_samples: int = 0
+
+    def enqueue(self, depth: int) -> None:
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        self.queue_depth_total += depth
+        self.queue_samples += 1
+
+    def record(self, seconds: float, items: int = 1) -> None:
+        self.items += items
+        self.busy_seconds += seconds
+
+    def as_dict(self) -> dict:
+        return {
+            self.unit: self.items,
+            "busy_ms": int(self.busy_seconds * 1000),
+            "throughput_per_second": round(self.items / self.busy_seconds, 2) if self.busy_seconds > 0 else None,
+            "max_queue_depth": self.max_queue_depth,
+            "avg_queue_depth": round(self.queue_depth_total / self.queue_samples, 2) if self.queue_samples else 0.0,
+        }
+
+
+@dataclass
+class PipelineStats:
+    """Per-stage counters for the read -> parse -> embed -> write ingestion pipeline.
+
+    Busy time is summed per item, so a stage running on several workers can report more busy time than wall time;
+    comparing each stage's throughput shows which one bounds the pipeline.
+    """
+
+    read: StageStats = field(default_factory=lambda: StageStats("files"))
+    parse: StageStats = field(default_factory=lambda: StageStats("files"))
+    embed: StageStats = field(default_factory=lambda: StageStats("chunks"))
+    write: StageStats = field(default_factory=lambda: StageStats("chunks"))
+    read_bytes: int = 0
+    parse_backend: str = "thread"
+    parse_restarts: int = 0
+    wall_seconds: float = 0.0
+
+    @property
+    def active(self) -> bool:
+        return self.read.items > 0 or self.read.queue_samples > 0
+
+    def as_dict(self) -> dict:
+        return {
+            "read": {**self.read.as_dict(), "bytes": self.read_bytes},
+            "parse": {**self.parse.as_dict(), "backend": self.parse_backend, "restarts": self.parse_restarts},
+            "embed": self.embed.as_dict(),
+            "write": self.write.as_dict(),
+            "wall_ms": int(self.wall_seconds * 1000),
+        }
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import heapq
+import math
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from knowledge.models import EvidencePosting, EvidenceUnit
+from knowledge.services.tokenizers import Tokenizer, build_tokenizer
+
+
+BACKFILL_BATCH_SIZE = 500
+
+
+@dataclass
+class PostingList:
+    term: str
+    idf: float
+    evidence_ids: list[int]
+    frequencies: list[int]
+    upper_bound: float = 0.0
+
+
+def bm25_idf(document_count: int, document_frequency: int) -> float:
+    return math.log(1.0 + (document_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+
+def max_score_top_k(
+    postings: list[PostingList],
+    lengths: dict[int, int],
+    average_length: float,
+    top_k: int,
+    accept: Callable[[int], bool] | None = None,
+    k1: float = 1.2,
+    b: float = 0.75,
+) -> list[tuple[float, int]]:
+    """Document-at-a-time BM25 top-k with MaxScore pruning.
+
+    Posting lists are ordered by their maximum contribution. Lists whose bounds together cannot lift a
+    document past the current k-th score are "non-essential": they never drive candidate generation and
+    are only probed (by binary search) for documents an essential list already produced, and only while
+    the remaining bound can still change the outcome.
+    """
+    if top_k <= 0 or not postings:
+        return []
+    average_length = average_length or 1.0
+
+    def contribution(posting: PostingList, position: int) -> float:
+        frequency = posting.frequencies[position]
+        length = lengths.get(posting.evidence_ids[position], 0)
+        return posting.idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length / average_length))
+
+    shortest = min(lengths.values(), default=0)
+    for posting in postings:
+        frequency = max(posting.frequencies, default=0)
+        posting.upper_bound = posting.idf * frequency * (k1 + 1) / ((frequency + k1 * (1 - b + b * shortest / average_length)) or 1.0)
+    postings = sorted((posting for posting in postings if posting.evidence_ids), key=lambda posting: posting.upper_bound)
+    if not postings:
+        return []
+    prefix_bounds = [0.0]
+    for posting in postings:
+        prefix_bounds.append(prefix_bounds[-1] + posting.upper_bound)
+
+    cursors = [0] * len(postings)
+    heap: list[tuple[float, int]] = []
+    threshold = 0.0
+    first_essential = 0
+    while True:
+        candidate = None
+        for index in range(first_essential, len(postings)):
+            if cursors[index] < len(postings[index].evidence_ids):
+                evidence_id = postings[index].evidence_ids[cursors[index]]
+                if candidate is None or evidence_id < candidate:
+                    candidate = evidence_id
+        if candidate is None:
+            break
+
+        score = 0.0
+        for index in range(first_essential, len(postings)):
+            posting = postings[index]
+            position = cursors[index]
+            if position < len(posting.evidence_ids) and posting.evidence_ids[position] == candidate:
+                score += contribution(posting, position)
+                cursors[index] = position + 1
+        if accept is not None and not accept(candidate):
+            continue
+        for index in range(first_essential - 1, -1, -1):
+            if len(heap) == top_k and score + prefix_bounds[index + 1] < threshold:
+                break
+            posting = postings[index]
+            position = bisect_left(posting.evidence_ids, candidate, cursors[index])
+            cursors[index] = position
+            if position < len(posting.evidence_ids) and posting.evidence_ids[position] == candidate:
+                score += contribution(posting, position)
+
+        entry = (score, -candidate)
+        if len(heap) < top_k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+        else:
+            continue
+        if len(heap) == top_k:
+            threshold = heap[0][0]
+            while first_essential < len(postings) and prefix_bounds[first_essential + 1] < threshold:
+                first_essential += 1
+    return [(score, -negative_id) for score, negative_id in sorted(heap, reverse=True)]
+
+
+class EvidenceLexicalIndex:
+    """Persistent term -> (evidence_id, term frequency) postings per knowledge base, queried with BM25.
+
+    Each evidence unit records the tokenizer its postings were built with, so switching tokenizers
+    re-indexes a knowledge base lazily on its next search instead of mixing incompatible terms.
+    """
+
+    def __init__(self, tokenizer: Tokenizer | None = None, k1: float = 1.2, b: float = 0.75) -> None:
+        self.tokenizer = tokenizer or build_tokenizer()
+        self.k1 = k1
+        self.b = b
+        self._verified_kb_ids: set[int] = set()
+
+    def index_evidence(self, db: Session, kb_id: int, evidence_units: Iterable[EvidenceUnit]) -> None:
+        rows = []
+        for evidence in evidence_units:
+            counts = Counter(self.tokenizer.tokenize(evidence.text))
+            evidence.lexical_length = sum(counts.values())
+            evidence.lexical_tokenizer = self.tokenizer.name
+            rows.extend(
+                {"kb_id": kb_id, "evidence_id": evidence.id, "term": term, "term_frequency": frequency}
+                for term, frequency in counts.items()
+            )
+        if rows:
+            db.execute(insert(EvidencePosting), rows)
+
+    def ensure_indexed(self, db: Session, kb_id: int) -> int:
+        # Evidence written before the index existed, or with another tokenizer, is (re)indexed on first use.
+        if kb_id in self._verified_kb_ids:
+            return 0
+        indexed = 0
+        while True:
+            pending = list(
+                db.scalars(
+                    select(EvidenceUnit)
+                    .where(EvidenceUnit.kb_id == kb_id)
+                    .where(
+                        or_(
+                            EvidenceUnit.lexical_length.is_(None),
+                            EvidenceUnit.lexical_tokenizer.is_(None),
+                            EvidenceUnit.lexical_tokenizer != self.tokenizer.name,
+                        )
+                    )
+                    .order_by(EvidenceUnit.id.asc())
+                    .limit(BACKFILL_BATCH_SIZE)
+                ).all()
+            )
+            if not pending:
+                if not indexed:
+                    # Only trust a KB once it was already consistent; fresh writes may still roll back.
+                    self._verified_kb_ids.add(kb_id)
+                return indexed
+            db.execute(delete(EvidencePosting).where(EvidencePosting.evidence_id.in_([evidence.id for evidence in pending])))
+            self.index_evidence(db, kb_id, pending)
+            db.flush()
+            indexed += len(pending)
+
+    def search(
+        self,
+        db: Session,
+        kb_id: int,
+        query: str,
+        top_k: int,
+        accept: Callable[[int, int], bool] | None = None,
+    ) -> list[tuple[float, int]]:
+        return self.search_many(db, kb_id, [(query, top_k, accept)])[0]
+
+    def search_many(
+        self,
+        db: Session,
+        kb_id: int,
+        requests: list[tuple[str, int, Callable[[int, int], bool] | None]],
+    ) -> list[list[tuple[float, int]]]:
+        # Corpus statistics and the posting lists of every query term are read once for the whole batch.
+        terms_by_request = [sorted(set(self.tokenizer.tokenize(query))) if top_k > 0 else [] for query, top_k, _ in requests]
+        terms = sorted({term for request_terms in terms_by_request for term in request_terms})
+        if not terms:
+            return [[] for _ in requests]
+        document_count, average_length = db.execute(
+            select(func.count(EvidenceUnit.id), func.avg(EvidenceUnit.lexical_length))
+            .where(EvidenceUnit.kb_id == kb_id)
+            .where(EvidenceUnit.lexical_tokenizer == self.tokenizer.name)
+        ).one()
+        if not document_count:
+            return [[] for _ in requests]
+        rows = db.execute(
+            select(EvidencePosting.term, EvidencePosting.evidence_id, EvidencePosting.term_frequency, EvidenceUnit.lexical_length, EvidenceUnit.asset_id)
+            .join(EvidenceUnit, EvidenceUnit.id == EvidencePosting.evidence_id)
+            .where(EvidencePosting.kb_id == kb_id)
+            .where(EvidencePosting.term.in_(terms))
+            .order_by(EvidencePosting.term.asc(), EvidencePosting.evidence_id.asc())
+        ).all()
+        by_term: dict[str, PostingList] = {}
+        lengths: dict[int, int] = {}
+        asset_ids: dict[int, int] = {}
+        for term, evidence_id, frequency, length, asset_id in rows:
+            posting = by_term.setdefault(term, PostingList(term=term, idf=0.0, evidence_ids=[], frequencies=[]))
+            posting.evidence_ids.append(evidence_id)
+            posting.frequencies.append(frequency)
+            lengths[evidence_id] = int(length or 0)
+            asset_ids[evidence_id] = asset_id
+        for posting in by_term.values():
+            posting.idf = bm25_idf(int(document_count), len(posting.evidence_ids))
+        results = []
+        for (_query, top_k, accept), request_terms in zip(requests, terms_by_request):
+            # Sharing the batch-wide length table only loosens the MaxScore bounds; rankings are unchanged.
+            results.append(
+                max_score_top_k(
+                    [by_term[term] for term in request_terms if term in by_term],
+                    lengths,
+                    float(average_length or 0.0),
+                    top_k,
+                    accept=(lambda evidence_id, accept=accept: accept(evidence_id, asset_ids[evidence_id])) if accept is not None else None,
+                    k1=self.k1,
+                    b=self.b,
+                )
+            )
+        return results
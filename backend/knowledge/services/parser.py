@@ -3,11 +3,19 @@ from __future__ import annotations
 import csv
 import io
 import json
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Iterator
 
 from pypdf import PdfReader
 
 
+@dataclass
+class ParsedSection:
+    text: str
+    page_number: int | None = None
+
+
 class DocumentParser:
     TEXT_EXTENSIONS = {".txt", ".md", ".markdown", ".json", ".csv", ".html", ".htm", ".yaml", ".yml"}
 
@@ -23,7 +31,21 @@ class DocumentParser:
             return "\n".join(", ".join(row) for row in reader)
         return content.decode("utf-8", errors="ignore")
 
-    def _parse_pdf(self, content: bytes) -> str:
+    def iter_sections(self, file_name: str, content: bytes) -> Iterator[ParsedSection]:
+        """Yield non-empty text sections; PDFs stream one page at a time instead of one joined string."""
+        if Path(file_name).suffix.lower() == ".pdf":
+            for page_number, text in self.iter_pdf_pages(content):
+                if text.strip():
+                    yield ParsedSection(text=text, page_number=page_number)
+            return
+        text = self.parse(file_name, content)
+        if text.strip():
+            yield ParsedSection(text=text)
+
+    def iter_pdf_pages(self, content: bytes) -> Iterator[tuple[int, str]]:
         reader = PdfReader(io.BytesIO(content))
-        texts = [page.extract_text() or "" for page in reader.pages]
-        return "\n".join(texts).strip()
+        for page_number, page in enumerate(reader.pages, start=1):
+            yield page_number, page.extract_text() or ""
+
+    def _parse_pdf(self, content: bytes) -> str:
+        return "\n".join(text for _, text in self.iter_pdf_pages(content)).strip()
@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+
+def reciprocal_rank_fusion(rankings: Iterable[list[int]], k: int = 60) -> list[tuple[float, int]]:
+    """Fuse ranked id lists by summing 1 / (k + rank); ties go to the smaller id."""
+    scores: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(dict.fromkeys(ranking), start=1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(((score, item_id) for item_id, score in scores.items()), key=lambda pair: (-pair[0], pair[1]))
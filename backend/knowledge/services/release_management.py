@@ -7,10 +7,15 @@ from sqlalchemy import select
 from sqlalchemy.orm import Session, selectinload
 
 from knowledge.models import KBRelease, KBReleaseItem, KnowledgeBase, KnowledgeItem, KnowledgeItemRevision
+from knowledge.services.formal_index import ReleaseFormalIndex
+from knowledge.services.service_access_cache import service_access_cache
 from knowledge.utils.time import utc_now
 
 
 class ReleaseManagementService:
+    def __init__(self, formal_index: ReleaseFormalIndex | None = None) -> None:
+        self.formal_index = formal_index or ReleaseFormalIndex()
+
     def publish_workspace_release(
         self,
         db: Session,
@@ -35,7 +40,9 @@ class ReleaseManagementService:
         )
         self._replace_current_release_status(current_release, "superseded")
         self._create_release_items(db, next_release, release_pairs)
+        self.formal_index.build(db, next_release.id)
         db.commit()
+        service_access_cache.invalidate()
         db.refresh(next_release)
         return next_release
 
@@ -72,7 +79,9 @@ class ReleaseManagementService:
         )
         self._replace_current_release_status(current_release, "superseded")
         self._create_release_items(db, next_release, list(base_by_item_id.values()))
+        self.formal_index.build(db, next_release.id)
         db.commit()
+        service_access_cache.invalidate()
         db.refresh(next_release)
         return next_release
 
@@ -102,7 +111,9 @@ class ReleaseManagementService:
         )
         self._replace_current_release_status(current_release, "rolled_back")
         self._create_release_items(db, next_release, target_pairs)
+        self.formal_index.build(db, next_release.id)
         db.commit()
+        service_access_cache.invalidate()
         db.refresh(next_release)
         return next_release
 
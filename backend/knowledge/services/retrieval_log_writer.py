@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.orm import Session
+
+from knowledge.core.settings import get_settings
+from knowledge.db.session import SessionLocal
+from knowledge.models import RetrievalLog, ServiceGrant
+
+
+logger = logging.getLogger(__name__)
+
+
+class RetrievalLogWriter:
+    """In-process buffer that moves retrieval log inserts and grant ``last_used_at`` touches off the request path.
+
+    Rows are written by a background thread in one transaction every ``flush_interval_ms`` or as soon as
+    ``batch_size`` rows are pending. The queue is bounded: when it is full new rows are dropped and counted
+    rather than blocking searches. Grant touches are coalesced per grant, so they never overflow.
+
+    The first submission starts the thread lazily. After ``stop()`` it is only restarted by an explicit ``start()``;
+    rows submitted meanwhile stay queued (still bounded) until then or until ``flush()``.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        batch_size: int | None = None,
+        flush_interval_ms: int | None = None,
+        max_queue_size: int | None = None,
+    ) -> None:
+        settings = get_settings()
+        self.session_factory = session_factory
+        self.batch_size = max(1, int(batch_size or settings.retrieval_log_batch_size))
+        self.flush_interval_ms = max(1, int(flush_interval_ms or settings.retrieval_log_flush_interval_ms))
+        self.max_queue_size = max(1, int(max_queue_size or settings.retrieval_log_max_queue_size))
+        self._rows: deque[dict] = deque()
+        self._grant_touches: dict[int, datetime] = {}
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self._stopped = False
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.grants_touched = 0
+        self.flushes = 0
+        self.failed = 0
+
+    def submit(self, values: dict, grant_id: int | None = None, used_at: datetime | None = None) -> bool:
+        with self._condition:
+            if grant_id is not None and used_at is not None:
+                previous = self._grant_touches.get(grant_id)
+                self._grant_touches[grant_id] = used_at if previous is None else max(previous, used_at)
+            accepted = len(self._rows) < self.max_queue_size
+            if accepted:
+                self._rows.append(values)
+                self.enqueued += 1
+            else:
+                self.dropped += 1
+            if len(self._rows) >= self.batch_size:
+                self._condition.notify()
+        self._ensure_started()
+        return accepted
+
+    def flush(self) -> int:
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._condition:
+                    rows = [self._rows.popleft() for _ in range(min(self.batch_size, len(self._rows)))]
+                    touches, self._grant_touches = self._grant_touches, {}
+                if not rows and not touches:
+                    return written
+                failed = 0
+                try:
+                    self._write(rows, touches)
+                except Exception as exc:  # noqa: BLE001
+                    # One bad row (e.g. its knowledge base was deleted meanwhile) must not sink the whole batch.
+                    logger.warning("retrieval log batch flush failed, retrying row by row: %s", exc)
+                    for row in rows:
+                        try:
+                            self._write([row], {})
+                        except Exception:  # noqa: BLE001
+                            failed += 1
+                    try:
+                        self._write([], touches)
+                    except Exception:  # noqa: BLE001
+                        touches = {}
+                with self._condition:
+                    self.written += len(rows) - failed
+                    self.failed += failed
+                    self.grants_touched += len(touches)
+                    self.flushes += 1
+                written += len(rows) - failed
+
+    def _write(self, rows: list[dict], touches: dict[int, datetime]) -> None:
+        db = self.session_factory()
+        try:
+            if rows:
+                db.execute(insert(RetrievalLog), rows)
+            if touches:
+                db.execute(
+                    update(ServiceGrant.__table__)
+                    .where(ServiceGrant.__table__.c.id == bindparam("grant_id"))
+                    .values(last_used_at=bindparam("used_at")),
+                    [{"grant_id": grant_id, "used_at": used_at} for grant_id, used_at in touches.items()],
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def start(self) -> None:
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="retrieval-log-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._condition:
+            thread = self._thread
+            self._stopping = True
+            self._condition.notify()
+        if thread is not None:
+            thread.join(timeout)
+        with self._condition:
+            self._thread = None
+            self._stopped = True
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "pending": len(self._rows),
+                "pending_grant_touches": len(self._grant_touches),
+                "enqueued": self.enqueued,
+                "dropped": self.dropped,
+                "written": self.written,
+                "grants_touched": self.grants_touched,
+                "flushes": self.flushes,
+                "failed": self.failed,
+                "batch_size": self.batch_size,
+                "flush_interval_ms": self.flush_interval_ms,
+                "max_queue_size": self.max_queue_size,
+            }
+
+    def _ensure_started(self) -> None:
+        with self._condition:
+            if not self._stopped:
+                self.start()
+
+    def _run(self) -> None:
+        interval = self.flush_interval_ms / 1000
+        while True:
+            with self._condition:
+                deadline = time.monotonic() + interval
+                while not self._stopping and len(self._rows) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if self._stopping:
+                    return
+            try:
+                self.flush()
+            except Exception:  # noqa: BLE001
+                logger.exception("retrieval log writer flush failed")
+
+
+retrieval_log_writer = RetrievalLogWriter()
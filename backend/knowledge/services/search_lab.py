@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from knowledge.models import EvidenceUnit, KBRelease, KnowledgeBase, RetrievalLog, Source, SourceAsset
-from knowledge.schemas.service_search import ServiceSearchResponse
+from knowledge.schemas.future_domain import KBReleaseRead
+from knowledge.schemas.service_search import ServiceSearchHit, ServiceSearchResponse
 from knowledge.services.release_management import ReleaseManagementService
+from knowledge.services.retrieval_log_writer import retrieval_log_writer
 from knowledge.services.service_search import ServiceSearchService
 
 
@@ -17,6 +22,7 @@ class SearchLabService:
     ) -> None:
         self.service_search_service = service_search_service or ServiceSearchService()
         self.release_management_service = release_management_service or ReleaseManagementService()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="search-lab")
 
     def compare(
         self,
@@ -31,42 +37,47 @@ class SearchLabService:
     ) -> tuple[KBRelease | None, ServiceSearchResponse, ServiceSearchResponse, ServiceSearchResponse, RetrievalLog]:
         kb = self._get_kb_or_404(db, wallet_address, kb_id)
         release = self._current_release(db, wallet_address, kb.id)
-        used_evidence_ids: set[int] = set()
+        search = self.service_search_service
+        # Build lazily-created indexes up front and commit them, so both legs below only read.
+        search.lexical_index.ensure_indexed(db, kb.id)
+        formal_entries = search.release_management_service.formal_index.load(db, release.id) if release is not None else []
+        db.commit()
 
-        formal_hits = (
-            self.service_search_service._search_formal(  # noqa: SLF001
-                db,
-                release=release,
+        used_evidence_ids: set[int] = set()
+        formal_future = (
+            self._executor.submit(
+                self._formal_leg,
+                # The commit above expired ORM state; the worker thread gets a detached snapshot instead.
+                release=KBReleaseRead.model_validate(release),
                 query=query,
                 result_view=result_view,
                 availability_mode=availability_mode,
                 top_k=top_k,
-                include_zero_scores=True,
                 used_evidence_ids=used_evidence_ids,
             )
             if release is not None
-            else []
+            else None
         )
-        evidence_hits = self.service_search_service._search_evidence(  # noqa: SLF001
+        # With zero scores included every formal entry claims its evidence, so the formal-first exclusions are
+        # bounded by the release's linked evidence; one ranking that deep serves both evidence views.
+        reserve = len({evidence_id for entry in formal_entries for evidence_id in entry.evidence_ids})
+        started = time.perf_counter()
+        ranked_evidence_hits = search._search_evidence(  # noqa: SLF001
             db,
             kb_id=kb.id,
             query=query,
             result_view=result_view,
             availability_mode=availability_mode,
-            top_k=top_k,
+            top_k=top_k + reserve,
             exclude_evidence_ids=set(),
             include_zero_scores=True,
         )
-        fallback_evidence_hits = self.service_search_service._search_evidence(  # noqa: SLF001
-            db,
-            kb_id=kb.id,
-            query=query,
-            result_view=result_view,
-            availability_mode=availability_mode,
-            top_k=max(0, top_k - len(formal_hits)),
-            exclude_evidence_ids=used_evidence_ids,
-            include_zero_scores=True,
-        )
+        evidence_ms = search._elapsed_ms(started)  # noqa: SLF001
+        formal_hits, formal_ms = formal_future.result() if formal_future is not None else ([], 0.0)
+        evidence_hits = ranked_evidence_hits[:top_k]
+        fallback_evidence_hits = [hit for hit in ranked_evidence_hits if hit.evidence_id not in used_evidence_ids][
+            : max(0, top_k - len(formal_hits))
+        ]
         formal_only = ServiceSearchResponse(
             kb_id=kb.id,
             mode="formal_only",
@@ -118,11 +129,39 @@ class SearchLabService:
             "result_view": result_view,
             "availability_mode": availability_mode,
             "release_id": release.id if release is not None else None,
+            "legs": {"formal": {"elapsed_ms": formal_ms}, "evidence": {"elapsed_ms": evidence_ms}},
         }
         db.commit()
         db.refresh(log)
         return release, formal_only, evidence_only, formal_first, log
 
+    def _formal_leg(
+        self,
+        *,
+        release: KBReleaseRead,
+        query: str,
+        result_view: str,
+        availability_mode: str,
+        top_k: int,
+        used_evidence_ids: set[int],
+    ) -> tuple[list[ServiceSearchHit], float]:
+        started = time.perf_counter()
+        db = self.service_search_service.session_factory()
+        try:
+            hits = self.service_search_service._search_formal(  # noqa: SLF001
+                db,
+                release=release,
+                query=query,
+                result_view=result_view,
+                availability_mode=availability_mode,
+                top_k=top_k,
+                include_zero_scores=True,
+                used_evidence_ids=used_evidence_ids,
+            )
+        finally:
+            db.close()
+        return hits, self.service_search_service._elapsed_ms(started)  # noqa: SLF001
+
     def list_retrieval_logs(
         self,
         db: Session,
@@ -132,6 +171,7 @@ class SearchLabService:
         limit: int = 50,
     ) -> list[RetrievalLog]:
         self._get_kb_or_404(db, wallet_address, kb_id)
+        retrieval_log_writer.flush()
         return list(
             db.scalars(
                 select(RetrievalLog)
@@ -144,6 +184,7 @@ class SearchLabService:
 
     def get_retrieval_log_or_404(self, db: Session, wallet_address: str, kb_id: int, log_id: int) -> RetrievalLog:
         self._get_kb_or_404(db, wallet_address, kb_id)
+        retrieval_log_writer.flush()
         log = db.get(RetrievalLog, log_id)
         if log is None or log.kb_id != kb_id or log.owner_wallet_address != wallet_address:
             raise LookupError("retrieval log not found")
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from knowledge.core.settings import get_settings
+from knowledge.models import KnowledgeBase
+from knowledge.schemas.service_search import ServiceSearchHit
+
+
+def bump_evidence_generation(db: Session, kb_id: int) -> None:
+    # Part of the caller's transaction, so cached results are only orphaned once the evidence/health change commits.
+    db.execute(
+        update(KnowledgeBase)
+        .where(KnowledgeBase.id == kb_id)
+        .values(evidence_generation=KnowledgeBase.evidence_generation + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def evidence_generation(db: Session, kb_id: int) -> int:
+    return int(db.scalar(select(KnowledgeBase.evidence_generation).where(KnowledgeBase.id == kb_id)) or 0)
+
+
+class SearchResultCache:
+    """Process-wide LRU of service search hits with a TTL.
+
+    Keys carry the release id and the knowledge base's evidence generation, which evidence builds and source
+    scans bump in the database; a new release or an evidence/health change therefore simply stops matching old
+    entries, across processes, without explicit invalidation.
+    """
+
+    def __init__(
+        self,
+        max_entries: int | None = None,
+        ttl_seconds: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        settings = get_settings()
+        self.max_entries = max(0, int(settings.search_result_cache_max_entries if max_entries is None else max_entries))
+        self.ttl_seconds = max(0.0, float(settings.search_result_cache_ttl_seconds if ttl_seconds is None else ttl_seconds))
+        self._clock = clock
+        self._entries: OrderedDict[tuple, tuple[float, tuple[ServiceSearchHit, ...]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.clear()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+
+    def get(self, key: tuple) -> list[ServiceSearchHit] | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._clock() - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(entry[1])
+            if entry is not None:
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple, hits: list[ServiceSearchHit]) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock(), tuple(hits))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+search_result_cache = SearchResultCache()
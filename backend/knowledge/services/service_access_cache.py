@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Callable
+
+from knowledge.core.settings import get_settings
+from knowledge.schemas.future_domain import KBReleaseRead, ServiceGrantRead
+from knowledge.schemas.grants import ServiceGrantResolvedRead
+from knowledge.utils.time import utc_now
+
+
+@dataclass(frozen=True)
+class ServiceAccess:
+    principal_id: int
+    grant: ServiceGrantRead
+    release: KBReleaseRead | None
+    release_error: str | None
+    resolved_grant: ServiceGrantResolvedRead
+
+    def with_usage(self, last_used_at: datetime | None, updated_at: datetime) -> "ServiceAccess":
+        usage = {"last_used_at": last_used_at, "updated_at": updated_at}
+        return replace(self, grant=self.grant.model_copy(update=usage), resolved_grant=self.resolved_grant.model_copy(update=usage))
+
+
+class ServiceAccessCache:
+    """Short-TTL, process-wide cache of (API key fingerprint, kb_id) -> principal, grant and resolved release.
+
+    Writes that can change the outcome (principal/grant updates, release publication, KB deletion) call
+    ``invalidate``; the TTL bounds staleness for writes made by other processes. Failed resolutions are never cached.
+    The grant's usage timestamps (``last_used_at``/``updated_at``) change on every search without invalidating, so
+    callers overlay fresh values with ``ServiceAccess.with_usage`` on each hit.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float | None = None,
+        max_entries: int = 4096,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        settings = get_settings()
+        self.ttl_seconds = max(0.0, float(settings.service_access_cache_ttl_seconds if ttl_seconds is None else ttl_seconds))
+        self.max_entries = max(1, int(max_entries))
+        self._clock = clock
+        self._entries: OrderedDict[tuple[str, int], tuple[float, ServiceAccess]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, fingerprint: str, kb_id: int) -> ServiceAccess | None:
+        if not self.ttl_seconds:
+            return None
+        key = (fingerprint, int(kb_id))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, access = entry
+                expires_at = access.grant.expires_at
+                if self._clock() - stored_at < self.ttl_seconds and (expires_at is None or expires_at > utc_now()):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return access
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, fingerprint: str, kb_id: int, access: ServiceAccess, generation: int) -> None:
+        if not self.ttl_seconds:
+            return
+        with self._lock:
+            # A write that landed while this entry was being resolved may have made it stale already.
+            if generation != self.generation:
+                return
+            self._entries[(fingerprint, int(kb_id))] = (self._clock(), access)
+            self._entries.move_to_end((fingerprint, int(kb_id)))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+service_access_cache = ServiceAccessCache()
@@ -7,6 +7,7 @@ from knowledge.models import KBRelease, KnowledgeBase, ServiceGrant
 from knowledge.models.entities import SERVICE_GRANT_RELEASE_SELECTION_MODES, SERVICE_GRANT_STATUSES
 from knowledge.schemas.service_search import RESULT_VIEWS
 from knowledge.services.release_management import ReleaseManagementService
+from knowledge.services.service_access_cache import service_access_cache
 from knowledge.services.service_principals import ServicePrincipalService
 from knowledge.utils.time import utc_now
 
@@ -59,6 +60,7 @@ class ServiceGrantService:
         )
         db.add(grant)
         db.commit()
+        service_access_cache.invalidate()
         db.refresh(grant)
         return grant
 
@@ -121,6 +123,7 @@ class ServiceGrantService:
         else:
             grant.grant_status = self._derive_grant_status(grant.expires_at, requested_status=grant.grant_status)
         db.commit()
+        service_access_cache.invalidate()
         db.refresh(grant)
         return grant
 
@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 
 from knowledge.models import ServicePrincipal, WalletUser
 from knowledge.models.entities import SERVICE_PRINCIPAL_STATUSES
+from knowledge.services.service_access_cache import service_access_cache
 
 
 class ServicePrincipalService:
@@ -43,7 +44,7 @@ class ServicePrincipalService:
             service_id=normalized_service_id,
             display_name=normalized_display_name,
             identity_type=normalized_identity_type,
-            credential_fingerprint=self._fingerprint_api_key(raw_api_key),
+            credential_fingerprint=self.fingerprint_api_key(raw_api_key),
             public_key_jwk={},
             principal_status="active",
         )
@@ -90,11 +91,12 @@ class ServicePrincipalService:
                 raise ValueError(f"principal_status must be one of: {', '.join(SERVICE_PRINCIPAL_STATUSES)}")
             principal.principal_status = normalized_status
         db.commit()
+        service_access_cache.invalidate()
         db.refresh(principal)
         return principal
 
     def verify_api_key(self, db: Session, raw_api_key: str) -> ServicePrincipal:
-        fingerprint = self._fingerprint_api_key(raw_api_key)
+        fingerprint = self.fingerprint_api_key(raw_api_key)
         principal = db.scalar(
             select(ServicePrincipal)
             .where(ServicePrincipal.identity_type == "api_key")
@@ -111,7 +113,7 @@ class ServicePrincipalService:
         return "svc_" + secrets.token_urlsafe(32)
 
     @staticmethod
-    def _fingerprint_api_key(raw_api_key: str) -> str:
+    def fingerprint_api_key(raw_api_key: str) -> str:
         normalized = str(raw_api_key or "").strip()
         if not normalized:
             raise ValueError("api_key cannot be empty")
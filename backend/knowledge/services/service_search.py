@@ -1,11 +1,18 @@
 from __future__ import annotations
 
-import re
+import heapq
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
 
+from knowledge.core.settings import get_settings
+from knowledge.db.session import SessionLocal, has_pending_writes
 from knowledge.models import (
     EvidenceUnit,
     KBRelease,
@@ -15,25 +22,52 @@ from knowledge.models import (
     KnowledgeItemEvidenceLink,
     KnowledgeItemRevision,
     RetrievalLog,
+    ServiceGrant,
     SourceAsset,
 )
 from knowledge.schemas.future_domain import KBReleaseRead, ServiceGrantRead
 from knowledge.schemas.grants import ServiceGrantResolvedRead
 from knowledge.schemas.service_search import (
     RESULT_VIEWS,
+    RETRIEVAL_STRATEGIES,
+    ServiceSearchBatchResponse,
+    ServiceSearchBatchResult,
     ServiceSearchEvidenceSummary,
     ServiceSearchHit,
     ServiceSearchResponse,
     ServiceSearchSourceHealthDetail,
 )
+from knowledge.services.embedding import EmbeddingProvider, build_embedding_provider
+from knowledge.services.formal_index import FormalIndexEntry
+from knowledge.services.lexical_index import EvidenceLexicalIndex
+from knowledge.services.rank_fusion import reciprocal_rank_fusion
 from knowledge.services.release_management import ReleaseManagementService
 from knowledge.services.service_grants import ServiceGrantService
 from knowledge.services.service_principals import ServicePrincipalService
+from knowledge.services.retrieval_log_writer import RetrievalLogWriter, retrieval_log_writer
+from knowledge.services.search_result_cache import SearchResultCache, evidence_generation, search_result_cache
+from knowledge.services.service_access_cache import ServiceAccess, ServiceAccessCache, service_access_cache
+from knowledge.services.vector_store import VectorSearchOptions, build_vector_search_options, build_vector_store
+from knowledge.utils.time import utc_now
 
 
 ALLOWED_MODES = {"formal_first", "formal_only", "evidence_only"}
 ALLOWED_RESULT_VIEWS = set(RESULT_VIEWS)
 ALLOWED_AVAILABILITY_MODES = {"allow_all", "healthy_only", "exclude_source_missing"}
+ALLOWED_RETRIEVAL_STRATEGIES = set(RETRIEVAL_STRATEGIES)
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def hybrid_search_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=max(1, get_settings().hybrid_search_workers), thread_name_prefix="hybrid-search")
+
+
+def close_hybrid_search_executor() -> None:
+    if hybrid_search_executor.cache_info().currsize:
+        hybrid_search_executor().shutdown(wait=False, cancel_futures=True)
+    hybrid_search_executor.cache_clear()
 
 
 @dataclass
@@ -58,14 +92,37 @@ class ServiceSearchService:
         principal_service: ServicePrincipalService | None = None,
         grant_service: ServiceGrantService | None = None,
         release_management_service: ReleaseManagementService | None = None,
+        vector_store=None,
+        embedding_provider: EmbeddingProvider | None = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+        log_writer: RetrievalLogWriter | None = None,
+        access_cache: ServiceAccessCache | None = None,
+        result_cache: SearchResultCache | None = None,
     ) -> None:
         self.principal_service = principal_service or ServicePrincipalService()
+        self.lexical_index = EvidenceLexicalIndex()
+        self._vector_store = vector_store
+        self._embedding_provider = embedding_provider
+        self.session_factory = session_factory
+        self.access_cache = access_cache or service_access_cache
+        self.result_cache = result_cache or search_result_cache
+        self.log_writer = log_writer or (retrieval_log_writer if get_settings().retrieval_log_async_enabled else None)
         self.release_management_service = release_management_service or ReleaseManagementService()
         self.grant_service = grant_service or ServiceGrantService(
             principal_service=self.principal_service,
             release_management_service=self.release_management_service,
         )
 
+    @property
+    def vector_store(self):
+        return self._vector_store if self._vector_store is not None else build_vector_store()
+
+    @property
+    def embedding_provider(self) -> EmbeddingProvider:
+        if self._embedding_provider is None:
+            self._embedding_provider = build_embedding_provider()
+        return self._embedding_provider
+
     def search(
         self,
         db: Session,
@@ -77,81 +134,247 @@ class ServiceSearchService:
         result_view: str | None,
         availability_mode: str,
         top_k: int,
+        retrieval: str = "lexical",
     ) -> ServiceSearchResponse:
         normalized_mode = self._normalize_choice(mode, ALLOWED_MODES, "mode")
         normalized_availability = self._normalize_choice(availability_mode, ALLOWED_AVAILABILITY_MODES, "availability_mode")
-        principal = self.principal_service.verify_api_key(db, service_api_key)
-        grant = self._resolve_grant_for_kb(db, principal.id, kb_id)
-        release = self._resolve_release_for_search(db, grant, normalized_mode)
-        normalized_view = self._resolve_result_view(result_view, grant.default_result_mode)
-
-        formal_hits: list[ServiceSearchHit] = []
-        evidence_hits: list[ServiceSearchHit] = []
-        used_evidence_ids: set[int] = set()
-        if normalized_mode in {"formal_first", "formal_only"} and release is not None:
-            formal_hits = self._search_formal(
-                db,
-                release,
-                query,
-                normalized_view,
-                normalized_availability,
-                top_k,
-                used_evidence_ids=used_evidence_ids,
-            )
-        if normalized_mode == "evidence_only":
-            evidence_hits = self._search_evidence(
-                db,
-                kb_id=kb_id,
-                query=query,
-                result_view=normalized_view,
-                availability_mode=normalized_availability,
-                top_k=top_k,
-                exclude_evidence_ids=set(),
-            )
-        elif normalized_mode == "formal_first":
-            remaining = max(0, top_k - len(formal_hits))
-            if remaining > 0:
-                evidence_hits = self._search_evidence(
-                    db,
-                    kb_id=kb_id,
-                    query=query,
-                    result_view=normalized_view,
-                    availability_mode=normalized_availability,
-                    top_k=remaining,
-                    exclude_evidence_ids=used_evidence_ids,
-                )
-        hits = formal_hits if normalized_mode == "formal_only" else evidence_hits if normalized_mode == "evidence_only" else [*formal_hits, *evidence_hits]
-        if normalized_mode == "formal_only" and release is None:
-            hits = []
+        normalized_retrieval = self._normalize_choice(retrieval, ALLOWED_RETRIEVAL_STRATEGIES, "retrieval")
+        access = self._resolve_access(db, service_api_key, kb_id)
+        if access.release is None and normalized_mode not in {"evidence_only", "formal_first"}:
+            raise LookupError(access.release_error or "current published release not found")
+        normalized_view = self._resolve_result_view(result_view, access.grant.default_result_mode)
 
-        resolved_grant = self._resolved_grant_read(db, grant, release)
-        self.grant_service.mark_grant_used(db, grant)
+        [(hits, retrieval_trace)] = self._run_queries(
+            db,
+            access=access,
+            kb_id=kb_id,
+            queries=[query],
+            mode=normalized_mode,
+            result_view=normalized_view,
+            availability_mode=normalized_availability,
+            top_k=top_k,
+            retrieval=normalized_retrieval,
+        )
         response = ServiceSearchResponse(
             kb_id=kb_id,
             mode=normalized_mode,
             result_view=normalized_view,
             availability_mode=normalized_availability,
-            release=release,
-            grant=resolved_grant,
-            hits=hits[:top_k],
+            retrieval=normalized_retrieval,
+            release=access.release,
+            grant=access.resolved_grant,
+            hits=hits,
         )
-        self.record_retrieval_log(
+        self._record_searches(db, access, [(query, response, retrieval_trace)])
+        return response
+
+    def search_batch(
+        self,
+        db: Session,
+        *,
+        service_api_key: str,
+        kb_id: int,
+        queries: list[str],
+        mode: str,
+        result_view: str | None,
+        availability_mode: str,
+        top_k: int,
+        retrieval: str = "lexical",
+    ) -> ServiceSearchBatchResponse:
+        max_queries = get_settings().service_search_batch_max_queries
+        if not queries:
+            raise ValueError("queries cannot be empty")
+        if len(queries) > max_queries:
+            raise ValueError(f"queries cannot contain more than {max_queries} entries")
+        normalized_mode = self._normalize_choice(mode, ALLOWED_MODES, "mode")
+        normalized_availability = self._normalize_choice(availability_mode, ALLOWED_AVAILABILITY_MODES, "availability_mode")
+        normalized_retrieval = self._normalize_choice(retrieval, ALLOWED_RETRIEVAL_STRATEGIES, "retrieval")
+        access = self._resolve_access(db, service_api_key, kb_id)
+        if access.release is None and normalized_mode not in {"evidence_only", "formal_first"}:
+            raise LookupError(access.release_error or "current published release not found")
+        normalized_view = self._resolve_result_view(result_view, access.grant.default_result_mode)
+
+        outcomes = self._run_queries(
             db,
-            owner_wallet_address=grant.owner_wallet_address,
+            access=access,
             kb_id=kb_id,
-            service_grant_id=grant.id,
-            service_principal_id=principal.id,
-            query=query,
-            query_mode=normalized_mode,
-            release_id=release.id if release is not None else None,
-            response=response,
+            queries=queries,
+            mode=normalized_mode,
+            result_view=normalized_view,
+            availability_mode=normalized_availability,
+            top_k=top_k,
+            retrieval=normalized_retrieval,
         )
-        return response
+        responses = [
+            ServiceSearchResponse(
+                kb_id=kb_id,
+                mode=normalized_mode,
+                result_view=normalized_view,
+                availability_mode=normalized_availability,
+                retrieval=normalized_retrieval,
+                release=access.release,
+                grant=access.resolved_grant,
+                hits=hits,
+            )
+            for hits, _ in outcomes
+        ]
+        self._record_searches(
+            db,
+            access,
+            [(query, response, trace) for query, response, (_, trace) in zip(queries, responses, outcomes)],
+        )
+        return ServiceSearchBatchResponse(
+            kb_id=kb_id,
+            mode=normalized_mode,
+            result_view=normalized_view,
+            availability_mode=normalized_availability,
+            retrieval=normalized_retrieval,
+            release=access.release,
+            grant=access.resolved_grant,
+            results=[ServiceSearchBatchResult(query=query, hits=response.hits) for query, response in zip(queries, responses)],
+        )
+
+    def _run_queries(
+        self,
+        db: Session,
+        *,
+        access: ServiceAccess,
+        kb_id: int,
+        queries: list[str],
+        mode: str,
+        result_view: str,
+        availability_mode: str,
+        top_k: int,
+        retrieval: str,
+    ) -> list[tuple[list[ServiceSearchHit], dict]]:
+        options = dict(mode=mode, result_view=result_view, availability_mode=availability_mode, top_k=top_k, retrieval=retrieval)
+        if not self.result_cache.enabled:
+            return self._execute_queries(db, access=access, kb_id=kb_id, queries=queries, **options)
+        release_id = access.release.id if access.release is not None else None
+        generation = evidence_generation(db, kb_id)
+        keys = [
+            (kb_id, release_id, generation, mode, self._cache_query(query, retrieval), result_view, availability_mode, top_k, retrieval)
+            for query in queries
+        ]
+        outcomes: dict[tuple, tuple[list[ServiceSearchHit], dict]] = {}
+        for key in dict.fromkeys(keys):
+            hits = self.result_cache.get(key)
+            if hits is not None:
+                outcomes[key] = (hits, {"strategy": retrieval, "legs": {}, "cache": "hit"})
+        pending = {key: query for key, query in zip(keys, queries) if key not in outcomes}
+        if pending:
+            computed = self._execute_queries(db, access=access, kb_id=kb_id, queries=list(pending.values()), **options)
+            for key, (hits, trace) in zip(pending, computed):
+                # Degraded results (e.g. a failed vector leg) are served but never cached.
+                if not any("error" in leg for leg in trace.get("legs", {}).values()):
+                    self.result_cache.put(key, hits)
+                outcomes[key] = (hits, trace)
+        return [outcomes[key] for key in keys]
+
+    @staticmethod
+    def _cache_query(query: str, retrieval: str) -> str:
+        # Lexical and formal scoring are case-insensitive; the vector leg embeds the query as written.
+        normalized = str(query or "").strip()
+        return normalized.lower() if retrieval == "lexical" else normalized
+
+    def _execute_queries(
+        self,
+        db: Session,
+        *,
+        access: ServiceAccess,
+        kb_id: int,
+        queries: list[str],
+        mode: str,
+        result_view: str,
+        availability_mode: str,
+        top_k: int,
+        retrieval: str,
+    ) -> list[tuple[list[ServiceSearchHit], dict]]:
+        release = access.release
+        traces: list[dict] = [{"strategy": retrieval, "legs": {}} for _ in queries]
+        used_evidence_ids: list[set[int]] = [set() for _ in queries]
+        formal_hits: list[list[ServiceSearchHit]] = [[] for _ in queries]
+        evidence_hits: list[list[ServiceSearchHit]] = [[] for _ in queries]
+        if mode in {"formal_first", "formal_only"} and release is not None:
+            formal_hits = self._search_formal_many(
+                db,
+                release,
+                queries,
+                result_view,
+                availability_mode,
+                top_k,
+                used_evidence_ids=used_evidence_ids,
+            )
+        if mode == "evidence_only":
+            evidence_hits = self._search_evidence_many(
+                db,
+                kb_id=kb_id,
+                queries=[(query, top_k, set()) for query in queries],
+                result_view=result_view,
+                availability_mode=availability_mode,
+                retrieval=retrieval,
+                wallet_address=access.grant.owner_wallet_address,
+                traces=traces,
+            )
+        elif mode == "formal_first":
+            evidence_hits = self._search_evidence_many(
+                db,
+                kb_id=kb_id,
+                queries=[
+                    (query, max(0, top_k - len(hits)), used)
+                    for query, hits, used in zip(queries, formal_hits, used_evidence_ids)
+                ],
+                result_view=result_view,
+                availability_mode=availability_mode,
+                retrieval=retrieval,
+                wallet_address=access.grant.owner_wallet_address,
+                traces=traces,
+            )
+        outcomes = []
+        for formal, evidence, trace in zip(formal_hits, evidence_hits, traces):
+            hits = formal if mode == "formal_only" else evidence if mode == "evidence_only" else [*formal, *evidence]
+            if mode == "formal_only" and release is None:
+                hits = []
+            outcomes.append((hits[:top_k], trace))
+        return outcomes
+
+    def _record_searches(self, db: Session, access: ServiceAccess, searches: list[tuple[str, ServiceSearchResponse, dict]]) -> None:
+        grant = access.grant
+        log_rows = []
+        for position, (query, response, retrieval_trace) in enumerate(searches):
+            values = self._retrieval_log_values(
+                owner_wallet_address=grant.owner_wallet_address,
+                kb_id=response.kb_id,
+                service_grant_id=grant.id,
+                service_principal_id=access.principal_id,
+                query=query,
+                query_mode=response.mode,
+                release_id=response.release.id if response.release is not None else None,
+                response=response,
+                retrieval_trace=retrieval_trace,
+            )
+            if len(searches) > 1:
+                values["trace_json"]["batch"] = {"size": len(searches), "position": position}
+            log_rows.append(values)
+        used_at = log_rows[-1]["created_at"]
+        if self.log_writer is not None:
+            # Persist indexes built lazily during this search; the log rows and grant touch are written in the background.
+            if has_pending_writes(db):
+                db.commit()
+            for values in log_rows:
+                self.log_writer.submit(values, grant_id=grant.id, used_at=used_at)
+        elif len(log_rows) == 1:
+            db.execute(update(ServiceGrant).where(ServiceGrant.id == grant.id).values(last_used_at=used_at))
+            self._insert_retrieval_log(db, log_rows[0])
+        else:
+            db.execute(update(ServiceGrant).where(ServiceGrant.id == grant.id).values(last_used_at=used_at))
+            db.execute(insert(RetrievalLog), log_rows)
+            db.commit()
 
     def _search_formal(
         self,
         db: Session,
-        release: KBRelease,
+        release: KBRelease | KBReleaseRead,
         query: str,
         result_view: str,
         availability_mode: str,
@@ -159,53 +382,92 @@ class ServiceSearchService:
         include_zero_scores: bool = False,
         used_evidence_ids: set[int] | None = None,
     ) -> list[ServiceSearchHit]:
-        rows = db.execute(
-            select(KBReleaseItem, KnowledgeItem, KnowledgeItemRevision)
-            .join(KnowledgeItem, KnowledgeItem.id == KBReleaseItem.knowledge_item_id)
-            .join(KnowledgeItemRevision, KnowledgeItemRevision.id == KBReleaseItem.knowledge_item_revision_id)
-            .where(KBReleaseItem.release_id == release.id)
-            .order_by(KBReleaseItem.knowledge_item_id.asc(), KBReleaseItem.id.asc())
-        ).all()
-        candidates: list[tuple[float, ServiceSearchHit]] = []
-        for release_item, item, revision in rows:
-            evidence_links = list(
-                db.scalars(
-                    select(KnowledgeItemEvidenceLink)
-                    .options(selectinload(KnowledgeItemEvidenceLink.evidence_unit))
-                    .where(KnowledgeItemEvidenceLink.knowledge_item_revision_id == revision.id)
-                    .order_by(KnowledgeItemEvidenceLink.rank.asc(), KnowledgeItemEvidenceLink.id.asc())
-                ).all()
-            )
-            evidence_units = [link.evidence_unit for link in evidence_links if link.evidence_unit is not None]
-            asset_ids = [evidence.asset_id for evidence in evidence_units]
-            source_assets = list(
-                db.scalars(select(SourceAsset).where(SourceAsset.id.in_(asset_ids)))  # type: ignore[arg-type]
-            ) if asset_ids else []
+        return self._search_formal_many(
+            db,
+            release,
+            [query],
+            result_view,
+            availability_mode,
+            top_k,
+            include_zero_scores=include_zero_scores,
+            used_evidence_ids=[used_evidence_ids] if used_evidence_ids is not None else None,
+        )[0]
+
+    def _search_formal_many(
+        self,
+        db: Session,
+        release: KBRelease | KBReleaseRead,
+        queries: list[str],
+        result_view: str,
+        availability_mode: str,
+        top_k: int,
+        include_zero_scores: bool = False,
+        used_evidence_ids: list[set[int]] | None = None,
+    ) -> list[list[ServiceSearchHit]]:
+        formal_index = self.release_management_service.formal_index
+        entries = formal_index.load(db, release.id)
+        asset_ids = sorted({asset_id for entry in entries for asset_id in entry.asset_ids})
+        assets = {asset.id: asset for asset in db.scalars(select(SourceAsset).where(SourceAsset.id.in_(asset_ids)))} if asset_ids else {}
+        searchable: list[tuple[FormalIndexEntry, list[SourceAsset], str]] = []
+        for entry in entries:
+            source_assets = [assets[asset_id] for asset_id in entry.asset_ids if asset_id in assets]
             health = self._content_health_for_assets(source_assets)
-            if not self._availability_allowed(health, availability_mode):
-                continue
-            score = self._formal_score(query, revision.title, revision.statement, item.is_hotfix, health)
-            if score <= 0 and not include_zero_scores:
-                continue
-            if used_evidence_ids is not None:
-                used_evidence_ids.update(evidence.id for evidence in evidence_units)
-            candidates.append(
-                (
-                    max(score, 0.0),
+            if self._availability_allowed(health, availability_mode):
+                searchable.append((entry, source_assets, health))
+
+        selections = [
+            [
+                (score, *searchable[index])
+                for score, index in self._top_formal_candidates(
+                    searchable,
+                    formal_index.tokenizer.tokenize(query),
+                    query,
+                    top_k,
+                    include_zero_scores=include_zero_scores,
+                    used_evidence_ids=used_evidence_ids[position] if used_evidence_ids is not None else None,
+                )
+            ]
+            for position, query in enumerate(queries)
+        ]
+
+        release_item_ids = {entry.release_item_id for selected in selections for _, entry, _, _ in selected}
+        if not release_item_ids:
+            return [[] for _ in queries]
+        rows = {
+            release_item.id: (release_item, item, revision)
+            for release_item, item, revision in db.execute(
+                select(KBReleaseItem, KnowledgeItem, KnowledgeItemRevision)
+                .join(KnowledgeItem, KnowledgeItem.id == KBReleaseItem.knowledge_item_id)
+                .join(KnowledgeItemRevision, KnowledgeItemRevision.id == KBReleaseItem.knowledge_item_revision_id)
+                .where(KBReleaseItem.id.in_(sorted(release_item_ids)))
+            )
+        }
+        evidence_by_id: dict[int, EvidenceUnit] = {}
+        if result_view == "audit":
+            evidence_ids = {evidence_id for selected in selections for _, entry, _, _ in selected for evidence_id in entry.evidence_ids}
+            if evidence_ids:
+                evidence_by_id = {evidence.id: evidence for evidence in db.scalars(select(EvidenceUnit).where(EvidenceUnit.id.in_(sorted(evidence_ids))))}
+        results = []
+        for selected in selections:
+            hits = []
+            for score, entry, source_assets, health in selected:
+                if entry.release_item_id not in rows:
+                    continue
+                release_item, item, revision = rows[entry.release_item_id]
+                hits.append(
                     self._formal_hit(
-                        score=max(score, 0.0),
+                        score=score,
                         release_item=release_item,
                         item=item,
                         revision=revision,
-                        evidence_units=evidence_units,
+                        evidence_units=[evidence_by_id[evidence_id] for evidence_id in entry.evidence_ids if evidence_id in evidence_by_id],
                         source_assets=source_assets,
                         result_view=result_view,
                         health=health,
-                    ),
+                    )
                 )
-            )
-        candidates.sort(key=lambda pair: pair[0], reverse=True)
-        return [hit for _, hit in candidates[:top_k]]
+            results.append(hits)
+        return results
 
     def _search_evidence(
         self,
@@ -218,37 +480,215 @@ class ServiceSearchService:
         top_k: int,
         exclude_evidence_ids: set[int],
         include_zero_scores: bool = False,
+        retrieval: str = "lexical",
+        wallet_address: str = "",
+        trace: dict | None = None,
     ) -> list[ServiceSearchHit]:
-        rows = db.execute(
-            select(EvidenceUnit, SourceAsset)
-            .join(SourceAsset, SourceAsset.id == EvidenceUnit.asset_id)
-            .where(EvidenceUnit.kb_id == kb_id)
-            .order_by(EvidenceUnit.asset_id.asc(), EvidenceUnit.id.asc())
-        ).all()
-        candidates: list[tuple[float, ServiceSearchHit]] = []
-        for evidence, asset in rows:
-            if evidence.id in exclude_evidence_ids:
-                continue
-            health = self._content_health_for_assets([asset])
-            if not self._availability_allowed(health, availability_mode):
-                continue
-            score = self._evidence_score(query, evidence.text)
-            if score <= 0 and not include_zero_scores:
-                continue
-            candidates.append(
-                (
-                    max(score, 0.0),
-                    self._evidence_hit(
-                        score=max(score, 0.0),
-                        evidence=evidence,
-                        asset=asset,
-                        result_view=result_view,
-                        health=health,
-                    ),
+        return self._search_evidence_many(
+            db,
+            kb_id=kb_id,
+            queries=[(query, top_k, exclude_evidence_ids)],
+            result_view=result_view,
+            availability_mode=availability_mode,
+            include_zero_scores=include_zero_scores,
+            retrieval=retrieval,
+            wallet_address=wallet_address,
+            traces=[trace] if trace is not None else None,
+        )[0]
+
+    def _search_evidence_many(
+        self,
+        db: Session,
+        *,
+        kb_id: int,
+        queries: list[tuple[str, int, set[int]]],
+        result_view: str,
+        availability_mode: str,
+        include_zero_scores: bool = False,
+        retrieval: str = "lexical",
+        wallet_address: str = "",
+        traces: list[dict] | None = None,
+    ) -> list[list[ServiceSearchHit]]:
+        # Queries whose formal hits already fill top_k are skipped entirely.
+        active = [position for position, (_, top_k, _) in enumerate(queries) if top_k > 0]
+        if not active:
+            return [[] for _ in queries]
+        self.lexical_index.ensure_indexed(db, kb_id)
+        assets = {asset.id: asset for asset in db.scalars(select(SourceAsset).where(SourceAsset.kb_id == kb_id)).all()}
+        health_by_asset = {asset_id: self._content_health_for_assets([asset]) for asset_id, asset in assets.items()}
+        allowed_asset_ids = {
+            asset_id for asset_id, health in health_by_asset.items() if self._availability_allowed(health, availability_mode)
+        }
+
+        def acceptor(exclude_evidence_ids: set[int]) -> Callable[[int, int], bool]:
+            def accept(evidence_id: int, asset_id: int) -> bool:
+                return evidence_id not in exclude_evidence_ids and asset_id in allowed_asset_ids
+
+            return accept
+
+        requests = [(queries[position][0], queries[position][1], acceptor(queries[position][2])) for position in active]
+        legs = [traces[position].setdefault("legs", {}) if traces is not None else {} for position in active]
+        if retrieval == "hybrid":
+            ranked_lists = self._hybrid_rank(
+                db,
+                kb_id=kb_id,
+                wallet_address=wallet_address,
+                requests=requests,
+                allowed_asset_ids=allowed_asset_ids,
+                legs=legs,
+            )
+        else:
+            started = time.perf_counter()
+            ranked_lists = self.lexical_index.search_many(db, kb_id, requests)
+            elapsed_ms = self._elapsed_ms(started)
+            for ranked, leg in zip(ranked_lists, legs):
+                leg["lexical"] = {"candidates": len(ranked), "elapsed_ms": elapsed_ms}
+        ranked_ids = {evidence_id for ranked in ranked_lists for _, evidence_id in ranked}
+        evidence_by_id = (
+            {evidence.id: evidence for evidence in db.scalars(select(EvidenceUnit).where(EvidenceUnit.id.in_(sorted(ranked_ids))))}
+            if ranked_ids
+            else {}
+        )
+        results: list[list[ServiceSearchHit]] = [[] for _ in queries]
+        for position, ranked in zip(active, ranked_lists):
+            _, top_k, exclude_evidence_ids = queries[position]
+            candidates: list[tuple[float, EvidenceUnit]] = [(score, evidence_by_id[evidence_id]) for score, evidence_id in ranked]
+            if include_zero_scores and len(candidates) < top_k:
+                seen_ids = {evidence_id for _, evidence_id in ranked}
+                for evidence in db.scalars(
+                    select(EvidenceUnit)
+                    .where(EvidenceUnit.kb_id == kb_id)
+                    .order_by(EvidenceUnit.asset_id.asc(), EvidenceUnit.id.asc())
+                ):
+                    if len(candidates) >= top_k:
+                        break
+                    if evidence.id in seen_ids or evidence.id in exclude_evidence_ids or evidence.asset_id not in allowed_asset_ids:
+                        continue
+                    candidates.append((0.0, evidence))
+            results[position] = [
+                self._evidence_hit(
+                    score=score,
+                    evidence=evidence,
+                    asset=assets[evidence.asset_id],
+                    result_view=result_view,
+                    health=health_by_asset[evidence.asset_id],
                 )
+                for score, evidence in candidates
+            ]
+        return results
+
+    def _hybrid_rank(
+        self,
+        db: Session,
+        *,
+        kb_id: int,
+        wallet_address: str,
+        requests: list[tuple[str, int, Callable[[int, int], bool]]],
+        allowed_asset_ids: set[int],
+        legs: list[dict],
+    ) -> list[list[tuple[float, int]]]:
+        settings = get_settings()
+        vector_store = self.vector_store
+        # The db backend only holds imported document chunks, whose ids mean nothing next to evidence ids.
+        vector_supported = bool(getattr(vector_store, "indexes_evidence", False))
+        options = build_vector_search_options(db.scalar(select(KnowledgeBase.retrieval_config).where(KnowledgeBase.id == kb_id)))
+        vector_futures = [
+            hybrid_search_executor().submit(
+                self._vector_candidates,
+                vector_store,
+                wallet_address=wallet_address,
+                kb_id=kb_id,
+                query=query,
+                budget=max(top_k, settings.hybrid_vector_candidates),
+                asset_ids=sorted(allowed_asset_ids),
+                options=options,
+            )
+            if vector_supported and allowed_asset_ids and str(query or "").strip()
+            else None
+            for query, top_k, _ in requests
+        ]
+        if not vector_supported:
+            for leg in legs:
+                leg["vector"] = {"skipped": "unsupported_backend"}
+        started = time.perf_counter()
+        lexical_lists = self.lexical_index.search_many(
+            db,
+            kb_id,
+            [(query, max(top_k, settings.hybrid_lexical_candidates), accept) for query, top_k, accept in requests],
+        )
+        elapsed_ms = self._elapsed_ms(started)
+        for lexical, leg in zip(lexical_lists, legs):
+            leg["lexical"] = {"candidates": len(lexical), "elapsed_ms": elapsed_ms}
+
+        vector_results: list[tuple[list[tuple[int, int]], float] | None] = []
+        for future, leg in zip(vector_futures, legs):
+            if future is None:
+                vector_results.append(None)
+                continue
+            try:
+                vector_results.append(future.result())
+            except Exception as exc:
+                # The vector leg is best effort: a failing embedding gateway or vector backend degrades to lexical.
+                logger.warning("hybrid vector leg failed for kb %s: %s", kb_id, exc)
+                leg["vector"] = {"candidates": 0, "error": str(exc)[:200]}
+                vector_results.append(None)
+        # Vector stores also hold imported document chunks; only keep hits that map back onto this KB's evidence.
+        candidate_ids = sorted({evidence_id for result in vector_results if result is not None for evidence_id, _ in result[0]})
+        owners = (
+            dict(db.execute(select(EvidenceUnit.id, EvidenceUnit.asset_id).where(EvidenceUnit.kb_id == kb_id).where(EvidenceUnit.id.in_(candidate_ids))).all())
+            if candidate_ids
+            else {}
+        )
+        fused_lists = []
+        for (_, top_k, accept), lexical, result, leg in zip(requests, lexical_lists, vector_results, legs):
+            vector_ids: list[int] = []
+            if result is not None:
+                candidates, vector_elapsed_ms = result
+                vector_ids = [
+                    evidence_id
+                    for evidence_id, asset_id in candidates
+                    if owners.get(evidence_id) == asset_id and accept(evidence_id, asset_id)
+                ]
+                leg["vector"] = {"candidates": len(vector_ids), "elapsed_ms": vector_elapsed_ms}
+            started = time.perf_counter()
+            fused = reciprocal_rank_fusion([[evidence_id for _, evidence_id in lexical], vector_ids], k=settings.hybrid_rrf_k)[:top_k]
+            leg["fusion"] = {"candidates": len(fused), "elapsed_ms": self._elapsed_ms(started)}
+            fused_lists.append(fused)
+        return fused_lists
+
+    def _vector_candidates(
+        self,
+        vector_store,
+        *,
+        wallet_address: str,
+        kb_id: int,
+        query: str,
+        budget: int,
+        asset_ids: list[int],
+        options: VectorSearchOptions,
+    ) -> tuple[list[tuple[int, int]], float]:
+        started = time.perf_counter()
+        query_vector = self.embedding_provider.embed_query(query)
+        db = self.session_factory()
+        try:
+            results = vector_store.search(
+                db,
+                wallet_address,
+                [kb_id],
+                query_vector,
+                budget,
+                query_text=query,
+                filters={"document_ids": asset_ids},
+                options=options,
             )
-        candidates.sort(key=lambda pair: pair[0], reverse=True)
-        return [hit for _, hit in candidates[:top_k]]
+        finally:
+            db.close()
+        candidates = [(int(result["chunk_id"]), int(result["document_id"])) for result in results if result.get("chunk_id")]
+        return candidates, self._elapsed_ms(started)
+
+    @staticmethod
+    def _elapsed_ms(started: float) -> float:
+        return round((time.perf_counter() - started) * 1000, 3)
 
     def _formal_hit(
         self,
@@ -356,13 +796,33 @@ class ServiceSearchService:
             raise LookupError("service grant not found for knowledge base")
         return grant
 
-    def _resolve_release_for_search(self, db: Session, grant, mode: str) -> KBRelease | None:
+    def _resolve_access(self, db: Session, service_api_key: str, kb_id: int) -> ServiceAccess:
+        fingerprint = self.principal_service.fingerprint_api_key(service_api_key)
+        access = self.access_cache.get(fingerprint, kb_id)
+        if access is not None:
+            # Usage timestamps move with every search (often via the background log writer), so hits re-read them.
+            usage = db.execute(select(ServiceGrant.last_used_at, ServiceGrant.updated_at).where(ServiceGrant.id == access.grant.id)).first()
+            if usage is not None:
+                return access.with_usage(*usage)
+        generation = self.access_cache.generation
+        principal = self.principal_service.verify_api_key(db, service_api_key)
+        grant = self._resolve_grant_for_kb(db, principal.id, kb_id)
+        release = None
+        release_error = None
         try:
-            return self.grant_service.resolve_release_for_grant(db, grant)
-        except LookupError:
-            if mode in {"evidence_only", "formal_first"}:
-                return None
-            raise
+            release = self.grant_service.resolve_release_for_grant(db, grant)
+        except LookupError as exc:
+            release_error = str(exc)
+        release_read = KBReleaseRead.model_validate(release) if release is not None else None
+        access = ServiceAccess(
+            principal_id=principal.id,
+            grant=ServiceGrantRead.model_validate(grant),
+            release=release_read,
+            release_error=release_error,
+            resolved_grant=self._resolved_grant_read(db, grant, release),
+        )
+        self.access_cache.put(fingerprint, kb_id, access, generation)
+        return access
 
     def _resolved_grant_read(self, db: Session, grant, release: KBRelease | None) -> ServiceGrantResolvedRead:
         kb_row = db.get(KnowledgeBase, grant.kb_id)
@@ -391,32 +851,46 @@ class ServiceSearchService:
             return health != "source_missing"
         return True
 
-    @staticmethod
-    def _tokenize(text: str) -> set[str]:
-        return {token for token in re.findall(r"[A-Za-z0-9_]+", str(text or "").lower()) if token}
+    @classmethod
+    def _top_formal_candidates(
+        cls,
+        searchable: list[tuple[FormalIndexEntry, list[SourceAsset], str]],
+        query_tokens: list[str],
+        query: str,
+        top_k: int,
+        *,
+        include_zero_scores: bool = False,
+        used_evidence_ids: set[int] | None = None,
+    ) -> list[tuple[float, int]]:
+        # Only (score, position) pairs are kept; hits are materialized by the caller for the selected top_k alone.
+        # nlargest keeps equal scores in index order, exactly like a stable descending sort.
+        token_set = set(query_tokens)
+        query_lower = str(query or "").strip().lower()
+
+        def scored():
+            for index, (entry, _source_assets, health) in enumerate(searchable):
+                score = cls._formal_score(token_set, query_lower, entry, health)
+                if score <= 0 and not include_zero_scores:
+                    continue
+                if used_evidence_ids is not None:
+                    used_evidence_ids.update(entry.evidence_ids)
+                yield max(score, 0.0), index
+
+        return heapq.nlargest(max(0, top_k), scored(), key=lambda candidate: candidate[0])
 
-    def _formal_score(self, query: str, title: str, statement: str, is_hotfix: bool, health: str) -> float:
-        base = self._text_score(query, f"{title} {statement}")
+    @staticmethod
+    def _formal_score(query_tokens: set[str], query_lower: str, entry: FormalIndexEntry, health: str) -> float:
+        if not query_tokens or not entry.tokens:
+            return 0.0
+        base = len(query_tokens & entry.tokens) / len(query_tokens)
+        if query_lower and query_lower in entry.text:
+            base += 0.2
         if base <= 0:
             return 0.0
-        boost = 0.05 if is_hotfix else 0.0
+        boost = 0.05 if entry.is_hotfix else 0.0
         penalty = 0.1 if health == "source_missing" else 0.03 if health == "stale" else 0.0
         return max(0.0, base + boost - penalty)
 
-    def _evidence_score(self, query: str, text: str) -> float:
-        return self._text_score(query, text)
-
-    def _text_score(self, query: str, text: str) -> float:
-        query_tokens = self._tokenize(query)
-        text_tokens = self._tokenize(text)
-        if not query_tokens or not text_tokens:
-            return 0.0
-        overlap = len(query_tokens & text_tokens) / len(query_tokens)
-        query_lower = str(query or "").strip().lower()
-        text_lower = str(text or "").strip().lower()
-        phrase_bonus = 0.2 if query_lower and query_lower in text_lower else 0.0
-        return overlap + phrase_bonus
-
     @staticmethod
     def _normalize_choice(value: str, allowed: set[str], field_name: str) -> str:
         normalized = str(value or "").strip().lower()
@@ -442,11 +916,46 @@ class ServiceSearchService:
         release_id: int | None,
         response: ServiceSearchResponse,
     ) -> RetrievalLog:
+        return self._insert_retrieval_log(
+            db,
+            self._retrieval_log_values(
+                owner_wallet_address=owner_wallet_address,
+                kb_id=kb_id,
+                service_grant_id=service_grant_id,
+                service_principal_id=service_principal_id,
+                query=query,
+                query_mode=query_mode,
+                release_id=release_id,
+                response=response,
+            ),
+        )
+
+    @staticmethod
+    def _insert_retrieval_log(db: Session, values: dict) -> RetrievalLog:
+        log = RetrievalLog(**values)
+        db.add(log)
+        db.commit()
+        db.refresh(log)
+        return log
+
+    @staticmethod
+    def _retrieval_log_values(
+        *,
+        owner_wallet_address: str,
+        kb_id: int,
+        service_grant_id: int | None,
+        service_principal_id: int | None,
+        query: str,
+        query_mode: str,
+        release_id: int | None,
+        response: ServiceSearchResponse,
+        retrieval_trace: dict | None = None,
+    ) -> dict:
         health_counts: dict[str, int] = {}
         for hit in response.hits:
             health_counts[hit.content_health_status] = health_counts.get(hit.content_health_status, 0) + 1
         top_hit = response.hits[0] if response.hits else None
-        log = RetrievalLog(
+        return dict(
             owner_wallet_address=owner_wallet_address,
             kb_id=kb_id,
             service_grant_id=service_grant_id,
@@ -473,6 +982,7 @@ class ServiceSearchService:
                 "result_view": response.result_view,
                 "availability_mode": response.availability_mode,
                 "release_selection_mode": response.grant.release_selection_mode if response.grant is not None else None,
+                "retrieval": retrieval_trace or {"strategy": response.retrieval, "legs": {}},
                 "hits": [
                     {
                         "result_kind": hit.result_kind,
@@ -485,8 +995,5 @@ class ServiceSearchService:
                     for hit in response.hits
                 ],
             },
+            created_at=utc_now(),
         )
-        db.add(log)
-        db.commit()
-        db.refresh(log)
-        return log
@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 
 from knowledge.models import Source, SourceAsset
 from knowledge.services.asset_inventory import AssetInventoryService, SourcePathMissingError, SourceScopeMismatchError
+from knowledge.services.search_result_cache import bump_evidence_generation
 from knowledge.services.source_registry import SourceRegistryService
 from knowledge.utils.time import utc_now
 
@@ -100,6 +101,7 @@ class SourceSyncService:
         source.last_seen_at = now
         source.last_synced_at = now
         source.sync_status = "synced" if source.enabled else "disabled"
+        bump_evidence_generation(db, source.kb_id)
         db.commit()
         db.refresh(source)
 
@@ -123,6 +125,7 @@ class SourceSyncService:
         source.sync_status = "source_missing"
         source.last_seen_at = utc_now()
         source.last_synced_at = utc_now()
+        bump_evidence_generation(db, source.kb_id)
         db.commit()
         db.refresh(source)
         stats.total_assets = len(assets)
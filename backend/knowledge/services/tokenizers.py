@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import re
+from typing import Protocol
+
+from knowledge.core.settings import get_settings
+
+
+MAX_TERM_LENGTH = 64
+WORD_PATTERN = re.compile(r"[A-Za-z0-9_]+")
+# Han (incl. extension A and compatibility ideographs), kana and hangul: scripts written without spaces.
+CJK_RUN = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u3040-\u30ff\uac00-\ud7af"
+MIXED_PATTERN = re.compile(rf"[A-Za-z0-9_]+|[{CJK_RUN}]+")
+CJK_RUN_PATTERN = re.compile(rf"[{CJK_RUN}]+")
+
+
+class Tokenizer(Protocol):
+    name: str
+
+    def tokenize(self, text: str) -> list[str]: ...
+
+
+class WordTokenizer:
+    name = "word"
+
+    def tokenize(self, text: str) -> list[str]:
+        return [token[:MAX_TERM_LENGTH] for token in WORD_PATTERN.findall(str(text or "").lower())]
+
+
+class CJKNgramTokenizer:
+    """Latin words as whole tokens; CJK runs as overlapping character bigrams and trigrams."""
+
+    name = "cjk_ngram"
+
+    def __init__(self, ngram_sizes: tuple[int, ...] = (2, 3)) -> None:
+        self.ngram_sizes = tuple(sorted(set(ngram_sizes)))
+
+    def tokenize(self, text: str) -> list[str]:
+        tokens: list[str] = []
+        for run in MIXED_PATTERN.findall(str(text or "").lower()):
+            if not CJK_RUN_PATTERN.fullmatch(run):
+                tokens.append(run[:MAX_TERM_LENGTH])
+                continue
+            if len(run) < self.ngram_sizes[0]:
+                tokens.append(run)
+                continue
+            for size in self.ngram_sizes:
+                tokens.extend(run[start : start + size] for start in range(len(run) - size + 1))
+        return tokens
+
+
+TOKENIZERS: dict[str, type] = {
+    WordTokenizer.name: WordTokenizer,
+    CJKNgramTokenizer.name: CJKNgramTokenizer,
+}
+
+
+def build_tokenizer(name: str | None = None) -> Tokenizer:
+    name = str(name or get_settings().lexical_tokenizer).strip().lower()
+    if name not in TOKENIZERS:
+        raise ValueError(f"lexical tokenizer must be one of: {', '.join(sorted(TOKENIZERS))}")
+    return TOKENIZERS[name]()
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Callable, Sequence
+
+import numpy as np
+
+from knowledge.services.vector_matrix import as_query_array, top_k_indices
+
+
+VectorFetcher = Callable[[np.ndarray], np.ndarray]
+
+ASSIGN_BATCH_SIZE = 65536
+
+
+def default_nlist(size: int) -> int:
+    return int(min(4096, max(1, round(math.sqrt(size)))))
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    return np.argmax(_normalize_rows(vectors) @ centroids.T, axis=1).astype(np.int64)
+
+
+def _assign_positions(fetch: VectorFetcher, positions: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    assignments = np.empty(positions.shape[0], dtype=np.int64)
+    for start in range(0, positions.shape[0], ASSIGN_BATCH_SIZE):
+        batch = positions[start : start + ASSIGN_BATCH_SIZE]
+        assignments[start : start + batch.shape[0]] = _assign(fetch(batch), centroids)
+    return assignments
+
+
+@dataclass(frozen=True)
+class IVFFlatIndex:
+    """Inverted-file index over a KB snapshot: spherical k-means centroids plus row positions per list.
+
+    Vectors are not copied into the lists; candidates are re-scored against the snapshot matrices, so the
+    index only costs one int64 per row on top of the centroids.
+    """
+
+    centroids: np.ndarray
+    keys: np.ndarray
+    assignments: np.ndarray
+    list_offsets: np.ndarray
+    list_positions: np.ndarray
+    trained_size: int
+
+    @property
+    def nlist(self) -> int:
+        return int(self.centroids.shape[0])
+
+    @property
+    def dimensions(self) -> int:
+        return int(self.centroids.shape[1])
+
+    def __len__(self) -> int:
+        return int(self.keys.shape[0])
+
+    @classmethod
+    def train(
+        cls,
+        keys: np.ndarray,
+        fetch: VectorFetcher,
+        *,
+        nlist: int | None = None,
+        sample_size: int | None = None,
+        iterations: int = 10,
+        seed: int = 0,
+    ) -> "IVFFlatIndex":
+        size = int(keys.shape[0])
+        if size == 0:
+            raise ValueError("cannot train an IVF index without vectors")
+        nlist = max(1, min(size, int(nlist or default_nlist(size))))
+        rng = np.random.default_rng(seed)
+        sample_size = min(size, int(sample_size or nlist * 40))
+        sample = np.sort(rng.choice(size, size=sample_size, replace=False))
+        data = _normalize_rows(fetch(sample))
+        centroids = data[rng.choice(data.shape[0], size=nlist, replace=False)].copy()
+        for _ in range(max(1, iterations)):
+            assignments = _assign(data, centroids)
+            counts = np.bincount(assignments, minlength=nlist)
+            order = np.argsort(assignments, kind="stable")
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            filled = counts > 0
+            sums = np.empty_like(centroids)
+            sums[filled] = np.add.reduceat(data[order], starts[filled], axis=0)
+            empty = np.flatnonzero(~filled)
+            if empty.size:
+                sums[empty] = data[rng.choice(data.shape[0], size=empty.size, replace=False)]
+            centroids = _normalize_rows(sums)
+        positions = np.arange(size, dtype=np.int64)
+        return cls._from_assignments(centroids, keys, _assign_positions(fetch, positions, centroids), trained_size=size)
+
+    def refresh(self, keys: np.ndarray, fetch: VectorFetcher) -> "IVFFlatIndex":
+        """Carry list assignments over to a newer snapshot, assigning only rows whose keys are new."""
+        order = np.argsort(self.keys, kind="stable")
+        sorted_keys = self.keys[order]
+        found = np.zeros(keys.shape[0], dtype=bool)
+        assignments = np.empty(keys.shape[0], dtype=np.int64)
+        if sorted_keys.size:
+            lookup = np.minimum(np.searchsorted(sorted_keys, keys), sorted_keys.size - 1)
+            found = sorted_keys[lookup] == keys
+            assignments[found] = self.assignments[order[lookup[found]]]
+        missing = np.flatnonzero(~found)
+        if missing.size:
+            assignments[missing] = _assign_positions(fetch, missing, self.centroids)
+        return self._from_assignments(self.centroids, keys, assignments, trained_size=self.trained_size)
+
+    def needs_retrain(self, size: int) -> bool:
+        return size > self.trained_size * 4 or size * 4 < self.trained_size
+
+    def candidates(self, query_vector: Sequence[float] | np.ndarray, nprobe: int) -> np.ndarray | None:
+        query = as_query_array(query_vector)
+        if query.shape[0] != self.dimensions:
+            return None
+        probes = top_k_indices(self.centroids @ query, max(1, min(int(nprobe), self.nlist)))
+        return np.concatenate(
+            [self.list_positions[self.list_offsets[probe] : self.list_offsets[probe + 1]] for probe in probes]
+        )
+
+    @classmethod
+    def _from_assignments(cls, centroids: np.ndarray, keys: np.ndarray, assignments: np.ndarray, *, trained_size: int) -> "IVFFlatIndex":
+        counts = np.bincount(assignments, minlength=centroids.shape[0])
+        return cls(
+            centroids=centroids,
+            keys=np.asarray(keys, dtype=np.int64),
+            assignments=assignments,
+            list_offsets=np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+            list_positions=np.argsort(assignments, kind="stable").astype(np.int64),
+            trained_size=trained_size,
+        )
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    size = int(scores.shape[0])
+    if top_k <= 0 or size == 0:
+        return np.empty(0, dtype=np.int64)
+    if top_k < size:
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        candidates = np.arange(size)
+    order = np.argsort(-scores[candidates], kind="stable")
+    return candidates[order]
+
+
+def as_query_array(query_vector: Sequence[float] | np.ndarray) -> np.ndarray:
+    return np.ascontiguousarray(np.asarray(query_vector, dtype=np.float32).reshape(-1))
+
+
+def aligned_query(query_vector: Sequence[float] | np.ndarray, dimensions: int) -> tuple[np.ndarray, float]:
+    query = as_query_array(query_vector)
+    query_norm = float(np.sqrt(np.dot(query, query))) or 1.0
+    if query.shape[0] != dimensions:
+        # Mirror cosine_similarity: dot product over the shared prefix, norms over full vectors.
+        aligned = np.zeros(dimensions, dtype=np.float32)
+        shared = min(dimensions, query.shape[0])
+        aligned[:shared] = query[:shared]
+        query = aligned
+    return query, query_norm
+
+
+@dataclass(frozen=True)
+class VectorMatrix:
+    matrix: np.ndarray
+    norms: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[float]] | np.ndarray, dimensions: int | None = None) -> "VectorMatrix":
+        if isinstance(rows, np.ndarray):
+            matrix = np.ascontiguousarray(rows, dtype=np.float32)
+        elif len(rows):
+            matrix = np.array(rows, dtype=np.float32)
+        else:
+            matrix = np.empty((0, int(dimensions or 0)), dtype=np.float32)
+        if matrix.ndim != 2:
+            raise ValueError("vector rows must share one dimension")
+        return cls(matrix=matrix, norms=cls.row_norms(matrix))
+
+    @staticmethod
+    def row_norms(matrix: np.ndarray) -> np.ndarray:
+        norms = np.sqrt(np.einsum("ij,ij->i", matrix, matrix, dtype=np.float32))
+        norms[norms == 0] = 1.0
+        return norms
+
+    def __len__(self) -> int:
+        return int(self.matrix.shape[0])
+
+    @property
+    def dimensions(self) -> int:
+        return int(self.matrix.shape[1])
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.matrix.nbytes + self.norms.nbytes)
+
+    def rows(self, indices: np.ndarray) -> np.ndarray:
+        return self.matrix[indices]
+
+    def scores(self, query_vector: Sequence[float] | np.ndarray) -> np.ndarray:
+        query, query_norm = aligned_query(query_vector, self.dimensions)
+        return (self.matrix @ query) / (self.norms * query_norm)
+
+    def scores_rows(self, rows: np.ndarray, query_vector: Sequence[float] | np.ndarray) -> np.ndarray:
+        query, query_norm = aligned_query(query_vector, self.dimensions)
+        return (self.matrix[rows] @ query) / (self.norms[rows] * query_norm)
+
+    def top_k(
+        self,
+        query_vector: Sequence[float] | np.ndarray,
+        top_k: int,
+        mask: np.ndarray | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        scores = self.scores(query_vector)
+        if mask is not None:
+            positions = np.flatnonzero(mask)
+            selected = top_k_indices(scores[positions], top_k)
+            indices = positions[selected]
+        else:
+            indices = top_k_indices(scores, top_k)
+        return indices, scores[indices]
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from knowledge.models import EmbeddingRecord, KBVectorCodebook, KnowledgeBase
+from knowledge.services.vector_matrix import aligned_query
+from knowledge.utils.vectors import decode_vector, encode_vector
+
+
+SCORE_BLOCK_ROWS = 8192
+
+
+@dataclass(frozen=True)
+class ScalarQuantizer:
+    """Per-dimension affine int8 codebook: ``x ~= offsets + scales * (code + 128)``."""
+
+    offsets: np.ndarray
+    scales: np.ndarray
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, margin: float = 0.05) -> "ScalarQuantizer":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] == 0 or vectors.shape[1] == 0:
+            raise ValueError("cannot fit a quantizer without vectors")
+        low = vectors.min(axis=0)
+        high = vectors.max(axis=0)
+        # Leave headroom so vectors written after the codebook was fitted rarely clip.
+        padding = (high - low) * margin
+        low = low - padding
+        scales = ((high + padding) - low) / 255.0
+        scales[scales == 0] = 1.0
+        return cls(offsets=low.astype(np.float32), scales=scales.astype(np.float32))
+
+    @classmethod
+    def from_blob(cls, blob: bytes) -> "ScalarQuantizer":
+        params = decode_vector(blob)
+        dimensions = params.shape[0] // 2
+        return cls(offsets=params[:dimensions].astype(np.float32), scales=params[dimensions:].astype(np.float32))
+
+    def to_blob(self) -> bytes:
+        return encode_vector(np.concatenate([self.offsets, self.scales]))
+
+    @property
+    def dimensions(self) -> int:
+        return int(self.offsets.shape[0])
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        codes = np.rint((vectors - self.offsets) / self.scales) - 128.0
+        return np.clip(codes, -128, 127).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return self.offsets + self.scales * (codes.astype(np.float32) + 128.0)
+
+
+@dataclass(frozen=True)
+class QuantizedVectorMatrix:
+    """int8 codes scored with asymmetric distance: the query stays float32, rows are never decoded in bulk."""
+
+    quantizer: ScalarQuantizer
+    codes: np.ndarray
+    norms: np.ndarray
+
+    @classmethod
+    def from_codes(cls, quantizer: ScalarQuantizer, codes: np.ndarray) -> "QuantizedVectorMatrix":
+        codes = np.ascontiguousarray(codes, dtype=np.int8)
+        norms = np.empty(codes.shape[0], dtype=np.float32)
+        for start in range(0, codes.shape[0], SCORE_BLOCK_ROWS):
+            block = quantizer.decode(codes[start : start + SCORE_BLOCK_ROWS])
+            norms[start : start + block.shape[0]] = np.sqrt(np.einsum("ij,ij->i", block, block))
+        norms[norms == 0] = 1.0
+        return cls(quantizer=quantizer, codes=codes, norms=norms)
+
+    def __len__(self) -> int:
+        return int(self.codes.shape[0])
+
+    @property
+    def dimensions(self) -> int:
+        return int(self.codes.shape[1])
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes + self.norms.nbytes)
+
+    def rows(self, indices: np.ndarray) -> np.ndarray:
+        return self.quantizer.decode(self.codes[indices])
+
+    def scores(self, query_vector: Sequence[float] | np.ndarray) -> np.ndarray:
+        weights, bias, query_norm = self._query_terms(query_vector)
+        scores = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), SCORE_BLOCK_ROWS):
+            block = self.codes[start : start + SCORE_BLOCK_ROWS]
+            scores[start : start + block.shape[0]] = block.astype(np.float32) @ weights
+        return (scores + bias) / (self.norms * query_norm)
+
+    def scores_rows(self, rows: np.ndarray, query_vector: Sequence[float] | np.ndarray) -> np.ndarray:
+        weights, bias, query_norm = self._query_terms(query_vector)
+        return (self.codes[rows].astype(np.float32) @ weights + bias) / (self.norms[rows] * query_norm)
+
+    def _query_terms(self, query_vector: Sequence[float] | np.ndarray) -> tuple[np.ndarray, float, float]:
+        query, query_norm = aligned_query(query_vector, self.dimensions)
+        weights = query * self.quantizer.scales
+        bias = float(np.dot(query, self.quantizer.offsets) + 128.0 * weights.sum())
+        return weights, bias, query_norm
+
+
+def load_kb_quantizer(db: Session, kb_id: int) -> ScalarQuantizer | None:
+    codebook = db.scalar(select(KBVectorCodebook).where(KBVectorCodebook.kb_id == kb_id))
+    return ScalarQuantizer.from_blob(codebook.params_blob) if codebook is not None else None
+
+
+def ensure_kb_quantizer(db: Session, kb: KnowledgeBase, vectors: Sequence[Sequence[float]], sample_size: int) -> ScalarQuantizer | None:
+    if not vectors or not len(vectors[0]):
+        return None
+    dimensions = len(vectors[0])
+    codebook = db.scalar(select(KBVectorCodebook).where(KBVectorCodebook.kb_id == kb.id))
+    if codebook is not None and codebook.dimensions == dimensions:
+        return ScalarQuantizer.from_blob(codebook.params_blob)
+
+    stored = db.scalars(
+        select(EmbeddingRecord.vector_blob)
+        .where(EmbeddingRecord.kb_id == kb.id)
+        .where(EmbeddingRecord.vector_blob.is_not(None))
+        .order_by(EmbeddingRecord.id.desc())
+        .limit(max(0, int(sample_size)))
+    ).all()
+    sample = [vector for vector in (decode_vector(blob) for blob in stored) if vector.shape[0] == dimensions]
+    sample.extend(np.asarray(vector, dtype=np.float32) for vector in vectors)
+    quantizer = ScalarQuantizer.fit(np.stack(sample))
+    if codebook is None:
+        codebook = KBVectorCodebook(kb_id=kb.id, owner_wallet_address=kb.owner_wallet_address)
+        db.add(codebook)
+    codebook.method = "int8"
+    codebook.dimensions = dimensions
+    codebook.params_blob = quantizer.to_blob()
+    codebook.sample_size = len(sample)
+    db.flush()
+    return quantizer
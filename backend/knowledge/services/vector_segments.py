@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from knowledge.services.vector_matrix import VectorMatrix
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts fall back to the in-process lock only
+    fcntl = None
+
+
+VECTOR_SUFFIX = ".f32"
+SIDECAR_SUFFIX = ".jsonl"
+TOMBSTONE_PREFIX = "tombstones-"
+TOMBSTONE_SUFFIX = ".log"
+TOMBSTONE_COMPACT_BYTES = 1 << 20
+SEQUENCE_FILE = "SEQUENCE"
+LOCK_FILE = "LOCK"
+
+
+@dataclass(frozen=True)
+class VectorSegment:
+    seq: int
+    dimensions: int
+    vector_path: Path
+    vector_ids: list[str]
+    # [start, end) byte range of each row's sidecar line.
+    offsets: np.ndarray
+    document_ids: np.ndarray
+    wallet_addresses: list[str]
+    source_paths: list[str]
+    source_kinds: list[str]
+    matrix: VectorMatrix
+
+    def __len__(self) -> int:
+        return len(self.vector_ids)
+
+    @property
+    def sidecar_path(self) -> Path:
+        return self.vector_path.with_suffix(SIDECAR_SUFFIX)
+
+    def read_lines(self, rows: Iterable[int]) -> list[bytes]:
+        # Raises FileNotFoundError when a compaction removed the segment after it was loaded.
+        lines = []
+        with self.sidecar_path.open("rb") as handle:
+            for row in rows:
+                start, end = self.offsets[row]
+                handle.seek(int(start))
+                lines.append(handle.read(int(end - start)).rstrip(b"\r\n") + b"\n")
+        return lines
+
+    def read_entries(self, rows: Iterable[int]) -> list[dict]:
+        return [json.loads(line) for line in self.read_lines(rows)]
+
+
+@dataclass
+class TombstoneLog:
+    name: str = ""
+    offset: int = 0
+    seqs: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class KBSegments:
+    signature: tuple
+    segments: list[VectorSegment]
+    live_masks: list[np.ndarray]
+
+    @property
+    def live_count(self) -> int:
+        return int(sum(int(mask.sum()) for mask in self.live_masks))
+
+
+class VectorSegmentStore:
+    """Append-only float32 segment files per KB, shared across processes through the page cache.
+
+    Each write publishes one immutable ``<seq>-<dims>.f32`` file plus a JSON-lines sidecar with the
+    row payloads; loaded segments keep only ids, filter fields and line offsets of the sidecar. Deletes append ``seq<TAB>vector_id`` to the KB's ``tombstones-<seq>.log``; a row is live
+    when it is the newest write for its vector id and no later tombstone exists. Compaction rewrites only
+    live rows, so it drops the log too; the next delete starts a log under a new name, which tells readers
+    to forget the tombstones they had cached.
+    """
+
+    def __init__(self, root: str | Path, max_segments_per_kb: int = 16) -> None:
+        self.root = Path(root)
+        self.max_segments_per_kb = max(1, int(max_segments_per_kb))
+        self._lock = threading.RLock()
+        self._segments: dict[Path, VectorSegment] = {}
+        self._tombstones: dict[int, TombstoneLog] = {}
+
+    def append(self, kb_id: int, entries: list[dict], vectors: np.ndarray) -> None:
+        if not entries:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(entries) or vectors.shape[1] == 0:
+            raise ValueError("segment vectors must be a non-empty (rows, dimensions) matrix")
+        kb_dir = self._kb_dir(kb_id)
+        with self._write_lock():
+            kb_dir.mkdir(parents=True, exist_ok=True)
+            lines = [json.dumps(entry, ensure_ascii=False, default=str).encode("utf-8") + b"\n" for entry in entries]
+            self._write_segment(kb_dir, self._next_seq(), lines, vectors)
+            if len(self._list_vector_files(kb_dir)) > self.max_segments_per_kb:
+                self._compact_locked(kb_id)
+
+    def tombstone(self, kb_id: int, vector_ids: list[str]) -> None:
+        vector_ids = [str(vector_id) for vector_id in vector_ids if str(vector_id or "").strip()]
+        kb_dir = self._kb_dir(kb_id)
+        if not vector_ids or not kb_dir.exists():
+            return
+        with self._write_lock():
+            seq = self._next_seq()
+            log_path = self._tombstone_path(kb_dir) or kb_dir / f"{TOMBSTONE_PREFIX}{seq:016d}{TOMBSTONE_SUFFIX}"
+            with log_path.open("a", encoding="utf-8") as handle:
+                handle.writelines(f"{seq}\t{vector_id}\n" for vector_id in vector_ids)
+                handle.flush()
+                os.fsync(handle.fileno())
+            if log_path.stat().st_size > TOMBSTONE_COMPACT_BYTES:
+                self._compact_locked(kb_id)
+
+    def compact(self, kb_id: int) -> None:
+        with self._write_lock():
+            self._compact_locked(kb_id)
+
+    def load(self, kb_id: int) -> KBSegments:
+        kb_dir = self._kb_dir(kb_id)
+        for attempt in range(3):
+            try:
+                with self._lock:
+                    # Tombstones first: a compaction that lands in between only removes segments they applied to.
+                    tombstones = self._refresh_tombstones(kb_id)
+                    vector_files = self._list_vector_files(kb_dir)
+                    segments = [self._load_segment(path) for path in vector_files]
+                    listed = set(vector_files)
+                    for path in [path for path in self._segments if path.parent == kb_dir and path not in listed]:
+                        self._segments.pop(path, None)
+                    signature = (tuple(path.name for path in vector_files), tombstones.name, tombstones.offset)
+                break
+            except FileNotFoundError:
+                # A concurrent compaction replaced the listed segments; list again.
+                if attempt == 2:
+                    raise
+        return KBSegments(signature=signature, segments=segments, live_masks=self._live_masks(segments, tombstones.seqs))
+
+    def signature(self, kb_id: int) -> tuple:
+        # Reads only the bytes appended since the last call, and counts complete lines exactly as load() does.
+        with self._lock:
+            tombstones = self._refresh_tombstones(kb_id)
+            vector_files = self._list_vector_files(self._kb_dir(kb_id))
+        return tuple(path.name for path in vector_files), tombstones.name, tombstones.offset
+
+    def forget(self, kb_id: int) -> None:
+        """Drops the KB's cached segments and tombstones; the next load reads them from disk again."""
+        kb_dir = self._kb_dir(kb_id)
+        with self._lock:
+            for path in [path for path in self._segments if path.parent == kb_dir]:
+                self._segments.pop(path, None)
+            self._tombstones.pop(kb_id, None)
+
+    def kb_ids(self) -> list[int]:
+        if not self.root.exists():
+            return []
+        return sorted(int(path.name[3:]) for path in self.root.glob("kb-*") if path.is_dir() and path.name[3:].isdigit())
+
+    def stats(self) -> dict:
+        kb_dirs = [path for path in self.root.glob("kb-*") if path.is_dir()] if self.root.exists() else []
+        segment_files = [path for kb_dir in kb_dirs for path in self._list_vector_files(kb_dir)]
+        return {
+            "root": str(self.root),
+            "kb_count": len(kb_dirs),
+            "segment_count": len(segment_files),
+            "segment_bytes": sum(path.stat().st_size for path in segment_files),
+        }
+
+    def _kb_dir(self, kb_id: int) -> Path:
+        return self.root / f"kb-{int(kb_id)}"
+
+    @staticmethod
+    def _list_vector_files(kb_dir: Path) -> list[Path]:
+        if not kb_dir.exists():
+            return []
+        return sorted(path for path in kb_dir.iterdir() if path.suffix == VECTOR_SUFFIX)
+
+    @staticmethod
+    def _parse_name(path: Path) -> tuple[int, int]:
+        seq, dimensions = path.stem.split("-", 1)
+        return int(seq), int(dimensions)
+
+    def _load_segment(self, vector_path: Path) -> VectorSegment:
+        cached = self._segments.get(vector_path)
+        if cached is not None:
+            return cached
+        seq, dimensions = self._parse_name(vector_path)
+        vector_ids: list[str] = []
+        offsets: list[tuple[int, int]] = []
+        document_ids: list[int] = []
+        wallet_addresses: list[str] = []
+        source_paths: list[str] = []
+        source_kinds: list[str] = []
+        position = 0
+        with vector_path.with_suffix(SIDECAR_SUFFIX).open("rb") as handle:
+            for line in handle:
+                if line.strip():
+                    entry = json.loads(line)
+                    metadata = entry.get("metadata") or {}
+                    vector_ids.append(str(entry["vector_id"]))
+                    offsets.append((position, position + len(line)))
+                    document_ids.append(int(metadata.get("document_id") or 0))
+                    # Interned, since a KB repeats the same few wallets, paths and kinds across thousands of rows.
+                    wallet_addresses.append(sys.intern(str(metadata.get("wallet_address") or "")))
+                    source_paths.append(sys.intern(str(metadata.get("source_path") or "")))
+                    source_kinds.append(sys.intern(str(metadata.get("source_kind") or "")))
+                position += len(line)
+        matrix = np.memmap(vector_path, dtype=np.float32, mode="r", shape=(len(vector_ids), dimensions))
+        segment = VectorSegment(
+            seq=seq,
+            dimensions=dimensions,
+            vector_path=vector_path,
+            vector_ids=vector_ids,
+            offsets=np.asarray(offsets, dtype=np.int64).reshape(-1, 2),
+            document_ids=np.asarray(document_ids, dtype=np.int64),
+            wallet_addresses=wallet_addresses,
+            source_paths=source_paths,
+            source_kinds=source_kinds,
+            matrix=VectorMatrix(matrix=matrix, norms=VectorMatrix.row_norms(matrix)),
+        )
+        self._segments[vector_path] = segment
+        return segment
+
+    @staticmethod
+    def _tombstone_path(kb_dir: Path) -> Path | None:
+        if not kb_dir.exists():
+            return None
+        logs = sorted(path for path in kb_dir.iterdir() if path.name.startswith(TOMBSTONE_PREFIX) and path.suffix == TOMBSTONE_SUFFIX)
+        return logs[-1] if logs else None
+
+    def _refresh_tombstones(self, kb_id: int) -> TombstoneLog:
+        path = self._tombstone_path(self._kb_dir(kb_id))
+        state = self._tombstones.get(kb_id)
+        if state is None or state.name != (path.name if path is not None else ""):
+            state = self._tombstones[kb_id] = TombstoneLog(name=path.name if path is not None else "")
+        if path is None:
+            return state
+        try:
+            with path.open("rb") as handle:
+                handle.seek(state.offset)
+                data = handle.read()
+        except FileNotFoundError:
+            # Compacted away while listing; the next refresh starts over with the replacement log.
+            return state
+        complete = data.rfind(b"\n") + 1
+        for line in data[:complete].decode("utf-8").splitlines():
+            seq, _, vector_id = line.partition("\t")
+            if vector_id:
+                state.seqs[vector_id] = max(int(seq), state.seqs.get(vector_id, 0))
+        state.offset += complete
+        return state
+
+    @staticmethod
+    def _live_masks(segments: list[VectorSegment], tombstones: dict[str, int]) -> list[np.ndarray]:
+        latest: dict[str, tuple[int, int]] = {}
+        for segment_index, segment in enumerate(segments):
+            for row_index, vector_id in enumerate(segment.vector_ids):
+                latest[vector_id] = (segment_index, row_index)
+        masks = [np.zeros(len(segment), dtype=bool) for segment in segments]
+        for vector_id, (segment_index, row_index) in latest.items():
+            if tombstones.get(vector_id, -1) < segments[segment_index].seq:
+                masks[segment_index][row_index] = True
+        return masks
+
+    def _compact_locked(self, kb_id: int) -> None:
+        loaded = self.load(kb_id)
+        by_dimensions: dict[int, tuple[list[bytes], list[np.ndarray]]] = {}
+        for segment, mask in zip(loaded.segments, loaded.live_masks):
+            if not mask.any():
+                continue
+            lines, blocks = by_dimensions.setdefault(segment.dimensions, ([], []))
+            # Live rows are copied as raw sidecar lines, never parsed.
+            lines.extend(segment.read_lines(np.flatnonzero(mask)))
+            blocks.append(np.asarray(segment.matrix.matrix[mask]))
+        kb_dir = self._kb_dir(kb_id)
+        for lines, blocks in by_dimensions.values():
+            self._write_segment(kb_dir, self._next_seq(), lines, np.concatenate(blocks, axis=0))
+        for segment in loaded.segments:
+            segment.vector_path.unlink(missing_ok=True)
+            segment.sidecar_path.unlink(missing_ok=True)
+            self._segments.pop(segment.vector_path, None)
+        # Every tombstone is older than the rewritten segments, so none of them applies any more.
+        tombstone_path = self._tombstone_path(kb_dir)
+        if tombstone_path is not None:
+            tombstone_path.unlink(missing_ok=True)
+        self._tombstones.pop(kb_id, None)
+
+    @staticmethod
+    def _write_segment(kb_dir: Path, seq: int, lines: list[bytes], vectors: np.ndarray) -> None:
+        stem = f"{seq:016d}-{vectors.shape[1]}"
+        sidecar_path = kb_dir / f"{stem}{SIDECAR_SUFFIX}"
+        vector_path = kb_dir / f"{stem}{VECTOR_SUFFIX}"
+        sidecar_tmp = sidecar_path.with_name(f".{sidecar_path.name}.tmp")
+        vector_tmp = vector_path.with_name(f".{vector_path.name}.tmp")
+        with sidecar_tmp.open("wb") as handle:
+            handle.writelines(lines)
+            handle.flush()
+            os.fsync(handle.fileno())
+        with vector_tmp.open("wb") as handle:
+            handle.write(vectors.tobytes(order="C"))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(sidecar_tmp, sidecar_path)
+        os.replace(vector_tmp, vector_path)
+
+    def _next_seq(self) -> int:
+        path = self.root / SEQUENCE_FILE
+        current = int(path.read_text(encoding="utf-8").strip() or 0) if path.exists() else 0
+        tmp = path.with_name(f".{SEQUENCE_FILE}.tmp")
+        tmp.write_text(str(current + 1), encoding="utf-8")
+        os.replace(tmp, path)
+        return current + 1
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with (self.root / LOCK_FILE).open("a") as handle:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
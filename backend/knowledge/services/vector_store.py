@@ -1,14 +1,17 @@
 from __future__ import annotations
 
 import math
+import threading
 import uuid
-from dataclasses import dataclass
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
 from functools import lru_cache
 from typing import Iterable
 
 from langchain_core.documents import Document
 from langchain_weaviate import WeaviateVectorStore as LangChainWeaviateVectorStore
-from sqlalchemy import select
+import numpy as np
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 import weaviate
 from weaviate.auth import AuthApiKey
@@ -16,8 +19,14 @@ import weaviate.classes.config as wc
 from weaviate.classes.query import Filter
 
 from knowledge.core.settings import get_settings
-from knowledge.services.embedding import build_langchain_embeddings
-from knowledge.models import EmbeddingRecord, ImportedChunk, ImportedDocument
+from knowledge.services.embedding import EmbeddingProvider, build_embedding_provider, build_langchain_embeddings
+from knowledge.services.vector_ann import IVFFlatIndex
+from knowledge.services.vector_matrix import VectorMatrix, top_k_indices
+from knowledge.services.vector_quantization import QuantizedVectorMatrix, ScalarQuantizer
+from knowledge.services.vector_segments import VectorSegment, VectorSegmentStore
+from knowledge.utils.vectors import decode_vector, stored_vector
+from knowledge.models import EmbeddingRecord, ImportedChunk, ImportedDocument, KBVectorCodebook
+from knowledge.models.entities import VECTOR_QUANTIZATION_METHODS
 
 
 @dataclass(frozen=True)
@@ -50,6 +59,31 @@ def build_vector_search_filter_plan(
     )
 
 
+VECTOR_INDEX_KINDS = ("flat", "ivf")
+
+
+@dataclass(frozen=True)
+class VectorSearchOptions:
+    vector_index: str = "flat"
+    nprobe: int = 16
+    quantization: str = "none"
+
+
+def build_vector_search_options(retrieval_config: dict | None = None) -> VectorSearchOptions:
+    config = dict(retrieval_config or {})
+    vector_index = str(config.get("vector_index") or "flat").strip().lower()
+    if vector_index not in VECTOR_INDEX_KINDS:
+        vector_index = "flat"
+    quantization = str(config.get("vector_quantization") or "none").strip().lower()
+    if quantization not in VECTOR_QUANTIZATION_METHODS:
+        quantization = "none"
+    return VectorSearchOptions(
+        vector_index=vector_index,
+        nprobe=max(1, int(config.get("ivf_nprobe") or 16)),
+        quantization=quantization,
+    )
+
+
 def cosine_similarity(left: list[float], right: list[float]) -> float:
     numerator = sum(a * b for a, b in zip(left, right))
     left_norm = math.sqrt(sum(a * a for a in left)) or 1.0
@@ -57,8 +91,206 @@ def cosine_similarity(left: list[float], right: list[float]) -> float:
     return numerator / (left_norm * right_norm)
 
 
+@dataclass
+class KBVectorSnapshot:
+    fingerprint: tuple
+    row_ids: np.ndarray
+    document_ids: np.ndarray
+    source_path_values: list[str]
+    source_path_codes: np.ndarray
+    source_kind_values: list[str]
+    source_kind_codes: np.ndarray
+    groups: list[tuple[np.ndarray, VectorMatrix | QuantizedVectorMatrix]]
+    live_mask: np.ndarray | None = None
+    ann_seed: IVFFlatIndex | None = None
+    ann_index: IVFFlatIndex | None = None
+    _locations: tuple[np.ndarray, np.ndarray] | None = field(default=None, repr=False)
+
+    @classmethod
+    def from_rows(
+        cls,
+        fingerprint: tuple,
+        rows: list[tuple[int, list[float] | np.ndarray, int, str, str]],
+        ann_seed: IVFFlatIndex | None = None,
+    ) -> "KBVectorSnapshot":
+        positions_by_dimensions: dict[int, list[int]] = {}
+        for position, row in enumerate(rows):
+            positions_by_dimensions.setdefault(len(row[1]) if row[1] is not None else 0, []).append(position)
+        groups = [
+            (
+                np.asarray(positions, dtype=np.int64),
+                VectorMatrix.from_rows(
+                    np.stack([rows[position][1] for position in positions]).astype(np.float32, copy=False)
+                    if dimensions
+                    else [],
+                    dimensions=dimensions,
+                ),
+            )
+            for dimensions, positions in positions_by_dimensions.items()
+        ]
+        return cls.from_columns(
+            fingerprint,
+            row_ids=[row[0] for row in rows],
+            document_ids=[row[2] for row in rows],
+            source_paths=[row[3] for row in rows],
+            source_kinds=[row[4] for row in rows],
+            groups=groups,
+            ann_seed=ann_seed,
+        )
+
+    @classmethod
+    def from_columns(
+        cls,
+        fingerprint: tuple,
+        *,
+        row_ids: list[int],
+        document_ids: list[int],
+        source_paths: list[str],
+        source_kinds: list[str],
+        groups: list[tuple[np.ndarray, VectorMatrix | QuantizedVectorMatrix]],
+        live_mask: np.ndarray | None = None,
+        ann_seed: IVFFlatIndex | None = None,
+    ) -> "KBVectorSnapshot":
+        source_path_values, source_path_codes = cls._encode(source_paths)
+        source_kind_values, source_kind_codes = cls._encode(source_kinds)
+        return cls(
+            fingerprint=fingerprint,
+            row_ids=np.asarray(row_ids, dtype=np.int64),
+            document_ids=np.asarray(document_ids, dtype=np.int64),
+            source_path_values=source_path_values,
+            source_path_codes=source_path_codes,
+            source_kind_values=source_kind_values,
+            source_kind_codes=source_kind_codes,
+            groups=groups,
+            live_mask=live_mask,
+            ann_seed=ann_seed,
+        )
+
+    @staticmethod
+    def _encode(values: list[str]) -> tuple[list[str], np.ndarray]:
+        index: dict[str, int] = {}
+        codes = np.fromiter((index.setdefault(value, len(index)) for value in values), dtype=np.int64, count=len(values))
+        return list(index), codes
+
+    def __len__(self) -> int:
+        return int(self.row_ids.shape[0])
+
+    def scores(self, query_vector: list[float]) -> np.ndarray:
+        if len(self.groups) == 1:
+            return self.groups[0][1].scores(query_vector)
+        scores = np.zeros(len(self), dtype=np.float32)
+        for positions, matrix in self.groups:
+            scores[positions] = matrix.scores(query_vector)
+        return scores
+
+    def filter_mask(self, filter_plan: VectorSearchFilterPlan) -> np.ndarray | None:
+        mask = self.live_mask
+        if filter_plan.source_paths:
+            path_mask = self._codes_mask(self.source_path_values, self.source_path_codes, filter_plan.source_paths)
+            mask = path_mask if mask is None else mask & path_mask
+        if filter_plan.source_kinds:
+            kind_mask = self._codes_mask(self.source_kind_values, self.source_kind_codes, filter_plan.source_kinds)
+            mask = kind_mask if mask is None else mask & kind_mask
+        if filter_plan.document_ids:
+            document_mask = np.isin(self.document_ids, np.asarray(filter_plan.document_ids, dtype=np.int64))
+            mask = document_mask if mask is None else mask & document_mask
+        return mask
+
+    @staticmethod
+    def _codes_mask(values: list[str], codes: np.ndarray, wanted: tuple[str, ...]) -> np.ndarray:
+        wanted_set = set(wanted)
+        wanted_codes = [code for code, value in enumerate(values) if value in wanted_set]
+        return np.isin(codes, np.asarray(wanted_codes, dtype=np.int64))
+
+    @property
+    def dimensions(self) -> int | None:
+        values = {matrix.dimensions for _, matrix in self.groups}
+        return values.pop() if len(values) == 1 else None
+
+    def _locate(self) -> tuple[np.ndarray, np.ndarray]:
+        if self._locations is None:
+            group_of = np.zeros(len(self), dtype=np.int64)
+            row_in_group = np.zeros(len(self), dtype=np.int64)
+            for group_index, (positions, _) in enumerate(self.groups):
+                group_of[positions] = group_index
+                row_in_group[positions] = np.arange(positions.shape[0], dtype=np.int64)
+            self._locations = (group_of, row_in_group)
+        return self._locations
+
+    def vectors(self, positions: np.ndarray) -> np.ndarray:
+        group_of, row_in_group = self._locate()
+        out = np.empty((positions.shape[0], self.dimensions or 0), dtype=np.float32)
+        for group_index, (_, matrix) in enumerate(self.groups):
+            selected = np.flatnonzero(group_of[positions] == group_index)
+            if selected.size:
+                out[selected] = matrix.rows(row_in_group[positions[selected]])
+        return out
+
+    def score_positions(self, query_vector: list[float], positions: np.ndarray) -> np.ndarray:
+        group_of, row_in_group = self._locate()
+        scores = np.zeros(positions.shape[0], dtype=np.float32)
+        for group_index, (_, matrix) in enumerate(self.groups):
+            selected = np.flatnonzero(group_of[positions] == group_index)
+            if selected.size:
+                scores[selected] = matrix.scores_rows(row_in_group[positions[selected]], query_vector)
+        return scores
+
+    def ensure_ann_index(self, min_vectors: int) -> IVFFlatIndex | None:
+        if self.ann_index is not None:
+            return self.ann_index
+        dimensions = self.dimensions
+        if len(self) < max(1, min_vectors) or not dimensions:
+            return None
+        seed = self.ann_seed
+        if seed is not None and seed.dimensions == dimensions and not seed.needs_retrain(len(self)):
+            index = seed.refresh(self.row_ids, self.vectors)
+        else:
+            index = IVFFlatIndex.train(self.row_ids, self.vectors)
+        self.ann_index = index
+        self.ann_seed = None
+        return index
+
+    def top_k(
+        self,
+        query_vector: list[float],
+        top_k: int,
+        filter_plan: VectorSearchFilterPlan,
+        ann_index: IVFFlatIndex | None = None,
+        nprobe: int = 16,
+    ) -> list[tuple[float, int]]:
+        mask = self.filter_mask(filter_plan)
+        if ann_index is not None:
+            candidates = ann_index.candidates(query_vector, nprobe)
+            if candidates is not None:
+                candidates = np.sort(candidates)
+                if mask is not None:
+                    candidates = candidates[mask[candidates]]
+                candidate_scores = self.score_positions(query_vector, candidates)
+                selected = top_k_indices(candidate_scores, top_k)
+                if selected.shape[0] >= top_k or nprobe >= ann_index.nlist:
+                    return [(float(candidate_scores[index]), int(self.row_ids[candidates[index]])) for index in selected]
+        scores = self.scores(query_vector)
+        if mask is None:
+            indices = top_k_indices(scores, top_k)
+        else:
+            positions = np.flatnonzero(mask)
+            indices = positions[top_k_indices(scores[positions], top_k)]
+        return [(float(scores[index]), int(self.row_ids[index])) for index in indices]
+
+
 class DBVectorStore:
     backend_name = "db"
+    indexes_evidence = False
+
+    def __init__(self, max_cached_kbs: int | None = None, ann_min_vectors: int | None = None) -> None:
+        settings = get_settings()
+        if max_cached_kbs is None:
+            max_cached_kbs = settings.vector_matrix_cache_max_kbs
+        self.max_cached_kbs = max(0, int(max_cached_kbs))
+        self.ann_min_vectors = settings.vector_ann_min_vectors if ann_min_vectors is None else int(ann_min_vectors)
+        self.rerank_factor = max(1, int(settings.vector_quantization_rerank_factor))
+        self._snapshots: OrderedDict[tuple[str, int], KBVectorSnapshot] = OrderedDict()
+        self._lock = threading.Lock()
 
     def search(
         self,
@@ -69,64 +301,512 @@ class DBVectorStore:
         top_k: int,
         query_text: str | None = None,
         filters: dict | None = None,
+        options: VectorSearchOptions | None = None,
     ) -> list[dict]:
         _ = query_text
         filter_plan = build_vector_search_filter_plan(wallet_address=wallet_address, kb_ids=kb_ids, filters=filters)
-        if not filter_plan.kb_ids:
+        options = options or VectorSearchOptions()
+        if not filter_plan.kb_ids or top_k <= 0:
+            return []
+
+        candidate_k = top_k * self.rerank_factor if options.quantization != "none" else top_k
+        ranked: list[tuple[float, int]] = []
+        quantized = False
+        for kb_id in filter_plan.kb_ids:
+            snapshot = self._snapshot_for_kb(db, filter_plan.wallet_address, kb_id, options.quantization, filter_plan)
+            quantized = quantized or snapshot.fingerprint[-1] is not None
+            cached = self._is_cached(filter_plan.wallet_address, kb_id, snapshot)
+            ann_index = snapshot.ensure_ann_index(self.ann_min_vectors) if options.vector_index == "ivf" and cached else None
+            ranked.extend(snapshot.top_k(query_vector, candidate_k, filter_plan, ann_index=ann_index, nprobe=options.nprobe))
+        if quantized:
+            ranked = self._rerank_full_precision(db, query_vector, ranked)
+        ranked.sort(key=lambda item: item[0], reverse=True)
+        ranked = ranked[:top_k]
+        if not ranked:
             return []
 
         rows = db.execute(
-            select(EmbeddingRecord, ImportedChunk, ImportedDocument)
-            .join(ImportedChunk, ImportedChunk.id == EmbeddingRecord.chunk_id)
+            select(ImportedChunk, ImportedDocument.source_path)
             .join(ImportedDocument, ImportedDocument.id == ImportedChunk.document_id)
-            .where(EmbeddingRecord.owner_wallet_address == filter_plan.wallet_address)
-            .where(EmbeddingRecord.kb_id.in_(filter_plan.kb_ids))
+            .where(ImportedChunk.id.in_([chunk_id for _, chunk_id in ranked]))
         ).all()
-
+        chunks_by_id = {chunk.id: (chunk, source_path) for chunk, source_path in rows}
         results = []
-        for embedding, chunk, document in rows:
-            if not self._matches_filter_plan(document=document, metadata=chunk.metadata_json or {}, filter_plan=filter_plan):
+        for score, chunk_id in ranked:
+            if chunk_id not in chunks_by_id:
                 continue
-            score = cosine_similarity(query_vector, embedding.vector_json)
+            chunk, source_path = chunks_by_id[chunk_id]
             results.append(
                 {
                     "chunk_id": chunk.id,
                     "kb_id": chunk.kb_id,
                     "document_id": chunk.document_id,
-                    "source_path": document.source_path,
+                    "source_path": source_path,
                     "text": chunk.text,
                     "score": score,
                     "metadata": chunk.metadata_json,
                 }
             )
-        results.sort(key=lambda item: item["score"], reverse=True)
-        return results[:top_k]
+        return results
+
+    def _snapshot_for_kb(
+        self,
+        db: Session,
+        wallet_address: str,
+        kb_id: int,
+        quantization: str = "none",
+        filter_plan: VectorSearchFilterPlan | None = None,
+    ) -> KBVectorSnapshot:
+        """Return the cached KB snapshot, or a one-off snapshot of just the rows a selective filter matches.
+
+        A stale or missing cache entry is only rebuilt for unfiltered (or broadly filtered) searches, so narrow
+        source_path/document_id filters never pay for loading the whole KB.
+        """
+        key = (wallet_address, kb_id)
+        # count/max(id) catch inserts and deletes; documents.updated_at catches in-place rewrites (source path or
+        # kind, kept chunks re-indexed with new metadata), since every ingestion write touches its document row.
+        documents_changed_at = (
+            select(func.max(ImportedDocument.updated_at))
+            .where(ImportedDocument.owner_wallet_address == wallet_address)
+            .where(ImportedDocument.kb_id == kb_id)
+            .scalar_subquery()
+        )
+        count, max_id, changed_at = db.execute(
+            select(func.count(EmbeddingRecord.id), func.max(EmbeddingRecord.id), documents_changed_at)
+            .where(EmbeddingRecord.owner_wallet_address == wallet_address)
+            .where(EmbeddingRecord.kb_id == kb_id)
+        ).one()
+        codebook_version = None
+        if quantization == "int8":
+            codebook_row = db.execute(
+                select(KBVectorCodebook.id, KBVectorCodebook.updated_at).where(KBVectorCodebook.kb_id == kb_id)
+            ).first()
+            codebook_version = tuple(codebook_row) if codebook_row is not None else None
+        fingerprint = (int(count or 0), int(max_id or 0), changed_at, codebook_version)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None and snapshot.fingerprint == fingerprint:
+                self._snapshots.move_to_end(key)
+                return snapshot
+
+        if filter_plan is not None and self._is_selective(filter_plan):
+            return self._load_snapshot(db, filter_plan, kb_id, fingerprint, None, prefilter=True)
+
+        previous = snapshot
+        ann_seed = (previous.ann_index or previous.ann_seed) if previous is not None else None
+        snapshot = self._load_snapshot(
+            db,
+            filter_plan or build_vector_search_filter_plan(wallet_address=wallet_address, kb_ids=[kb_id]),
+            kb_id,
+            fingerprint,
+            ann_seed,
+        )
+        if self.max_cached_kbs:
+            with self._lock:
+                self._snapshots[key] = snapshot
+                self._snapshots.move_to_end(key)
+                while len(self._snapshots) > self.max_cached_kbs:
+                    self._snapshots.popitem(last=False)
+        return snapshot
+
+    def _is_cached(self, wallet_address: str, kb_id: int, snapshot: KBVectorSnapshot) -> bool:
+        with self._lock:
+            return self._snapshots.get((wallet_address, kb_id)) is snapshot
+
+    @staticmethod
+    def _is_selective(filter_plan: VectorSearchFilterPlan) -> bool:
+        return bool(filter_plan.source_paths or filter_plan.document_ids)
 
     @staticmethod
-    def _matches_filter_plan(document: ImportedDocument, metadata: dict, filter_plan: VectorSearchFilterPlan) -> bool:
-        if filter_plan.source_paths and document.source_path not in set(filter_plan.source_paths):
-            return False
-        if filter_plan.source_kinds and metadata.get("source_kind") not in set(filter_plan.source_kinds):
-            return False
-        if filter_plan.document_ids and document.id not in set(filter_plan.document_ids):
-            return False
-        return True
+    def _build_filters(filter_plan: VectorSearchFilterPlan, kb_id: int, prefilter: bool = False) -> list:
+        if not prefilter:
+            return [
+                EmbeddingRecord.owner_wallet_address == filter_plan.wallet_address,
+                EmbeddingRecord.kb_id == kb_id,
+            ]
+        # Scope on documents so the planner can drive documents -> chunks -> embeddings through their indexes.
+        conditions = [
+            ImportedDocument.owner_wallet_address == filter_plan.wallet_address,
+            ImportedDocument.kb_id == kb_id,
+        ]
+        if filter_plan.source_paths:
+            conditions.append(ImportedDocument.source_path.in_(filter_plan.source_paths))
+        if filter_plan.source_kinds:
+            conditions.append(ImportedDocument.source_kind.in_(filter_plan.source_kinds))
+        if filter_plan.document_ids:
+            conditions.append(ImportedDocument.id.in_(filter_plan.document_ids))
+        return conditions
+
+    def _load_snapshot(
+        self,
+        db: Session,
+        filter_plan: VectorSearchFilterPlan,
+        kb_id: int,
+        fingerprint: tuple,
+        ann_seed: IVFFlatIndex | None,
+        prefilter: bool = False,
+    ) -> KBVectorSnapshot:
+        quantized = fingerprint[-1] is not None
+        rows = db.execute(
+            select(
+                EmbeddingRecord.chunk_id,
+                EmbeddingRecord.vector_codes if quantized else EmbeddingRecord.vector_blob,
+                EmbeddingRecord.vector_json,
+                ImportedChunk.document_id,
+                ImportedDocument.source_path,
+                ImportedDocument.source_kind,
+            )
+            .join(ImportedChunk, ImportedChunk.id == EmbeddingRecord.chunk_id)
+            .join(ImportedDocument, ImportedDocument.id == ImportedChunk.document_id)
+            .where(*self._build_filters(filter_plan, kb_id, prefilter=prefilter))
+            .order_by(EmbeddingRecord.id.asc())
+        ).all()
+        if quantized:
+            return self._build_quantized_snapshot(db, kb_id, fingerprint, rows, ann_seed)
+        return KBVectorSnapshot.from_rows(
+            fingerprint,
+            [
+                (chunk_id, stored_vector(blob, vector), document_id, source_path, source_kind or "")
+                for chunk_id, blob, vector, document_id, source_path, source_kind in rows
+            ],
+            ann_seed=ann_seed,
+        )
+
+    def _build_quantized_snapshot(
+        self,
+        db: Session,
+        kb_id: int,
+        fingerprint: tuple,
+        rows: list,
+        ann_seed: IVFFlatIndex | None,
+    ) -> KBVectorSnapshot:
+        quantizer = ScalarQuantizer.from_blob(
+            db.scalar(select(KBVectorCodebook.params_blob).where(KBVectorCodebook.kb_id == kb_id))
+        )
+        codes = [decode_vector(blob) if blob is not None else None for _, blob, _, _, _, _ in rows]
+        # Rows written before quantization was enabled only have full-precision vectors; encode those in memory.
+        pending = [row[0] for row, code in zip(rows, codes) if code is None or code.shape[0] != quantizer.dimensions]
+        full_vectors = self._full_precision_vectors(db, pending)
+        quantized_positions: list[int] = []
+        quantized_codes: list[np.ndarray] = []
+        other_positions: dict[int, list[int]] = {}
+        for position, (row, code) in enumerate(zip(rows, codes)):
+            if code is None or code.shape[0] != quantizer.dimensions:
+                vector = full_vectors.get(row[0], np.zeros(0, dtype=np.float32))
+                if vector.shape[0] != quantizer.dimensions:
+                    other_positions.setdefault(vector.shape[0], []).append(position)
+                    continue
+                code = quantizer.encode(vector)
+            quantized_positions.append(position)
+            quantized_codes.append(code)
+        groups: list[tuple[np.ndarray, VectorMatrix | QuantizedVectorMatrix]] = []
+        if quantized_positions:
+            groups.append(
+                (np.asarray(quantized_positions, dtype=np.int64), QuantizedVectorMatrix.from_codes(quantizer, np.stack(quantized_codes)))
+            )
+        for dimensions, positions in other_positions.items():
+            vectors = [full_vectors[rows[position][0]] for position in positions]
+            groups.append(
+                (
+                    np.asarray(positions, dtype=np.int64),
+                    VectorMatrix.from_rows(np.stack(vectors).astype(np.float32, copy=False), dimensions=dimensions),
+                )
+            )
+        return KBVectorSnapshot.from_columns(
+            fingerprint,
+            row_ids=[row[0] for row in rows],
+            document_ids=[row[3] for row in rows],
+            source_paths=[row[4] for row in rows],
+            source_kinds=[row[5] or "" for row in rows],
+            groups=groups,
+            ann_seed=ann_seed,
+        )
+
+    def _rerank_full_precision(self, db: Session, query_vector: list[float], ranked: list[tuple[float, int]]) -> list[tuple[float, int]]:
+        vectors = self._full_precision_vectors(db, [chunk_id for _, chunk_id in ranked])
+        chunk_ids_by_dimensions: dict[int, list[int]] = {}
+        for _, chunk_id in ranked:
+            if chunk_id in vectors:
+                chunk_ids_by_dimensions.setdefault(vectors[chunk_id].shape[0], []).append(chunk_id)
+        rescored: list[tuple[float, int]] = []
+        for dimensions, chunk_ids in chunk_ids_by_dimensions.items():
+            matrix = VectorMatrix.from_rows(
+                np.stack([vectors[chunk_id] for chunk_id in chunk_ids]).astype(np.float32, copy=False),
+                dimensions=dimensions,
+            )
+            rescored.extend(zip(matrix.scores(query_vector).tolist(), chunk_ids))
+        return rescored
+
+    @staticmethod
+    def _full_precision_vectors(db: Session, chunk_ids: list[int], batch_size: int = 500) -> dict[int, np.ndarray]:
+        vectors: dict[int, np.ndarray] = {}
+        for start in range(0, len(chunk_ids), batch_size):
+            rows = db.execute(
+                select(EmbeddingRecord.chunk_id, EmbeddingRecord.vector_blob, EmbeddingRecord.vector_json).where(
+                    EmbeddingRecord.chunk_id.in_(chunk_ids[start : start + batch_size])
+                )
+            ).all()
+            for chunk_id, blob, vector in rows:
+                vectors[chunk_id] = stored_vector(blob, vector)
+        return vectors
 
     def index_chunks(self, payloads: list[dict]) -> None:
         _ = payloads
 
-    def delete_vectors(self, vector_ids: list[str]) -> None:
-        _ = vector_ids
+    def delete_vectors(self, vector_ids: list[str], kb_id: int | None = None) -> None:
+        _ = (vector_ids, kb_id)
+
+    def health(self) -> dict:
+        with self._lock:
+            cached = list(self._snapshots.values())
+        return {
+            "backend": "db",
+            "status": "ok",
+            "cached_kbs": len(cached),
+            "cached_vectors": sum(len(snapshot) for snapshot in cached),
+            "cached_vector_bytes": sum(matrix.nbytes for snapshot in cached for _, matrix in snapshot.groups),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+
+
+class LocalVectorStore:
+    backend_name = "local"
+    indexes_evidence = True
+
+    def __init__(
+        self,
+        root: str | None = None,
+        max_segments_per_kb: int | None = None,
+        embedding_provider: EmbeddingProvider | None = None,
+        ann_min_vectors: int | None = None,
+        max_cached_kbs: int | None = None,
+    ) -> None:
+        settings = get_settings()
+        if max_cached_kbs is None:
+            max_cached_kbs = settings.vector_matrix_cache_max_kbs
+        self.max_cached_kbs = max(0, int(max_cached_kbs))
+        self.segment_store = VectorSegmentStore(
+            root or settings.vector_store_local_root,
+            max_segments_per_kb=max_segments_per_kb or settings.vector_store_local_max_segments,
+        )
+        self.ann_min_vectors = settings.vector_ann_min_vectors if ann_min_vectors is None else int(ann_min_vectors)
+        self.rerank_factor = max(1, int(settings.vector_quantization_rerank_factor))
+        self.quantization_sample_size = max(1, int(settings.vector_quantization_fit_sample_size))
+        self._embedding_provider = embedding_provider
+        # LRU of (snapshot, segments by seq); text and metadata are read from the sidecars for returned hits only.
+        self._snapshots: OrderedDict[tuple[str, int], tuple[KBVectorSnapshot, dict[int, VectorSegment]]] = OrderedDict()
+        self._quantized: dict[tuple[str, int], KBVectorSnapshot] = {}
+        self._quantizers: dict[int, ScalarQuantizer] = {}
+        self._segment_codes: dict[tuple[int, int], QuantizedVectorMatrix] = {}
+        self._lock = threading.Lock()
+
+    def _embeddings(self) -> EmbeddingProvider:
+        if self._embedding_provider is None:
+            self._embedding_provider = build_embedding_provider()
+        return self._embedding_provider
+
+    def index_chunks(self, payloads: list[dict]) -> None:
+        if not payloads:
+            return
+        vectors = [item.get("vector") or None for item in payloads]
+        missing = [index for index, vector in enumerate(vectors) if vector is None]
+        if missing:
+            embedded = self._embeddings().embed_texts([payloads[index]["text"] for index in missing])
+            for index, vector in zip(missing, embedded):
+                vectors[index] = vector
+        groups: dict[tuple[int, int], tuple[list[dict], list[list[float]]]] = {}
+        for item, vector in zip(payloads, vectors):
+            kb_id = int(item["metadata"]["kb_id"])
+            entries, rows = groups.setdefault((kb_id, len(vector)), ([], []))
+            entries.append({"vector_id": item["vector_id"], "text": item["text"], "metadata": item["metadata"]})
+            rows.append(vector)
+        for (kb_id, _), (entries, rows) in groups.items():
+            self.segment_store.append(kb_id, entries, np.asarray(rows, dtype=np.float32))
+
+    def delete_vectors(self, vector_ids: list[str], kb_id: int | None = None) -> None:
+        # Tombstones are kept per KB; callers without a KB fall back to every KB directory.
+        for target in [kb_id] if kb_id is not None else self.segment_store.kb_ids():
+            self.segment_store.tombstone(target, vector_ids)
+
+    def search(
+        self,
+        db: Session,
+        wallet_address: str,
+        kb_ids: Iterable[int],
+        query_vector: list[float],
+        top_k: int,
+        query_text: str | None = None,
+        filters: dict | None = None,
+        options: VectorSearchOptions | None = None,
+    ) -> list[dict]:
+        _ = (db, query_text)
+        filter_plan = build_vector_search_filter_plan(wallet_address=wallet_address, kb_ids=kb_ids, filters=filters)
+        options = options or VectorSearchOptions()
+        if not filter_plan.kb_ids or top_k <= 0:
+            return []
+        for attempt in range(2):
+            try:
+                return self._search(filter_plan, query_vector, top_k, options)
+            except FileNotFoundError:
+                # Another process compacted a segment away after it was loaded; the retry sees the new signature.
+                if attempt:
+                    raise
+        return []
+
+    def _search(self, filter_plan: VectorSearchFilterPlan, query_vector: list[float], top_k: int, options: VectorSearchOptions) -> list[dict]:
+        candidate_k = top_k * self.rerank_factor if options.quantization == "int8" else top_k
+        ranked: list[tuple[float, VectorSegment, int]] = []
+        for kb_id in filter_plan.kb_ids:
+            snapshot, segments = self._snapshot_for_kb(filter_plan.wallet_address, kb_id)
+            searched = self._quantized_snapshot(filter_plan.wallet_address, kb_id, snapshot) if options.quantization == "int8" else snapshot
+            ann_index = searched.ensure_ann_index(self.ann_min_vectors) if options.vector_index == "ivf" else None
+            hits = searched.top_k(query_vector, candidate_k, filter_plan, ann_index=ann_index, nprobe=options.nprobe)
+            if searched is not snapshot and hits:
+                # Rerank the int8 candidates against the memory-mapped float32 rows; row keys ascend with segment order.
+                row_keys = np.asarray([row_key for _, row_key in hits], dtype=np.int64)
+                scores = snapshot.score_positions(query_vector, np.searchsorted(snapshot.row_ids, row_keys))
+                hits = list(zip(scores.tolist(), row_keys.tolist()))
+            ranked.extend((score, segments[row_key >> 32], row_key & 0xFFFFFFFF) for score, row_key in hits)
+        ranked.sort(key=lambda item: item[0], reverse=True)
+        ranked = ranked[:top_k]
+        rows_by_segment: dict[int, tuple[VectorSegment, list[int]]] = {}
+        for _, segment, row in ranked:
+            rows_by_segment.setdefault(segment.seq, (segment, []))[1].append(row)
+        entries: dict[tuple[int, int], dict] = {}
+        for segment, rows in rows_by_segment.values():
+            entries.update(((segment.seq, row), entry) for row, entry in zip(rows, segment.read_entries(rows)))
+        results = []
+        for score, segment, row in ranked:
+            entry = entries[(segment.seq, row)]
+            metadata = entry.get("metadata") or {}
+            results.append(
+                {
+                    "chunk_id": int(metadata.get("chunk_id") or 0),
+                    "kb_id": int(metadata.get("kb_id") or 0),
+                    "document_id": int(metadata.get("document_id") or 0),
+                    "source_path": metadata.get("source_path") or "",
+                    "text": entry.get("text") or "",
+                    "score": score,
+                    "metadata": metadata,
+                }
+            )
+        return results
+
+    def _snapshot_for_kb(self, wallet_address: str, kb_id: int) -> tuple[KBVectorSnapshot, dict[int, VectorSegment]]:
+        key = (wallet_address, kb_id)
+        signature = self.segment_store.signature(kb_id)
+        with self._lock:
+            cached = self._snapshots.get(key)
+            if cached is not None and cached[0].fingerprint == signature:
+                self._snapshots.move_to_end(key)
+                return cached
+
+        loaded = self.segment_store.load(kb_id)
+        row_keys: list[int] = []
+        groups: list[tuple[np.ndarray, VectorMatrix]] = []
+        for segment in loaded.segments:
+            groups.append((np.arange(len(row_keys), len(row_keys) + len(segment), dtype=np.int64), segment.matrix))
+            # Segments are immutable, so (seq, row) is a stable key across snapshot rebuilds.
+            row_keys.extend((segment.seq << 32) | row_index for row_index in range(len(segment)))
+        live_mask = np.concatenate(loaded.live_masks) if loaded.live_masks else np.zeros(0, dtype=bool)
+        live_mask &= np.fromiter(
+            (owner == wallet_address for segment in loaded.segments for owner in segment.wallet_addresses), dtype=bool, count=len(row_keys)
+        )
+        previous = cached[0] if cached is not None else None
+        snapshot = KBVectorSnapshot.from_columns(
+            loaded.signature,
+            row_ids=row_keys,
+            document_ids=np.concatenate([segment.document_ids for segment in loaded.segments]) if loaded.segments else [],
+            source_paths=[path for segment in loaded.segments for path in segment.source_paths],
+            source_kinds=[kind for segment in loaded.segments for kind in segment.source_kinds],
+            groups=groups,
+            live_mask=live_mask,
+            ann_seed=(previous.ann_index or previous.ann_seed) if previous is not None else None,
+        )
+        segments = {segment.seq: segment for segment in loaded.segments}
+        if self.max_cached_kbs:
+            with self._lock:
+                self._snapshots[key] = (snapshot, segments)
+                self._snapshots.move_to_end(key)
+                while len(self._snapshots) > self.max_cached_kbs:
+                    evicted, _ = self._snapshots.popitem(last=False)
+                    self._quantized.pop(evicted, None)
+                    self._forget_kb_locked(evicted[1])
+        else:
+            self._forget_kb(kb_id)
+        return snapshot, segments
+
+    def _forget_kb(self, kb_id: int) -> None:
+        with self._lock:
+            self._forget_kb_locked(kb_id)
+
+    def _forget_kb_locked(self, kb_id: int) -> None:
+        # Per-KB state outlives a snapshot only while some wallet still has that KB cached.
+        if any(cached_kb_id == kb_id for _, cached_kb_id in self._snapshots):
+            return
+        self._quantizers.pop(kb_id, None)
+        self._segment_codes = {code_key: codes for code_key, codes in self._segment_codes.items() if code_key[0] != kb_id}
+        self.segment_store.forget(kb_id)
+
+    def _quantized_snapshot(self, wallet_address: str, kb_id: int, snapshot: KBVectorSnapshot) -> KBVectorSnapshot:
+        """int8 view of a KB snapshot; segments are immutable, so each one is encoded once per KB codebook."""
+        key = (wallet_address, kb_id)
+        with self._lock:
+            cached = self._quantized.get(key)
+        if cached is not None and cached.fingerprint == snapshot.fingerprint:
+            return cached
+        dimensions = snapshot.dimensions
+        if not dimensions or not len(snapshot):
+            return snapshot
+        with self._lock:
+            quantizer = self._quantizers.get(kb_id)
+            if quantizer is None or quantizer.dimensions != dimensions:
+                sample = np.random.default_rng(0).choice(len(snapshot), size=min(len(snapshot), self.quantization_sample_size), replace=False)
+                quantizer = ScalarQuantizer.fit(snapshot.vectors(np.sort(sample)))
+                self._quantizers[kb_id] = quantizer
+                self._segment_codes = {code_key: codes for code_key, codes in self._segment_codes.items() if code_key[0] != kb_id}
+            groups: list[tuple[np.ndarray, VectorMatrix | QuantizedVectorMatrix]] = []
+            live_seqs: set[int] = set()
+            for positions, matrix in snapshot.groups:
+                if not positions.size:
+                    continue
+                seq = int(snapshot.row_ids[positions[0]]) >> 32
+                live_seqs.add(seq)
+                codes = self._segment_codes.get((kb_id, seq))
+                if codes is None:
+                    codes = QuantizedVectorMatrix.from_codes(quantizer, quantizer.encode(matrix.rows(np.arange(len(matrix)))))
+                    self._segment_codes[(kb_id, seq)] = codes
+                groups.append((positions, codes))
+            # Compaction replaces segments; drop the codes of ones that are gone.
+            self._segment_codes = {
+                code_key: codes for code_key, codes in self._segment_codes.items() if code_key[0] != kb_id or code_key[1] in live_seqs
+            }
+        previous = (cached.ann_index or cached.ann_seed) if cached is not None else None
+        quantized = replace(snapshot, groups=groups, ann_seed=previous, ann_index=None, _locations=None)
+        with self._lock:
+            if key in self._snapshots:
+                self._quantized[key] = quantized
+            else:
+                self._forget_kb_locked(kb_id)
+        return quantized
 
     def health(self) -> dict:
-        return {"backend": "db", "status": "ok"}
+        return {"backend": "local", "status": "ok", **self.segment_store.stats()}
 
     def close(self) -> None:
-        return None
+        with self._lock:
+            self._snapshots.clear()
+            self._quantized.clear()
+            self._quantizers.clear()
+            self._segment_codes.clear()
 
 
 class WeaviateVectorStore:
     backend_name = "weaviate"
+    indexes_evidence = True
 
     def __init__(self) -> None:
         self.settings = get_settings()
@@ -256,7 +936,8 @@ class WeaviateVectorStore:
             ids.append(item["vector_id"])
         self._store_client().add_documents(documents, ids=ids)
 
-    def delete_vectors(self, vector_ids: list[str]) -> None:
+    def delete_vectors(self, vector_ids: list[str], kb_id: int | None = None) -> None:
+        _ = kb_id
         if not vector_ids:
             return
         client = self._connect()
@@ -276,8 +957,9 @@ class WeaviateVectorStore:
         top_k: int,
         query_text: str | None = None,
         filters: dict | None = None,
+        options: VectorSearchOptions | None = None,
     ) -> list[dict]:
-        _ = db
+        _ = (db, options)
         store = self._store_client()
         filter_plan = build_vector_search_filter_plan(wallet_address=wallet_address, kb_ids=kb_ids, filters=filters)
         filters = self._build_filters(filter_plan)
@@ -340,6 +1022,8 @@ def build_vector_store():
     settings = get_settings()
     if settings.vector_store_mode == "weaviate":
         return WeaviateVectorStore()
+    if settings.vector_store_mode == "local":
+        return LocalVectorStore()
     return DBVectorStore()
 
 
@@ -1,3 +1,4 @@
 from knowledge.utils.time import utc_isoformat, utc_now
+from knowledge.utils.vectors import decode_vector, encode_vector, stored_vector
 
-__all__ = ["utc_isoformat", "utc_now"]
+__all__ = ["decode_vector", "encode_vector", "stored_vector", "utc_isoformat", "utc_now"]
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+import hashlib
+import json
+
+
+def sha256_bytes(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def config_hash(config: dict, keys: tuple[str, ...]) -> str:
+    # Only the keys that change the produced chunks/vectors, so unrelated retrieval settings do not force a rebuild.
+    return sha256_text(json.dumps({key: config.get(key) for key in keys}, sort_keys=True, default=str))
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import struct
+from typing import Sequence
+
+import numpy as np
+
+
+VECTOR_BLOB_MAGIC = b"KV"
+VECTOR_BLOB_VERSION = 1
+VECTOR_BLOB_DTYPES: dict[str, int] = {"float32": 1, "float16": 2, "int8": 3}
+
+# magic, version, dtype code, dimensions; 8 bytes keeps the payload aligned for float32 views.
+_HEADER = struct.Struct("<2sBBI")
+_NUMPY_DTYPES = {1: np.dtype("<f4"), 2: np.dtype("<f2"), 3: np.dtype("i1")}
+
+
+def encode_vector(vector: Sequence[float] | np.ndarray | None, dtype: str = "float32") -> bytes:
+    code = VECTOR_BLOB_DTYPES.get(dtype)
+    if code is None:
+        raise ValueError(f"vector dtype must be one of: {', '.join(VECTOR_BLOB_DTYPES)}")
+    values = np.asarray(vector if vector is not None else [], dtype=_NUMPY_DTYPES[code]).reshape(-1)
+    return _HEADER.pack(VECTOR_BLOB_MAGIC, VECTOR_BLOB_VERSION, code, values.shape[0]) + values.tobytes()
+
+
+def decode_vector(blob: bytes | memoryview) -> np.ndarray:
+    """Return a read-only view over the blob payload; no float data is copied."""
+    if len(blob) < _HEADER.size:
+        raise ValueError("vector blob is truncated")
+    magic, version, code, dimensions = _HEADER.unpack_from(blob)
+    if magic != VECTOR_BLOB_MAGIC or version != VECTOR_BLOB_VERSION or code not in _NUMPY_DTYPES:
+        raise ValueError("unsupported vector blob header")
+    return np.frombuffer(blob, dtype=_NUMPY_DTYPES[code], count=dimensions, offset=_HEADER.size)
+
+
+def stored_vector(blob: bytes | memoryview | None, fallback: Sequence[float] | None = None) -> np.ndarray:
+    if blob is not None:
+        return decode_vector(blob)
+    return np.asarray(fallback or [], dtype=np.float32)
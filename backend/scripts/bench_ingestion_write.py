@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+from time import perf_counter
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare per-chunk add+flush with batched INSERT ... RETURNING when writing one file's chunks.")
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="knowledge-ingestion-write-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["INGESTION_WRITE_BATCH_SIZE"] = str(args.batch_size)
+
+    from sqlalchemy import event
+
+    from knowledge.db.base import Base
+    from knowledge.db.schema import ensure_runtime_schema
+    from knowledge.db.session import SessionLocal, engine
+    from knowledge.models import EmbeddingRecord, ImportedChunk, ImportedDocument, ImportTask, KnowledgeBase, WalletUser
+    from knowledge.services.chunking import ChunkResult
+    from knowledge.services.embedding import MockEmbeddingProvider
+    from knowledge.services.ingestion import ChunkGroup, IngestionService, PreparedFile
+    from knowledge.services.warehouse import WarehouseFileEntry
+    from knowledge.utils.vectors import encode_vector
+
+    Base.metadata.create_all(bind=engine)
+    ensure_runtime_schema(engine)
+    statements = [0]
+    event.listen(engine, "before_cursor_execute", lambda *_args: statements.__setitem__(0, statements[0] + 1))
+
+    service = IngestionService(embedding_provider=MockEmbeddingProvider(dimensions=args.dimensions))
+    chunks = [ChunkResult(text=f"chunk {index} " + "lorem ipsum " * 40, metadata={"chunk_strategy": "text_recursive"}) for index in range(args.chunks)]
+    vectors = service.embedding_provider.embed_texts([chunk.text for chunk in chunks])
+
+    def legacy_write(db, task, prepared, embeddings) -> int:
+        # Previous shape: a cancel check and a flush per chunk to learn its id before adding the embedding.
+        document = ImportedDocument(
+            kb_id=prepared.kb.id,
+            owner_wallet_address=task.owner_wallet_address,
+            source_path=prepared.file_entry.path,
+            source_file_name=prepared.file_entry.name,
+            source_kind="app",
+            parse_status="parsed",
+        )
+        db.add(document)
+        db.flush()
+        for index, chunk_data in enumerate(chunks):
+            db.refresh(task)
+            chunk = ImportedChunk(
+                document_id=document.id,
+                kb_id=prepared.kb.id,
+                owner_wallet_address=task.owner_wallet_address,
+                chunk_index=index,
+                text=chunk_data.text,
+                metadata_json=dict(chunk_data.metadata),
+            )
+            db.add(chunk)
+            db.flush()
+            db.add(
+                EmbeddingRecord(
+                    chunk_id=chunk.id,
+                    kb_id=prepared.kb.id,
+                    owner_wallet_address=task.owner_wallet_address,
+                    vector_id=str(uuid.uuid5(uuid.NAMESPACE_URL, f"knowledge:{prepared.kb.id}:{prepared.file_entry.path}:{index}")),
+                    embedding_model="bench",
+                    vector_blob=encode_vector(embeddings[index], service.settings.embedding_vector_dtype),
+                )
+            )
+        db.flush()
+        return len(chunks)
+
+    def bulk_write(db, task, prepared, embeddings) -> int:
+        # The import pipeline writes a file as chunk groups followed by an empty group that finalizes it.
+        group = service._chunk_group(db, prepared, chunks)  # noqa: SLF001
+        written = service._write_group(db, task, group, embeddings, {})  # noqa: SLF001
+        service._write_group(db, task, ChunkGroup(prepared, start=len(chunks), chunks=[], last=True), [], {})  # noqa: SLF001
+        return written
+
+    print(f"one file with {args.chunks} chunks, {args.dimensions}-d vectors, batch size {args.batch_size}")
+    print(f"{'strategy':>10} {'ms':>9} {'statements':>11}")
+    baseline = None
+    for label, writer in (("per-chunk", legacy_write), ("bulk", bulk_write)):
+        with SessionLocal() as db:
+            wallet_address = f"wallet-{label}"
+            kb = KnowledgeBase(owner_wallet_address=wallet_address, name=label, description="")
+            db.add_all([WalletUser(wallet_address=wallet_address), kb])
+            db.flush()
+            task = ImportTask(owner_wallet_address=wallet_address, kb_id=kb.id, task_type="import", source_paths=["/apps/bench"], status="running")
+            db.add(task)
+            db.commit()
+            prepared = PreparedFile(
+                file_entry=WarehouseFileEntry(path=f"/apps/bench/{label}.txt", name=f"{label}.txt", entry_type="file"),
+                wallet_address=wallet_address,
+                started=perf_counter(),
+                kb=kb,
+                document=None,
+                source_kind="app",
+                current_version="",
+                has_version_hint=False,
+                resolved=SimpleNamespace(binding=None),
+                config={**service._default_config(), "embedding_model": "bench"},  # noqa: SLF001
+                file_type="text",
+                needs_vectors=True,
+            )
+            statements[0] = 0
+            started = perf_counter()
+            written = writer(db, task, prepared, vectors)
+            db.commit()
+            elapsed_ms = (perf_counter() - started) * 1000
+            assert written == args.chunks
+        baseline = baseline or elapsed_ms
+        note = "" if label == "per-chunk" else f"  ({baseline / elapsed_ms:.1f}x faster)"
+        print(f"{label:>10} {elapsed_ms:>9.1f} {statements[0]:>11}{note}")
+
+
+if __name__ == "__main__":
+    main()
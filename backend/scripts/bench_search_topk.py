@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from statistics import median
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from knowledge.models import EvidenceUnit, KBReleaseItem, KnowledgeItem, KnowledgeItemRevision, SourceAsset  # noqa: E402
+from knowledge.services.formal_index import FormalIndexEntry  # noqa: E402
+from knowledge.services.lexical_index import PostingList, bm25_idf, max_score_top_k  # noqa: E402
+from knowledge.services.service_search import ServiceSearchService  # noqa: E402
+from knowledge.utils.time import utc_now  # noqa: E402
+
+
+def build_corpus(size: int, vocabulary: int, query_count: int, seed: int) -> tuple[list[list[str]], list[str]]:
+    rng = random.Random(seed)
+    words = [f"term{index}" for index in range(vocabulary)]
+    # Zipf-like weights so a few terms are common and most are rare, as in real evidence text.
+    weights = [1.0 / (rank + 1) for rank in range(vocabulary)]
+    documents = [rng.choices(words, weights=weights, k=rng.randint(20, 80)) for _ in range(size)]
+    queries = [" ".join(rng.choices(words[5:200], k=3)) for _ in range(query_count)]
+    return documents, queries
+
+
+def build_postings(documents: list[list[str]]) -> tuple[dict[str, PostingList], dict[int, int], float]:
+    by_term: dict[str, PostingList] = {}
+    lengths: dict[int, int] = {}
+    for evidence_id, tokens in enumerate(documents, start=1):
+        lengths[evidence_id] = len(tokens)
+        for term, frequency in sorted(Counter(tokens).items()):
+            posting = by_term.setdefault(term, PostingList(term=term, idf=0.0, evidence_ids=[], frequencies=[]))
+            posting.evidence_ids.append(evidence_id)
+            posting.frequencies.append(frequency)
+    for posting in by_term.values():
+        posting.idf = bm25_idf(len(documents), len(posting.evidence_ids))
+    return by_term, lengths, sum(lengths.values()) / len(lengths)
+
+
+def measure(callback, repeats: int) -> tuple[float, float, object]:
+    timings = []
+    result = None
+    for _ in range(repeats):
+        started = perf_counter()
+        result = callback()
+        timings.append((perf_counter() - started) * 1000)
+    tracemalloc.start()
+    callback()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return median(timings), peak / (1024 * 1024), result
+
+
+def evidence_benchmark(service: ServiceSearchService, documents: list[list[str]], queries: list[str], top_k: int, repeats: int) -> list[tuple]:
+    by_term, lengths, average_length = build_postings(documents)
+    asset = SourceAsset(id=1, source_id=1, asset_path="/bench/evidence.md", availability_status="available")
+    evidence = {
+        evidence_id: EvidenceUnit(id=evidence_id, kb_id=1, asset_id=1, evidence_type="paragraph", text=" ".join(tokens[:40]), source_locator={})
+        for evidence_id, tokens in enumerate(documents, start=1)
+    }
+
+    def hit(score: float, evidence_id: int):
+        return service._evidence_hit(score=score, evidence=evidence[evidence_id], asset=asset, result_view="audit", health="healthy")  # noqa: SLF001
+
+    def eager():
+        # Previous shape: score every matching document, build a hit for each, sort, then slice.
+        for query in queries:
+            scores: dict[int, float] = {}
+            for term in set(query.split()):
+                posting = by_term.get(term)
+                if posting is None:
+                    continue
+                for evidence_id, frequency in zip(posting.evidence_ids, posting.frequencies):
+                    length = lengths[evidence_id]
+                    scores[evidence_id] = scores.get(evidence_id, 0.0) + posting.idf * frequency * 2.2 / (frequency + 1.2 * (0.25 + 0.75 * length / average_length))
+            hits = [hit(score, evidence_id) for evidence_id, score in scores.items()]
+            hits.sort(key=lambda item: item.score, reverse=True)
+            hits[:top_k]
+
+    def lazy():
+        for query in queries:
+            postings = [by_term[term] for term in sorted(set(query.split())) if term in by_term]
+            [hit(score, evidence_id) for score, evidence_id in max_score_top_k(postings, lengths, average_length, top_k)]
+
+    return [("evidence", "eager", *measure(eager, repeats)[:2]), ("evidence", "heap+lazy", *measure(lazy, repeats)[:2])]
+
+
+def formal_benchmark(service: ServiceSearchService, documents: list[list[str]], queries: list[str], top_k: int, repeats: int) -> list[tuple]:
+    now = utc_now()
+    asset = SourceAsset(id=1, source_id=1, asset_path="/bench/formal.md", availability_status="available")
+    searchable = []
+    rows = {}
+    for index, tokens in enumerate(documents, start=1):
+        text = " ".join(tokens[:24])
+        entry = FormalIndexEntry(
+            release_item_id=index,
+            knowledge_item_id=index,
+            revision_id=index,
+            is_hotfix=False,
+            text=text,
+            tokens=frozenset(tokens[:24]),
+            evidence_ids=(index,),
+            asset_ids=(1,),
+        )
+        searchable.append((entry, [asset], "healthy"))
+        rows[index] = (
+            KBReleaseItem(id=index, release_id=1, content_health_status="healthy", item_version_hash="bench"),
+            KnowledgeItem(id=index, item_type="fact", is_hotfix=False),
+            KnowledgeItemRevision(id=index, title=text[:40], statement=text, updated_at=now),
+        )
+
+    def hit(score: float, entry: FormalIndexEntry):
+        release_item, item, revision = rows[entry.release_item_id]
+        return service._formal_hit(  # noqa: SLF001
+            score=score,
+            release_item=release_item,
+            item=item,
+            revision=revision,
+            evidence_units=[],
+            source_assets=[asset],
+            result_view="audit",
+            health="healthy",
+        )
+
+    def eager():
+        for query in queries:
+            tokens, query_lower = set(query.split()), query.lower()
+            hits = []
+            for entry, _assets, health in searchable:
+                score = service._formal_score(tokens, query_lower, entry, health)  # noqa: SLF001
+                if score > 0:
+                    hits.append(hit(score, entry))
+            hits.sort(key=lambda item: item.score, reverse=True)
+            hits[:top_k]
+
+    def lazy():
+        for query in queries:
+            selected = service._top_formal_candidates(searchable, query.split(), query, top_k)  # noqa: SLF001
+            [hit(score, searchable[index][0]) for score, index in selected]
+
+    return [("formal", "eager", *measure(eager, repeats)[:2]), ("formal", "heap+lazy", *measure(lazy, repeats)[:2])]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare eager hit construction + full sort with top-k heap selection + lazy hits.")
+    parser.add_argument("--size", type=int, default=50_000)
+    parser.add_argument("--vocabulary", type=int, default=5_000)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    documents, queries = build_corpus(args.size, args.vocabulary, args.queries, args.seed)
+    service = ServiceSearchService()
+    results = [
+        *evidence_benchmark(service, documents, queries, args.top_k, args.repeats),
+        *formal_benchmark(service, documents, queries, args.top_k, args.repeats),
+    ]
+    print(f"{len(queries)} queries over {args.size} candidates, top_k={args.top_k}")
+    print(f"{'path':>9} {'strategy':>10} {'median ms':>10} {'peak MB':>9}")
+    baseline: dict[str, tuple[float, float]] = {}
+    for path, strategy, elapsed_ms, peak_mb in results:
+        baseline.setdefault(path, (elapsed_ms, peak_mb))
+        base_ms, base_mb = baseline[path]
+        note = "" if strategy == "eager" else f"  ({base_ms / elapsed_ms:.1f}x faster, {base_mb / max(peak_mb, 1e-6):.1f}x less memory)"
+        print(f"{path:>9} {strategy:>10} {elapsed_ms:>10.1f} {peak_mb:>9.2f}{note}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from knowledge.services.vector_matrix import VectorMatrix  # noqa: E402
+from knowledge.services.vector_store import KBVectorSnapshot, build_vector_search_filter_plan  # noqa: E402
+
+
+def clustered_vectors(rng: np.random.Generator, size: int, dimensions: int, clusters: int) -> tuple[np.ndarray, np.ndarray]:
+    centers = rng.standard_normal((clusters, dimensions), dtype=np.float32)
+    labels = rng.integers(0, clusters, size=size)
+    rows = centers[labels] + 0.35 * rng.standard_normal((size, dimensions), dtype=np.float32)
+    return rows, centers
+
+
+def build_snapshot(rows: np.ndarray) -> KBVectorSnapshot:
+    size = rows.shape[0]
+    return KBVectorSnapshot.from_columns(
+        ("bench", size),
+        row_ids=list(range(size)),
+        document_ids=[0] * size,
+        source_paths=[""] * size,
+        source_kinds=[""] * size,
+        groups=[(np.arange(size, dtype=np.int64), VectorMatrix.from_rows(rows))],
+    )
+
+
+def run(size: int, dimensions: int, top_k: int, queries: int, nprobes: list[int], seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    rows, centers = clustered_vectors(rng, size, dimensions, clusters=max(8, size // 500))
+    picks = rng.integers(0, centers.shape[0], size=queries)
+    query_vectors = centers[picks] + 0.35 * rng.standard_normal((queries, dimensions), dtype=np.float32)
+    snapshot = build_snapshot(rows)
+    plan = build_vector_search_filter_plan(wallet_address="bench", kb_ids=[1], filters=None)
+
+    train_started = perf_counter()
+    index = snapshot.ensure_ann_index(min_vectors=1)
+    train_ms = (perf_counter() - train_started) * 1000
+
+    exact_started = perf_counter()
+    expected = [{row_id for _, row_id in snapshot.top_k(query, top_k, plan)} for query in query_vectors]
+    exact_ms = (perf_counter() - exact_started) * 1000 / queries
+
+    print(f"\n{size} vectors x {dimensions} dims, nlist={index.nlist}, train {train_ms:.0f} ms, exact {exact_ms:.2f} ms/query")
+    print(f"{'nprobe':>8} {'recall@k':>9} {'ms/query':>10} {'speedup':>9}")
+    for nprobe in nprobes:
+        started = perf_counter()
+        found = [{row_id for _, row_id in snapshot.top_k(query, top_k, plan, ann_index=index, nprobe=nprobe)} for query in query_vectors]
+        ivf_ms = (perf_counter() - started) * 1000 / queries
+        recall = sum(len(actual & wanted) for actual, wanted in zip(found, expected)) / max(1, top_k * queries)
+        print(f"{nprobe:>8} {recall:>9.3f} {ivf_ms:>10.2f} {exact_ms / ivf_ms if ivf_ms else 0:>8.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure IVF recall@k and latency against the exact matrix scan.")
+    parser.add_argument("--sizes", default="100000,1000000")
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--nprobes", default="1,2,4,8,16,32,64")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    nprobes = [int(value) for value in args.nprobes.split(",") if value.strip()]
+    for size in [int(value) for value in args.sizes.split(",") if value.strip()]:
+        run(size, args.dimensions, args.top_k, args.queries, nprobes, args.seed)
+
+
+if __name__ == "__main__":
+    main()
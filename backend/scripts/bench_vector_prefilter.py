@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def seed(engine, size: int, documents: int, dimensions: int, seed_value: int) -> tuple[str, int, list[int], list[str]]:
+    from sqlalchemy import insert
+
+    from knowledge.models import EmbeddingRecord, ImportedChunk, ImportedDocument, KnowledgeBase, WalletUser
+    from knowledge.utils.vectors import encode_vector
+
+    rng = np.random.default_rng(seed_value)
+    wallet_address = "wallet-bench"
+    with engine.begin() as connection:
+        connection.execute(insert(WalletUser), [{"wallet_address": wallet_address}])
+        kb_id = connection.execute(
+            insert(KnowledgeBase).values(owner_wallet_address=wallet_address, name="bench", description="", retrieval_config={})
+        ).inserted_primary_key[0]
+        paths = [f"/apps/bench/doc-{index}.txt" for index in range(documents)]
+        connection.execute(
+            insert(ImportedDocument),
+            [
+                {
+                    "kb_id": kb_id,
+                    "owner_wallet_address": wallet_address,
+                    "source_path": path,
+                    "source_file_name": path.rsplit("/", 1)[-1],
+                    "source_kind": "app" if index % 2 == 0 else "external",
+                    "parse_status": "parsed",
+                }
+                for index, path in enumerate(paths)
+            ],
+        )
+        document_ids = list(range(1, documents + 1))
+        for start in range(0, size, 10000):
+            count = min(10000, size - start)
+            chunk_ids = list(range(start + 1, start + count + 1))
+            owners = rng.integers(0, documents, size=count)
+            connection.execute(
+                insert(ImportedChunk),
+                [
+                    {
+                        "id": chunk_id,
+                        "document_id": document_ids[owner],
+                        "kb_id": kb_id,
+                        "owner_wallet_address": wallet_address,
+                        "chunk_index": chunk_id,
+                        "text": f"chunk {chunk_id}",
+                        "metadata_json": {"source_kind": "app" if owner % 2 == 0 else "external"},
+                    }
+                    for chunk_id, owner in zip(chunk_ids, owners)
+                ],
+            )
+            vectors = rng.standard_normal((count, dimensions), dtype=np.float32)
+            connection.execute(
+                insert(EmbeddingRecord),
+                [
+                    {
+                        "chunk_id": chunk_id,
+                        "kb_id": kb_id,
+                        "owner_wallet_address": wallet_address,
+                        "vector_id": f"vec-{chunk_id}",
+                        "embedding_model": "bench",
+                        "vector_json": [],
+                        "vector_blob": encode_vector(vector),
+                    }
+                    for chunk_id, vector in zip(chunk_ids, vectors)
+                ],
+            )
+    return wallet_address, kb_id, document_ids, paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare cold filtered DB vector search with and without SQL prefiltering.")
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--top-k", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="knowledge-prefilter-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+
+    from knowledge.db.base import Base
+    from knowledge.db.schema import ensure_runtime_schema
+    from knowledge.db.session import SessionLocal, engine
+    from knowledge.services.vector_store import DBVectorStore, build_vector_search_filter_plan
+
+    Base.metadata.create_all(bind=engine)
+    ensure_runtime_schema(engine)
+    started = perf_counter()
+    wallet_address, kb_id, document_ids, paths = seed(engine, args.size, args.documents, args.dimensions, args.seed)
+    print(f"seeded {args.size} embeddings across {args.documents} documents in {perf_counter() - started:.1f} s")
+
+    query = np.random.default_rng(args.seed + 1).standard_normal(args.dimensions).astype(np.float32).tolist()
+    cases = {
+        "1 source_path": {"source_paths": paths[:1]},
+        "10 document_ids": {"document_ids": document_ids[:10]},
+        "100 source_paths": {"source_paths": paths[:100]},
+        "source_kind only": {"source_kinds": ["app"]},
+    }
+    store = DBVectorStore(max_cached_kbs=0)
+    print(f"{'filter':>18} {'rows full':>10} {'rows sql':>9} {'full ms':>9} {'sql ms':>8} {'speedup':>8}")
+    with SessionLocal() as db:
+        for label, filters in cases.items():
+            plan = build_vector_search_filter_plan(wallet_address=wallet_address, kb_ids=[kb_id], filters=filters)
+            timings = {}
+            rows = {}
+            for mode, filter_plan in (("full", None), ("sql", plan)):
+                started = perf_counter()
+                for _ in range(args.repeat):
+                    snapshot = store._snapshot_for_kb(db, wallet_address, kb_id, filter_plan=filter_plan)
+                    snapshot.top_k(query, args.top_k, plan)
+                timings[mode] = (perf_counter() - started) * 1000 / args.repeat
+                rows[mode] = len(snapshot)
+            print(
+                f"{label:>18} {rows['full']:>10} {rows['sql']:>9} {timings['full']:>9.1f} {timings['sql']:>8.1f} "
+                f"{timings['full'] / timings['sql']:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from knowledge.services.vector_matrix import VectorMatrix, top_k_indices  # noqa: E402
+from knowledge.services.vector_quantization import QuantizedVectorMatrix, ScalarQuantizer  # noqa: E402
+from knowledge.utils.vectors import encode_vector  # noqa: E402
+
+
+def run(size: int, dimensions: int, top_k: int, queries: int, rerank_factors: list[int], seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(8, size // 500), dimensions), dtype=np.float32)
+    rows = centers[rng.integers(0, centers.shape[0], size=size)] + 0.5 * rng.standard_normal((size, dimensions), dtype=np.float32)
+    query_vectors = rows[rng.integers(0, size, size=queries)] + 0.1 * rng.standard_normal((queries, dimensions), dtype=np.float32)
+
+    exact = VectorMatrix.from_rows(rows)
+    started = perf_counter()
+    quantizer = ScalarQuantizer.fit(rows[rng.choice(size, size=min(size, 4096), replace=False)])
+    quantized = QuantizedVectorMatrix.from_codes(quantizer, quantizer.encode(rows))
+    build_ms = (perf_counter() - started) * 1000
+
+    started = perf_counter()
+    expected = [set(top_k_indices(exact.scores(query), top_k).tolist()) for query in query_vectors]
+    exact_ms = (perf_counter() - started) * 1000 / queries
+
+    json_bytes = len(str(rows[0].tolist()).replace(" ", ""))
+    print(f"\n{size} vectors x {dimensions} dims, quantize {build_ms:.0f} ms")
+    print(
+        f"  RAM   float32 {exact.nbytes / 2**20:8.1f} MB   int8 {quantized.nbytes / 2**20:8.1f} MB   "
+        f"({exact.nbytes / quantized.nbytes:.1f}x smaller)"
+    )
+    print(
+        f"  DB    json ~{json_bytes} B/row   float32 blob {len(encode_vector(rows[0]))} B/row   "
+        f"float16 blob {len(encode_vector(rows[0], 'float16'))} B/row   int8 codes {len(encode_vector(quantizer.encode(rows[0]), 'int8'))} B/row"
+    )
+    print(f"{'rerank':>8} {'recall@k':>9} {'ms/query':>10} {'exact ms':>10}")
+    for factor in rerank_factors:
+        hits = 0
+        started = perf_counter()
+        for query, wanted in zip(query_vectors, expected):
+            shortlist = np.sort(top_k_indices(quantized.scores(query), top_k * factor))
+            if factor > 1:
+                # Mirrors DBVectorStore: rescore the shortlist against full-precision vectors.
+                shortlist = shortlist[top_k_indices(exact.scores_rows(shortlist, query), top_k)]
+            hits += len(wanted & set(shortlist.tolist()))
+        elapsed = (perf_counter() - started) * 1000 / queries
+        print(f"{('x' + str(factor)) if factor > 1 else 'none':>8} {hits / (top_k * queries):>9.3f} {elapsed:>10.2f} {exact_ms:>10.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report memory footprint and recall@k of int8 scalar quantization.")
+    parser.add_argument("--sizes", default="100000,1000000")
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--rerank-factors", default="1,2,4,8")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    factors = [int(value) for value in args.rerank_factors.split(",") if value.strip()]
+    for size in [int(value) for value in args.sizes.split(",") if value.strip()]:
+        run(size, args.dimensions, args.top_k, args.queries, factors, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from knowledge.services.vector_matrix import VectorMatrix  # noqa: E402
+from knowledge.services.vector_store import cosine_similarity  # noqa: E402
+
+
+def legacy_search(rows: np.ndarray, query: list[float], top_k: int) -> list[tuple[float, int]]:
+    results = []
+    for index, row in enumerate(rows):
+        results.append((cosine_similarity(query, row.tolist()), index))
+    results.sort(key=lambda item: item[0], reverse=True)
+    return results[:top_k]
+
+
+def run(size: int, dimensions: int, top_k: int, queries: int, legacy_limit: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    rows = rng.standard_normal((size, dimensions), dtype=np.float32)
+    query_vectors = rng.standard_normal((queries, dimensions), dtype=np.float32)
+
+    build_started = perf_counter()
+    matrix = VectorMatrix.from_rows(rows)
+    build_ms = (perf_counter() - build_started) * 1000
+
+    matrix_started = perf_counter()
+    for query in query_vectors:
+        matrix.top_k(query, top_k)
+    matrix_ms = (perf_counter() - matrix_started) * 1000 / queries
+
+    legacy_ms = None
+    agreement = None
+    if size <= legacy_limit:
+        query = query_vectors[0].tolist()
+        legacy_started = perf_counter()
+        legacy = legacy_search(rows, query, top_k)
+        legacy_ms = (perf_counter() - legacy_started) * 1000
+        expected = [index for _, index in legacy]
+        actual = matrix.top_k(query_vectors[0], top_k)[0].tolist()
+        agreement = len(set(expected) & set(actual)) / max(1, len(expected))
+    return {
+        "size": size,
+        "build_ms": build_ms,
+        "matrix_ms": matrix_ms,
+        "legacy_ms": legacy_ms,
+        "agreement": agreement,
+        "matrix_mb": matrix.matrix.nbytes / (1024 * 1024),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the per-row cosine loop with the NumPy matrix scan.")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--top-k", type=int, default=6)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--legacy-limit", type=int, default=1_000_000, help="skip the legacy loop above this size")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'vectors':>10} {'matrix MB':>10} {'build ms':>10} {'matrix ms':>10} {'legacy ms':>12} {'speedup':>9} {'top-k agree':>12}")
+    for size in [int(value) for value in args.sizes.split(",") if value.strip()]:
+        result = run(size, args.dimensions, args.top_k, args.queries, args.legacy_limit, args.seed)
+        legacy = result["legacy_ms"]
+        speedup = f"{legacy / result['matrix_ms']:.1f}x" if legacy is not None and result["matrix_ms"] else "-"
+        agreement = f"{result['agreement']:.0%}" if result["agreement"] is not None else "-"
+        print(
+            f"{result['size']:>10} {result['matrix_mb']:>10.1f} {result['build_ms']:>10.1f} "
+            f"{result['matrix_ms']:>10.2f} {(f'{legacy:.1f}' if legacy is not None else 'skipped'):>12} {speedup:>9} {agreement:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -270,6 +270,8 @@ def test_end_to_end_auth_upload_import_search():
         ops_overview = client.get("/ops/overview", headers=headers)
         assert ops_overview.status_code == 200
         assert ops_overview.json()["knowledge_bases"] >= 1
+        assert {"entries", "hits", "misses", "hit_rate"} <= set(ops_overview.json()["embedding_cache"])
+        assert {"entries", "hits", "coalesced", "avg_upstream_ms"} <= set(ops_overview.json()["query_embedding_cache"])
 
         ops_workers = client.get("/ops/workers", headers=headers)
         assert ops_workers.status_code == 200
@@ -1087,9 +1089,9 @@ def test_delete_document_route_cleans_vector_store(monkeypatch):
         deleted_vector_ids: list[list[str]] = []
         original_delete_vectors = routes_documents.document_index_service.vector_store.delete_vectors
 
-        def spy_delete_vectors(vector_ids: list[str]) -> None:
+        def spy_delete_vectors(vector_ids: list[str], kb_id: int | None = None) -> None:
             deleted_vector_ids.append(list(vector_ids))
-            original_delete_vectors(vector_ids)
+            original_delete_vectors(vector_ids, kb_id=kb_id)
 
         monkeypatch.setattr(routes_documents.document_index_service.vector_store, "delete_vectors", spy_delete_vectors)
 
@@ -189,3 +189,41 @@ def test_source_build_skips_missing_assets_and_explicit_missing_asset_build_fail
         missing_evidence = client.get(f"/kbs/{kb_id}/evidence?asset_id={gone_asset['id']}", headers=headers)
         assert missing_evidence.status_code == 200
         assert missing_evidence.json() == []
+
+
+def test_touched_asset_with_identical_bytes_keeps_its_evidence_units():
+    account = Account.create()
+    with TestClient(app) as client:
+        token = _login(client, account)
+        headers = {"Authorization": f"Bearer {token}"}
+        configure_warehouse_credentials(client, headers)
+        kb_id = client.post("/kbs", headers=headers, json={"name": "Evidence Touch KB", "description": "touch"}).json()["id"]
+
+        upload = client.post(
+            "/warehouse/upload",
+            headers=headers,
+            data={"target_dir": _app_path("library/touch-source")},
+            files={"file": ("story.txt", b"stable evidence body", "text/plain")},
+        )
+        assert upload.status_code == 200
+        source, assets = _create_source_and_scan(client, headers, kb_id, _app_path("library/touch-source"))
+        asset_id = assets[0]["id"]
+        first_build = client.post(f"/kbs/{kb_id}/assets/{asset_id}/build-evidence", headers=headers)
+        assert first_build.json()["built_evidence_count"] == 1
+        before_items = client.get(f"/kbs/{kb_id}/evidence?asset_id={asset_id}", headers=headers).json()
+
+        local_file = _warehouse_fs_path(account.address, upload.json()["warehouse_path"])
+        next_mtime = local_file.stat().st_mtime + 5
+        os.utime(local_file, (next_mtime, next_mtime))
+        rescan = client.post(f"/kbs/{kb_id}/sources/{source['id']}/scan", headers=headers)
+        assert rescan.json()["stats"]["changed_assets"] == 1
+
+        second_build = client.post(f"/kbs/{kb_id}/assets/{asset_id}/build-evidence", headers=headers)
+        assert second_build.status_code == 200
+        assert second_build.json()["unchanged_asset_count"] == 1
+        assert second_build.json()["built_evidence_count"] == 0
+        after_items = client.get(f"/kbs/{kb_id}/evidence?asset_id={asset_id}", headers=headers).json()
+        assert [item["id"] for item in after_items] == [item["id"] for item in before_items]
+        assert after_items[0]["source_locator"]["source_version"] != before_items[0]["source_locator"]["source_version"]
+        asset = next(item for item in client.get(f"/kbs/{kb_id}/sources/{source['id']}/assets", headers=headers).json() if item["id"] == asset_id)
+        assert asset["availability_status"] == "available"
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+from eth_account import Account
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, event, select
+
+from tests.helpers import configure_warehouse_credentials
+from tests.test_service_search import (
+    _create_grant,
+    _create_manual_item,
+    _create_service_principal,
+    _login,
+    _publish_release,
+    _update_manual_item,
+    _upload_source_and_build_evidence,
+)
+
+from knowledge.db.session import SessionLocal, engine
+from knowledge.main import app
+from knowledge.models import KBRelease, KBReleaseSearchIndex
+from knowledge.services.formal_index import FormalIndexEntry
+from knowledge.services.service_search import ServiceSearchService
+
+
+def _count_statements(callback) -> tuple[object, int]:
+    statements: list[str] = []
+
+    def _record(_conn, _cursor, statement, _parameters, _context, _executemany) -> None:
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        result = callback()
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    return result, len(statements)
+
+
+def test_publish_hotfix_and_rollback_materialize_release_search_index():
+    account = Account.create()
+    with TestClient(app) as client:
+        token = _login(client, account)
+        headers = {"Authorization": f"Bearer {token}"}
+        configure_warehouse_credentials(client, headers)
+        kb_id = client.post("/kbs", headers=headers, json={"name": "Formal Index KB", "description": "formal"}).json()["id"]
+        _source, evidence = _upload_source_and_build_evidence(
+            client,
+            headers,
+            kb_id,
+            source_dir="library/formal-index",
+            file_name="guide.md",
+            content=b"# Keys\n\nRotate signing keys quarterly.\n\n# Backups\n\nBackups run nightly.",
+        )
+        item_id, revision_v1 = _create_manual_item(
+            client,
+            headers,
+            kb_id,
+            title="Key rotation",
+            statement="Rotate signing keys quarterly.",
+            item_type="fact",
+            payload={"fact": "Rotate signing keys quarterly."},
+            evidence_unit_ids=[evidence[0]["id"]],
+        )
+        release_1 = _publish_release(client, headers, kb_id, version="release-1")["release"]
+        revision_v2 = _update_manual_item(
+            client,
+            headers,
+            kb_id,
+            item_id,
+            statement="Rotate signing keys monthly.",
+            payload={"fact": "Rotate signing keys monthly."},
+            evidence_unit_ids=[evidence[1]["id"], evidence[0]["id"]],
+        )
+        hotfix = client.post(
+            f"/kbs/{kb_id}/releases/{release_1['id']}/hotfix",
+            headers=headers,
+            json={"version": "release-2", "release_note": "monthly", "knowledge_item_ids": [item_id]},
+        )
+        hotfix.raise_for_status()
+        rollback = client.post(
+            f"/kbs/{kb_id}/releases/{release_1['id']}/rollback",
+            headers=headers,
+            json={"version": "release-3", "release_note": "back"},
+        )
+        rollback.raise_for_status()
+
+        with SessionLocal() as db:
+            indexes = {
+                index.release_id: index
+                for index in db.scalars(
+                    select(KBReleaseSearchIndex).join(KBRelease, KBRelease.id == KBReleaseSearchIndex.release_id).where(KBRelease.kb_id == kb_id)
+                )
+            }
+        assert set(indexes) == {release_1["id"], hotfix.json()["release"]["id"], rollback.json()["release"]["id"]}
+        hotfix_entry = indexes[hotfix.json()["release"]["id"]].entries_json[0]
+        assert hotfix_entry["revision_id"] == revision_v2
+        assert hotfix_entry["evidence_ids"] == [evidence[1]["id"], evidence[0]["id"]]
+        assert "monthly" in hotfix_entry["tokens"]
+        rollback_entry = indexes[rollback.json()["release"]["id"]].entries_json[0]
+        assert rollback_entry["revision_id"] == revision_v1
+        assert rollback_entry["evidence_ids"] == [evidence[0]["id"]]
+
+
+def test_formal_search_round_trips_do_not_grow_with_release_size():
+    account = Account.create()
+    with TestClient(app) as client:
+        token = _login(client, account)
+        headers = {"Authorization": f"Bearer {token}"}
+        configure_warehouse_credentials(client, headers)
+        service = ServiceSearchService()
+        counts = []
+        for size in (2, 8):
+            kb_id = client.post("/kbs", headers=headers, json={"name": f"Formal {size}", "description": "formal"}).json()["id"]
+            _source, evidence = _upload_source_and_build_evidence(
+                client,
+                headers,
+                kb_id,
+                source_dir=f"library/formal-size-{size}",
+                file_name="guide.md",
+                content="\n\n".join(f"# Part {index}\n\nPolicy number {index} covers retention." for index in range(size)).encode("utf-8"),
+            )
+            for index in range(size):
+                _create_manual_item(
+                    client,
+                    headers,
+                    kb_id,
+                    title=f"Retention policy {index}",
+                    statement=f"Policy number {index} covers retention.",
+                    item_type="fact",
+                    payload={"fact": f"Policy number {index} covers retention."},
+                    evidence_unit_ids=[evidence[index]["id"]],
+                )
+            release_id = _publish_release(client, headers, kb_id, version="release-1")["release"]["id"]
+            with SessionLocal() as db:
+                release = db.get(KBRelease, release_id)
+                hits, statements = _count_statements(
+                    lambda: service._search_formal(db, release, "retention policy", "audit", "allow_all", top_k=size)  # noqa: SLF001
+                )
+            assert len(hits) == size
+            assert all(hit.evidence_summaries for hit in hits)
+            counts.append(statements)
+        assert counts[0] == counts[1]
+
+
+def test_formal_search_rebuilds_missing_release_index_on_first_use():
+    account = Account.create()
+    with TestClient(app) as client:
+        token = _login(client, account)
+        headers = {"Authorization": f"Bearer {token}"}
+        kb_id = client.post("/kbs", headers=headers, json={"name": "Legacy Release KB", "description": "formal"}).json()["id"]
+        _create_manual_item(
+            client,
+            headers,
+            kb_id,
+            title="Legacy fact",
+            statement="Releases published before the index still search.",
+            item_type="fact",
+            payload={"fact": "Releases published before the index still search."},
+        )
+        release_id = _publish_release(client, headers, kb_id, version="release-1")["release"]["id"]
+        with SessionLocal() as db:
+            db.execute(delete(KBReleaseSearchIndex).where(KBReleaseSearchIndex.release_id == release_id))
+            db.commit()
+
+        principal, api_key = _create_service_principal(client, headers, service_id="legacy-formal", display_name="Legacy")
+        _create_grant(client, headers, kb_id, principal_id=principal["id"], release_selection_mode="latest_published")
+        response = client.post(
+            "/service/search/formal",
+            headers={"X-Service-Api-Key": api_key},
+            json={"kb_id": kb_id, "query": "legacy fact", "result_view": "compact"},
+        )
+        response.raise_for_status()
+        assert [hit["title"] for hit in response.json()["hits"]] == ["Legacy fact"]
+        with SessionLocal() as db:
+            index = db.scalar(select(KBReleaseSearchIndex).where(KBReleaseSearchIndex.release_id == release_id))
+        assert index is not None and index.item_count == 1
+
+
+def test_top_formal_candidates_match_stable_full_sort():
+    entries = [
+        (
+            FormalIndexEntry(
+                release_item_id=index,
+                knowledge_item_id=index,
+                revision_id=index,
+                is_hotfix=index % 5 == 0,
+                text=text,
+                tokens=frozenset(text.split()),
+                evidence_ids=(index * 10,),
+                asset_ids=(),
+            ),
+            [],
+            "healthy",
+        )
+        for index, text in enumerate(["rotate keys", "keys", "rotate", "backup keys", "nothing here", "rotate keys now", "keys rotate"])
+    ]
+    used: set[int] = set()
+    selected = ServiceSearchService._top_formal_candidates(entries, ["rotate", "keys"], "rotate keys", 3, used_evidence_ids=used)  # noqa: SLF001
+    scored = [
+        (ServiceSearchService._formal_score({"rotate", "keys"}, "rotate keys", entry, health), index)  # noqa: SLF001
+        for index, (entry, _assets, health) in enumerate(entries)
+    ]
+    expected = sorted([candidate for candidate in scored if candidate[0] > 0], key=lambda candidate: candidate[0], reverse=True)[:3]
+    assert selected == expected
+    assert [index for _, index in selected] == [0, 5, 6]
+    assert used == {0, 10, 20, 30, 50, 60}
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+from uuid import uuid4
+
+from eth_account import Account
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from tests.helpers import configure_warehouse_credentials
+from tests.test_service_search import _create_grant, _create_service_principal, _login, _upload_source_and_build_evidence
+
+from knowledge.db.session import SessionLocal
+from knowledge.main import app
+from knowledge.models import KnowledgeBase, RetrievalLog
+from knowledge.services.embedding import MockEmbeddingProvider
+from knowledge.services.rank_fusion import reciprocal_rank_fusion
+from knowledge.services.retrieval_log_writer import retrieval_log_writer
+from knowledge.services.service_search import ServiceSearchService
+from knowledge.services.vector_quantization import QuantizedVectorMatrix
+from knowledge.services.vector_store import DBVectorStore, LocalVectorStore, VectorSearchOptions
+
+
+class CannedVectorStore:
+    indexes_evidence = True
+
+    def __init__(self, results: list[tuple[int, int]] | None = None, error: Exception | None = None) -> None:
+        self.results = results or []
+        self.error = error
+        self.calls: list[dict] = []
+
+    def search(self, db, wallet_address, kb_ids, query_vector, top_k, query_text=None, filters=None, options=None):
+        self.calls.append({"wallet_address": wallet_address, "kb_ids": list(kb_ids), "top_k": top_k, "filters": filters, "options": options})
+        if self.error is not None:
+            raise self.error
+        return [
+            {"chunk_id": chunk_id, "document_id": document_id, "kb_id": 0, "score": 1.0 - index / 10, "text": "", "metadata": {}}
+            for index, (chunk_id, document_id) in enumerate(self.results[:top_k])
+        ]
+
+
+def test_reciprocal_rank_fusion_sums_reciprocal_ranks():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [2, 4]], k=60)
+    assert [item_id for _, item_id in fused] == [2, 1, 4, 3]
+    assert fused[0][0] == 1 / 62 + 1 / 61
+    assert [item_id for _, item_id in reciprocal_rank_fusion([[5], [4]])] == [4, 5]
+
+
+def _hybrid_fixture(client: TestClient) -> tuple[int, str, list[dict]]:
+    token = _login(client, Account.create())
+    headers = {"Authorization": f"Bearer {token}"}
+    configure_warehouse_credentials(client, headers)
+    kb_id = client.post("/kbs", headers=headers, json={"name": "Hybrid KB", "description": "hybrid"}).json()["id"]
+    paragraphs = [
+        "Rotate the signing keys every quarter.",
+        "Signing keys live in the hardware module.",
+        "Incident reviews happen within five days.",
+    ]
+    _source, evidence = _upload_source_and_build_evidence(
+        client,
+        headers,
+        kb_id,
+        source_dir="library/hybrid",
+        file_name="ops.md",
+        content="\n\n".join(f"# Section {index}\n\n{text}" for index, text in enumerate(paragraphs)).encode("utf-8"),
+    )
+    principal, api_key = _create_service_principal(client, headers, service_id="hybrid-search", display_name="Hybrid")
+    _create_grant(client, headers, kb_id, principal_id=principal["id"], release_selection_mode="latest_published")
+    return kb_id, api_key, evidence
+
+
+def test_hybrid_search_fuses_lexical_and_vector_legs_and_traces_timings():
+    with TestClient(app) as client:
+        kb_id, api_key, evidence = _hybrid_fixture(client)
+        first, second, third = evidence
+        vector_store = CannedVectorStore(
+            results=[(second["id"], second["asset_id"]), (999_999, second["asset_id"]), (third["id"], third["asset_id"])]
+        )
+        service = ServiceSearchService(vector_store=vector_store, embedding_provider=MockEmbeddingProvider(dimensions=8))
+        with SessionLocal() as db:
+            response = service.search(
+                db,
+                service_api_key=api_key,
+                kb_id=kb_id,
+                query="rotate keys",
+                mode="evidence_only",
+                result_view="compact",
+                availability_mode="allow_all",
+                top_k=3,
+                retrieval="hybrid",
+            )
+            retrieval_log_writer.flush()
+            log = db.scalar(select(RetrievalLog).where(RetrievalLog.kb_id == kb_id).order_by(RetrievalLog.id.desc()))
+
+        assert response.retrieval == "hybrid"
+        # Lexical ranks first, second; vector ranks second, third (the unknown chunk is dropped).
+        assert [hit.evidence_id for hit in response.hits] == [second["id"], first["id"], third["id"]]
+        assert vector_store.calls[0]["filters"] == {"document_ids": [first["asset_id"]]}
+        legs = log.trace_json["retrieval"]["legs"]
+        assert log.trace_json["retrieval"]["strategy"] == "hybrid"
+        assert legs["lexical"]["candidates"] == 2
+        assert legs["vector"]["candidates"] == 2
+        assert legs["fusion"]["candidates"] == 3
+        assert all(legs[name]["elapsed_ms"] >= 0 for name in ("lexical", "vector", "fusion"))
+
+
+def test_hybrid_search_degrades_to_lexical_when_vector_leg_fails():
+    with TestClient(app) as client:
+        kb_id, api_key, evidence = _hybrid_fixture(client)
+        service = ServiceSearchService(
+            vector_store=CannedVectorStore(error=RuntimeError("vector backend down")),
+            embedding_provider=MockEmbeddingProvider(dimensions=8),
+        )
+        with SessionLocal() as db:
+            response = service.search(
+                db,
+                service_api_key=api_key,
+                kb_id=kb_id,
+                query="incident reviews",
+                mode="evidence_only",
+                result_view="compact",
+                availability_mode="allow_all",
+                top_k=3,
+                retrieval="hybrid",
+            )
+            retrieval_log_writer.flush()
+            log = db.scalar(select(RetrievalLog).where(RetrievalLog.kb_id == kb_id).order_by(RetrievalLog.id.desc()))
+        assert [hit.evidence_id for hit in response.hits] == [evidence[2]["id"]]
+        assert log.trace_json["retrieval"]["legs"]["vector"]["error"] == "vector backend down"
+
+        rejected = client.post(
+            "/service/search/evidence",
+            headers={"X-Service-Api-Key": api_key},
+            json={"kb_id": kb_id, "query": "incident", "retrieval": "semantic"},
+        )
+        assert rejected.status_code == 400
+
+
+def test_hybrid_search_skips_vector_leg_on_db_backend():
+    class CountingEmbeddingProvider(MockEmbeddingProvider):
+        queries: list[str] = []
+
+        def embed_query(self, text: str) -> list[float]:
+            self.queries.append(text)
+            return super().embed_query(text)
+
+    with TestClient(app) as client:
+        kb_id, api_key, evidence = _hybrid_fixture(client)
+        provider = CountingEmbeddingProvider(dimensions=8)
+        service = ServiceSearchService(vector_store=DBVectorStore(), embedding_provider=provider)
+        with SessionLocal() as db:
+            response = service.search(
+                db,
+                service_api_key=api_key,
+                kb_id=kb_id,
+                query="rotate keys",
+                mode="evidence_only",
+                result_view="compact",
+                availability_mode="allow_all",
+                top_k=3,
+                retrieval="hybrid",
+            )
+            retrieval_log_writer.flush()
+            log = db.scalar(select(RetrievalLog).where(RetrievalLog.kb_id == kb_id).order_by(RetrievalLog.id.desc()))
+        assert [hit.evidence_id for hit in response.hits] == [evidence[0]["id"], evidence[1]["id"]]
+        assert log.trace_json["retrieval"]["legs"]["vector"] == {"skipped": "unsupported_backend"}
+        assert provider.queries == []
+
+
+class RecordingLocalStore(LocalVectorStore):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.options: list[VectorSearchOptions] = []
+
+    def search(self, *args, options=None, **kwargs):
+        self.options.append(options)
+        return super().search(*args, options=options, **kwargs)
+
+
+def _local_hybrid_store(tmp_path, kb_id: int, evidence: list[dict], retrieval_config: dict) -> tuple[RecordingLocalStore, str]:
+    provider = MockEmbeddingProvider(dimensions=8)
+    store = RecordingLocalStore(root=str(tmp_path), embedding_provider=provider, ann_min_vectors=1)
+    with SessionLocal() as db:
+        kb = db.get(KnowledgeBase, kb_id)
+        kb.retrieval_config = {**(kb.retrieval_config or {}), **retrieval_config}
+        wallet_address = kb.owner_wallet_address
+        db.commit()
+    store.index_chunks(
+        [
+            {
+                "vector_id": str(uuid4()),
+                "text": item["text"],
+                "metadata": {"wallet_address": wallet_address, "kb_id": kb_id, "document_id": item["asset_id"], "chunk_id": item["id"]},
+            }
+            for item in evidence
+        ]
+    )
+    return store, wallet_address
+
+
+def _hybrid_search(service: ServiceSearchService, api_key: str, kb_id: int, query: str):
+    with SessionLocal() as db:
+        response = service.search(
+            db,
+            service_api_key=api_key,
+            kb_id=kb_id,
+            query=query,
+            mode="evidence_only",
+            result_view="compact",
+            availability_mode="allow_all",
+            top_k=3,
+            retrieval="hybrid",
+        )
+        retrieval_log_writer.flush()
+        log = db.scalar(select(RetrievalLog).where(RetrievalLog.kb_id == kb_id).order_by(RetrievalLog.id.desc()))
+    return response, log
+
+
+def test_hybrid_search_applies_kb_vector_index_options(tmp_path):
+    with TestClient(app) as client:
+        kb_id, api_key, evidence = _hybrid_fixture(client)
+        store, wallet_address = _local_hybrid_store(tmp_path, kb_id, evidence, {"vector_index": "ivf", "ivf_nprobe": 2})
+        service = ServiceSearchService(vector_store=store, embedding_provider=MockEmbeddingProvider(dimensions=8))
+        response, log = _hybrid_search(service, api_key, kb_id, "incident reviews")
+        assert store.options == [VectorSearchOptions(vector_index="ivf", nprobe=2)]
+        assert store._snapshots[(wallet_address, kb_id)][0].ann_index is not None
+        assert log.trace_json["retrieval"]["legs"]["vector"]["candidates"] == 3
+        assert response.hits[0].evidence_id == evidence[2]["id"]
+
+
+def test_hybrid_search_scores_int8_codes_and_reranks_on_local_backend(tmp_path):
+    with TestClient(app) as client:
+        kb_id, api_key, evidence = _hybrid_fixture(client)
+        store, wallet_address = _local_hybrid_store(tmp_path, kb_id, evidence, {"vector_quantization": "int8"})
+        provider = MockEmbeddingProvider(dimensions=8)
+        service = ServiceSearchService(vector_store=store, embedding_provider=provider)
+        response, log = _hybrid_search(service, api_key, kb_id, "incident reviews")
+        assert store.options == [VectorSearchOptions(quantization="int8")]
+        quantized = store._quantized[(wallet_address, kb_id)]
+        assert all(isinstance(matrix, QuantizedVectorMatrix) for _, matrix in quantized.groups)
+        assert log.trace_json["retrieval"]["legs"]["vector"]["candidates"] == 3
+        assert response.hits[0].evidence_id == evidence[2]["id"]
+
+        # Scores come from the float32 rerank, so they match a full-precision search.
+        query_vector = provider.embed_query("incident reviews")
+        exact = store.search(None, wallet_address, [kb_id], query_vector, top_k=3)
+        reranked = store.search(None, wallet_address, [kb_id], query_vector, top_k=3, options=VectorSearchOptions(quantization="int8"))
+        assert [(item["chunk_id"], round(item["score"], 5)) for item in reranked] == [(item["chunk_id"], round(item["score"], 5)) for item in exact]
@@ -0,0 +1,549 @@
+from __future__ import annotations
+
+import io
+import math
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from uuid import NAMESPACE_URL, uuid4, uuid5
+
+import httpx
+import pytest
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+from sqlalchemy import event, select
+
+from knowledge.db.base import Base
+from knowledge.db.schema import ensure_runtime_schema
+from knowledge.db.session import SessionLocal, engine
+from knowledge.models import EmbeddingRecord, ImportedChunk, ImportTask, ImportTaskItem, KnowledgeBase, WalletUser
+from knowledge.services.embedding import MockEmbeddingProvider
+from knowledge.services.embedding_scheduler import EmbeddingScheduler, estimate_tokens, is_transient_error
+from knowledge.services.chunking import DocumentChunker
+from knowledge.services.ingestion import IngestionService
+from knowledge.services.ingestion_pipeline import ParseExecutor, ParseTimeoutError, parse_file
+from knowledge.services.parser import DocumentParser
+from knowledge.services.warehouse import WarehouseFileEntry, WarehouseGateway
+from knowledge.utils.vectors import stored_vector
+
+
+class FlakyEmbeddingProvider(MockEmbeddingProvider):
+    def __init__(self, failures: int = 0, poison: str | None = None) -> None:
+        super().__init__(dimensions=8)
+        self.failures = failures
+        self.poison = poison
+        self.calls: list[list[str]] = []
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(list(texts))
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("gateway timeout")
+        if self.poison and any(self.poison in text for text in texts):
+            raise ValueError("input rejected")
+        return super().embed_texts(texts)
+
+
+class DictWarehouseGateway(WarehouseGateway):
+    def __init__(self, root: str, files: dict[str, str | bytes]) -> None:
+        self.root = root
+        self.files = files
+        self.modified_at = datetime(2024, 1, 1)
+
+    def browse(self, wallet_address: str, path: str, auth=None) -> list[WarehouseFileEntry]:
+        if path in self.files:
+            return [WarehouseFileEntry(path=path, name=path.rsplit("/", 1)[-1], entry_type="file", modified_at=self.modified_at)]
+        return [
+            WarehouseFileEntry(path=file_path, name=file_path.rsplit("/", 1)[-1], entry_type="file", modified_at=self.modified_at)
+            for file_path in sorted(self.files)
+        ]
+
+    def read_file(self, wallet_address: str, path: str, auth=None) -> bytes:
+        content = self.files[path]
+        return content if isinstance(content, bytes) else content.encode("utf-8")
+
+
+def _pdf_bytes(pages: list[str]) -> bytes:
+    writer = PdfWriter()
+    font = writer._add_object(
+        DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+            }
+        )
+    )
+    for text in pages:
+        page = writer.add_blank_page(width=612, height=792)
+        stream = DecodedStreamObject()
+        stream.set_data(f"BT /F1 10 Tf 20 700 Td ({text}) Tj ET".encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(stream)
+        page[NameObject("/Resources")] = DictionaryObject({NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def _ingestion_service(files: dict[str, str | bytes], provider: MockEmbeddingProvider) -> IngestionService:
+    service = IngestionService(warehouse_gateway=DictWarehouseGateway("/apps/knowledge", files), embedding_provider=provider)
+    service.warehouse_access_service = SimpleNamespace(
+        resolve_path_read_access=lambda *args, **kwargs: SimpleNamespace(auth=None, binding=None),
+        mark_access_success=lambda resolved: None,
+        is_auth_error=lambda exc: False,
+        find_best_binding_for_path=lambda *args, **kwargs: None,
+    )
+    return service
+
+
+def _create_import_task(db, source_path: str) -> ImportTask:
+    Base.metadata.create_all(bind=engine)
+    ensure_runtime_schema(engine)
+    wallet_address = f"wallet-{uuid4().hex}"
+    kb = KnowledgeBase(owner_wallet_address=wallet_address, name="pipeline", description="")
+    db.add_all([WalletUser(wallet_address=wallet_address), kb])
+    db.flush()
+    task = ImportTask(owner_wallet_address=wallet_address, kb_id=kb.id, task_type="import", source_paths=[source_path], status="pending")
+    db.add(task)
+    db.commit()
+    return task
+
+
+def _follow_up_task(db, task: ImportTask, task_type: str) -> ImportTask:
+    follow_up = ImportTask(owner_wallet_address=task.owner_wallet_address, kb_id=task.kb_id, task_type=task_type, source_paths=task.source_paths, status="pending")
+    db.add(follow_up)
+    db.commit()
+    return follow_up
+
+
+def test_embedding_scheduler_packs_batches_retries_and_isolates_failures():
+    sleeps: list[float] = []
+    provider = FlakyEmbeddingProvider(failures=2, poison="poison")
+    scheduler = EmbeddingScheduler(provider, max_batch_tokens=estimate_tokens("x" * 40) * 3, max_batch_texts=3, concurrency=1, max_retries=2, backoff_seconds=0.01, sleep=sleeps.append)
+
+    groups = [["x" * 40, "y" * 40], ["z" * 40], ["poison" + "w" * 34], ["v" * 40]]
+    batches = scheduler.pack(groups)
+    assert [batch.slots for batch in batches] == [[(0, 0), (0, 1), (1, 0)], [(2, 0), (3, 0)]]
+
+    results, stats = scheduler.embed_groups(groups)
+    assert [len(vectors) for vectors in results[:2]] == [2, 1]
+    assert results[0][1] == MockEmbeddingProvider(dimensions=8).embed_texts(["y" * 40])[0]
+    assert isinstance(results[2], ValueError) and isinstance(results[3], ValueError)
+    # The connection errors are retried with growing backoff; the rejected input fails without a retry.
+    assert stats.batches == 2 and stats.failed_batches == 1 and stats.retries == 2
+    assert len(sleeps) == 2 and sleeps[1] > sleeps[0]
+    assert len(provider.calls) == 4
+
+
+def test_embedding_scheduler_retries_only_transient_errors():
+    request = httpx.Request("POST", "http://gateway/v1/embeddings")
+
+    def status_error(status: int) -> httpx.HTTPStatusError:
+        return httpx.HTTPStatusError("gateway", request=request, response=httpx.Response(status, request=request))
+
+    assert all(is_transient_error(exc) for exc in (TimeoutError(), ConnectionError(), httpx.ReadTimeout("slow"), status_error(429), status_error(503)))
+    assert not any(is_transient_error(exc) for exc in (ValueError("bad input"), status_error(400), status_error(401), status_error(413)))
+
+    class RejectingProvider(MockEmbeddingProvider):
+        calls = 0
+
+        def embed_texts(self, texts: list[str]) -> list[list[float]]:
+            self.calls += 1
+            raise status_error(400)
+
+    provider = RejectingProvider(dimensions=8)
+    results, stats = EmbeddingScheduler(provider, max_retries=3, backoff_seconds=0, sleep=lambda _: None).embed_groups([["text"]])
+    assert isinstance(results[0], httpx.HTTPStatusError)
+    assert provider.calls == 1 and stats.retries == 0
+
+
+def test_import_task_packs_chunks_from_many_files_into_shared_embedding_batches():
+    files = {f"/apps/knowledge/docs/note-{index}.txt": f"note {index} about shared batching" for index in range(5)}
+    provider = FlakyEmbeddingProvider(failures=1)
+    service = _ingestion_service(files, provider)
+    service.embedding_scheduler = EmbeddingScheduler(provider, max_batch_texts=64, backoff_seconds=0)
+    db = SessionLocal()
+    try:
+        task = _create_import_task(db, "/apps/knowledge/docs")
+        service.process_task(db, task)
+
+        assert task.status == "succeeded"
+        assert len(provider.calls) == 2 and len(provider.calls[-1]) == 5
+        assert task.stats_json["embedding"]["batches"] == 1
+        assert task.stats_json["embedding"]["retries"] == 1
+        statuses = db.scalars(select(ImportTaskItem.status).where(ImportTaskItem.task_id == task.id)).all()
+        assert statuses == ["indexed"] * 5
+        assert len(db.scalars(select(EmbeddingRecord.id).where(EmbeddingRecord.kb_id == task.kb_id)).all()) == 5
+    finally:
+        db.close()
+
+
+def test_pdf_sections_stream_page_by_page_into_page_numbered_chunks():
+    content = _pdf_bytes(["Opening page. " * 90, "", "Short tail.", "Closing page. " * 60])
+    sections = DocumentParser().iter_sections("manual.pdf", content)
+    first = next(sections)
+    assert (first.page_number, first.text.startswith("Opening page.")) == (1, True)
+
+    chunks = list(DocumentChunker().iter_chunks("manual.pdf", [first, *sections], {"chunk_size": 800, "chunk_overlap": 120}))
+    pages = [(chunk.metadata["page_start"], chunk.metadata["page_end"]) for chunk in chunks]
+    assert pages == [(1, 1), (1, 1), (3, 4), (4, 4)]
+    assert "Short tail. Closing page." in chunks[2].text
+    assert chunks[2].text.startswith(DocumentChunker._overlap_tail(chunks[1].text, 80) + " Short tail.")
+    assert all(chunk.metadata["chunk_strategy"] == "pdf_recursive_dense" for chunk in chunks)
+
+
+def test_pdf_chunks_carry_overlap_across_page_breaks_after_full_length_parts():
+    first_page = " ".join(f"alpha{index:03d}" for index in range(140))
+    second_page = " ".join(f"omega{index:03d}" for index in range(40))
+    config = {"chunk_size": 800, "chunk_overlap": 120}
+    content = _pdf_bytes([first_page, second_page])
+
+    chunks = list(DocumentChunker().iter_chunks("manual.pdf", DocumentParser().iter_sections("manual.pdf", content), config))
+    last_on_first_page = [chunk for chunk in chunks if chunk.metadata["page_end"] == 1][-1]
+    assert len(last_on_first_page.text) >= DocumentChunker._pdf_chunk_size(config) // 2
+    opening = next(chunk for chunk in chunks if chunk.metadata["page_end"] == 2)
+    assert opening.metadata["page_start"] == 2
+    carried = opening.text.split(" omega000", 1)[0].split()
+    assert carried and len(" ".join(carried)) <= DocumentChunker._pdf_chunk_overlap(config)
+    assert last_on_first_page.text.endswith(" ".join(carried))
+
+
+def test_import_task_stores_pdf_page_numbers_on_chunks():
+    files = {"/apps/knowledge/docs/manual.pdf": _pdf_bytes(["Install the agent. " * 50, "Rotate the keys. " * 50])}
+    service = _ingestion_service(files, MockEmbeddingProvider(dimensions=8))
+    db = SessionLocal()
+    try:
+        task = _create_import_task(db, "/apps/knowledge/docs")
+        service.process_task(db, task)
+
+        assert task.status == "succeeded"
+        chunks = db.scalars(select(ImportedChunk).where(ImportedChunk.kb_id == task.kb_id).order_by(ImportedChunk.chunk_index)).all()
+        assert chunks[0].metadata_json["page_start"] == 1
+        assert chunks[-1].metadata_json["page_end"] == 2
+        assert any("Rotate the keys." in chunk.text and chunk.metadata_json["page_start"] == 2 for chunk in chunks)
+    finally:
+        db.close()
+
+
+class SlowWarehouseGateway(DictWarehouseGateway):
+    def __init__(self, root: str, files: dict[str, str | bytes]) -> None:
+        super().__init__(root, files)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def read_file(self, wallet_address: str, path: str, auth=None) -> bytes:
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(0.02)
+            return super().read_file(wallet_address, path, auth=auth)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def test_import_pipeline_prefetches_reads_and_reports_stage_stats():
+    files: dict[str, str | bytes] = {f"/apps/knowledge/docs/note-{index}.txt": f"note {index} about pipelining" for index in range(8)}
+    files["/apps/knowledge/docs/broken.json"] = "{not json"
+    service = _ingestion_service(files, MockEmbeddingProvider(dimensions=8))
+    gateway = SlowWarehouseGateway("/apps/knowledge", files)
+    service.warehouse_gateway = gateway
+    service.settings = service.settings.model_copy(update={"ingestion_embedding_window_files": 3, "ingestion_read_workers": 4, "ingestion_read_prefetch": 4})
+    db = SessionLocal()
+    try:
+        task = _create_import_task(db, "/apps/knowledge/docs")
+        service.process_task(db, task)
+
+        assert task.status == "partial_success"
+        assert gateway.max_in_flight > 1
+        items = db.scalars(select(ImportTaskItem).where(ImportTaskItem.task_id == task.id).order_by(ImportTaskItem.source_path)).all()
+        assert [(item.file_name, item.status) for item in items] == [("broken.json", "failed")] + [(f"note-{index}.txt", "indexed") for index in range(8)]
+        pipeline = task.stats_json["pipeline"]
+        assert pipeline["read"]["files"] == 9 and pipeline["read"]["bytes"] > 0
+        assert pipeline["read"]["max_queue_depth"] == 4
+        assert pipeline["parse"]["files"] == 8
+        assert pipeline["embed"]["chunks"] == pipeline["write"]["chunks"] == task.stats_json["processed_chunks"] == 8
+        assert pipeline["write"]["max_queue_depth"] == 3
+    finally:
+        db.close()
+
+
+def test_import_embeds_next_window_while_previous_window_is_written():
+    files = {f"/apps/knowledge/docs/note-{index}.txt": f"note {index} about overlapping stages" for index in range(3)}
+    write_started = threading.Event()
+    second_embed_started = threading.Event()
+
+    class BlockingProvider(MockEmbeddingProvider):
+        def __init__(self) -> None:
+            super().__init__(dimensions=8)
+            self.calls = 0
+
+        def embed_texts(self, texts: list[str]) -> list[list[float]]:
+            self.calls += 1
+            if self.calls == 2:
+                second_embed_started.set()
+                # Blocks until the first window's write is under way; serial stages would never get there.
+                assert write_started.wait(5)
+            return super().embed_texts(texts)
+
+    service = _ingestion_service(files, BlockingProvider())
+    service.settings = service.settings.model_copy(update={"ingestion_embedding_window_files": 1})
+    write_group = service._write_group
+    overlapped: list[bool] = []
+
+    def _write_group(*args, **kwargs):
+        if not write_started.is_set():
+            write_started.set()
+            overlapped.append(second_embed_started.wait(5))
+        return write_group(*args, **kwargs)
+
+    service._write_group = _write_group
+    db = SessionLocal()
+    try:
+        task = _create_import_task(db, "/apps/knowledge/docs")
+        service.process_task(db, task)
+
+        assert task.status == "succeeded"
+        assert overlapped == [True]
+        assert task.stats_json["processed_chunks"] == 3
+    finally:
+        db.close()
+
+
+def test_import_streams_large_files_through_embed_and_write_in_bounded_groups():
+    paragraphs = [f"Section {index}. " + f"topic{index} details " * 40 for index in range(12)]
+    path = "/apps/knowledge/docs/manual.txt"
+    files = {path: "\n\n".join(paragraphs)}
+    provider = FlakyEmbeddingProvider()
+    service = _ingestion_service(files, provider)
+    service.settings = service.settings.model_copy(update={"ingestion_chunk_group_size": 4})
+    write_group = service._write_group
+    group_sizes: list[int] = []
+
+    def _write_group(db, task, group, *args, **kwargs):
+        group_sizes.append(len(group.chunks))
+        return write_group(db, task, group, *args, **kwargs)
+
+    service._write_group = _write_group
+    db = SessionLocal()
+    try:
+        task = _create_import_task(db, "/apps/knowledge/docs")
+        service.process_task(db, task)
+        assert task.status == "succeeded"
+        chunk_count = task.stats_json["processed_chunks"]
+        assert chunk_count > 8
+        assert max(group_sizes) == 4 and sum(group_sizes) == chunk_count
+        assert max(len(call) for call in provider.calls) <= 4
+        indexes = db.scalars(select(ImportedChunk.chunk_index).where(ImportedChunk.kb_id == task.kb_id)).all()
+        assert sorted(indexes) == list(range(chunk_count))
+
+        # A batch fails after earlier groups of the edited file were committed: the file is restored as it was.
+        before = sorted(db.scalars(select(ImportedChunk.text).where(ImportedChunk.kb_id == task.kb_id)).all())
+        writes_before = len(group_sizes)
+        paragraphs[0] = "Section 0. refreshed " * 40
+        paragraphs[-1] = "Section 11. poisoned " * 40
+        files[path] = "\n\n".join(paragraphs)
+        provider.poison = "poisoned"
+        service.warehouse_gateway.modified_at = datetime(2024, 2, 1)
+        update = service.process_task(db, _follow_up_task(db, task, "import"))
+        assert update.status == "partial_success"
+        assert any(group_sizes[writes_before:])
+        db.expire_all()
+        assert sorted(db.scalars(select(ImportedChunk.text).where(ImportedChunk.kb_id == task.kb_id)).all()) == before
+        item = db.scalar(select(ImportTaskItem).where(ImportTaskItem.task_id == update.id))
+        assert (item.status, item.error_type) == ("failed", "ValueError")
+    finally:
+        db.close()
+
+
+def test_import_writes_chunks_and_embeddings_in_batches():
+    files = {"/apps/knowledge/docs/long.txt": "\n\n".join(f"Paragraph {index} " + "filler text " * 60 for index in range(120))}
+    service = _ingestion_service(files, MockEmbeddingProvider(dimensions=8))
+    service.settings = service.settings.model_copy(update={"ingestion_write_batch_size": 50})
+    statements: list[str] = []
+
+    def _record(_conn, _cursor, statement, _parameters, _context, _executemany) -> None:
+        statements.append(statement.lstrip().upper())
+
+    db = SessionLocal()
+    try:
+        task = _create_import_task(db, "/apps/knowledge/docs")
+        event.listen(engine, "before_cursor_execute", _record)
+        try:
+            service.process_task(db, task)
+        finally:
+            event.remove(engine, "before_cursor_execute", _record)
+
+        assert task.status == "succeeded"
+        chunk_count = task.stats_json["processed_chunks"]
+        assert chunk_count > 100
+        batches = math.ceil(chunk_count / 50)
+        assert sum(statement.startswith("INSERT INTO CHUNKS") for statement in statements) == batches
+        assert sum(statement.startswith("INSERT INTO EMBEDDINGS") for statement in statements) == batches
+        rows = db.execute(
+            select(ImportedChunk.chunk_index, EmbeddingRecord.vector_id)
+            .join(EmbeddingRecord, EmbeddingRecord.chunk_id == ImportedChunk.id)
+            .where(ImportedChunk.kb_id == task.kb_id)
+            .order_by(ImportedChunk.chunk_index)
+        ).all()
+        assert [index for index, _ in rows] == list(range(chunk_count))
+        assert rows[7][1] == str(uuid5(NAMESPACE_URL, f"knowledge:{task.kb_id}:/apps/knowledge/docs/long.txt:7"))
+    finally:
+        db.close()
+
+
+def test_process_parse_executor_matches_threads_and_recovers_from_timeouts():
+    config = {"chunk_size": 800, "chunk_overlap": 120}
+    content = _pdf_bytes(["Install the agent. " * 50, "Rotate the keys. " * 50])
+    executor = ParseExecutor(backend="process", workers=1, timeout_seconds=0.001)
+    try:
+        # Spawning the first worker alone exceeds the timeout, so the pool is replaced and the queued job resubmitted.
+        first = executor.submit("manual.pdf", content, config)
+        queued = executor.submit("notes.md", b"# Notes\n\nKeep the runbook current.", config)
+        with pytest.raises(ParseTimeoutError):
+            executor.result(first)
+        assert executor.restarts == 1
+
+        executor.timeout_seconds = 120
+        chunks, elapsed = executor.result(queued)
+        assert chunks == parse_file("notes.md", b"# Notes\n\nKeep the runbook current.", config)
+        assert elapsed >= 0
+        pdf_chunks, _ = executor.result(executor.submit("manual.pdf", content, config))
+        assert pdf_chunks == parse_file("manual.pdf", content, config)
+        with pytest.raises(ValueError, match="parsed text is empty"):
+            executor.result(executor.submit("empty.txt", b"   ", config))
+    finally:
+        executor.shutdown()
+
+    with pytest.raises(ValueError):
+        ParseExecutor(backend="fibers")
+
+
+def test_unchanged_content_is_skipped_and_changed_documents_reuse_chunk_embeddings():
+    paragraphs = [f"Section {index}. " + f"topic{index} details " * 40 for index in range(6)]
+    files = {"/apps/knowledge/docs/manual.txt": "\n\n".join(paragraphs), "/apps/knowledge/docs/other.txt": "An unrelated note."}
+    provider = FlakyEmbeddingProvider()
+    service = _ingestion_service(files, provider)
+    db = SessionLocal()
+    try:
+        task = _create_import_task(db, "/apps/knowledge/docs")
+        service.process_task(db, task)
+        assert task.status == "succeeded"
+        chunk_count = task.stats_json["processed_chunks"] - 1
+        assert chunk_count >= 6
+        embedded_before = sum(len(call) for call in provider.calls)
+
+        # A touched directory: new mtimes, same bytes. Reindex tasks skip too, since the chunking config is unchanged.
+        service.warehouse_gateway.modified_at = datetime(2024, 2, 1)
+        reindex = service.process_task(db, _follow_up_task(db, task, "reindex"))
+        assert reindex.status == "succeeded"
+        assert reindex.stats_json["skipped_files"] == 2
+        assert sum(len(call) for call in provider.calls) == embedded_before
+        messages = db.scalars(select(ImportTaskItem.message).where(ImportTaskItem.task_id == reindex.id)).all()
+        assert messages == ["content unchanged", "content unchanged"]
+
+        # One edited paragraph: only its chunks go to the provider, the rest reuse stored vectors.
+        paragraphs[2] = "Section 2. rewritten " * 40
+        files["/apps/knowledge/docs/manual.txt"] = "\n\n".join(paragraphs)
+        service.warehouse_gateway.modified_at = datetime(2024, 3, 1)
+        update = service.process_task(db, _follow_up_task(db, task, "import"))
+        assert update.status == "succeeded"
+        newly_embedded = sum(len(call) for call in provider.calls) - embedded_before
+        assert 0 < newly_embedded < chunk_count
+        assert update.stats_json["reused_embeddings"] == update.stats_json["processed_chunks"] - newly_embedded
+        chunks = db.scalars(select(ImportedChunk).where(ImportedChunk.kb_id == task.kb_id).where(ImportedChunk.text.contains("rewritten"))).all()
+        embedding = db.scalar(select(EmbeddingRecord).where(EmbeddingRecord.chunk_id == chunks[0].id))
+        assert stored_vector(embedding.vector_blob).tolist() == pytest.approx(provider.embed_texts([chunks[0].text])[0], rel=1e-6)
+    finally:
+        db.close()
+
+
+def test_reimport_diffs_chunks_and_keeps_unchanged_rows_and_vector_ids():
+    paragraphs = [f"Section {index}. " + f"topic{index} details " * 40 for index in range(6)]
+    path = "/apps/knowledge/docs/manual.txt"
+    files = {path: "\n\n".join(paragraphs)}
+    service = _ingestion_service(files, FlakyEmbeddingProvider())
+    db = SessionLocal()
+
+    def _chunks(kb_id: int) -> dict[str, tuple[int, int, str]]:
+        rows = db.execute(
+            select(ImportedChunk.text, ImportedChunk.id, ImportedChunk.chunk_index, EmbeddingRecord.vector_id)
+            .join(EmbeddingRecord, EmbeddingRecord.chunk_id == ImportedChunk.id)
+            .where(ImportedChunk.kb_id == kb_id)
+        ).all()
+        return {text: (chunk_id, chunk_index, vector_id) for text, chunk_id, chunk_index, vector_id in rows}
+
+    try:
+        task = _create_import_task(db, "/apps/knowledge/docs")
+        service.process_task(db, task)
+        before = _chunks(task.kb_id)
+        first_item = db.scalar(select(ImportTaskItem).where(ImportTaskItem.task_id == task.id))
+        assert (first_item.chunks_added, first_item.chunks_kept, first_item.chunks_removed) == (len(before), 0, 0)
+
+        # A new leading paragraph shifts every index and one paragraph is dropped.
+        edited = ["Preface. " + "fresh words " * 40, *paragraphs[:3], *paragraphs[4:]]
+        files[path] = "\n\n".join(edited)
+        service.warehouse_gateway.modified_at = datetime(2024, 2, 1)
+        update = service.process_task(db, _follow_up_task(db, task, "import"))
+        assert update.status == "succeeded"
+        after = _chunks(task.kb_id)
+        kept = before.keys() & after.keys()
+        item = db.scalar(select(ImportTaskItem).where(ImportTaskItem.task_id == update.id))
+        assert (item.chunks_added, item.chunks_kept, item.chunks_removed) == (len(after) - len(kept), len(kept), len(before) - len(kept))
+        assert 0 < item.chunks_added < len(after)
+        assert item.chunks_removed > 0
+        for text in kept:
+            assert after[text][0] == before[text][0]
+            assert after[text][2] == before[text][2]
+        assert sorted(index for _, index, _ in after.values()) == list(range(len(after)))
+        assert len({vector_id for _, _, vector_id in after.values()}) == len(after)
+        assert not any("topic3" in text for text in after)
+    finally:
+        db.close()
+
+
+def test_reimport_reindexes_kept_chunks_with_new_metadata_and_reused_vectors(monkeypatch):
+    class RecordingVectorStore:
+        def __init__(self) -> None:
+            self.payloads: list[dict] = []
+
+        def index_chunks(self, payloads: list[dict]) -> None:
+            self.payloads.extend(payloads)
+
+        def delete_vectors(self, vector_ids: list[str], kb_id: int | None = None) -> None:
+            _ = (vector_ids, kb_id)
+
+    paragraphs = [f"Section {index}. " + f"topic{index} details " * 40 for index in range(4)]
+    path = "/apps/knowledge/docs/manual.txt"
+    files = {path: "\n\n".join(paragraphs)}
+    provider = FlakyEmbeddingProvider()
+    service = _ingestion_service(files, provider)
+    service.vector_store = RecordingVectorStore()
+    monkeypatch.setattr(service.settings, "vector_store_mode", "local")
+    db = SessionLocal()
+    try:
+        task = _create_import_task(db, "/apps/knowledge/docs")
+        service.process_task(db, task)
+        first = {item["vector_id"]: item for item in service.vector_store.payloads}
+        service.vector_store.payloads.clear()
+        provider.calls.clear()
+
+        # An appended paragraph leaves every old chunk in place; only the document version changes.
+        files[path] = "\n\n".join([*paragraphs, "Appendix. " + "extra notes " * 40])
+        service.warehouse_gateway.modified_at = datetime(2024, 2, 1)
+        update = service.process_task(db, _follow_up_task(db, task, "import"))
+        assert update.status == "succeeded"
+        item = db.scalar(select(ImportTaskItem).where(ImportTaskItem.task_id == update.id))
+        assert item.chunks_kept == len(first)
+
+        resent = {payload["vector_id"]: payload for payload in service.vector_store.payloads}
+        assert first.keys() <= resent.keys()
+        for vector_id, payload in first.items():
+            assert resent[vector_id]["metadata"]["source_version"] == item.source_version != payload["metadata"]["source_version"]
+            assert resent[vector_id]["vector"] == pytest.approx(payload["vector"], rel=1e-6)
+        assert not any(payload["text"] in call for payload in first.values() for call in provider.calls)
+    finally:
+        db.close()
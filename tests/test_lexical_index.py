@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import random
+
+from eth_account import Account
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from tests.helpers import configure_warehouse_credentials
+from tests.test_service_search import _create_grant, _create_service_principal, _login, _upload_source_and_build_evidence
+
+from knowledge.db.session import SessionLocal
+from knowledge.main import app
+from knowledge.models import EvidencePosting, EvidenceUnit
+from knowledge.services.lexical_index import EvidenceLexicalIndex, PostingList, bm25_idf, max_score_top_k
+from knowledge.services.tokenizers import CJKNgramTokenizer, WordTokenizer, build_tokenizer
+
+
+def _exhaustive_bm25(documents: dict[int, list[str]], query_terms: list[str], k1: float = 1.2, b: float = 0.75) -> dict[int, float]:
+    average_length = sum(len(tokens) for tokens in documents.values()) / len(documents)
+    scores: dict[int, float] = {}
+    for term in query_terms:
+        matching = [evidence_id for evidence_id, tokens in documents.items() if term in tokens]
+        idf = bm25_idf(len(documents), len(matching))
+        for evidence_id in matching:
+            frequency = documents[evidence_id].count(term)
+            length = len(documents[evidence_id])
+            scores[evidence_id] = scores.get(evidence_id, 0.0) + idf * frequency * (k1 + 1) / (
+                frequency + k1 * (1 - b + b * length / average_length)
+            )
+    return scores
+
+
+def test_max_score_top_k_matches_exhaustive_bm25():
+    rng = random.Random(11)
+    vocabulary = [f"w{index}" for index in range(40)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    documents = {evidence_id: rng.choices(vocabulary, weights=weights, k=rng.randint(3, 60)) for evidence_id in range(1, 801)}
+    lengths = {evidence_id: len(tokens) for evidence_id, tokens in documents.items()}
+    average_length = sum(lengths.values()) / len(lengths)
+
+    for query_terms in (["w0", "w7", "w31"], ["w2", "w3"], ["w39", "w1", "w5", "w20"]):
+        postings = []
+        for term in query_terms:
+            matching = sorted(evidence_id for evidence_id, tokens in documents.items() if term in tokens)
+            postings.append(
+                PostingList(
+                    term=term,
+                    idf=bm25_idf(len(documents), len(matching)),
+                    evidence_ids=matching,
+                    frequencies=[documents[evidence_id].count(term) for evidence_id in matching],
+                )
+            )
+        expected_scores = _exhaustive_bm25(documents, query_terms)
+        for top_k, accept in ((5, None), (25, lambda evidence_id: evidence_id % 3 != 0)):
+            eligible = {evidence_id: score for evidence_id, score in expected_scores.items() if accept is None or accept(evidence_id)}
+            expected = sorted(eligible.items(), key=lambda pair: (-pair[1], pair[0]))[:top_k]
+            actual = max_score_top_k(postings, lengths, average_length, top_k, accept=accept)
+            assert [evidence_id for _, evidence_id in actual] == [evidence_id for evidence_id, _ in expected]
+            assert [round(score, 9) for score, _ in actual] == [round(score, 9) for _, score in expected]
+
+
+def test_evidence_search_ranks_with_bm25_postings_and_rebuild_replaces_them():
+    account = Account.create()
+    with TestClient(app) as client:
+        token = _login(client, account)
+        headers = {"Authorization": f"Bearer {token}"}
+        configure_warehouse_credentials(client, headers)
+        kb_id = client.post("/kbs", headers=headers, json={"name": "BM25 KB", "description": "lexical"}).json()["id"]
+        paragraphs = [
+            "Rotate the signing keys every quarter.",
+            "Backups run nightly and keys are stored offline. Keys keys keys.",
+            "The release checklist covers changelog and tagging.",
+        ]
+        source, evidence = _upload_source_and_build_evidence(
+            client,
+            headers,
+            kb_id,
+            source_dir="library/bm25",
+            file_name="ops.md",
+            content="\n\n".join(f"# Section {index}\n\n{text}" for index, text in enumerate(paragraphs)).encode("utf-8"),
+        )
+        assert len(evidence) == 3
+        with SessionLocal() as db:
+            terms = set(db.scalars(select(EvidencePosting.term).where(EvidencePosting.kb_id == kb_id)).all())
+        assert {"rotate", "keys", "changelog"} <= terms
+
+        principal, api_key = _create_service_principal(client, headers, service_id="bm25-search", display_name="BM25")
+        _create_grant(client, headers, kb_id, principal_id=principal["id"], release_selection_mode="latest_published")
+        response = client.post(
+            "/service/search/evidence",
+            headers={"X-Service-Api-Key": api_key},
+            json={"kb_id": kb_id, "query": "offline keys", "top_k": 3, "result_view": "compact"},
+        )
+        response.raise_for_status()
+        hits = response.json()["hits"]
+        assert [hit["evidence_id"] for hit in hits] == [evidence[1]["id"], evidence[0]["id"]]
+        assert hits[0]["score"] > hits[1]["score"] > 0
+
+        rebuild = client.post(f"/kbs/{kb_id}/sources/{source['id']}/build-evidence", headers=headers)
+        rebuild.raise_for_status()
+        with SessionLocal() as db:
+            evidence_ids = set(db.scalars(select(EvidencePosting.evidence_id).where(EvidencePosting.kb_id == kb_id)).all())
+        current = client.get(f"/kbs/{kb_id}/evidence?source_id={source['id']}", headers=headers).json()
+        assert evidence_ids == {item["id"] for item in current}
+
+
+def test_tokenizers_split_words_and_cjk_ngrams():
+    assert WordTokenizer().tokenize("Keys, keys and KEYS_v2") == ["keys", "keys", "and", "keys_v2"]
+    assert CJKNgramTokenizer().tokenize("发布版本 v2 的 Release说明") == [
+        "发布",
+        "布版",
+        "版本",
+        "发布版",
+        "布版本",
+        "v2",
+        "的",
+        "release",
+        "说明",
+    ]
+    assert build_tokenizer("word").name == "word"
+
+
+def test_chinese_evidence_matches_through_ngrams_and_reindexes_after_tokenizer_change():
+    account = Account.create()
+    with TestClient(app) as client:
+        token = _login(client, account)
+        headers = {"Authorization": f"Bearer {token}"}
+        configure_warehouse_credentials(client, headers)
+        kb_id = client.post("/kbs", headers=headers, json={"name": "中文知识库", "description": "cjk"}).json()["id"]
+        paragraphs = ["签名密钥每季度轮换一次。", "备份每晚执行，并离线保存。", "发布清单包含变更日志与打标签。"]
+        _source, evidence = _upload_source_and_build_evidence(
+            client,
+            headers,
+            kb_id,
+            source_dir="library/cjk",
+            file_name="ops-zh.md",
+            content="\n\n".join(f"# 第{index}节\n\n{text}" for index, text in enumerate(paragraphs)).encode("utf-8"),
+        )
+        with SessionLocal() as db:
+            assert EvidenceLexicalIndex(tokenizer=WordTokenizer()).ensure_indexed(db, kb_id) == len(evidence)
+            db.commit()
+
+        principal, api_key = _create_service_principal(client, headers, service_id="cjk-search", display_name="CJK")
+        _create_grant(client, headers, kb_id, principal_id=principal["id"], release_selection_mode="latest_published")
+        response = client.post(
+            "/service/search/evidence",
+            headers={"X-Service-Api-Key": api_key},
+            json={"kb_id": kb_id, "query": "密钥轮换", "top_k": 3, "result_view": "compact"},
+        )
+        response.raise_for_status()
+        hits = response.json()["hits"]
+        assert [hit["evidence_id"] for hit in hits] == [evidence[0]["id"]]
+
+        # The reindex ran inside the search request and was flushed; the async log path must still commit it.
+        with SessionLocal() as db:
+            tokenizers = set(db.scalars(select(EvidenceUnit.lexical_tokenizer).where(EvidenceUnit.kb_id == kb_id)))
+        assert tokenizers == {build_tokenizer().name}
@@ -29,10 +29,15 @@ def test_db_filter_matching_uses_shared_filter_plan():
         kb_ids=[1],
         filters={"source_paths": ["/a"], "source_kinds": ["personal"], "document_ids": [5]},
     )
-    document = SimpleNamespace(id=5, source_path="/a")
-    assert vector_store_module.DBVectorStore._matches_filter_plan(document, {"source_kind": "personal"}, plan) is True
-    assert vector_store_module.DBVectorStore._matches_filter_plan(document, {"source_kind": "shared"}, plan) is False
-    assert vector_store_module.DBVectorStore._matches_filter_plan(SimpleNamespace(id=7, source_path="/a"), {"source_kind": "personal"}, plan) is False
+    snapshot = vector_store_module.KBVectorSnapshot.from_columns(
+        (),
+        row_ids=[1, 2, 3],
+        document_ids=[5, 5, 7],
+        source_paths=["/a", "/a", "/a"],
+        source_kinds=["personal", "shared", "personal"],
+        groups=[],
+    )
+    assert snapshot.filter_mask(plan).tolist() == [True, False, False]
 
 
 def test_weaviate_filter_builder_uses_shared_plan(monkeypatch):
@@ -166,3 +171,170 @@ def test_build_embedding_provider_selects_provider_mode(monkeypatch):
     provider = embedding_module.build_embedding_provider()
     assert isinstance(provider, embedding_module.MockEmbeddingProvider)
     assert len(provider.embed_query("mock")) == 12
+
+
+def test_embedding_cache_serves_repeated_texts_and_evicts_expired_and_lru_entries():
+    from datetime import timedelta
+    from uuid import uuid4
+
+    from sqlalchemy import select, update
+
+    from knowledge.db.base import Base
+    from knowledge.db.session import SessionLocal, engine
+    from knowledge.models import EmbeddingCacheEntry
+    from knowledge.services.embedding_cache import EmbeddingCache, EmbeddingCacheStats, content_hash
+    from knowledge.utils.time import utc_now
+
+    class CountingProvider(embedding_module.EmbeddingProvider):
+        def __init__(self, model: str, cache: EmbeddingCache) -> None:
+            self.calls: list[list[str]] = []
+            self.cache = cache
+            self.cache_model = model
+            self.cache_dimensions = 4
+
+        def _embed_uncached(self, texts: list[str]) -> list[list[float]]:
+            self.calls.append(list(texts))
+            return [[float(len(text)), 1.0, 0.0, 0.5] for text in texts]
+
+    Base.metadata.create_all(bind=engine)
+    model = f"model-{uuid4().hex}"
+    stats = EmbeddingCacheStats()
+    cache = EmbeddingCache(max_entries=10_000, ttl_seconds=3600, stats=stats)
+    provider = CountingProvider(model, cache)
+
+    first = provider.embed_texts(["alpha", "beta", "alpha"])
+    second = provider.embed_texts(["alpha", "gamma!"])
+    assert provider.calls == [["alpha", "beta"], ["gamma!"]]
+    assert first[0] == first[2] == second[0] == [5.0, 1.0, 0.0, 0.5]
+    assert stats.as_dict()["hits"] == 1 and stats.as_dict()["misses"] == 3
+
+    other_model = CountingProvider(f"{model}-v2", cache)
+    other_model.embed_texts(["alpha"])
+    assert other_model.calls == [["alpha"]]
+
+    with SessionLocal() as db:
+        db.execute(
+            update(EmbeddingCacheEntry)
+            .where(EmbeddingCacheEntry.model == model, EmbeddingCacheEntry.content_hash == content_hash("beta"))
+            .values(last_used_at=utc_now() - timedelta(hours=2))
+        )
+        db.commit()
+    provider.embed_texts(["beta"])
+    assert provider.calls[-1] == ["beta"]
+
+    with SessionLocal() as db:
+        db.execute(
+            update(EmbeddingCacheEntry)
+            .where(EmbeddingCacheEntry.model == model, EmbeddingCacheEntry.content_hash == content_hash("gamma!"))
+            .values(last_used_at=utc_now() - timedelta(hours=2))
+        )
+        db.commit()
+        total = len(db.scalars(select(EmbeddingCacheEntry.id)).all())
+    lru_cache = EmbeddingCache(max_entries=total - 2, ttl_seconds=3600, stats=stats)
+    assert lru_cache.evict() == 2
+    with SessionLocal() as db:
+        remaining = set(db.scalars(select(EmbeddingCacheEntry.content_hash).where(EmbeddingCacheEntry.model == model)).all())
+        assert remaining == {content_hash("beta")}
+        assert lru_cache.overview(db)["evictions"] == 2
+
+
+def test_embedding_cache_joins_caller_write_transaction_during_index_chunks(tmp_path):
+    import time
+    from uuid import uuid4
+
+    from sqlalchemy import select
+
+    from knowledge.db.base import Base
+    from knowledge.db.session import SessionLocal, engine
+    from knowledge.models import EmbeddingCacheEntry, WalletUser
+    from knowledge.services.embedding_cache import EmbeddingCache, EmbeddingCacheStats, content_hash, embedding_cache_session
+
+    class CachedProvider(embedding_module.EmbeddingProvider):
+        def __init__(self, model: str, cache: EmbeddingCache) -> None:
+            self.cache = cache
+            self.cache_model = model
+            self.cache_dimensions = 3
+
+        def _embed_uncached(self, texts: list[str]) -> list[list[float]]:
+            return [[float(len(text)), 1.0, 0.0] for text in texts]
+
+    def payload(vector_id: str, text: str) -> dict:
+        return {
+            "vector_id": vector_id,
+            "text": text,
+            "vector": None,
+            "metadata": {"wallet_address": "wallet-cache", "kb_id": 1, "document_id": 1, "chunk_id": 1, "source_path": "/a", "source_kind": "app"},
+        }
+
+    Base.metadata.create_all(bind=engine)
+    model = f"model-{uuid4().hex}"
+    stats = EmbeddingCacheStats()
+    store = vector_store_module.LocalVectorStore(root=str(tmp_path), embedding_provider=CachedProvider(model, EmbeddingCache(stats=stats)))
+    with SessionLocal() as db:
+        # Hold an uncommitted write, as the evidence pipeline and _write_file do around index_chunks.
+        db.add(WalletUser(wallet_address=f"wallet-{uuid4().hex[:12]}"))
+        db.flush()
+        started = time.perf_counter()
+        with embedding_cache_session(db):
+            store.index_chunks([payload("v1", "alpha"), payload("v2", "beta")])
+            store.index_chunks([payload("v3", "alpha")])
+        assert time.perf_counter() - started < 5
+        db.commit()
+    store.close()
+
+    assert stats.as_dict() == {"hits": 1, "misses": 2, "hit_rate": 0.3333, "writes": 2, "evictions": 0, "errors": 0}
+    with SessionLocal() as db:
+        cached = set(db.scalars(select(EmbeddingCacheEntry.content_hash).where(EmbeddingCacheEntry.model == model)).all())
+    assert cached == {content_hash("alpha"), content_hash("beta")}
+
+
+def test_query_embedding_cache_lru_ttl_and_single_flight():
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    now = [0.0]
+    cache = embedding_module.QueryEmbeddingCache(max_entries=2, ttl_seconds=60, clock=lambda: now[0])
+    provider = embedding_module.MockEmbeddingProvider(dimensions=4, query_cache=cache)
+    calls: list[str] = []
+    original = provider._embed_query_uncached
+
+    def counting(text: str) -> list[float]:
+        calls.append(text)
+        return original(text)
+
+    provider._embed_query_uncached = counting
+    assert provider.embed_query("a") == provider.embed_query("a")
+    provider.embed_query("b")
+    provider.embed_query("c")
+    provider.embed_query("a")
+    assert calls == ["a", "b", "c", "a"]
+    assert cache.stats()["evictions"] == 2
+
+    now[0] = 120.0
+    provider.embed_query("a")
+    assert calls[-1] == "a" and len(calls) == 5
+
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow(text: str) -> list[float]:
+        calls.append(text)
+        started.set()
+        release.wait(5)
+        return original(text)
+
+    provider._embed_query_uncached = slow
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(provider.embed_query, "hot")
+        started.wait(5)
+        followers = [executor.submit(provider.embed_query, "hot") for _ in range(3)]
+        while cache.stats()["coalesced"] < 3:
+            time.sleep(0.01)
+        release.set()
+        results = [leader.result()] + [future.result() for future in followers]
+    assert calls.count("hot") == 1
+    assert all(result == results[0] for result in results)
+    stats = cache.stats()
+    assert stats["coalesced"] == 3 and stats["hits"] == 1 and stats["misses"] == 6
+    assert stats["max_upstream_ms"] > 0
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import time
+
+from eth_account import Account
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from tests.helpers import configure_warehouse_credentials
+from tests.test_service_search import _create_grant, _create_service_principal, _login, _upload_source_and_build_evidence
+
+from knowledge.db.base import Base
+from knowledge.db.session import SessionLocal, engine, has_pending_writes
+from knowledge.main import app
+from knowledge.models import RetrievalLog, ServiceGrant, WalletUser
+from knowledge.services.retrieval_log_writer import RetrievalLogWriter, retrieval_log_writer
+from knowledge.utils.time import utc_now
+
+
+def _wallet() -> str:
+    Base.metadata.create_all(bind=engine)
+    wallet_address = Account.create().address
+    with SessionLocal() as db:
+        db.add(WalletUser(wallet_address=wallet_address))
+        db.commit()
+    return wallet_address
+
+
+def _log_values(wallet_address: str, query: str, kb_id: int | None = None) -> dict:
+    return {
+        "owner_wallet_address": wallet_address,
+        "kb_id": kb_id,
+        "query": query,
+        "query_mode": "evidence_only",
+        "result_summary_json": {"hit_count": 0},
+        "trace_json": {"mode": "evidence_only"},
+        "created_at": utc_now(),
+    }
+
+
+def _logged_queries(wallet_address: str) -> list[str]:
+    with SessionLocal() as db:
+        return list(db.scalars(select(RetrievalLog.query).where(RetrievalLog.owner_wallet_address == wallet_address).order_by(RetrievalLog.id.asc())))
+
+
+def test_writer_bounds_its_queue_and_isolates_bad_rows():
+    wallet_address = _wallet()
+    writer = RetrievalLogWriter(batch_size=10, flush_interval_ms=60_000, max_queue_size=3)
+    try:
+        assert writer.submit(_log_values(wallet_address, "first"))
+        assert writer.submit(_log_values(wallet_address, "orphan", kb_id=987_654_321))
+        assert writer.submit(_log_values(wallet_address, "second"))
+        assert not writer.submit(_log_values(wallet_address, "overflow"))
+        assert _logged_queries(wallet_address) == []
+
+        assert writer.flush() == 2
+    finally:
+        writer.stop()
+    assert _logged_queries(wallet_address) == ["first", "second"]
+    stats = writer.stats()
+    assert stats["dropped"] == 1
+    assert stats["failed"] == 1
+    assert stats["written"] == 2
+    assert stats["pending"] == 0
+
+
+def test_writer_flushes_in_background_when_batch_fills_and_on_stop():
+    wallet_address = _wallet()
+    writer = RetrievalLogWriter(batch_size=2, flush_interval_ms=60_000, max_queue_size=100)
+    writer.start()
+    writer.submit(_log_values(wallet_address, "one"))
+    writer.submit(_log_values(wallet_address, "two"))
+    deadline = time.monotonic() + 5
+    while writer.stats()["written"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert _logged_queries(wallet_address) == ["one", "two"]
+
+    writer.submit(_log_values(wallet_address, "three"))
+    writer.stop()
+    assert _logged_queries(wallet_address) == ["one", "two", "three"]
+
+
+def test_writer_is_not_restarted_by_submissions_after_stop():
+    wallet_address = _wallet()
+    writer = RetrievalLogWriter(batch_size=1, flush_interval_ms=60_000, max_queue_size=100)
+    writer.submit(_log_values(wallet_address, "lazy"))
+    assert writer.stats()["running"]
+    writer.stop()
+    assert _logged_queries(wallet_address) == ["lazy"]
+
+    assert writer.submit(_log_values(wallet_address, "late"))
+    assert not writer.stats()["running"]
+    assert writer.stats()["pending"] == 1
+    assert writer.flush() == 1
+
+    writer.start()
+    try:
+        assert writer.stats()["running"]
+    finally:
+        writer.stop()
+    assert _logged_queries(wallet_address) == ["lazy", "late"]
+
+
+def test_has_pending_writes_tracks_flushed_changes_until_commit():
+    wallet_address = _wallet()
+    with SessionLocal() as db:
+        user = db.get(WalletUser, wallet_address)
+        assert not has_pending_writes(db)
+        user.last_login_at = utc_now()
+        assert has_pending_writes(db)
+        db.flush()
+        assert not db.dirty
+        assert has_pending_writes(db)
+        db.commit()
+        assert not has_pending_writes(db)
+
+
+def test_service_search_buffers_log_and_grant_touch():
+    account = Account.create()
+    with TestClient(app) as client:
+        token = _login(client, account)
+        headers = {"Authorization": f"Bearer {token}"}
+        configure_warehouse_credentials(client, headers)
+        kb_id = client.post("/kbs", headers=headers, json={"name": "Buffered Log KB", "description": "log"}).json()["id"]
+        _upload_source_and_build_evidence(
+            client,
+            headers,
+            kb_id,
+            source_dir="library/buffered-log",
+            file_name="fact.txt",
+            content=b"Buffered logs are flushed in batches.",
+        )
+        principal, api_key = _create_service_principal(client, headers, service_id="buffered-log", display_name="Buffered")
+        grant = _create_grant(client, headers, kb_id, principal_id=principal["id"], release_selection_mode="latest_published")
+        retrieval_log_writer.flush()
+        written_before = retrieval_log_writer.stats()["written"]
+        for _ in range(3):
+            response = client.post(
+                "/service/search/evidence",
+                headers={"X-Service-Api-Key": api_key},
+                json={"kb_id": kb_id, "query": "buffered batches"},
+            )
+            response.raise_for_status()
+
+    # Leaving the client runs the lifespan shutdown, which drains the buffer.
+    assert retrieval_log_writer.stats()["written"] - written_before == 3
+    with SessionLocal() as db:
+        assert db.scalar(select(func.count(RetrievalLog.id)).where(RetrievalLog.kb_id == kb_id)) == 3
+        assert db.get(ServiceGrant, grant["id"]).last_used_at is not None
@@ -6,11 +6,15 @@ from pathlib import Path
 from eth_account import Account
 from eth_account.messages import encode_defunct
 from fastapi.testclient import TestClient
+from sqlalchemy import select
 
 from tests.helpers import configure_warehouse_credentials
 
 from knowledge.core.settings import get_settings
+from knowledge.db.session import SessionLocal
 from knowledge.main import app
+from knowledge.models import RetrievalLog
+from knowledge.services.service_search import ServiceSearchService
 from knowledge.services.warehouse_scope import warehouse_app_path
 
 
@@ -366,3 +370,76 @@ def test_search_lab_compare_explains_stale_penalty_or_ranks_healthy_before_stale
         stale_hit = next(item for item in hits if item["content_health_status"] == "stale")
         healthy_hit = next(item for item in hits if item["content_health_status"] == "healthy")
         assert hits.index(healthy_hit) < hits.index(stale_hit)
+
+
+def test_search_lab_compare_derives_both_evidence_views_from_one_ranking():
+    account = Account.create()
+    with TestClient(app) as client:
+        token = _login(client, account)
+        headers = {"Authorization": f"Bearer {token}"}
+        configure_warehouse_credentials(client, headers)
+        kb_id = client.post("/kbs", headers=headers, json={"name": "Compare Legs KB", "description": "legs"}).json()["id"]
+        paragraphs = [
+            "Rotate signing keys every quarter.",
+            "Signing keys live in the hardware module.",
+            "Keys for staging rotate monthly.",
+            "Incident reviews happen within five days.",
+        ]
+        _source, evidence, _upload = _upload_source_and_build_evidence(
+            client,
+            headers,
+            kb_id,
+            source_dir="library/compare-legs",
+            file_name="keys.md",
+            content="\n\n".join(f"# Part {index}\n\n{text}" for index, text in enumerate(paragraphs)).encode("utf-8"),
+        )
+        _create_manual_item(
+            client,
+            headers,
+            kb_id,
+            title="Quarterly rotation",
+            statement="Rotate signing keys every quarter.",
+            item_type="fact",
+            payload={"fact": "Rotate signing keys every quarter."},
+            evidence_unit_ids=[evidence[0]["id"], evidence[1]["id"]],
+        )
+        _publish_release(client, headers, kb_id, version="release-1")
+
+        compare = client.post(
+            f"/kbs/{kb_id}/search-lab/compare",
+            headers=headers,
+            json={"query": "signing keys", "top_k": 3, "result_view": "compact", "availability_mode": "allow_all"},
+        )
+        compare.raise_for_status()
+        payload = compare.json()
+
+        service = ServiceSearchService()
+        with SessionLocal() as db:
+            expected_evidence = service._search_evidence(  # noqa: SLF001
+                db,
+                kb_id=kb_id,
+                query="signing keys",
+                result_view="compact",
+                availability_mode="allow_all",
+                top_k=3,
+                exclude_evidence_ids=set(),
+                include_zero_scores=True,
+            )
+            expected_fallback = service._search_evidence(  # noqa: SLF001
+                db,
+                kb_id=kb_id,
+                query="signing keys",
+                result_view="compact",
+                availability_mode="allow_all",
+                top_k=2,
+                exclude_evidence_ids={evidence[0]["id"], evidence[1]["id"]},
+                include_zero_scores=True,
+            )
+            log = db.scalar(select(RetrievalLog).where(RetrievalLog.kb_id == kb_id).order_by(RetrievalLog.id.desc()))
+
+        assert payload["evidence_only"]["hits"] == [hit.model_dump() for hit in expected_evidence]
+        assert {hit["evidence_id"] for hit in payload["evidence_only"]["hits"][:2]} == {evidence[0]["id"], evidence[1]["id"]}
+        assert payload["formal_first"]["hits"][0]["result_kind"] == "formal"
+        assert payload["formal_first"]["hits"][1:] == [hit.model_dump() for hit in expected_fallback]
+        assert [hit["evidence_id"] for hit in payload["formal_first"]["hits"][1:]] == [evidence[2]["id"], evidence[3]["id"]]
+        assert set(log.trace_json["legs"]) == {"formal", "evidence"}
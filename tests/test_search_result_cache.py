@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from eth_account import Account
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from tests.helpers import configure_warehouse_credentials
+from tests.test_service_search import _create_grant, _create_service_principal, _login, _upload_source_and_build_evidence
+
+from knowledge.db.session import SessionLocal
+from knowledge.main import app
+from knowledge.models import KnowledgeBase, RetrievalLog
+from knowledge.schemas.service_search import ServiceSearchHit
+from knowledge.services.retrieval_log_writer import retrieval_log_writer
+from knowledge.services.search_result_cache import SearchResultCache, search_result_cache
+from knowledge.services.warehouse_scope import warehouse_app_path
+
+
+def _generation(kb_id: int) -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(KnowledgeBase.evidence_generation).where(KnowledgeBase.id == kb_id))
+
+
+def _search(client: TestClient, api_key: str, kb_id: int, query: str):
+    response = client.post(
+        "/service/search/evidence",
+        headers={"X-Service-Api-Key": api_key},
+        json={"kb_id": kb_id, "query": query},
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def test_repeated_search_is_served_from_cache_until_evidence_generation_changes():
+    with TestClient(app) as client:
+        token = _login(client, Account.create())
+        headers = {"Authorization": f"Bearer {token}"}
+        configure_warehouse_credentials(client, headers)
+        kb_id = client.post("/kbs", headers=headers, json={"name": "Result Cache KB", "description": "cache"}).json()["id"]
+        assert _generation(kb_id) == 0
+        source, _evidence = _upload_source_and_build_evidence(
+            client,
+            headers,
+            kb_id,
+            source_dir="library/result-cache",
+            file_name="policy.txt",
+            content=b"Backups are retained for thirty days.",
+        )
+        # One bump from the scan, one from the evidence build.
+        assert _generation(kb_id) == 2
+        principal, api_key = _create_service_principal(client, headers, service_id="result-cache", display_name="Result Cache")
+        _create_grant(client, headers, kb_id, principal_id=principal["id"], release_selection_mode="latest_published")
+
+        hits_before = search_result_cache.stats()["hits"]
+        first = _search(client, api_key, kb_id, "Backups retained")
+        second = _search(client, api_key, kb_id, "  backups RETAINED ")
+        assert second["hits"] == first["hits"]
+        assert search_result_cache.stats()["hits"] == hits_before + 1
+
+        client.post(
+            "/warehouse/upload",
+            headers=headers,
+            data={"target_dir": warehouse_app_path("library/result-cache")},
+            files={"file": ("extra.txt", b"Backups are also retained offsite.", "text/plain")},
+        ).raise_for_status()
+        client.post(f"/kbs/{kb_id}/sources/{source['id']}/scan", headers=headers).raise_for_status()
+        client.post(f"/kbs/{kb_id}/sources/{source['id']}/build-evidence", headers=headers).raise_for_status()
+        assert _generation(kb_id) == 4
+
+        third = _search(client, api_key, kb_id, "backups retained")
+        assert len(third["hits"]) == 2
+        assert search_result_cache.stats()["hits"] == hits_before + 1
+
+        retrieval_log_writer.flush()
+        with SessionLocal() as db:
+            traces = [log.trace_json["retrieval"] for log in db.scalars(select(RetrievalLog).where(RetrievalLog.kb_id == kb_id).order_by(RetrievalLog.id.asc()))]
+        assert [trace.get("cache") for trace in traces] == [None, "hit", None]
+
+
+def test_result_cache_evicts_least_recently_used_and_expires():
+    now = [0.0]
+    cache = SearchResultCache(max_entries=2, ttl_seconds=10, clock=lambda: now[0])
+    hit = ServiceSearchHit(result_kind="evidence", score=1.0, content_health_status="healthy", source_health_summary="healthy", evidence_id=1)
+    cache.put(("a",), [hit])
+    cache.put(("b",), [])
+    assert cache.get(("a",)) == [hit]
+    cache.put(("c",), [])
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) == [hit]
+    now[0] = 10.0
+    assert cache.get(("c",)) is None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["expirations"] == 1
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+
+    disabled = SearchResultCache(max_entries=0, ttl_seconds=10)
+    disabled.put(("a",), [hit])
+    assert not disabled.enabled
+    assert disabled.get(("a",)) is None
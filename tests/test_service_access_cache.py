@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import re
+
+from eth_account import Account
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func, select
+
+from tests.helpers import configure_warehouse_credentials
+from tests.test_service_search import (
+    _create_grant,
+    _create_manual_item,
+    _create_service_principal,
+    _login,
+    _publish_release,
+    _upload_source_and_build_evidence,
+)
+
+from knowledge.db.session import SessionLocal, engine
+from knowledge.main import app
+from knowledge.models import RetrievalLog, ServiceGrant
+from knowledge.schemas.future_domain import ServiceGrantRead
+from knowledge.schemas.grants import ServiceGrantResolvedRead
+from knowledge.services.service_access_cache import ServiceAccess, ServiceAccessCache
+from knowledge.services.service_search import ServiceSearchService
+from knowledge.utils.time import utc_now
+
+
+ACCESS_QUERY = re.compile(r"^\s*SELECT\b.*\bFROM (service_principals|service_grants|kb_releases)\b", re.IGNORECASE | re.DOTALL)
+
+
+def _access_queries(callback) -> tuple[object, list[str]]:
+    statements: list[str] = []
+
+    def _record(_conn, _cursor, statement, _parameters, _context, _executemany) -> None:
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        result = callback()
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    return result, [statement for statement in statements if ACCESS_QUERY.search(statement)]
+
+
+def _fixture(client: TestClient) -> tuple[dict[str, str], int, dict, str]:
+    token = _login(client, Account.create())
+    headers = {"Authorization": f"Bearer {token}"}
+    configure_warehouse_credentials(client, headers)
+    kb_id = client.post("/kbs", headers=headers, json={"name": "Access Cache KB", "description": "cache"}).json()["id"]
+    _source, evidence = _upload_source_and_build_evidence(
+        client,
+        headers,
+        kb_id,
+        source_dir="library/access-cache",
+        file_name="keys.txt",
+        content=b"Rotate signing keys quarterly.",
+    )
+    _create_manual_item(
+        client,
+        headers,
+        kb_id,
+        title="Key rotation",
+        statement="Rotate signing keys quarterly.",
+        item_type="fact",
+        payload={"fact": "Rotate signing keys quarterly."},
+        evidence_unit_ids=[evidence[0]["id"]],
+    )
+    _publish_release(client, headers, kb_id, version="release-1")
+    principal, api_key = _create_service_principal(client, headers, service_id="access-cache", display_name="Access Cache")
+    _create_grant(client, headers, kb_id, principal_id=principal["id"], release_selection_mode="latest_published")
+    return headers, kb_id, principal, api_key
+
+
+def _search(client: TestClient, api_key: str, kb_id: int):
+    return client.post(
+        "/service/search/formal",
+        headers={"X-Service-Api-Key": api_key},
+        json={"kb_id": kb_id, "query": "signing keys"},
+    )
+
+
+def test_warm_search_skips_principal_grant_and_release_queries():
+    with TestClient(app) as client:
+        _headers, kb_id, _principal, api_key = _fixture(client)
+        cold, cold_queries = _access_queries(lambda: _search(client, api_key, kb_id))
+        warm, warm_queries = _access_queries(lambda: _search(client, api_key, kb_id))
+
+    assert cold.status_code == warm.status_code == 200
+    assert cold_queries
+    # Only the grant's usage timestamps are re-read on a hit.
+    assert len(warm_queries) == 1
+    assert "last_used_at" in warm_queries[0] and "grant_status" not in warm_queries[0]
+    assert warm.json()["release"]["id"] == cold.json()["release"]["id"]
+    usage = {"last_used_at", "updated_at"}
+    assert {key: value for key, value in warm.json()["grant"].items() if key not in usage} == {
+        key: value for key, value in cold.json()["grant"].items() if key not in usage
+    }
+
+
+def test_principal_update_and_release_publish_invalidate_cached_access():
+    with TestClient(app) as client:
+        headers, kb_id, principal, api_key = _fixture(client)
+        first = _search(client, api_key, kb_id)
+        first.raise_for_status()
+
+        release_2 = _publish_release(client, headers, kb_id, version="release-2")["release"]
+        republished = _search(client, api_key, kb_id)
+        republished.raise_for_status()
+        assert republished.json()["release"]["id"] == release_2["id"] != first.json()["release"]["id"]
+
+        client.patch(f"/service-principals/{principal['id']}", headers=headers, json={"principal_status": "disabled"}).raise_for_status()
+        disabled = _search(client, api_key, kb_id)
+        assert disabled.status_code == 403
+        assert disabled.json()["detail"] == "service principal is disabled"
+
+
+def _access(expires_at=None) -> ServiceAccess:
+    now = utc_now()
+    grant = ServiceGrantRead(
+        id=1,
+        owner_wallet_address="0xowner",
+        kb_id=7,
+        service_principal_id=3,
+        grant_status="active",
+        release_selection_mode="latest_published",
+        pinned_release_id=None,
+        default_result_mode="compact",
+        expires_at=expires_at,
+        last_used_at=None,
+        revoked_at=None,
+        revoked_by="",
+        created_at=now,
+        updated_at=now,
+    )
+    return ServiceAccess(
+        principal_id=3,
+        grant=grant,
+        release=None,
+        release_error="current published release not found",
+        resolved_grant=ServiceGrantResolvedRead(**grant.model_dump()),
+    )
+
+
+def test_cache_honours_ttl_grant_expiry_and_racing_invalidation():
+    now = [0.0]
+    cache = ServiceAccessCache(ttl_seconds=5, clock=lambda: now[0])
+    cache.put("fp", 7, _access(), cache.generation)
+    assert cache.get("fp", 7) is not None
+    assert cache.get("fp", 8) is None
+    now[0] = 5.0
+    assert cache.get("fp", 7) is None
+
+    cache.put("expired", 7, _access(expires_at=utc_now().replace(year=2000)), cache.generation)
+    assert cache.get("expired", 7) is None
+
+    generation = cache.generation
+    cache.invalidate()
+    cache.put("fp", 7, _access(), generation)
+    assert cache.get("fp", 7) is None
+    assert cache.stats()["invalidations"] == 1
+
+    disabled = ServiceAccessCache(ttl_seconds=0)
+    disabled.put("fp", 7, _access(), disabled.generation)
+    assert disabled.get("fp", 7) is None
+
+
+def test_synchronous_log_mode_touches_grant_from_cached_access():
+    with TestClient(app) as client:
+        _headers, kb_id, _principal, api_key = _fixture(client)
+        service = ServiceSearchService()
+        service.log_writer = None
+        with SessionLocal() as db:
+            responses = [
+                service.search(
+                    db,
+                    service_api_key=api_key,
+                    kb_id=kb_id,
+                    query="signing keys",
+                    mode="formal_only",
+                    result_view=None,
+                    availability_mode="allow_all",
+                    top_k=3,
+                )
+                for _ in range(2)
+            ]
+            grant = db.scalar(select(ServiceGrant).where(ServiceGrant.kb_id == kb_id))
+            assert grant.last_used_at is not None
+            # The second search hits the access cache but still reports the touch made by the first.
+            assert responses[0].grant.last_used_at is None
+            assert responses[1].grant.last_used_at is not None
+            assert db.scalar(select(func.count(RetrievalLog.id)).where(RetrievalLog.kb_id == kb_id)) == 2
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from eth_account import Account
+from fastapi.testclient import TestClient
+from sqlalchemy import event, select
+
+from tests.helpers import configure_warehouse_credentials
+from tests.test_service_search import (
+    _create_grant,
+    _create_manual_item,
+    _create_service_principal,
+    _login,
+    _publish_release,
+    _upload_source_and_build_evidence,
+)
+
+from knowledge.core.settings import get_settings
+from knowledge.db.session import SessionLocal, engine
+from knowledge.main import app
+from knowledge.models import RetrievalLog
+from knowledge.services.retrieval_log_writer import retrieval_log_writer
+
+
+QUERIES = ["signing keys", "nightly backups", "incident reviews", "unrelated gardening"]
+
+
+def _count_selects(callback) -> tuple[object, int]:
+    statements: list[str] = []
+
+    def _record(_conn, _cursor, statement, _parameters, _context, _executemany) -> None:
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        result = callback()
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    return result, sum(1 for statement in statements if statement.lstrip().upper().startswith("SELECT"))
+
+
+def _fixture(client: TestClient) -> tuple[int, str]:
+    token = _login(client, Account.create())
+    headers = {"Authorization": f"Bearer {token}"}
+    configure_warehouse_credentials(client, headers)
+    kb_id = client.post("/kbs", headers=headers, json={"name": "Batch KB", "description": "batch"}).json()["id"]
+    _source, evidence = _upload_source_and_build_evidence(
+        client,
+        headers,
+        kb_id,
+        source_dir="library/batch-search",
+        file_name="ops.md",
+        content=b"# Keys\n\nRotate signing keys quarterly.\n\n# Backups\n\nBackups run nightly.\n\n# Incidents\n\nIncident reviews happen within five days.",
+    )
+    _create_manual_item(
+        client,
+        headers,
+        kb_id,
+        title="Key rotation",
+        statement="Rotate signing keys quarterly.",
+        item_type="fact",
+        payload={"fact": "Rotate signing keys quarterly."},
+        evidence_unit_ids=[evidence[0]["id"]],
+    )
+    _publish_release(client, headers, kb_id, version="release-1")
+    principal, api_key = _create_service_principal(client, headers, service_id="batch-search", display_name="Batch")
+    _create_grant(client, headers, kb_id, principal_id=principal["id"], release_selection_mode="latest_published", default_result_mode="audit")
+    return kb_id, api_key
+
+
+def _batch(client: TestClient, api_key: str, kb_id: int, queries: list[str], **body):
+    return client.post(
+        "/service/search/batch",
+        headers={"X-Service-Api-Key": api_key},
+        json={"kb_id": kb_id, "queries": queries, **body},
+    )
+
+
+def test_batch_search_matches_individual_searches_and_logs_each_query():
+    with TestClient(app) as client:
+        kb_id, api_key = _fixture(client)
+        batch = _batch(client, api_key, kb_id, QUERIES, top_k=2)
+        batch.raise_for_status()
+        payload = batch.json()
+        assert payload["mode"] == "formal_first"
+        assert payload["result_view"] == "audit"
+        assert [result["query"] for result in payload["results"]] == QUERIES
+
+        for query, result in zip(QUERIES, payload["results"]):
+            single = client.post(
+                "/service/search",
+                headers={"X-Service-Api-Key": api_key},
+                json={"kb_id": kb_id, "query": query, "top_k": 2},
+            )
+            single.raise_for_status()
+            assert result["hits"] == single.json()["hits"]
+        assert payload["results"][0]["hits"][0]["result_kind"] == "formal"
+        assert payload["results"][-1]["hits"] == []
+
+        retrieval_log_writer.flush()
+        with SessionLocal() as db:
+            logs = list(db.scalars(select(RetrievalLog).where(RetrievalLog.kb_id == kb_id).order_by(RetrievalLog.id.asc())))
+        batch_logs = [log for log in logs if "batch" in log.trace_json]
+        assert [log.query for log in batch_logs] == QUERIES
+        assert [log.trace_json["batch"] for log in batch_logs] == [{"size": 4, "position": index} for index in range(4)]
+
+
+def test_batch_search_statement_count_does_not_grow_with_queries():
+    with TestClient(app) as client:
+        kb_id, api_key = _fixture(client)
+        _batch(client, api_key, kb_id, QUERIES[:1]).raise_for_status()
+        for mode in ("formal_first", "evidence_only"):
+            few, few_selects = _count_selects(lambda: _batch(client, api_key, kb_id, QUERIES[:2], mode=mode))
+            many, many_selects = _count_selects(lambda: _batch(client, api_key, kb_id, QUERIES * 4, mode=mode))
+            assert few.status_code == many.status_code == 200
+            assert many_selects == few_selects
+
+
+def test_batch_search_rejects_empty_and_oversized_batches():
+    with TestClient(app) as client:
+        kb_id, api_key = _fixture(client)
+        empty = _batch(client, api_key, kb_id, [])
+        assert empty.status_code == 400
+        oversized = _batch(client, api_key, kb_id, ["keys"] * (get_settings().service_search_batch_max_queries + 1))
+        assert oversized.status_code == 400
+        assert _batch(client, api_key, kb_id, ["keys"], mode="everything").status_code == 400
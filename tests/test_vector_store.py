@@ -0,0 +1,394 @@
+from __future__ import annotations
+
+from uuid import uuid4
+
+import numpy as np
+from sqlalchemy import select
+
+from knowledge.db.base import Base
+from knowledge.db.schema import ensure_runtime_schema
+from knowledge.db.session import engine, session_scope
+from knowledge.models import EmbeddingRecord, ImportedChunk, ImportedDocument, KBVectorCodebook, KnowledgeBase, WalletUser
+from knowledge.services.vector_matrix import VectorMatrix, top_k_indices
+from knowledge.services.embedding import MockEmbeddingProvider
+from knowledge.services.vector_store import (
+    DBVectorStore,
+    LocalVectorStore,
+    VectorSearchOptions,
+    build_vector_search_filter_plan,
+    build_vector_search_options,
+    cosine_similarity,
+)
+from knowledge.services.vector_quantization import QuantizedVectorMatrix, ScalarQuantizer, ensure_kb_quantizer
+from knowledge.services.vector_segments import VectorSegment
+from knowledge.utils.vectors import decode_vector, encode_vector
+
+
+def _ensure_schema_ready() -> None:
+    Base.metadata.create_all(bind=engine)
+    ensure_runtime_schema(engine)
+
+
+def _seed_kb_vectors(db, documents: dict[str, list[tuple[str, list[float]]]], source_kind: str = "app") -> tuple[str, int]:
+    token = uuid4().hex
+    wallet_address = f"wallet-{token}"
+    kb = KnowledgeBase(owner_wallet_address=wallet_address, name=f"KB {token[:8]}", description="vectors")
+    db.add_all([WalletUser(wallet_address=wallet_address), kb])
+    db.flush()
+    for source_path, chunks in documents.items():
+        document = ImportedDocument(
+            kb_id=kb.id,
+            owner_wallet_address=wallet_address,
+            source_path=source_path,
+            source_file_name=source_path.rsplit("/", 1)[-1],
+            source_kind=source_kind,
+            parse_status="parsed",
+        )
+        db.add(document)
+        db.flush()
+        for index, (text, vector) in enumerate(chunks):
+            chunk = ImportedChunk(
+                document_id=document.id,
+                kb_id=kb.id,
+                owner_wallet_address=wallet_address,
+                chunk_index=index,
+                text=text,
+                metadata_json={"source_path": source_path, "source_kind": source_kind},
+            )
+            db.add(chunk)
+            db.flush()
+            db.add(
+                EmbeddingRecord(
+                    chunk_id=chunk.id,
+                    kb_id=kb.id,
+                    owner_wallet_address=wallet_address,
+                    vector_id=f"vec-{chunk.id}",
+                    embedding_model="mock",
+                    vector_json=vector,
+                )
+            )
+    db.flush()
+    return wallet_address, kb.id
+
+
+def test_vector_matrix_top_k_matches_cosine_loop():
+    rng = np.random.default_rng(3)
+    rows = rng.standard_normal((200, 8)).astype(np.float32)
+    rows[5] = 0.0
+    query = rng.standard_normal(8).astype(np.float32)
+    matrix = VectorMatrix.from_rows(rows)
+
+    expected = sorted(range(len(rows)), key=lambda index: cosine_similarity(query.tolist(), rows[index].tolist()), reverse=True)
+    indices, scores = matrix.top_k(query, 10)
+    assert indices.tolist() == expected[:10]
+    assert np.allclose(scores, [cosine_similarity(query.tolist(), rows[index].tolist()) for index in expected[:10]], atol=1e-5)
+
+    mask = np.zeros(len(rows), dtype=bool)
+    mask[::3] = True
+    masked_indices, _ = matrix.top_k(query, 4, mask=mask)
+    assert masked_indices.tolist() == [index for index in expected if index % 3 == 0][:4]
+
+    short_query = query[:5].tolist()
+    assert np.allclose(
+        matrix.scores(short_query)[:3],
+        [cosine_similarity(short_query, rows[index].tolist()) for index in range(3)],
+        atol=1e-5,
+    )
+    assert top_k_indices(np.asarray([0.1, 0.9, 0.5], dtype=np.float32), 5).tolist() == [1, 2, 0]
+
+
+def test_db_vector_store_search_uses_cached_matrix_and_refreshes_on_change():
+    _ensure_schema_ready()
+    store = DBVectorStore(max_cached_kbs=4)
+    with session_scope() as db:
+        wallet_address, kb_id = _seed_kb_vectors(
+            db,
+            {
+                "/apps/demo/a.txt": [("alpha", [1.0, 0.0, 0.0]), ("beta", [0.0, 1.0, 0.0])],
+                "/apps/demo/b.txt": [("gamma", [0.7, 0.7, 0.0]), ("short", [1.0, 0.05])],
+            },
+        )
+        results = store.search(db, wallet_address, [kb_id], [1.0, 0.1, 0.0], top_k=3)
+        assert [item["text"] for item in results] == ["short", "alpha", "gamma"]
+        assert results[1]["source_path"] == "/apps/demo/a.txt"
+        assert results[0]["metadata"]["source_kind"] == "app"
+
+        filtered = store.search(
+            db,
+            wallet_address,
+            [kb_id],
+            [1.0, 0.1, 0.0],
+            top_k=3,
+            filters={"source_paths": ["/apps/demo/b.txt"]},
+        )
+        assert [item["text"] for item in filtered] == ["short", "gamma"]
+        assert store.search(db, wallet_address, [kb_id], [1.0, 0.0, 0.0], top_k=3, filters={"source_kinds": ["external"]}) == []
+        assert store.health()["cached_kbs"] == 1
+
+        document_id = results[0]["document_id"]
+        chunk = ImportedChunk(
+            document_id=document_id,
+            kb_id=kb_id,
+            owner_wallet_address=wallet_address,
+            chunk_index=9,
+            text="delta",
+            metadata_json={"source_kind": "app"},
+        )
+        db.add(chunk)
+        db.flush()
+        db.add(
+            EmbeddingRecord(
+                chunk_id=chunk.id,
+                kb_id=kb_id,
+                owner_wallet_address=wallet_address,
+                vector_id="vec-delta",
+                embedding_model="mock",
+                vector_json=[0.0, 0.0, 1.0],
+            )
+        )
+        db.flush()
+        refreshed = store.search(db, wallet_address, [kb_id], [0.0, 0.0, 1.0], top_k=1)
+        assert [item["text"] for item in refreshed] == ["delta"]
+        assert store.search(db, "wallet-other", [kb_id], [0.0, 0.0, 1.0], top_k=1) == []
+
+
+def _local_payload(vector_id: str, text: str, vector: list[float] | None, *, kb_id: int = 1, chunk_id: int = 1, source_path: str = "/a") -> dict:
+    return {
+        "vector_id": vector_id,
+        "text": text,
+        "vector": vector,
+        "metadata": {
+            "wallet_address": "wallet-local",
+            "kb_id": kb_id,
+            "document_id": chunk_id * 10,
+            "chunk_id": chunk_id,
+            "source_path": source_path,
+            "source_kind": "app",
+        },
+    }
+
+
+def test_local_vector_store_segments_support_tombstones_compaction_and_shared_readers(tmp_path):
+    writer = LocalVectorStore(root=str(tmp_path), max_segments_per_kb=3, embedding_provider=MockEmbeddingProvider(dimensions=3))
+    writer.index_chunks(
+        [
+            _local_payload("v1", "alpha", [1.0, 0.0, 0.0], chunk_id=1),
+            _local_payload("v2", "beta", [0.0, 1.0, 0.0], chunk_id=2, source_path="/b"),
+        ]
+    )
+    writer.index_chunks([_local_payload("v3", "embedded by provider", None, chunk_id=3)])
+    writer.index_chunks([_local_payload("other-kb", "alpha elsewhere", [1.0, 0.0, 0.0], kb_id=2, chunk_id=4)])
+
+    results = writer.search(None, "wallet-local", [1], [1.0, 0.0, 0.0], top_k=5)
+    assert [item["text"] for item in results][0] == "alpha"
+    assert {item["chunk_id"] for item in results} == {1, 2, 3}
+    assert writer.search(None, "wallet-local", [1], [1.0, 0.0, 0.0], top_k=5, filters={"source_paths": ["/b"]})[0]["text"] == "beta"
+    assert writer.search(None, "wallet-other", [1], [1.0, 0.0, 0.0], top_k=5) == []
+
+    reader = LocalVectorStore(root=str(tmp_path))
+    writer.delete_vectors(["v1"])
+    assert [item["text"] for item in reader.search(None, "wallet-local", [1], [1.0, 0.0, 0.0], top_k=1)] != ["alpha"]
+
+    writer.index_chunks([_local_payload("v1", "alpha again", [1.0, 0.0, 0.0], chunk_id=1)])
+    writer.index_chunks([_local_payload("v2", "beta moved", [0.0, 0.0, 1.0], chunk_id=2)])
+    assert len(list((tmp_path / "kb-1").glob("*.f32"))) <= 3
+    refreshed = reader.search(None, "wallet-local", [1], [1.0, 0.0, 0.0], top_k=5)
+    assert [item["text"] for item in refreshed][0] == "alpha again"
+    assert sorted(item["text"] for item in refreshed) == ["alpha again", "beta moved", "embedded by provider"]
+    assert reader.health()["backend"] == "local"
+
+
+def test_local_tombstones_are_per_kb_and_dropped_by_compaction(tmp_path):
+    store = LocalVectorStore(root=str(tmp_path), max_segments_per_kb=16)
+    store.index_chunks([_local_payload("a1", "kb one", [1.0, 0.0], chunk_id=1), _local_payload("a2", "kb one b", [0.0, 1.0], chunk_id=2)])
+    store.index_chunks([_local_payload("b1", "kb two", [1.0, 0.0], kb_id=2, chunk_id=3)])
+    segments = store.segment_store
+    first = store._snapshot_for_kb("wallet-local", 1)[0]
+
+    store.delete_vectors(["b1"], kb_id=2)
+    assert segments.signature(1) == first.fingerprint
+    assert store._snapshot_for_kb("wallet-local", 1)[0] is first
+    assert store.search(None, "wallet-local", [2], [1.0, 0.0], top_k=5) == []
+
+    # A half-written tombstone line is not counted by either signature() or load(), so the snapshot stays cached.
+    store.delete_vectors(["a1"], kb_id=1)
+    log_path = next((tmp_path / "kb-1").glob("tombstones-*.log"))
+    with log_path.open("a", encoding="utf-8") as handle:
+        handle.write("99\ta2")
+    deleted = store._snapshot_for_kb("wallet-local", 1)[0]
+    assert segments.signature(1) == deleted.fingerprint
+    assert store._snapshot_for_kb("wallet-local", 1)[0] is deleted
+    assert [item["text"] for item in store.search(None, "wallet-local", [1], [1.0, 0.0], top_k=5)] == ["kb one b"]
+
+    segments.compact(1)
+    assert list((tmp_path / "kb-1").glob("tombstones-*.log")) == []
+    assert segments._tombstones.get(1) is None
+    reader = LocalVectorStore(root=str(tmp_path))
+    assert [item["text"] for item in reader.search(None, "wallet-local", [1], [1.0, 0.0], top_k=5)] == ["kb one b"]
+    store.delete_vectors(["a2"], kb_id=1)
+    assert store.search(None, "wallet-local", [1], [1.0, 0.0], top_k=5) == []
+    assert reader.search(None, "wallet-local", [1], [1.0, 0.0], top_k=5) == []
+
+
+def test_local_snapshots_are_lru_bounded_and_read_sidecar_rows_for_hits_only(tmp_path, monkeypatch):
+    store = LocalVectorStore(root=str(tmp_path), max_cached_kbs=1)
+    store.index_chunks([_local_payload(f"a{index}", f"kb one {index}", [1.0, index / 10], chunk_id=index + 1) for index in range(20)])
+    store.index_chunks([_local_payload("b1", "kb two", [1.0, 0.0], kb_id=2, chunk_id=100, source_path="/b")])
+
+    reads: list[list[int]] = []
+    read_entries = VectorSegment.read_entries
+
+    def _recording_read(segment, rows):
+        rows = list(rows)
+        reads.append(rows)
+        return read_entries(segment, rows)
+
+    monkeypatch.setattr(VectorSegment, "read_entries", _recording_read)
+    results = store.search(None, "wallet-local", [1], [1.0, 0.0], top_k=3, options=VectorSearchOptions(quantization="int8"))
+    assert [item["text"] for item in results] == ["kb one 0", "kb one 1", "kb one 2"]
+    assert results[0]["metadata"]["document_id"] == 10
+    assert reads == [[0, 1, 2]]
+    segment = next(iter(store._snapshots[("wallet-local", 1)][1].values()))
+    assert not hasattr(segment, "entries")
+
+    assert [item["text"] for item in store.search(None, "wallet-local", [2], [1.0, 0.0], top_k=3, filters={"source_paths": ["/b"]})] == ["kb two"]
+    assert list(store._snapshots) == [("wallet-local", 2)]
+    assert list(store._quantized) == [] and 1 not in store._quantizers
+    assert {path.parent.name for path in store.segment_store._segments} == {"kb-2"}
+    # An evicted KB is reloaded from disk on its next search.
+    assert store.search(None, "wallet-local", [1], [1.0, 0.0], top_k=1)[0]["text"] == "kb one 0"
+    assert list(store._snapshots) == [("wallet-local", 1)]
+
+
+def test_ivf_search_keeps_recall_and_refreshes_incrementally(tmp_path):
+    rng = np.random.default_rng(11)
+    centers = rng.standard_normal((12, 8)).astype(np.float32)
+    rows = centers[rng.integers(0, 12, size=600)] + 0.2 * rng.standard_normal((600, 8)).astype(np.float32)
+    store = LocalVectorStore(root=str(tmp_path), ann_min_vectors=100)
+    store.index_chunks([_local_payload(f"v{index}", f"row {index}", row.tolist(), chunk_id=index) for index, row in enumerate(rows)])
+
+    ivf = VectorSearchOptions(vector_index="ivf", nprobe=4)
+    hits = 0
+    for query in centers:
+        exact = {item["chunk_id"] for item in store.search(None, "wallet-local", [1], query.tolist(), top_k=10)}
+        approx = {item["chunk_id"] for item in store.search(None, "wallet-local", [1], query.tolist(), top_k=10, options=ivf)}
+        hits += len(exact & approx)
+    assert hits / (10 * len(centers)) >= 0.9
+
+    trained = store._snapshots[("wallet-local", 1)][0].ann_index
+    assert trained is not None
+    store.index_chunks([_local_payload("new", "fresh row", centers[0].tolist(), chunk_id=9999)])
+    store.delete_vectors(["v0"])
+    results = store.search(None, "wallet-local", [1], centers[0].tolist(), top_k=3, options=ivf)
+    assert results[0]["text"] == "fresh row"
+    assert "row 0" not in {item["text"] for item in results}
+    refreshed = store._snapshots[("wallet-local", 1)][0].ann_index
+    assert refreshed is not trained
+    assert np.array_equal(refreshed.centroids, trained.centroids)
+    assert len(refreshed) == len(rows) + 1
+
+    assert build_vector_search_options({"vector_index": "IVF", "ivf_nprobe": 32}) == VectorSearchOptions("ivf", 32)
+    assert build_vector_search_options({"vector_index": "hnsw"}) == VectorSearchOptions()
+
+
+def test_embedding_vectors_migrate_from_json_to_binary_blobs():
+    blob = encode_vector([0.5, -1.0, 2.0])
+    decoded = decode_vector(blob)
+    assert len(blob) == 8 + 12
+    assert decoded.dtype == np.float32 and decoded.tolist() == [0.5, -1.0, 2.0]
+    assert not decoded.flags.writeable and not decoded.flags.owndata
+    assert decode_vector(encode_vector([0.25, 1.5], dtype="float16")).tolist() == [0.25, 1.5]
+    assert decode_vector(encode_vector(None)).shape == (0,)
+
+    _ensure_schema_ready()
+    store = DBVectorStore(max_cached_kbs=0)
+    with session_scope() as db:
+        wallet_address, kb_id = _seed_kb_vectors(db, {"/apps/demo/legacy.txt": [("legacy", [0.0, 1.0]), ("other", [1.0, 0.0])]})
+    ensure_runtime_schema(engine)
+    with session_scope() as db:
+        records = db.scalars(select(EmbeddingRecord).where(EmbeddingRecord.kb_id == kb_id).order_by(EmbeddingRecord.id)).all()
+        assert [record.vector_json for record in records] == [[], []]
+        assert [decode_vector(record.vector_blob).tolist() for record in records] == [[0.0, 1.0], [1.0, 0.0]]
+        assert [item["text"] for item in store.search(db, wallet_address, [kb_id], [0.1, 1.0], top_k=2)] == ["legacy", "other"]
+
+
+def test_int8_quantized_search_reranks_against_full_precision_vectors():
+    rng = np.random.default_rng(5)
+    rows = rng.standard_normal((300, 16)).astype(np.float32)
+    quantizer = ScalarQuantizer.fit(rows)
+    quantized = QuantizedVectorMatrix.from_codes(quantizer, quantizer.encode(rows))
+    query = rng.standard_normal(16).astype(np.float32)
+    exact = VectorMatrix.from_rows(rows).scores(query)
+    assert quantized.codes.dtype == np.int8 and quantized.nbytes < VectorMatrix.from_rows(rows).nbytes / 2
+    assert np.allclose(quantized.scores(query), exact, atol=0.03)
+    assert np.allclose(quantized.scores_rows(np.asarray([3, 7]), query), quantized.scores(query)[[3, 7]])
+
+    _ensure_schema_ready()
+    store = DBVectorStore(max_cached_kbs=4)
+    with session_scope() as db:
+        wallet_address, kb_id = _seed_kb_vectors(
+            db,
+            {"/apps/demo/q.txt": [(f"row {index}", row.tolist()) for index, row in enumerate(rows[:40])]},
+        )
+        kb = db.get(KnowledgeBase, kb_id)
+        ensure_kb_quantizer(db, kb, [row.tolist() for row in rows[:40]], sample_size=100)
+        record = db.scalar(select(EmbeddingRecord).where(EmbeddingRecord.kb_id == kb_id).order_by(EmbeddingRecord.id))
+        record.vector_codes = encode_vector(quantizer.encode(rows[0]), "int8")
+        db.flush()
+
+        expected = [item["text"] for item in store.search(db, wallet_address, [kb_id], query.tolist(), top_k=5)]
+        int8 = build_vector_search_options({"vector_quantization": "int8"})
+        results = store.search(db, wallet_address, [kb_id], query.tolist(), top_k=5, options=int8)
+        assert [item["text"] for item in results] == expected
+        assert np.allclose([item["score"] for item in results], sorted(exact[:40], reverse=True)[:5], atol=1e-5)
+        assert db.scalar(select(KBVectorCodebook.dimensions).where(KBVectorCodebook.kb_id == kb_id)) == 16
+        assert store.health()["cached_vector_bytes"] > 0
+
+
+def test_db_vector_store_prefilters_selective_searches_in_sql():
+    _ensure_schema_ready()
+    store = DBVectorStore(max_cached_kbs=4)
+    with session_scope() as db:
+        wallet_address, kb_id = _seed_kb_vectors(
+            db,
+            {
+                "/apps/demo/a.txt": [("alpha", [1.0, 0.0]), ("beta", [0.0, 1.0])],
+                "/apps/demo/b.txt": [("gamma", [0.9, 0.1])],
+            },
+        )
+        plan = build_vector_search_filter_plan(wallet_address=wallet_address, kb_ids=[kb_id], filters={"source_paths": ["/apps/demo/b.txt"]})
+        snapshot = store._snapshot_for_kb(db, wallet_address, kb_id, filter_plan=plan)
+        assert len(snapshot) == 1
+
+        filtered = store.search(db, wallet_address, [kb_id], [1.0, 0.0], top_k=3, filters={"source_paths": ["/apps/demo/b.txt"]})
+        assert [item["text"] for item in filtered] == ["gamma"]
+        document_id = filtered[0]["document_id"]
+        assert store.search(db, wallet_address, [kb_id], [1.0, 0.0], top_k=3, filters={"document_ids": [document_id], "source_kinds": ["external"]}) == []
+        assert store.health()["cached_kbs"] == 0
+
+        assert [item["text"] for item in store.search(db, wallet_address, [kb_id], [1.0, 0.0], top_k=2, filters={"source_kinds": ["app"]})] == ["alpha", "gamma"]
+        assert store.health()["cached_kbs"] == 1
+        cached = store.search(db, wallet_address, [kb_id], [0.0, 1.0], top_k=3, filters={"document_ids": [document_id]})
+        assert [item["text"] for item in cached] == ["gamma"]
+
+
+def test_db_vector_store_refreshes_cached_snapshot_after_in_place_document_update():
+    _ensure_schema_ready()
+    store = DBVectorStore(max_cached_kbs=4)
+    with session_scope() as db:
+        wallet_address, kb_id = _seed_kb_vectors(
+            db,
+            {
+                "/apps/demo/a.txt": [("alpha", [1.0, 0.0])],
+                "/apps/demo/b.txt": [("gamma", [0.9, 0.1])],
+            },
+        )
+        assert [item["text"] for item in store.search(db, wallet_address, [kb_id], [1.0, 0.0], top_k=2, filters={"source_kinds": ["app"]})] == ["alpha", "gamma"]
+        assert store.health()["cached_kbs"] == 1
+
+        document = db.scalar(select(ImportedDocument).where(ImportedDocument.kb_id == kb_id, ImportedDocument.source_path == "/apps/demo/b.txt"))
+        document.source_kind = "external"
+        db.flush()
+
+        assert [item["text"] for item in store.search(db, wallet_address, [kb_id], [1.0, 0.0], top_k=2, filters={"source_kinds": ["app"]})] == ["alpha"]
+        assert [item["text"] for item in store.search(db, wallet_address, [kb_id], [1.0, 0.0], top_k=2, filters={"source_kinds": ["external"]})] == ["gamma"]